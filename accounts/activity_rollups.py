@@ -0,0 +1,171 @@
+"""Hourly UserActivity rollups (UserActivityHourly) and the reads built on them.
+
+The activity dashboard, statistics page and system-status API used to group
+the raw UserActivity table — tens of millions of rows on a busy site — once
+per chart, and the hourly pattern relied on SQLite's strftime(). Every
+activity written now also bumps its hour's rollup row for (user, module,
+activity level, action type) — connect() hooks UserActivity's post_save —
+and the reads below take:
+
+  * whole hours from the rollups, and
+  * the partial hour at the start of the window from the raw table, an
+    indexed range of at most an hour,
+
+so a 90-day view costs the same handful of queries as a one-day view, on
+any database backend.
+
+`manage.py rebuild_activity_rollups` rebuilds a date range from the raw table,
+for the initial backfill. Do not rebuild months core.retention has archived:
+their raw rows are gone and the rollups are all that is left.
+"""
+from collections import Counter
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import ExtractHour, TruncHour
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .models import UserActivity, UserActivityHourly
+
+DIMENSIONS = ("user_id", "module", "activity_level", "action_type")
+
+
+def hour_of(moment):
+    """Start of the UTC hour containing `moment`."""
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _next_hour(moment):
+    start = hour_of(moment)
+    return start if start == moment else start + timedelta(hours=1)
+
+
+def record(activity):
+    """Add one UserActivity to its hour's rollup row."""
+    is_error = activity.status_code is not None and activity.status_code >= 400
+    timed = activity.response_time_ms is not None
+    key = {
+        "hospital_id": activity.hospital_id,
+        "hour": hour_of(activity.timestamp),
+        "user_id": activity.user_id,
+        "module": activity.module or "",
+        "activity_level": activity.activity_level,
+        "action_type": activity.action_type,
+    }
+    updated = UserActivityHourly._base_manager.filter(**key).update(
+        count=F("count") + 1,
+        error_count=F("error_count") + int(is_error),
+        response_time_ms_total=F("response_time_ms_total") + (activity.response_time_ms or 0),
+        timed_count=F("timed_count") + int(timed),
+    )
+    if not updated:
+        # A concurrent first write may create a twin row; reads sum them.
+        UserActivityHourly._base_manager.create(
+            count=1, error_count=int(is_error),
+            response_time_ms_total=activity.response_time_ms or 0,
+            timed_count=int(timed), **key,
+        )
+
+
+def rebuild(start, end):
+    """Replace the rollups of [start, end) — hour-aligned — with counts from
+    the raw table. Returns the number of rollup rows written."""
+    start, end = hour_of(start), _next_hour(end)
+    UserActivityHourly._base_manager.filter(hour__gte=start, hour__lt=end).delete()
+    rows = (
+        UserActivity._base_manager.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(bucket=TruncHour("timestamp", tzinfo=dt_timezone.utc))
+        .values("hospital_id", "bucket", *DIMENSIONS)
+        .annotate(
+            n=Count("id"),
+            errors=Count("id", filter=Q(status_code__gte=400)),
+            response_total=Sum("response_time_ms"),
+            timed=Count("response_time_ms"),
+        )
+        .order_by()
+    )
+    rollups = [
+        UserActivityHourly(
+            hospital_id=row["hospital_id"], hour=row["bucket"],
+            user_id=row["user_id"], module=row["module"] or "",
+            activity_level=row["activity_level"], action_type=row["action_type"],
+            count=row["n"], error_count=row["errors"],
+            response_time_ms_total=row["response_total"] or 0, timed_count=row["timed"],
+        )
+        for row in rows.iterator()
+    ]
+    UserActivityHourly._base_manager.bulk_create(rollups, batch_size=1000)
+    return len(rollups)
+
+
+def _window(start):
+    """(rollups, raw) querysets that together cover `start` until now."""
+    first_full_hour = _next_hour(start)
+    return (
+        UserActivityHourly.objects.filter(hour__gte=first_full_hour),
+        UserActivity.objects.filter(timestamp__gte=start, timestamp__lt=first_full_hour),
+    )
+
+
+def counts_by(start, *fields):
+    """Activity counts since `start` grouped by `fields` (names valid on both
+    models, e.g. 'module' or 'user__username'), largest first."""
+    rollups, raw = _window(start)
+    totals = Counter()
+    for row in rollups.values(*fields).annotate(n=Sum("count")).order_by():
+        totals[tuple(row[f] for f in fields)] += row["n"]
+    for row in raw.values(*fields).annotate(n=Count("id")).order_by():
+        totals[tuple(row[f] for f in fields)] += row["n"]
+    return [dict(zip(fields, key), count=n) for key, n in totals.most_common()]
+
+
+def total(start):
+    rollups, raw = _window(start)
+    return (rollups.aggregate(n=Sum("count"))["n"] or 0) + raw.count()
+
+
+def active_user_count(start):
+    rollups, raw = _window(start)
+    users = set(rollups.filter(user__isnull=False).values_list("user_id", flat=True).distinct())
+    users.update(raw.filter(user__isnull=False).values_list("user_id", flat=True).distinct())
+    return len(users)
+
+
+def by_hour_of_day(start):
+    """Counts per local hour of day, 0-23, every hour present."""
+    rollups, raw = _window(start)
+    totals = Counter()
+    for row in rollups.annotate(h=ExtractHour("hour")).values("h").annotate(n=Sum("count")).order_by():
+        totals[row["h"]] += row["n"]
+    for row in raw.annotate(h=ExtractHour("timestamp")).values("h").annotate(n=Count("id")).order_by():
+        totals[row["h"]] += row["n"]
+    return [{"hour": f"{h:02d}", "count": totals[h]} for h in range(24)]
+
+
+def timeline(start):
+    """[(hour start, count)] for every hour from `start`'s hour until now;
+    the first bucket only counts from `start` itself."""
+    rollups, raw = _window(start)
+    totals = Counter(dict(rollups.values_list("hour").annotate(n=Sum("count")).order_by()))
+    first_hour = hour_of(start)
+    if first_hour != start:
+        totals[first_hour] += raw.count()
+    hour, last = first_hour, max([hour_of(timezone.now()), *totals])
+    series = []
+    while hour <= last:
+        series.append((hour, totals[hour]))
+        hour += timedelta(hours=1)
+    return series
+
+
+def _on_activity(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        record(instance)
+
+
+def connect():
+    post_save.connect(
+        _on_activity, sender="accounts.UserActivity",
+        dispatch_uid="activity_rollups", weak=False,
+    )
@@ -13,6 +13,7 @@ from django.core.paginator import Paginator
 from datetime import timedelta, datetime
 import json
 
+from . import activity_rollups
 from .models import UserActivity, ActivityAlert, UserSession
 from django.contrib.auth.decorators import login_required, user_passes_test
 # from .forms import ActivityFilterForm, AlertFilterForm  # We'll create inline forms
@@ -139,26 +140,18 @@ def activity_dashboard(request):
     else:
         start_time = now - timedelta(hours=24)
     
-    # Get statistics
-    total_activities = UserActivity.objects.filter(timestamp__gte=start_time).count()
-    active_users = UserActivity.objects.filter(
-        timestamp__gte=start_time, 
-        user__isnull=False
-    ).values('user').distinct().count()
+    # Get statistics (hourly rollups, plus the raw rows of the first partial hour)
+    total_activities = activity_rollups.total(start_time)
+    active_users = activity_rollups.active_user_count(start_time)
     
     # Get activity levels breakdown
-    activity_levels = UserActivity.objects.filter(
-        timestamp__gte=start_time
-    ).values('activity_level').annotate(
-        count=Count('id')
-    ).order_by('activity_level')
+    activity_levels = sorted(
+        activity_rollups.counts_by(start_time, 'activity_level'),
+        key=lambda row: row['activity_level'],
+    )
     
     # Get top activities
-    top_activities = UserActivity.objects.filter(
-        timestamp__gte=start_time
-    ).values('action_type').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
+    top_activities = activity_rollups.counts_by(start_time, 'action_type')[:10]
     
     # Get recent alerts
     recent_alerts = ActivityAlert.objects.filter(
@@ -172,20 +165,14 @@ def activity_dashboard(request):
         last_activity__gte=start_time
     ).select_related('user').order_by('-last_activity')[:10]
     
-    # Chart data for time series
-    chart_data = []
-    hours = int((now - start_time).total_seconds() / 3600)
-    for i in range(hours + 1):
-        hour_start = start_time + timedelta(hours=i)
-        hour_end = hour_start + timedelta(hours=1)
-        count = UserActivity.objects.filter(
-            timestamp__gte=hour_start,
-            timestamp__lt=hour_end
-        ).count()
-        chart_data.append({
-            'time': hour_start.strftime('%Y-%m-%d %H:%M'),
-            'count': count
-        })
+    # Chart data for time series, one point per hour
+    chart_data = [
+        {
+            'time': timezone.localtime(hour_start).strftime('%Y-%m-%d %H:%M'),
+            'count': count,
+        }
+        for hour_start, count in activity_rollups.timeline(start_time)
+    ]
     
     context = {
         'time_range': time_range,
@@ -467,37 +454,26 @@ def activity_statistics(request):
     else:
         start_time = now - timedelta(days=7)
     
-    # User statistics
-    active_users_stats = UserActivity.objects.filter(
-        timestamp__gte=start_time
-    ).values('user__username').annotate(
-        activity_count=Count('id')
-    ).order_by('-activity_count')[:20]
-    
-    # Module statistics
-    module_stats = UserActivity.objects.filter(
-        timestamp__gte=start_time
-    ).values('module').annotate(
-        activity_count=Count('id')
-    ).order_by('-activity_count')[:15]
-    
-    # Risk level statistics
-    risk_stats = UserActivity.objects.filter(
-        timestamp__gte=start_time
-    ).values('activity_level').annotate(
-        count=Count('id')
-    ).order_by('activity_level')
-    
-    # Hourly activity patterns
-    hourly_stats = UserActivity.objects.filter(
-        timestamp__gte=start_time
-    ).extra({
-        'hour': "strftime('%%H', timestamp)"
-    }).values('hour').annotate(
-        count=Count('id')
-    ).order_by('hour')
+    # User, module, risk level and hour-of-day breakdowns come from the
+    # hourly rollups (plus the raw rows of the first partial hour).
+    active_users_stats = [
+        {'user__username': row['user__username'], 'activity_count': row['count']}
+        for row in activity_rollups.counts_by(start_time, 'user__username')[:20]
+    ]
+    
+    module_stats = [
+        {'module': row['module'], 'activity_count': row['count']}
+        for row in activity_rollups.counts_by(start_time, 'module')[:15]
+    ]
+    
+    risk_stats = sorted(
+        activity_rollups.counts_by(start_time, 'activity_level'),
+        key=lambda row: row['activity_level'],
+    )
     
-    # Error statistics
+    hourly_stats = activity_rollups.by_hour_of_day(start_time)
+    
+    # Error statistics (by description, which the rollups do not keep)
     error_stats = UserActivity.objects.filter(
         timestamp__gte=start_time,
         action_type='error'
@@ -521,7 +497,7 @@ def activity_statistics(request):
         'active_users_stats': active_users_stats,
         'module_stats': module_stats,
         'risk_stats': risk_stats,
-        'hourly_stats': hourly_stats,
+        'hourly_stats': json_for_template(hourly_stats),
         'error_stats': error_stats,
         'alert_stats': alert_stats,
         'total_risk_activities': total_risk_activities,
@@ -668,9 +644,7 @@ def api_system_status(request):
             timestamp__gte=five_minutes_ago,
             user__isnull=False
         ).values('user').distinct().count(),
-        'total_activities_last_hour': UserActivity.objects.filter(
-            timestamp__gte=timezone.now() - timedelta(hours=1)
-        ).count(),
+        'total_activities_last_hour': activity_rollups.total(now - timedelta(hours=1)),
         'active_sessions': UserSession.objects.filter(
             is_active=True,
             last_activity__gte=five_minutes_ago
@@ -6,10 +6,21 @@ the limit below means "hours since the user last signed in", not "hours since
 the key was first minted".
 
 Set `API_TOKEN_TTL_HOURS=0` to switch expiry off.
+
+Each token request is authenticated once. TokenAuthUserMiddleware resolves
+the header and leaves the outcome on the request; the DRF class below reuses
+it instead of running the Token/user join a second time inside the view.
+With `API_TOKEN_CACHE_SECONDS` set, the key's (user id, created, is_active)
+is cached for that long, so a hit costs only the user lookup by primary key.
+`forget_token()` drops an entry; accounts.signals calls it when a token is
+refreshed or deleted, a user is saved, or a user logs out.
 """
+import hashlib
 from datetime import timedelta
 
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.utils import timezone
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
@@ -19,9 +30,42 @@ def token_ttl():
     return timedelta(hours=getattr(settings, "API_TOKEN_TTL_HOURS", 12))
 
 
+def _cache_key(key):
+    # Hashed: the cache (DatabaseCache, Redis) should not hold usable keys.
+    return "api_token_" + hashlib.sha256(key.encode()).hexdigest()
+
+
+def forget_token(key):
+    """Drop the cached resolution of one token key."""
+    cache.delete(_cache_key(key))
+
+
 class ExpiringTokenAuthentication(TokenAuthentication):
+    def authenticate(self, request):
+        # TokenAuthUserMiddleware already ran this for the request: reuse its
+        # (user, token), None, or AuthenticationFailed.
+        resolved = getattr(request, "_token_auth", self)
+        if resolved is self:
+            return super().authenticate(request)
+        if isinstance(resolved, AuthenticationFailed):
+            raise resolved
+        return resolved
+
     def authenticate_credentials(self, key):
-        user, token = super().authenticate_credentials(key)
+        timeout = getattr(settings, "API_TOKEN_CACHE_SECONDS", 0)
+        entry = cache.get(_cache_key(key)) if timeout else None
+        if entry is None:
+            user, token = super().authenticate_credentials(key)
+            if timeout:
+                cache.set(_cache_key(key), (user.pk, token.created, user.is_active), timeout)
+        else:
+            user_id, created, is_active = entry
+            if not is_active:
+                raise AuthenticationFailed("User inactive or deleted.")
+            user = get_user_model()._base_manager.filter(pk=user_id).first()
+            if user is None or not user.is_active:
+                raise AuthenticationFailed("User inactive or deleted.")
+            token = self.get_model()(key=key, user=user, created=created)
         ttl = token_ttl()
         if ttl and timezone.now() - token.created > ttl:
             raise AuthenticationFailed("Session expired. Sign in again.")
@@ -7,3 +7,5 @@ class AccountsConfig(AppConfig):
     def ready(self):
         # Import signals to ensure they are registered
         import accounts.signals
+        from . import activity_rollups
+        activity_rollups.connect()
@@ -0,0 +1,40 @@
+"""Rebuild the hourly UserActivity rollups from the raw table.
+
+    python manage.py rebuild_activity_rollups              # the last 90 days
+    python manage.py rebuild_activity_rollups --days 365
+
+Run it once after deploying the rollups to backfill history. New activities
+are rolled up as they are written, so it only needs re-running after raw rows
+are bulk-loaded or corrected outside the ORM.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from accounts import activity_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild UserActivityHourly rows from UserActivity, one day at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="How far back to rebuild (default 90)")
+
+    def handle(self, *args, **options):
+        if options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        end = timezone.now()
+        day = activity_rollups.hour_of(end - timedelta(days=options["days"]))
+        written = 0
+        while day < end:
+            next_day = min(day + timedelta(days=1), end)
+            # The delete and the re-insert land together, so readers never
+            # see an empty day.
+            with transaction.atomic():
+                written += activity_rollups.rebuild(day, next_day)
+            day = next_day
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {written} hourly rollup row(s) over {options['days']} day(s)"
+        ))
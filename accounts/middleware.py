@@ -28,7 +28,9 @@ class TokenAuthUserMiddleware:
     DRF authenticates inside the view, which is too late: StrictAccessControl
     runs in process_view and would see AnonymousUser and redirect the API caller
     to the HTML login page. Resolving the token here means token clients go
-    through the exact same permission checks as session users.
+    through the exact same permission checks as session users. The outcome is
+    kept on the request as `_token_auth`, which ExpiringTokenAuthentication
+    returns inside the view instead of authenticating a second time.
     """
 
     def __init__(self, get_response):
@@ -45,8 +47,11 @@ class TokenAuthUserMiddleware:
                 # Same class DRF uses, so an expired token is anonymous here too
                 # and the access-control middleware answers it with a 401.
                 result = ExpiringTokenAuthentication().authenticate(request)
-            except AuthenticationFailed:
+            except AuthenticationFailed as exc:
+                request._token_auth = exc
                 result = None
+            else:
+                request._token_auth = result
             if result:
                 request.user = result[0]
         return self.get_response(request)
@@ -0,0 +1,60 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0043_alter_customuser_username_and_more'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserActivityHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField(help_text='Start of the hour, UTC')),
+                ('module', models.CharField(blank=True, max_length=100)),
+                ('activity_level', models.CharField(max_length=10)),
+                ('action_type', models.CharField(max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('error_count', models.PositiveIntegerField(default=0, help_text='Activities answered with status 400 or above')),
+                ('response_time_ms_total', models.BigIntegerField(default=0)),
+                ('timed_count', models.PositiveIntegerField(default=0, help_text='Activities with a response time recorded')),
+            ],
+            options={
+                'verbose_name': 'Hourly User Activity',
+                'verbose_name_plural': 'Hourly User Activity',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['timestamp'], name='idx_activity_timestamp'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivity',
+            index=models.Index(fields=['action_type', 'timestamp'], name='idx_activity_type_time'),
+        ),
+        migrations.AddField(
+            model_name='useractivityhourly',
+            name='hospital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital'),
+        ),
+        migrations.AddField(
+            model_name='useractivityhourly',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='useractivityhourly',
+            index=models.Index(fields=['hour'], name='idx_activity_hourly_hour'),
+        ),
+        migrations.AddIndex(
+            model_name='useractivityhourly',
+            index=models.Index(fields=['hour', 'user'], name='idx_activity_hourly_user'),
+        ),
+    ]
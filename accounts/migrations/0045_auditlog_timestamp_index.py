@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0044_user_activity_hourly'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['timestamp'], name='idx_auditlog_timestamp'),
+        ),
+    ]
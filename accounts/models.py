@@ -561,6 +561,9 @@ class AuditLog(TenantModel):
         verbose_name = _("audit log")
         verbose_name_plural = _("audit logs")
         ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["timestamp"], name="idx_auditlog_timestamp"),
+        ]
 
     def __str__(self):
         user_str = str(self.user) if self.user else "System"
@@ -795,12 +798,55 @@ class UserActivity(TenantModel):
         verbose_name = "User Activity"
         verbose_name_plural = "User Activities"
         ordering = ["-timestamp"]
+        indexes = [
+            # Time-window reads (live monitor, the partial hour the rollups
+            # do not cover yet) and error listings.
+            models.Index(fields=["timestamp"], name="idx_activity_timestamp"),
+            models.Index(fields=["action_type", "timestamp"], name="idx_activity_type_time"),
+        ]
 
     def __str__(self):
         user_str = str(self.user) if self.user else "Anonymous"
         return f"{user_str} - {self.get_action_type_display()} - {self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}"
 
 
+class UserActivityHourly(TenantModel):
+    """UserActivity counted per UTC hour, user, module, level and action type.
+
+    Maintained by accounts.activity_rollups as activities are written; the
+    activity dashboard and statistics read these instead of grouping the raw
+    table. Rows are additive — two rows for the same key are summed, never
+    merged — so concurrent writers need no lock.
+    """
+
+    hour = models.DateTimeField(help_text="Start of the hour, UTC")
+    user = models.ForeignKey(
+        "CustomUser", on_delete=models.SET_NULL, null=True, blank=True
+    )
+    module = models.CharField(max_length=100, blank=True)
+    activity_level = models.CharField(max_length=10)
+    action_type = models.CharField(max_length=20)
+    count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(
+        default=0, help_text="Activities answered with status 400 or above"
+    )
+    response_time_ms_total = models.BigIntegerField(default=0)
+    timed_count = models.PositiveIntegerField(
+        default=0, help_text="Activities with a response time recorded"
+    )
+
+    class Meta:
+        verbose_name = "Hourly User Activity"
+        verbose_name_plural = "Hourly User Activity"
+        indexes = [
+            models.Index(fields=["hour"], name="idx_activity_hourly_hour"),
+            models.Index(fields=["hour", "user"], name="idx_activity_hourly_user"),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}:00 {self.action_type}/{self.activity_level}: {self.count}"
+
+
 class ActivityAlert(TenantModel):
     """Alerts for suspicious activity patterns"""
 
@@ -1,6 +1,10 @@
 import logging
-from django.db.models.signals import post_save, m2m_changed
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, m2m_changed
 from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .api.auth import forget_token
 from .models import CustomUser, CustomUserProfile, Role
 
 logger = logging.getLogger(__name__)
@@ -118,3 +122,31 @@ def on_user_roles_changed(sender, instance, action, **kwargs):
 # the clear twice, with an extra customuser_roles query each time.
 
 post_save.connect(create_or_update_user_profile, sender=CustomUser)
+
+
+def forget_user_tokens(user):
+    """Drop the cached resolution of every API token this user holds."""
+    if not getattr(settings, "API_TOKEN_CACHE_SECONDS", 0) or user is None:
+        return
+    for key in Token.objects.filter(user_id=user.pk).values_list("key", flat=True):
+        forget_token(key)
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def on_token_changed(sender, instance, **kwargs):
+    """A sign-in refreshes `created`; a deleted token is revoked. Either way
+    the cached resolution is stale."""
+    forget_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def on_user_saved_forget_tokens(sender, instance, update_fields=None, **kwargs):
+    # Login stamps last_login with update_fields; only is_active matters here.
+    if update_fields is None or "is_active" in update_fields:
+        forget_user_tokens(instance)
+
+
+@receiver(user_logged_out)
+def on_user_logged_out(sender, request, user, **kwargs):
+    forget_user_tokens(user)
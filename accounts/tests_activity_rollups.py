@@ -0,0 +1,87 @@
+"""Hourly activity rollups: kept by the writer, rebuildable, and what the
+activity dashboard and statistics read."""
+import io
+import json
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts import activity_rollups
+from accounts.models import CustomUser, UserActivity, UserActivityHourly
+
+
+class ActivityRollupTest(TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_superuser(
+            phone_number="08016000451", username="rollupadmin", password="pw12345",
+        )
+        self.nurse = CustomUser.objects.create_user(
+            phone_number="08016000452", username="rollupnurse", password="pw12345",
+        )
+
+    def log(self, user, action_type="view", level="low", module="Pharmacy", status=200, ms=40):
+        return UserActivity.objects.create(
+            user=user, action_type=action_type, activity_level=level,
+            description=f"{action_type} {module}", module=module,
+            status_code=status, response_time_ms=ms,
+        )
+
+    def test_writer_keeps_the_rollup(self):
+        for _ in range(3):
+            self.log(self.nurse)
+        self.log(self.nurse, action_type="error", level="medium", status=500, ms=None)
+        view = UserActivityHourly.objects.get(user=self.nurse, action_type="view")
+        self.assertEqual(
+            (view.count, view.error_count, view.response_time_ms_total, view.timed_count),
+            (3, 0, 120, 3),
+        )
+        error = UserActivityHourly.objects.get(user=self.nurse, action_type="error")
+        self.assertEqual((error.count, error.error_count, error.timed_count), (1, 1, 0))
+
+    def test_window_reads_match_the_raw_table(self):
+        now = timezone.now()
+        for hours_ago, user, action in ((30, self.nurse, "view"), (5, self.admin, "create"),
+                                        (5, self.nurse, "view"), (0, self.nurse, "update")):
+            activity = self.log(user, action_type=action)
+            UserActivity.objects.filter(pk=activity.pk).update(
+                timestamp=now - timedelta(hours=hours_ago, minutes=10)
+            )
+        out = io.StringIO()
+        call_command("rebuild_activity_rollups", "--days", "3", stdout=out)
+        self.assertIn("Rebuilt", out.getvalue())
+
+        for start in (now - timedelta(hours=24), now - timedelta(hours=5, minutes=20), now - timedelta(days=2)):
+            raw = UserActivity.objects.filter(timestamp__gte=start)
+            expected = {
+                row["action_type"]: row["n"]
+                for row in raw.values("action_type").annotate(n=Count("id"))
+            }
+            got = {row["action_type"]: row["count"] for row in activity_rollups.counts_by(start, "action_type")}
+            self.assertEqual(got, expected, start)
+            self.assertEqual(activity_rollups.total(start), raw.count())
+            self.assertEqual(
+                sum(count for _, count in activity_rollups.timeline(start)), raw.count()
+            )
+            self.assertEqual(
+                sum(row["count"] for row in activity_rollups.by_hour_of_day(start)), raw.count()
+            )
+        self.assertEqual(activity_rollups.active_user_count(now - timedelta(hours=24)), 2)
+
+    def test_statistics_page_reads_rollups(self):
+        self.log(self.nurse)
+        self.log(self.admin, module="Billing")
+        self.client.force_login(self.admin)
+        response = self.client.get("/accounts/activity-statistics/", {"time_range": "90d"})
+        self.assertEqual(response.status_code, 200)
+        hourly = json.loads(response.context["hourly_stats"])
+        self.assertEqual(len(hourly), 24)
+        self.assertEqual(sum(row["count"] for row in hourly), 2)
+        modules = {row["module"]: row["activity_count"] for row in response.context["module_stats"]}
+        self.assertEqual(modules, {"Pharmacy": 1, "Billing": 1})
+
+        response = self.client.get("/accounts/activity-dashboard/", {"time_range": "7d"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.context["chart_data"])), 7 * 24 + 1)
@@ -9,7 +9,9 @@ from datetime import timedelta
 from unittest import mock
 
 from django.core.cache import cache
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.test import Client, TestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from rest_framework.authtoken.models import Token
 from rest_framework.throttling import SimpleRateThrottle
@@ -110,3 +112,53 @@ class LoginThrottleTest(TestCase):
         for _ in range(3):
             self.assertEqual(self.attempt().status_code, 401)
         self.assertEqual(self.attempt().status_code, 429)
+
+
+@override_settings(
+    STRICT_ACCESS_CONTROL=True,
+    API_TOKEN_CACHE_SECONDS=60,
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+)
+@modify_settings(MIDDLEWARE={"remove": "core.query_count_middleware.QueryCountMiddleware"})
+class TokenResolutionCacheTest(TestCase):
+    """The middleware and DRF share one resolution per request, and the
+    cached resolution is dropped whenever the token or user changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = CustomUser.objects.create_user(
+            phone_number="08016000011", username="drcache", password="pw12345",
+        )
+        role, _ = Role.objects.get_or_create(name="doctor")
+        self.user.roles.add(role)
+        self.key = Token.objects.create(user=self.user).key
+
+    def get(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/accounts/staff/", HTTP_AUTHORIZATION=f"Token {self.key}"
+            )
+        token_queries = sum("authtoken_token" in q["sql"] for q in queries.captured_queries)
+        return response.status_code, token_queries
+
+    def test_token_is_resolved_once_then_cached(self):
+        self.assertEqual(self.get(), (200, 1))
+        self.assertEqual(self.get(), (200, 0))
+
+    def test_revoked_on_delete_deactivation_and_refresh(self):
+        self.get()
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.get()[0], 401)
+
+        self.user.is_active = True
+        self.user.save()
+        self.assertEqual(self.get()[0], 200)
+        token = Token.objects.get(key=self.key)
+        token.created = timezone.now() - timedelta(hours=13)
+        token.save()
+        self.assertEqual(self.get()[0], 401)
+
+        token.delete()
+        self.assertEqual(self.get()[0], 401)
@@ -19,6 +19,7 @@ from accounts.models import CustomUser
 from ..models import (
     Appointment, AppointmentFollowUp, DoctorLeave, DoctorSchedule,
 )
+from ..availability import search_from_query
 from ..services import (
     BookingError, available_slots, check_doctor_availability,
     resolve_authorization_code, update_status,
@@ -51,7 +52,7 @@ class AppointmentViewSet(viewsets.ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'head', 'options']
 
     def get_permissions(self):
-        if self.action in ('slots',):
+        if self.action in ('slots', 'search_slots'):
             return [permissions.IsAuthenticated()]
         return super().get_permissions()
 
@@ -169,6 +170,17 @@ class AppointmentViewSet(viewsets.ModelViewSet):
         )
         return Response({'slots': slots, 'message': message})
 
+    @action(detail=False, methods=['get'], url_path='search-slots')
+    def search_slots(self, request):
+        """Free slots across doctors and days: `department` or `doctors`,
+        `date`, `days`, `limit`, `per_doctor` (see availability.search_from_query).
+        """
+        try:
+            slots = search_from_query(request.query_params)
+        except ValueError:
+            return _error('Invalid search parameters.')
+        return Response({'slots': slots})
+
 
 class AppointmentFollowUpViewSet(viewsets.ModelViewSet):
     queryset = AppointmentFollowUp.objects.all()
@@ -0,0 +1,228 @@
+"""Free-slot search across many doctors and days.
+
+`services.available_slots` answers "what is free for Dr X on Tuesday"; the
+booking desk usually wants "the first free slot with any cardiologist this
+week", which used to mean one AJAX call per doctor per day. This loads the
+schedules, approved leave and live bookings for every doctor and day in the
+window in three queries, merges each day's bookings into sorted disjoint
+intervals, and sweeps the shift once to read off the free slots.
+
+The slot grid is the one the booking form validates against: SLOT_MINUTES
+steps from the start of the doctor's shift. Anything bookable here passes
+`services.check_doctor_availability`, and vice versa.
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from core.date_ranges import day_bounds
+
+from .models import Appointment, DoctorLeave, DoctorSchedule, SLOT_MINUTES
+
+LIVE_STATUSES = ("scheduled", "confirmed")
+# A week or two is what a desk searches; more is a report, not a booking.
+MAX_SEARCH_DAYS = 31
+# Which schedule counts when a doctor has more than one for a weekday; the
+# slot search and the booking checks must agree on it.
+SCHEDULE_ORDER = ("start_time", "pk")
+
+
+def merge_intervals(intervals):
+    """Sorted, disjoint cover of `intervals` ((start, end) pairs)."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def free_slots(shift_start, shift_end, busy, earliest=None, minutes=SLOT_MINUTES):
+    """Slot start times on the shift grid that miss every `busy` interval.
+
+    `busy` must be merged (see merge_intervals). One pass over the shift and
+    one over the bookings: O(slots + bookings), not O(slots x bookings).
+    """
+    step = timedelta(minutes=minutes)
+    slots = []
+    i = 0
+    slot_start = shift_start
+    while slot_start + step <= shift_end:
+        slot_end = slot_start + step
+        while i < len(busy) and busy[i][1] <= slot_start:
+            i += 1
+        taken = i < len(busy) and busy[i][0] < slot_end
+        if not taken and (earliest is None or slot_start >= earliest):
+            slots.append(slot_start)
+        slot_start = slot_end
+    return slots
+
+
+class AvailabilityWindow:
+    """Schedules, leave and bookings for a set of doctors over a date range."""
+
+    def __init__(self, doctor_ids, first_day, last_day, exclude_appointment_id=None):
+        self.doctor_ids = list(doctor_ids)
+        self.first_day = first_day
+        self.last_day = last_day
+        start, end = day_bounds(first_day, last_day)
+
+        # One shift per doctor and weekday, the same one services.doctor_shift
+        # picks: the earliest (SCHEDULE_ORDER) wins.
+        self.shifts = {}
+        for s in DoctorSchedule.objects.filter(
+            doctor_id__in=self.doctor_ids, is_available=True
+        ).order_by(*SCHEDULE_ORDER).only("doctor_id", "weekday", "start_time", "end_time"):
+            self.shifts.setdefault((s.doctor_id, s.weekday), (s.start_time, s.end_time))
+
+        self.leave = defaultdict(list)
+        for doctor_id, leave_start, leave_end in DoctorLeave.objects.filter(
+            doctor_id__in=self.doctor_ids,
+            is_approved=True,
+            start_date__lt=end,
+            end_date__gte=start,
+        ).values_list("doctor_id", "start_date", "end_date"):
+            self.leave[doctor_id].append(
+                (timezone.localdate(leave_start), timezone.localdate(leave_end))
+            )
+
+        bookings = Appointment.objects.filter(
+            doctor_id__in=self.doctor_ids,
+            status__in=LIVE_STATUSES,
+            appointment_date__gte=start,
+            appointment_date__lt=end,
+        )
+        if exclude_appointment_id:
+            bookings = bookings.exclude(id=exclude_appointment_id)
+        raw = defaultdict(list)
+        for doctor_id, starts_at, end_time in bookings.values_list(
+            "doctor_id", "appointment_date", "end_time"
+        ):
+            local = timezone.localtime(starts_at).replace(tzinfo=None)
+            finish = (
+                datetime.combine(local.date(), end_time)
+                if end_time
+                else local + timedelta(minutes=SLOT_MINUTES)
+            )
+            raw[(doctor_id, local.date())].append((local, finish))
+        self.busy = {key: merge_intervals(spans) for key, spans in raw.items()}
+
+    def on_leave(self, doctor_id, day):
+        return any(a <= day <= b for a, b in self.leave.get(doctor_id, ()))
+
+    def slots(self, doctor_id, day, earliest=None):
+        """Free slot starts (naive local datetimes) for one doctor on one day."""
+        shift = self.shifts.get((doctor_id, day.weekday()))
+        if shift is None or self.on_leave(doctor_id, day):
+            return []
+        return free_slots(
+            datetime.combine(day, shift[0]),
+            datetime.combine(day, shift[1]),
+            self.busy.get((doctor_id, day), []),
+            earliest,
+        )
+
+    def days(self):
+        day = self.first_day
+        while day <= self.last_day:
+            yield day
+            day += timedelta(days=1)
+
+
+def slot_dict(slot_start):
+    """The {"value", "text"} shape the booking form's time picker takes."""
+    return {"value": slot_start.strftime("%H:%M"), "text": slot_start.strftime("%I:%M %p")}
+
+
+def search_slots(doctors, first_day, days=7, limit=None, per_doctor=None):
+    """Free slots across `doctors` from `first_day` for `days` days.
+
+    Returns dicts sorted by time, then doctor name, each carrying the doctor,
+    the date and the form's {"value", "text"} pair. `limit` caps the total
+    (limit=1 is "first free slot"); `per_doctor` caps each doctor's share so
+    one doctor with an empty diary does not crowd out the rest.
+    """
+    days = max(1, min(int(days), MAX_SEARCH_DAYS))
+    doctors = list(doctors)
+    names = {d.pk: d.get_full_name() for d in doctors}
+    last_day = first_day + timedelta(days=days - 1)
+    window = AvailabilityWindow(names, first_day, last_day)
+
+    now = timezone.localtime().replace(tzinfo=None)
+    found = []
+    for day in window.days():
+        earliest = now if day == now.date() else None
+        if day < now.date():
+            continue
+        day_slots = []
+        for doctor_id in names:
+            for slot_start in window.slots(doctor_id, day, earliest):
+                day_slots.append((slot_start, names[doctor_id], doctor_id))
+        day_slots.sort()
+        found.extend(day_slots)
+        # Days are visited in order, so once enough are found the rest of the
+        # window cannot produce anything earlier.
+        if limit and not per_doctor and len(found) >= limit:
+            break
+
+    results = []
+    taken = defaultdict(int)
+    for slot_start, name, doctor_id in found:
+        if per_doctor and taken[doctor_id] >= per_doctor:
+            continue
+        taken[doctor_id] += 1
+        results.append({
+            "doctor": doctor_id,
+            "doctor_name": name,
+            "date": slot_start.date().isoformat(),
+            **slot_dict(slot_start),
+        })
+        if limit and len(results) >= limit:
+            break
+    return results
+
+
+def search_from_query(params):
+    """search_slots() driven by request parameters, for the view and the API.
+
+    department   doctors whose primary or assigned department this is
+    doctors      comma-separated doctor ids (instead of, or within, department)
+    date         first day, YYYY-MM-DD (default today)
+    days         how many days to search (default 7, max MAX_SEARCH_DAYS)
+    limit        total slots to return (1 = first free slot)
+    per_doctor   slots per doctor
+
+    Raises ValueError on malformed input.
+    """
+    from django.db.models import Q
+
+    from .forms import doctor_queryset
+
+    first_day = (
+        datetime.strptime(params["date"], "%Y-%m-%d").date()
+        if params.get("date")
+        else timezone.localdate()
+    )
+    doctors = doctor_queryset()
+    if params.get("department"):
+        department = int(params["department"])
+        doctors = doctors.filter(
+            Q(profile__department_id=department) | Q(profile__departments__id=department)
+        ).distinct()
+    if params.get("doctors"):
+        ids = [int(i) for i in str(params["doctors"]).split(",") if i.strip()]
+        doctors = doctors.filter(pk__in=ids)
+
+    def _opt_int(name):
+        return int(params[name]) if params.get(name) else None
+
+    return search_slots(
+        doctors,
+        first_day,
+        days=_opt_int("days") or 7,
+        limit=_opt_int("limit"),
+        per_doctor=_opt_int("per_doctor"),
+    )
@@ -1,57 +1,46 @@
-from django.core.management.base import BaseCommand
-from django.core.mail import send_mail
+from collections import defaultdict
+from datetime import timedelta
+
 from django.conf import settings
+from django.core.management.base import BaseCommand
 from django.utils import timezone
+
+from appointments.availability import LIVE_STATUSES
 from appointments.models import Appointment
-from datetime import timedelta
+from core.date_ranges import day_bounds
+from core.models import OutboundEmail
+from core.notifications import dispatch, enqueue_many
+
+TEMPLATE = 'appointment_reminder'
 
 
 class Command(BaseCommand):
     help = 'Send appointment reminders to patients'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--time-budget', type=int, default=120,
+            help='Seconds to spend sending; the rest is left to send_notifications',
+        )
+
     def handle(self, *args, **options):
-        # Get appointments for tomorrow
-        tomorrow = timezone.now().date() + timedelta(days=1)
+        # appointment_date is a DateTimeField: match tomorrow as a range, not
+        # an equality with midnight.
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        start, end = day_bounds(tomorrow)
         appointments = Appointment.objects.filter(
-            appointment_date=tomorrow,
-            status__in=['scheduled', 'confirmed']
-        ).select_related('patient', 'doctor')
+            appointment_date__gte=start,
+            appointment_date__lt=end,
+            status__in=LIVE_STATUSES,
+        ).select_related('patient', 'doctor').order_by('appointment_date')
 
-        # Send reminders
+        # One email per hospital and address, listing every appointment booked
+        # under it tomorrow: the outbox allows one reminder per recipient per
+        # day, and a family often shares one address across patients.
+        by_email = defaultdict(list)
         for appointment in appointments:
-            # Send email reminder
             if appointment.patient.email:
-                subject = f"Appointment Reminder - {appointment.appointment_date.strftime('%B %d, %Y')}"
-                message = f"""
-Dear {appointment.patient.get_full_name()},
-
-This is a reminder that you have an appointment scheduled for tomorrow with Dr. {appointment.doctor.get_full_name()}.
-
-Appointment Details:
-- Date: {appointment.appointment_date.strftime('%B %d, %Y')}
-- Time: {appointment.appointment_time.strftime('%I:%M %p')}
-- Doctor: Dr. {appointment.doctor.get_full_name()}
-- Reason: {appointment.reason}
-
-Please arrive 15 minutes early to complete any necessary paperwork.
-
-If you need to reschedule or cancel, please contact our office at least 24 hours in advance.
-
-Thank you,
-Hospital Management System
-                """
-                try:
-                    send_mail(
-                        subject=subject,
-                        message=message,
-                        from_email=settings.DEFAULT_FROM_EMAIL,
-                        recipient_list=[appointment.patient.email],
-                        fail_silently=False,
-                    )
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(f'Failed to send email to {appointment.patient.email}: {str(e)}')
-                    )
+                by_email[(appointment.hospital_id, appointment.patient.email)].append(appointment)
 
             # Send SMS reminder (if implemented)
             if hasattr(settings, 'TWILIO_ACCOUNT_SID') and appointment.patient.phone_number:
@@ -61,6 +50,58 @@ Hospital Management System
                     self.style.WARNING(f'SMS reminder would be sent to {appointment.patient.phone_number}')
                 )
 
+        enqueue_many([
+            OutboundEmail(
+                recipient=email,
+                # Per hospital, so an address registered at two hospitals
+                # hears from both; reruns still queue nothing new.
+                template=TEMPLATE if hospital_id is None else f'{TEMPLATE}:{hospital_id}',
+                subject=f"Appointment Reminder - {tomorrow.strftime('%B %d, %Y')}",
+                body=self.build_message(booked),
+                hospital_id=hospital_id,
+            )
+            for (hospital_id, email), booked in by_email.items()
+        ])
+        sent, failed = dispatch(time_budget=options['time_budget'])
+
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully sent reminders for {appointments.count()} appointments')
-        )
\ No newline at end of file
+            self.style.SUCCESS(
+                f'Queued reminders for {len(by_email)} addresses '
+                f'({sum(map(len, by_email.values()))} appointments); '
+                f'{sent} sent, {failed} failed this run'
+            )
+        )
+
+    def build_message(self, appointments):
+        patients = list({a.patient_id: a.patient for a in appointments}.values())
+        shared = len(patients) > 1
+        details = '\n\n'.join(self.details(a, shared) for a in appointments)
+        doctors = ', '.join(sorted({f'Dr. {a.doctor.get_full_name()}' for a in appointments}))
+        names = [p.get_full_name() for p in patients]
+        greeting = names[0] if not shared else ', '.join(names[:-1]) + f' and {names[-1]}'
+        return f"""
+Dear {greeting},
+
+This is a reminder that {'you have appointments' if shared else 'you have an appointment'} scheduled for tomorrow with {doctors}.
+
+{details}
+
+Please arrive 15 minutes early to complete any necessary paperwork.
+
+If you need to reschedule or cancel, please contact our office at least 24 hours in advance.
+
+Thank you,
+Hospital Management System
+"""
+
+    def details(self, appointment, shared):
+        lines = ['Appointment Details:']
+        if shared:
+            lines.append(f'- Patient: {appointment.patient.get_full_name()}')
+        lines += [
+            f"- Date: {timezone.localtime(appointment.appointment_date).strftime('%B %d, %Y')}",
+            f"- Time: {appointment.appointment_time.strftime('%I:%M %p')}",
+            f'- Doctor: Dr. {appointment.doctor.get_full_name()}',
+            f'- Reason: {appointment.reason}',
+        ]
+        return '\n'.join(lines)
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0010_appointment_consulting_room_appointment_department'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['hospital', 'status', 'appointment_date'], name='idx_appt_hosp_status_date'),
+        ),
+    ]
@@ -144,6 +144,11 @@ class Appointment(TenantModel):
             models.Index(
                 fields=["appointment_date", "status"], name="idx_appt_date_status"
             ),
+            # Tenant first: TenantManager adds hospital= to every query.
+            models.Index(
+                fields=["hospital", "status", "appointment_date"],
+                name="idx_appt_hosp_status_date",
+            ),
         ]
 
 
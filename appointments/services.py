@@ -8,6 +8,9 @@ from datetime import datetime, timedelta
 
 from django.utils import timezone
 
+from .availability import (
+    LIVE_STATUSES, SCHEDULE_ORDER, day_bounds, free_slots, merge_intervals, slot_dict,
+)
 from .models import Appointment, DoctorLeave, DoctorSchedule, SLOT_MINUTES
 
 
@@ -17,10 +20,12 @@ class BookingError(Exception):
 
 def _busy_ranges(doctor, date, exclude_appointment_id=None):
     """Live bookings for a doctor on a date, as (start, end) naive datetimes."""
+    day_start, day_end = day_bounds(date, date)
     existing = Appointment.objects.filter(
         doctor=doctor,
-        appointment_date__date=date,
-        status__in=["scheduled", "confirmed"],
+        appointment_date__gte=day_start,
+        appointment_date__lt=day_end,
+        status__in=LIVE_STATUSES,
     ).only("appointment_date", "end_time")
     if exclude_appointment_id:
         existing = existing.exclude(id=exclude_appointment_id)
@@ -50,7 +55,7 @@ def doctor_shift(doctor, date):
 
     schedule = DoctorSchedule.objects.filter(
         doctor=doctor, weekday=date.weekday(), is_available=True
-    ).first()
+    ).order_by(*SCHEDULE_ORDER).first()
     if schedule:
         return schedule, ""
 
@@ -67,35 +72,27 @@ def doctor_shift(doctor, date):
 
 
 def available_slots(doctor, date, exclude_appointment_id=None):
-    """Bookable slots for a doctor on a date. Returns (slots, message)."""
+    """Bookable slots for a doctor on a date. Returns (slots, message).
+
+    Many doctors or days at once: availability.search_slots.
+    """
     schedule, message = doctor_shift(doctor, date)
     if schedule is None:
         return [], message
 
-    busy = _busy_ranges(doctor, date, exclude_appointment_id)
+    busy = merge_intervals(_busy_ranges(doctor, date, exclude_appointment_id))
 
     # Don't offer slots that have already started today.
     now = timezone.localtime()
     earliest = now.replace(tzinfo=None) if date == now.date() else None
 
-    slots = []
-    shift_end = datetime.combine(date, schedule.end_time)
-    slot_start = datetime.combine(date, schedule.start_time)
-    while slot_start < shift_end:
-        slot_end = slot_start + timedelta(minutes=SLOT_MINUTES)
-        taken = any(
-            slot_start < busy_end and slot_end > busy_start
-            for busy_start, busy_end in busy
-        )
-        if slot_end <= shift_end and not taken and (
-            earliest is None or slot_start >= earliest
-        ):
-            slots.append({
-                "value": slot_start.strftime("%H:%M"),
-                "text": slot_start.strftime("%I:%M %p"),
-            })
-        slot_start = slot_end
-    return slots, ""
+    starts = free_slots(
+        datetime.combine(date, schedule.start_time),
+        datetime.combine(date, schedule.end_time),
+        busy,
+        earliest,
+    )
+    return [slot_dict(start) for start in starts], ""
 
 
 def check_doctor_availability(
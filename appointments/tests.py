@@ -1,6 +1,6 @@
 from datetime import date, datetime, time, timedelta
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase
 from django.urls import reverse
 from django.utils import timezone
 
@@ -229,3 +229,99 @@ class AppointmentBookingTests(TestCase):
         self.assertEqual(timezone.localtime(leave.start_date).time(), time.min)
         # The whole day must be covered, so a booking on that day is blocked.
         self.assertFalse(self.form("10:00").is_valid())
+
+
+class ReminderCommandTests(TestCase):
+    def test_tomorrows_appointments_are_reminded_once(self):
+        from io import StringIO
+
+        from django.core import mail
+        from django.core.management import call_command
+
+        doctor = CustomUser.objects.create_user(
+            phone_number="08000000031", username="remdoc", password="x",
+            first_name="Bola", last_name="Ade",
+        )
+        patient = Patient.objects.create(
+            first_name="Remi", last_name="Patient", date_of_birth=date(1990, 1, 1),
+            gender="F", address="1 Test St", city="Lagos", state="Lagos",
+            email="remi@example.com",
+        )
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        for day, hour in ((tomorrow, 9), (tomorrow, 14), (tomorrow + timedelta(days=1), 9)):
+            Appointment.objects.create(
+                patient=patient, doctor=doctor, reason="review",
+                appointment_date=timezone.make_aware(datetime.combine(day, time(hour))),
+            )
+
+        call_command("send_appointment_reminders", stdout=StringIO())
+        call_command("send_appointment_reminders", stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["remi@example.com"])
+        self.assertIn("09:00 AM", mail.outbox[0].body)
+        self.assertIn("02:00 PM", mail.outbox[0].body)
+
+
+    def test_a_shared_address_is_reminded_per_hospital_naming_each_patient(self):
+        from io import StringIO
+
+        from django.core import mail
+        from django.core.management import call_command
+
+        from saas.current import clear_current_hospital, set_current_hospital
+        from saas.models import Hospital
+
+        self.addCleanup(clear_current_hospital)
+        doctor = CustomUser.objects.create_user(
+            phone_number="08000000032", username="famdoc", password="x",
+            first_name="Kola", last_name="Ade",
+        )
+        at_ten = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), time(10)))
+        for hospital, names in (
+            (Hospital.objects.create(name="North", subdomain="north"), ("Ada", "Tobi")),
+            (Hospital.objects.create(name="South", subdomain="south"), ("Ada",)),
+        ):
+            set_current_hospital(hospital)
+            for name in names:
+                patient = Patient.objects.create(
+                    first_name=name, last_name="Family", date_of_birth=date(2010, 1, 1),
+                    gender="F", address="1 Test St", city="Lagos", state="Lagos",
+                    email="family@example.com",
+                )
+                Appointment.objects.create(
+                    patient=patient, doctor=doctor, reason="review", appointment_date=at_ten,
+                )
+        clear_current_hospital()
+
+        call_command("send_appointment_reminders", stdout=StringIO())
+
+        bodies = sorted(m.body for m in mail.outbox)
+        self.assertEqual(len(bodies), 2)
+        self.assertIn("Dear Ada Family and Tobi Family,", bodies[0])
+        self.assertIn("- Patient: Tobi Family", bodies[0])
+        self.assertIn("Dear Ada Family,", bodies[1])
+
+
+class IntervalSweepTests(SimpleTestCase):
+    """The pure part of the slot engine."""
+
+    def test_merge_joins_overlapping_and_touching_bookings(self):
+        from .availability import merge_intervals
+
+        self.assertEqual(
+            merge_intervals([(5, 6), (1, 3), (2, 4), (4, 5), (8, 9)]),
+            [(1, 6), (8, 9)],
+        )
+
+    def test_free_slots_skip_any_overlap_and_stay_inside_the_shift(self):
+        from .availability import free_slots
+
+        day = datetime(2030, 1, 7)
+        at = lambda h, m=0: day.replace(hour=h, minute=m)  # noqa: E731
+        busy = [(at(9, 15), at(9, 45)), (at(10, 30), at(11, 30))]
+        slots = free_slots(at(9), at(12, 15), busy)
+        self.assertEqual(
+            [s.strftime("%H:%M") for s in slots], ["10:00", "11:30"]
+        )
+        self.assertEqual(free_slots(at(9), at(10), [], earliest=at(9, 10)), [at(9, 30)])
@@ -167,6 +167,46 @@ class AppointmentApiTest(TestCase):
         assert body["slots"] == []
         assert "does not work on" in body["message"]
 
+    def test_search_finds_the_first_free_slot_across_doctors(self):
+        other = CustomUser.objects.create_user(
+            phone_number="08014000003", username="drbello", password="pw12345",
+            first_name="Bola", last_name="Bello",
+        )
+        other.roles.add(Role.objects.get(name="doctor"))
+        DoctorSchedule.objects.create(
+            doctor=other, weekday=self.date.weekday(),
+            start_time=time(10, 0), end_time=time(12, 0), is_available=True,
+        )
+        self.book(hour=9)  # Dr Allen's 09:00 is gone
+
+        body = self.get(
+            f"/appointments/api/appointments/search-slots/"
+            f"?date={self.date}&days=1&limit=1"
+        ).json()
+        assert body["slots"] == [{
+            "doctor": self.doctor.id, "doctor_name": "Ada Allen",
+            "date": self.date.isoformat(), "value": "09:30", "text": "09:30 AM",
+        }], body
+
+        body = self.get(
+            f"/appointments/api/appointments/search-slots/"
+            f"?date={self.date}&days=1&doctors={other.id}"
+        ).json()
+        assert [s["value"] for s in body["slots"]] == ["10:00", "10:30", "11:00", "11:30"]
+
+    def test_search_skips_leave_and_rejects_bad_input(self):
+        day_start = timezone.make_aware(timezone.datetime.combine(self.date, time(0)))
+        DoctorLeave.objects.create(
+            doctor=self.doctor, start_date=day_start, end_date=day_start,
+            reason="Conference", is_approved=True,
+        )
+        body = self.get(
+            f"/appointments/api/appointments/search-slots/?date={self.date}&days=1"
+        ).json()
+        assert body["slots"] == [], body
+        response = self.get("/appointments/api/appointments/search-slots/?days=x")
+        assert response.status_code == 400
+
     def test_rescheduling_does_not_clash_with_itself(self):
         appointment_id = self.book(hour=9).json()["id"]
         body = self.get(
@@ -26,5 +26,6 @@ urlpatterns = [
 
     # AJAX endpoints
     path('get-available-slots/', views.get_available_slots, name='get_available_slots'),
+    path('search-slots/', views.search_available_slots, name='search_available_slots'),
     path('update-appointment-status/<int:appointment_id>/', views.update_appointment_status, name='update_appointment_status'),
 ]
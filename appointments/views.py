@@ -12,6 +12,7 @@ from datetime import datetime, timedelta
 from calendar import monthrange
 from .models import Appointment, AppointmentFollowUp, DoctorSchedule, DoctorLeave, SLOT_MINUTES
 # Slot maths is shared with the booking form and the mobile API.
+from .availability import search_from_query
 from .services import BookingError, available_slots, update_status
 from .forms import (
     AppointmentForm, AppointmentFollowUpForm, DoctorScheduleForm,
@@ -575,6 +576,20 @@ def get_available_slots(request):
 
     return JsonResponse({'available_slots': slots}, status=200)
 
+@login_required
+@permission_required('appointments.view')
+def search_available_slots(request):
+    """AJAX: free slots across several doctors and days in one call.
+
+    e.g. ?department=3&days=7&limit=1 for "first free cardiology slot this
+    week". Parameters are documented on availability.search_from_query.
+    """
+    try:
+        slots = search_from_query(request.GET)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid search parameters'}, status=400)
+    return JsonResponse({'slots': slots}, status=200)
+
 @login_required
 @permission_required('appointments.edit')
 def update_appointment_status(request, appointment_id):
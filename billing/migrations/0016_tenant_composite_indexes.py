@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0015_alter_payment_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['hospital', 'status', 'invoice_date'], name='idx_invoice_hosp_status_date'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['hospital', 'payment_date'], name='idx_payment_hosp_date'),
+        ),
+    ]
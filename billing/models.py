@@ -316,6 +316,11 @@ class Invoice(TenantModel):
             models.Index(fields=["invoice_date"]),
             models.Index(fields=["status", "invoice_date"]),
             models.Index(fields=["patient", "status"]),
+            # Tenant first: TenantManager adds hospital= to every query.
+            models.Index(
+                fields=["hospital", "status", "invoice_date"],
+                name="idx_invoice_hosp_status_date",
+            ),
         ]
         ordering = ["-invoice_date"]
         permissions = [
@@ -418,6 +423,7 @@ class Payment(TenantModel):
             models.Index(fields=["invoice"], name="idx_payment_invoice"),
             models.Index(fields=["payment_method"], name="idx_payment_method"),
             models.Index(fields=["created_at"], name="idx_payment_created"),
+            models.Index(fields=["hospital", "payment_date"], name="idx_payment_hosp_date"),
         ]
         ordering = ["-payment_date", "-created_at"]
         permissions = [
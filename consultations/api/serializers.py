@@ -35,6 +35,9 @@ class WaitingListSerializer(serializers.ModelSerializer):
     status_display = serializers.CharField(
         source='get_status_display', read_only=True
     )
+    # Set on queue listings by consultations.queue.with_positions.
+    queue_position = serializers.SerializerMethodField()
+    estimated_wait = serializers.SerializerMethodField()
 
     class Meta:
         model = WaitingList
@@ -42,11 +45,18 @@ class WaitingListSerializer(serializers.ModelSerializer):
             'id', 'patient', 'patient_name', 'patient_number',
             'consulting_room', 'room_number', 'clinic_type', 'doctor',
             'doctor_name', 'appointment', 'check_in_time', 'status',
-            'status_display', 'priority', 'notes',
+            'status_display', 'priority', 'notes', 'queue_position',
+            'estimated_wait',
         ]
         # Status moves through the queue actions, not a blind PATCH.
         read_only_fields = ['status']
 
+    def get_queue_position(self, obj):
+        return getattr(obj, 'queue_position', None)
+
+    def get_estimated_wait(self, obj):
+        return getattr(obj, 'estimated_wait', None)
+
 
 class ConsultationNoteSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(
@@ -15,8 +15,9 @@ from ..models import (
     Consultation, ConsultationNote, ConsultingRoom, Referral, SOAPNote,
     WaitingList,
 )
+from .. import queue
 from ..services import (
-    ConsultationActionError, call_in_patient, complete_waiting_entry,
+    ConsultationActionError, call_in_next, call_in_patient, complete_waiting_entry,
     update_consultation_status, update_referral_status, waiting_queue,
 )
 from .serializers import (
@@ -121,7 +122,7 @@ class WaitingListViewSet(viewsets.ModelViewSet):
         # These actions carry their own authorisation (see services); DRF's
         # model permissions would answer the wrong question here — a doctor
         # moving their own consultation is not "may add a consultation".
-        if self.action in ('call_in', 'complete'):
+        if self.action in ('call_in', 'call_next', 'complete'):
             return [permissions.IsAuthenticated()]
         return super().get_permissions()
 
@@ -139,8 +140,12 @@ class WaitingListViewSet(viewsets.ModelViewSet):
             )
         if params.get('status'):
             queryset = queryset.filter(status=params['status'])
-        # Urgent first, then whoever has been waiting longest.
-        return queryset.order_by('priority', 'check_in_time')
+        # Emergencies first, then whoever has been waiting longest.
+        return queue.ordered(queryset)
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        return queue.with_positions(page) if page is not None else None
 
     def perform_create(self, serializer):
         serializer.save(created_by=self.request.user)
@@ -158,6 +163,23 @@ class WaitingListViewSet(viewsets.ModelViewSet):
             'consultation': ConsultationSerializer(consultation).data,
         }, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='call-next')
+    def call_next(self, request):
+        """Start a consultation with the head of the caller's queue
+        (optionally of one `room`); 204 when nobody is waiting."""
+        room = None
+        if request.data.get('room'):
+            room = ConsultingRoom.objects.filter(pk=request.data['room']).first()
+            if room is None:
+                return _error('Unknown consulting room.')
+        consultation = call_in_next(request.user, room)
+        if consultation is None:
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        return Response({
+            'waiting_entry': WaitingListSerializer(consultation.waiting_list_entry).data,
+            'consultation': ConsultationSerializer(consultation).data,
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def complete(self, request, pk=None):
         entry = self.get_object()
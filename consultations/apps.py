@@ -6,4 +6,5 @@ class ConsultationsConfig(AppConfig):
     name = 'consultations'
 
     def ready(self):
-        from . import signals  # noqa: F401
+        from . import queue, signals  # noqa: F401
+        queue.connect()
@@ -0,0 +1,98 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_queue(apps, schema_editor):
+    WaitingList = apps.get_model('consultations', 'WaitingList')
+    Consultation = apps.get_model('consultations', 'Consultation')
+    for priority, rank in (('emergency', 0), ('urgent', 1)):
+        WaitingList._base_manager.filter(priority=priority).update(priority_rank=rank)
+    # The consultation started when the entry went in progress; when it
+    # ended was never recorded, so completed_at stays empty for old rows.
+    WaitingList._base_manager.filter(started_at__isnull=True).exclude(status='waiting').update(
+        started_at=Subquery(
+            Consultation._base_manager.filter(waiting_list_entry=OuterRef('pk')).values('consultation_date')[:1]
+        )
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('appointments', '0011_tenant_composite_indexes'),
+        ('consultations', '0019_alter_consultingroom_room_number_and_more'),
+        ('core', '0015_outboundemail'),
+        ('patients', '0031_wallet_balance_snapshots'),
+        ('saas', '0009_hospital_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsultationPace',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('average_seconds', models.FloatField()),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterModelOptions(
+            name='waitinglist',
+            options={'ordering': ['priority_rank', 'check_in_time'], 'verbose_name_plural': 'Waiting List Entries'},
+        ),
+        migrations.AddField(
+            model_name='waitinglist',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='waitinglist',
+            name='priority_rank',
+            field=models.PositiveSmallIntegerField(default=2, editable=False),
+        ),
+        migrations.AddField(
+            model_name='waitinglist',
+            name='started_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='waitinglist',
+            index=models.Index(fields=['consulting_room', 'status', 'priority_rank', 'check_in_time'], name='idx_waiting_room_queue'),
+        ),
+        migrations.AddIndex(
+            model_name='waitinglist',
+            index=models.Index(fields=['doctor', 'status', 'priority_rank', 'check_in_time'], name='idx_waiting_doctor_queue'),
+        ),
+        migrations.AddField(
+            model_name='consultationpace',
+            name='consulting_room',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='consultations.consultingroom'),
+        ),
+        migrations.AddField(
+            model_name='consultationpace',
+            name='doctor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='consultationpace',
+            name='hospital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital'),
+        ),
+        migrations.AddConstraint(
+            model_name='consultationpace',
+            constraint=models.UniqueConstraint(condition=models.Q(('doctor__isnull', True)), fields=('consulting_room',), name='uniq_pace_per_room'),
+        ),
+        migrations.AddConstraint(
+            model_name='consultationpace',
+            constraint=models.UniqueConstraint(condition=models.Q(('consulting_room__isnull', True)), fields=('doctor',), name='uniq_pace_per_doctor'),
+        ),
+        migrations.AddConstraint(
+            model_name='consultationpace',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('consulting_room__isnull', True), ('doctor__isnull', False)), models.Q(('consulting_room__isnull', False), ('doctor__isnull', True)), _connector='OR'), name='pace_room_xor_doctor'),
+        ),
+        migrations.RunPython(backfill_queue, migrations.RunPython.noop),
+    ]
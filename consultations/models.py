@@ -67,17 +67,73 @@ class WaitingList(TenantModel):
         ('urgent', 'Urgent'),
         ('emergency', 'Emergency'),
     ), default='normal')
+    # Sort key for `priority` (see consultations.queue): the choice values
+    # themselves sort "urgent" after "normal".
+    priority_rank = models.PositiveSmallIntegerField(default=2, editable=False)
     notes = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='created_waiting_entries')
+    started_at = models.DateTimeField(null=True, blank=True, editable=False)
+    completed_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return f"{self.patient.get_full_name()} - Room {self.consulting_room.room_number} - {self.get_status_display()}"
 
+    def save(self, *args, **kwargs):
+        from .queue import PRIORITY_RANK
+
+        changed = {'priority_rank'}
+        self._queue_completed = False
+        self.priority_rank = PRIORITY_RANK.get(self.priority, PRIORITY_RANK['normal'])
+        if self.status == 'in_progress' and self.started_at is None:
+            self.started_at = timezone.now()
+            changed.add('started_at')
+        if self.status == 'completed' and self.completed_at is None:
+            self.completed_at = timezone.now()
+            changed.add('completed_at')
+            # consultations.queue times the consultation from this save.
+            self._queue_completed = True
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = set(update_fields) | changed
+        super().save(*args, **kwargs)
+
     class Meta:
-        ordering = ['priority', 'check_in_time']
+        ordering = ['priority_rank', 'check_in_time']
         verbose_name_plural = "Waiting List Entries"
+        indexes = [
+            models.Index(fields=['consulting_room', 'status', 'priority_rank', 'check_in_time'], name='idx_waiting_room_queue'),
+            models.Index(fields=['doctor', 'status', 'priority_rank', 'check_in_time'], name='idx_waiting_doctor_queue'),
+        ]
+
+
+class ConsultationPace(TenantModel):
+    """Rolling average length of a consultation, per consulting room (doctor
+    empty) or per doctor (room empty); what consultations.queue estimates
+    waiting times from. Kept by the queue as entries complete."""
+    consulting_room = models.ForeignKey(ConsultingRoom, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    average_seconds = models.FloatField()
+    samples = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        subject = f"Dr. {self.doctor}" if self.doctor_id else f"Room {self.consulting_room}"
+        return f"{subject}: {self.average_seconds / 60:.0f} min over {self.samples} consultation(s)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['consulting_room'], condition=models.Q(doctor__isnull=True), name='uniq_pace_per_room'),
+            models.UniqueConstraint(fields=['doctor'], condition=models.Q(consulting_room__isnull=True), name='uniq_pace_per_doctor'),
+            models.CheckConstraint(
+                check=(
+                    models.Q(consulting_room__isnull=True, doctor__isnull=False)
+                    | models.Q(consulting_room__isnull=False, doctor__isnull=True)
+                ),
+                name='pace_room_xor_doctor',
+            ),
+        ]
 
 
 class Consultation(TenantModel):
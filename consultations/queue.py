@@ -0,0 +1,239 @@
+"""The consultation queue: order, positions, waiting-time estimates, claiming.
+
+Every waiting entry stands in one queue: its doctor's, if one is assigned,
+otherwise its consulting room's. Within a queue it is triage priority
+first (emergency, urgent, normal: WaitingList.priority_rank), then
+check-in time. An entry's position counts only the waiting entries ahead
+of it in that queue; whoever is already in progress is being seen.
+
+The estimated wait is the entries ahead times the queue's pace, the
+rolling average length of a consultation (ConsultationPace). Each
+completed entry updates its room's and its doctor's pace; an
+exponentially weighted average, so the estimate follows a clinic that
+speeds up or slows down through the day. A room queue with several
+doctors consulting in it is divided between them. Until a room has a
+history, DEFAULT_MINUTES is used.
+
+claim() and claim_next() start a consultation with a compare-and-set
+update (status still 'waiting', doctor still this one or nobody), so when
+two doctors reach for the same patient exactly one gets them, on any
+database. Queue changes are published on the core.events `queue` channel:
+the entry itself, and the new positions of the queues it touched.
+"""
+import math
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core import events, turnaround
+
+from .models import ConsultationPace, WaitingList
+
+PRIORITY_RANK = {'emergency': 0, 'urgent': 1, 'normal': 2}
+ORDER = ('priority_rank', 'check_in_time', 'pk')
+ACTIVE = ('waiting', 'in_progress')
+
+DEFAULT_MINUTES = 15
+# Weight of each new consultation in the rolling average.
+PACE_WEIGHT = 0.2
+# Longer than this, the entry was left open rather than consulted on.
+PACE_MAX_SECONDS = 3 * 3600
+# Claim attempts before claim_next() gives up on a busy queue.
+CLAIM_ATTEMPTS = 5
+
+
+def ordered(queryset):
+    """`queryset` of WaitingList in queue order."""
+    return queryset.order_by(*ORDER)
+
+
+def _queue_of(doctor_id, room_id):
+    return ('doctor', doctor_id) if doctor_id else ('room', room_id)
+
+
+def _paces(room_ids, doctor_ids):
+    paces = {}
+    rows = ConsultationPace._base_manager.filter(
+        Q(consulting_room_id__in=room_ids, doctor__isnull=True)
+        | Q(doctor_id__in=doctor_ids, consulting_room__isnull=True)
+    ).values_list('consulting_room_id', 'doctor_id', 'average_seconds')
+    for room_id, doctor_id, seconds in rows:
+        paces[_queue_of(doctor_id, room_id)] = seconds
+    return paces
+
+
+def positions(entries):
+    """{entry id: (position, estimated wait in minutes)} for the waiting
+    entries among `entries`, within their whole queues. Three queries
+    however many queues are involved."""
+    room_ids = {e.consulting_room_id for e in entries}
+    doctor_ids = {e.doctor_id for e in entries if e.doctor_id}
+    return _positions(room_ids, doctor_ids)
+
+
+def _positions(room_ids, doctor_ids):
+    if not room_ids and not doctor_ids:
+        return {}
+    rows = ordered(
+        WaitingList._base_manager.filter(status__in=ACTIVE).filter(
+            Q(doctor_id__in=doctor_ids) | Q(doctor__isnull=True, consulting_room_id__in=room_ids)
+        )
+    ).values_list('pk', 'consulting_room_id', 'doctor_id', 'status')
+    queues, busy_doctors = {}, {}
+    for pk, room_id, doctor_id, status in rows:
+        if status == 'waiting':
+            queues.setdefault(_queue_of(doctor_id, room_id), []).append((pk, room_id))
+    # Doctors consulting in a room share out its unassigned queue.
+    for room_id, doctor_id in (
+        WaitingList._base_manager.filter(status='in_progress', consulting_room_id__in=room_ids)
+        .exclude(doctor__isnull=True).values_list('consulting_room_id', 'doctor_id').distinct()
+    ):
+        busy_doctors[room_id] = busy_doctors.get(room_id, 0) + 1
+
+    paces = _paces(room_ids, doctor_ids | {key[1] for key in queues if key[0] == 'doctor'})
+    default = DEFAULT_MINUTES * 60
+    result = {}
+    for key, waiting in queues.items():
+        for ahead, (pk, room_id) in enumerate(waiting):
+            seconds = paces.get(key) or paces.get(('room', room_id)) or default
+            if key[0] == 'room':
+                seconds /= max(1, busy_doctors.get(room_id, 0))
+            result[pk] = (ahead + 1, math.ceil(ahead * seconds / 60))
+    return result
+
+
+def with_positions(entries):
+    """`entries` as a list, each with .queue_position and .estimated_wait
+    (minutes) set; None for entries not waiting."""
+    entries = list(entries)
+    found = positions(entries)
+    for entry in entries:
+        entry.queue_position, entry.estimated_wait = found.get(entry.pk, (None, None))
+    return entries
+
+
+def _unpaid():
+    # A regular patient whose registration fee is unpaid cannot be seen yet.
+    return Q(patient__patient_type='regular', patient__is_active=False)
+
+
+def claim(entry, doctor):
+    """Move waiting `entry` to in progress with `doctor`. False if it is no
+    longer waiting or another doctor has it; `entry` is updated on success."""
+    now = timezone.now()
+    claimed = WaitingList._base_manager.filter(
+        Q(doctor=doctor) | Q(doctor__isnull=True), pk=entry.pk, status='waiting',
+    ).update(status='in_progress', doctor=doctor, started_at=now, updated_at=now)
+    if not claimed:
+        return False
+    entry.status, entry.doctor, entry.started_at, entry.updated_at = 'in_progress', doctor, now, now
+    # update() sent no post_save; publish and record what it would have.
+    events.publish_instance(entry)
+    turnaround.record(
+        'consultation', entry, {'started': now},
+        department_id=entry.consulting_room.department_id, doctor_id=doctor.pk,
+    )
+    _publish_positions({entry.consulting_room_id}, {doctor.pk}, entry.hospital_id)
+    return True
+
+
+def claim_next(doctor, consulting_room=None):
+    """Take the head of `doctor`'s queue (their own patients and the
+    unassigned ones of `consulting_room`, or of every room they have
+    patients in). None when there is nobody to see."""
+    candidates = WaitingList.objects.filter(status='waiting').exclude(_unpaid())
+    if consulting_room is not None:
+        candidates = candidates.filter(consulting_room=consulting_room).filter(
+            Q(doctor=doctor) | Q(doctor__isnull=True)
+        )
+    else:
+        rooms = WaitingList.objects.filter(doctor=doctor, status__in=ACTIVE).values('consulting_room_id')
+        candidates = candidates.filter(Q(doctor=doctor) | Q(doctor__isnull=True, consulting_room_id__in=rooms))
+    for _ in range(CLAIM_ATTEMPTS):
+        entry = ordered(candidates).select_related('patient', 'consulting_room').first()
+        if entry is None:
+            return None
+        if claim(entry, doctor):
+            return entry
+    return None
+
+
+def record_pace(entry):
+    """Fold the length of completed `entry` into its room's and doctor's pace."""
+    if not (entry.started_at and entry.completed_at):
+        return
+    seconds = (entry.completed_at - entry.started_at).total_seconds()
+    if not 0 < seconds <= PACE_MAX_SECONDS:
+        return
+    subjects = [{'consulting_room_id': entry.consulting_room_id, 'doctor_id': None}]
+    if entry.doctor_id:
+        subjects.append({'consulting_room_id': None, 'doctor_id': entry.doctor_id})
+    # A first sample lands at its own value (the update moves an average
+    # of `seconds` to `seconds`).
+    ConsultationPace._base_manager.bulk_create(
+        [ConsultationPace(hospital_id=entry.hospital_id, average_seconds=seconds, **subject) for subject in subjects],
+        ignore_conflicts=True,
+    )
+    for subject in subjects:
+        ConsultationPace._base_manager.filter(**subject).update(
+            average_seconds=F('average_seconds') + PACE_WEIGHT * (seconds - F('average_seconds')),
+            samples=F('samples') + 1,
+            updated_at=timezone.now(),
+        )
+
+
+def _publish_positions(room_ids, doctor_ids, hospital_id):
+    room_ids, doctor_ids = set(room_ids) - {None}, set(doctor_ids) - {None}
+
+    def publish():
+        found = _positions(room_ids, doctor_ids)
+        events.publish(hospital_id, 'queue', 'positions', {
+            'consulting_room_ids': sorted(room_ids),
+            'doctor_ids': sorted(doctor_ids),
+            'positions': {pk: {'position': p, 'wait_minutes': w} for pk, (p, w) in found.items()},
+        })
+
+    transaction.on_commit(publish)
+
+
+def _before_entry_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Moving an entry to another room or doctor reorders the queue it left.
+    instance._queue_was = None
+    if instance.pk and not raw and (
+        update_fields is None or {'consulting_room', 'doctor'} & set(update_fields)
+    ):
+        instance._queue_was = (
+            WaitingList._base_manager.filter(pk=instance.pk)
+            .values_list('consulting_room_id', 'doctor_id').first()
+        )
+
+
+def _on_entry(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if getattr(instance, '_queue_completed', False):
+        record_pace(instance)
+    old_room, old_doctor = getattr(instance, '_queue_was', None) or (None, None)
+    _publish_positions(
+        {instance.consulting_room_id, old_room}, {instance.doctor_id, old_doctor}, instance.hospital_id,
+    )
+
+
+def _on_consultation(sender, instance, raw=False, **kwargs):
+    # Finishing the consultation takes its patient off the queue.
+    if raw or instance.status != 'completed' or not instance.waiting_list_entry_id:
+        return
+    entry = WaitingList._base_manager.filter(pk=instance.waiting_list_entry_id, status='in_progress').first()
+    if entry is not None:
+        entry.status = 'completed'
+        entry.save(update_fields=['status', 'updated_at'])
+
+
+def connect():
+    from django.db.models.signals import post_delete, post_save, pre_save
+
+    pre_save.connect(_before_entry_save, sender='consultations.WaitingList', dispatch_uid='queue_entry', weak=False)
+    post_save.connect(_on_entry, sender='consultations.WaitingList', dispatch_uid='queue_entry', weak=False)
+    post_delete.connect(_on_entry, sender='consultations.WaitingList', dispatch_uid='queue_entry', weak=False)
+    post_save.connect(_on_consultation, sender='consultations.Consultation', dispatch_uid='queue_consultation', weak=False)
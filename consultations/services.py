@@ -10,6 +10,7 @@ from django.utils import timezone
 
 from core.audit_utils import log_audit_action
 
+from . import queue
 from .models import Consultation, Referral, WaitingList
 
 
@@ -122,12 +123,25 @@ def call_in_patient(entry, user):
         raise ConsultationActionError(
             f"This patient is already {entry.get_status_display().lower()}."
         )
+    # Compare-and-set: of two doctors calling the same patient, one wins.
+    if not queue.claim(entry, entry.doctor or user):
+        raise ConsultationActionError(
+            "This patient has just been called in by someone else."
+        )
+
+    return _open_consultation(entry, user)
+
+
+def call_in_next(user, consulting_room=None):
+    """Take the head of `user`'s queue into a consultation; None when nobody
+    is waiting."""
+    entry = queue.claim_next(user, consulting_room)
+    if entry is None:
+        return None
+    return _open_consultation(entry, user)
 
-    entry.status = "in_progress"
-    if user and not entry.doctor:
-        entry.doctor = user
-    entry.save()
 
+def _open_consultation(entry, user):
     consultation = Consultation.objects.create(
         patient=entry.patient,
         doctor=user,
@@ -155,11 +169,11 @@ def complete_waiting_entry(entry):
 
 
 def waiting_queue(consulting_room=None, doctor=None, today_only=True):
-    """The live queue, urgent first, then by check-in time."""
-    queryset = (
+    """The live queue, emergencies first, then by check-in time."""
+    queryset = queue.ordered(
         WaitingList.objects
         .select_related("patient", "consulting_room", "doctor")
-        .filter(status__in=["waiting", "in_progress"])
+        .filter(status__in=queue.ACTIVE)
     )
     if consulting_room:
         queryset = queryset.filter(consulting_room=consulting_room)
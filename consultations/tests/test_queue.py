@@ -0,0 +1,142 @@
+"""The consultation queue engine (consultations.queue).
+
+Pinned here: triage order, positions and waiting estimates within a queue,
+that a patient can only be claimed once, and that finished consultations
+feed the rolling pace the estimates come from.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser, Department
+from consultations import queue
+from consultations.models import (
+    Consultation, ConsultationPace, ConsultingRoom, WaitingList,
+)
+from patients.models import Patient
+
+
+class QueueEngineTest(TestCase):
+    def setUp(self):
+        department, _ = Department.objects.get_or_create(name="Medicine")
+        self.room = ConsultingRoom.objects.create(
+            room_number="Q1", floor="1", department=department,
+        )
+        self.ada = self.doctor("08016000481", "adaq")
+        self.bayo = self.doctor("08016000482", "bayoq")
+        self.count = 0
+
+    def doctor(self, phone, username):
+        return CustomUser.objects.create_superuser(
+            phone_number=phone, username=username, password="pw12345",
+        )
+
+    def check_in(self, priority="normal", doctor=None, **patient):
+        self.count += 1
+        patient = Patient.objects.create(
+            first_name=f"P{self.count}", last_name="Queue", date_of_birth="1990-01-01",
+            gender="F", address="1 Queue Road", city="Lagos", state="Lagos", **patient,
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            return WaitingList.objects.create(
+                patient=patient, consulting_room=self.room, priority=priority, doctor=doctor,
+            )
+
+    def test_triage_order_positions_and_estimates(self):
+        normal = self.check_in("normal")
+        urgent = self.check_in("urgent")
+        emergency = self.check_in("emergency")
+
+        entries = queue.with_positions(queue.ordered(WaitingList.objects.all()))
+        assert [e.pk for e in entries] == [emergency.pk, urgent.pk, normal.pk]
+        assert [(e.queue_position, e.estimated_wait) for e in entries] == [
+            (1, 0), (2, queue.DEFAULT_MINUTES), (3, 2 * queue.DEFAULT_MINUTES),
+        ]
+
+        # A ten-minute room pace, shared by two doctors consulting in it.
+        ConsultationPace.objects.create(consulting_room=self.room, average_seconds=600)
+        for doctor in (self.ada, self.bayo):
+            busy = self.check_in(doctor=doctor)
+            WaitingList.objects.filter(pk=busy.pk).update(status="in_progress")
+        found = queue.positions([normal])
+        assert found[normal.pk] == (3, 10)
+
+        self.client.force_login(self.ada)
+        page = self.client.get("/consultations/waiting-list/")
+        self.assertContains(page, '<td class="queue-eta">~10 min</td>')
+
+    def test_a_patient_is_claimed_once(self):
+        entry = self.check_in()
+        stale = WaitingList.objects.get(pk=entry.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assert queue.claim(entry, self.ada)
+        assert not queue.claim(stale, self.bayo)
+
+        entry.refresh_from_db()
+        assert (entry.status, entry.doctor) == ("in_progress", self.ada)
+        assert entry.started_at is not None
+        assert stale.status == "waiting"
+
+        # Another doctor's patient is not up for grabs either.
+        mine = self.check_in(doctor=self.ada)
+        assert not queue.claim(mine, self.bayo)
+
+    def test_claim_next_takes_the_head_of_the_queue(self):
+        unpaid = self.check_in("emergency", patient_type="regular", is_active=False)
+        normal = self.check_in("normal")
+        urgent = self.check_in("urgent")
+
+        assert queue.claim_next(self.ada, self.room).pk == urgent.pk
+        assert queue.claim_next(self.bayo, self.room).pk == normal.pk
+        assert queue.claim_next(self.ada, self.room) is None
+        unpaid.refresh_from_db()
+        assert unpaid.status == "waiting"
+
+    def test_finished_consultations_set_the_pace(self):
+        for minutes in (10, 20):
+            entry = self.check_in()
+            queue.claim(entry, self.ada)
+            WaitingList.objects.filter(pk=entry.pk).update(
+                started_at=timezone.now() - timedelta(minutes=minutes),
+            )
+            consultation = Consultation.objects.create(
+                patient=entry.patient, doctor=self.ada, consulting_room=self.room,
+                waiting_list_entry=entry, status="in_progress",
+            )
+            consultation.status = "completed"
+            consultation.save()
+
+            entry.refresh_from_db()
+            assert entry.status == "completed"
+            assert entry.completed_at is not None
+
+        room = ConsultationPace.objects.get(consulting_room=self.room)
+        doctor = ConsultationPace.objects.get(doctor=self.ada)
+        assert room.samples == doctor.samples == 2
+        # 600s, then a fifth of the way to 1200s.
+        assert abs(room.average_seconds - 720) < 5, room.average_seconds
+        assert abs(doctor.average_seconds - room.average_seconds) < 1
+
+    def test_call_next_patient_view(self):
+        first = self.check_in()
+        second = self.check_in()
+
+        self.client.force_login(self.ada)
+        page = self.client.get("/consultations/doctor/waiting-list/")
+        self.assertContains(page, "Call Next Patient")
+        response = self.client.post(
+            "/consultations/doctor/waiting-list/call-next/", {"consulting_room": self.room.pk},
+        )
+        consultation = Consultation.objects.get(waiting_list_entry=first)
+        self.assertRedirects(
+            response, f"/consultations/doctor/consultation/{consultation.pk}/",
+            fetch_redirect_response=False,
+        )
+
+        # Without a room, a doctor is offered the rooms they already work in.
+        self.client.force_login(self.bayo)
+        WaitingList.objects.filter(pk=self.check_in(doctor=self.bayo).pk).update(status="in_progress")
+        self.client.post("/consultations/doctor/waiting-list/call-next/")
+        assert Consultation.objects.get(waiting_list_entry=second).doctor == self.bayo
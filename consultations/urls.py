@@ -56,6 +56,7 @@ urlpatterns = [
     # Doctor Waiting List and Consultation
     path('doctor/waiting-list/', views.doctor_waiting_list, name='doctor_waiting_list'),
     path('doctor/waiting-list/<int:entry_id>/start/', views.start_consultation, name='start_consultation'),
+    path('doctor/waiting-list/call-next/', views.call_next_patient, name='call_next_patient'),
     path('doctor/consultation/<int:consultation_id>/', views.doctor_consultation, name='doctor_consultation'),
 
     # Doctor Actions from Consultation
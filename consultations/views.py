@@ -8,6 +8,7 @@ from django.utils import timezone
 from django.db import transaction
 from django.db.models import Count, Q, Max, F
 from django.core.paginator import Paginator
+from . import queue
 from .models import Consultation, ConsultationNote, Referral, SOAPNote, ConsultationOrder, ConsultingRoom, WaitingList, CLINIC_TYPE_CHOICES
 # Workflow rules are shared with the mobile API.
 from .services import (
@@ -40,7 +41,7 @@ def unified_dashboard(request):
         ).all().order_by('-consultation_date')
         waiting_entries = WaitingList.objects.filter(
             status__in=['waiting', 'in_progress']
-        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by('priority', 'check_in_time')
+        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by(*queue.ORDER)
     elif user_in_role(request.user, 'doctor'):
         # Doctors see only their consultations with select_related
         consultations = Consultation.objects.filter(
@@ -49,7 +50,7 @@ def unified_dashboard(request):
         waiting_entries = WaitingList.objects.filter(
             doctor=request.user,
             status__in=['waiting', 'in_progress']
-        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by('priority', 'check_in_time')
+        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by(*queue.ORDER)
     else:
         # Default: show all with select_related
         consultations = Consultation.objects.select_related(
@@ -57,7 +58,7 @@ def unified_dashboard(request):
         ).all().order_by('-consultation_date')
         waiting_entries = WaitingList.objects.filter(
             status__in=['waiting', 'in_progress']
-        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by('priority', 'check_in_time')
+        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by(*queue.ORDER)
     
     # Calculate statistics using aggregate for efficiency
     from django.db.models import Count as CountFunc, Q as Q2
@@ -99,17 +100,17 @@ def consultation_list(request):
         consultations = Consultation.objects.select_related('patient', 'doctor', 'consulting_room').all()
         waiting_entries = WaitingList.objects.filter(
             status__in=['waiting', 'in_progress']
-        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by('priority', 'check_in_time')
+        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by(*queue.ORDER)
     elif is_doctor:
         consultations = Consultation.objects.filter(doctor=request.user).select_related('patient', 'doctor', 'consulting_room')
         waiting_entries = WaitingList.objects.filter(
             doctor=request.user, status__in=['waiting', 'in_progress']
-        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by('priority', 'check_in_time')
+        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by(*queue.ORDER)
     else:
         consultations = Consultation.objects.select_related('patient', 'doctor', 'consulting_room').all()
         waiting_entries = WaitingList.objects.filter(
             status__in=['waiting', 'in_progress']
-        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by('priority', 'check_in_time')
+        ).select_related('patient', 'doctor', 'consulting_room', 'appointment').order_by(*queue.ORDER)
 
     # Apply GET filters
     search = request.GET.get('search', '').strip()
@@ -168,7 +169,10 @@ def bulk_start_consultations(request):
         for entry_id in entry_ids:
             try:
                 waiting_entry = get_object_or_404(WaitingList, id=entry_id, doctor=request.user)
-                
+                if waiting_entry.status == 'waiting' and not queue.claim(waiting_entry, request.user):
+                    errors.append(f"{waiting_entry.patient.get_full_name()} has already been started.")
+                    continue
+
                 # Check if a consultation already exists
                 try:
                     consultation = waiting_entry.consultation
@@ -205,10 +209,11 @@ def bulk_start_consultations(request):
                         'consultation_id': consultation.id
                     })
                 
-                # Update waiting entry status
-                waiting_entry.status = 'in_progress'
-                waiting_entry.save()
-                
+                # Reopen an entry that had already left the queue
+                if waiting_entry.status != 'in_progress':
+                    waiting_entry.status = 'in_progress'
+                    waiting_entry.save()
+
             except Exception as e:
                 errors.append(f"Error with entry {entry_id}: {str(e)}")
         
@@ -1557,9 +1562,9 @@ def delete_consulting_room(request, room_id):
 @permission_required('consultations.view')
 def waiting_list(request):
     """View for displaying the patient waiting list"""
-    waiting_entries = WaitingList.objects.filter(
-        status__in=['waiting', 'in_progress']
-    ).order_by('priority', 'check_in_time')
+    waiting_entries = queue.ordered(WaitingList.objects.filter(
+        status__in=queue.ACTIVE
+    ).select_related('patient', 'doctor', 'consulting_room'))
 
     # Filter by doctor
     doctor = request.GET.get('doctor', '')
@@ -1598,7 +1603,7 @@ def waiting_list(request):
     consulting_rooms = ConsultingRoom.objects.filter(is_active=True)
 
     context = {
-        'waiting_entries': waiting_entries,
+        'waiting_entries': queue.with_positions(waiting_entries),
         'doctors': doctors,
         'consulting_rooms': consulting_rooms,
         'doctor': doctor,
@@ -1732,10 +1737,10 @@ def doctor_waiting_list(request):
     doctor = request.user
 
     # Get waiting patients for this doctor
-    waiting_entries = WaitingList.objects.filter(
+    waiting_entries = queue.ordered(WaitingList.objects.filter(
         doctor=doctor,
-        status__in=['waiting', 'in_progress']
-    ).order_by('priority', 'check_in_time')
+        status__in=queue.ACTIVE
+    ).select_related('patient', 'consulting_room'))
 
     # Filter by consulting room
     consulting_room = request.GET.get('consulting_room', '')
@@ -1749,7 +1754,7 @@ def doctor_waiting_list(request):
     ).distinct()
 
     context = {
-        'waiting_entries': waiting_entries,
+        'waiting_entries': queue.with_positions(waiting_entries),
         'consulting_rooms': consulting_rooms,
         'consulting_room': consulting_room,
     }
@@ -1767,34 +1772,62 @@ def start_consultation(request, entry_id):
         messages.error(request, f"Cannot start consultation: {waiting_entry.patient.get_full_name()}'s registration fee is unpaid (patient inactive).")
         return redirect('consultations:doctor_waiting_list')
 
-    # Update waiting entry status
-    waiting_entry.status = 'in_progress'
-    waiting_entry.save()
+    # Claim the patient; a doctor who reached them first keeps them
+    if waiting_entry.status == 'waiting':
+        if not queue.claim(waiting_entry, request.user):
+            messages.error(request, f"{waiting_entry.patient.get_full_name()} has already been started by another doctor.")
+            return redirect('consultations:doctor_waiting_list')
+    elif waiting_entry.status != 'in_progress':
+        waiting_entry.status = 'in_progress'
+        waiting_entry.save()
 
-    # Check if a consultation already exists
-    try:
-        consultation = waiting_entry.consultation
-    except Consultation.DoesNotExist:
-        # Create a new consultation
-        consultation = Consultation.objects.create(
-            patient=waiting_entry.patient,
-            doctor=waiting_entry.doctor,
-            consulting_room=waiting_entry.consulting_room,
-            waiting_list_entry=waiting_entry,
-            appointment=waiting_entry.appointment,
-            chief_complaint="",
-            symptoms="",
-            status='in_progress'
-        )
+    consultation = _consultation_for_entry(waiting_entry)
+    return redirect('consultations:doctor_consultation', consultation_id=consultation.id)
 
-        # Get the latest vitals if they exist
-        latest_vitals = Vitals.objects.filter(patient=waiting_entry.patient).order_by('-date_time').first()
-        if latest_vitals:
-            consultation.vitals = latest_vitals
-            consultation.save()
 
+@login_required
+@permission_required('consultations.create')
+@require_http_methods(["POST"])
+def call_next_patient(request):
+    """Start a consultation with whoever is next in the doctor's queue"""
+    consulting_room = None
+    if request.POST.get('consulting_room'):
+        consulting_room = get_object_or_404(ConsultingRoom, id=request.POST['consulting_room'])
+
+    waiting_entry = queue.claim_next(request.user, consulting_room)
+    if waiting_entry is None:
+        messages.info(request, "Nobody is waiting for you right now.")
+        return redirect('consultations:doctor_waiting_list')
+
+    consultation = _consultation_for_entry(waiting_entry)
     return redirect('consultations:doctor_consultation', consultation_id=consultation.id)
 
+
+def _consultation_for_entry(waiting_entry):
+    """The entry's consultation, created (with the latest vitals) if it has none yet"""
+    try:
+        return waiting_entry.consultation
+    except Consultation.DoesNotExist:
+        pass
+
+    consultation = Consultation.objects.create(
+        patient=waiting_entry.patient,
+        doctor=waiting_entry.doctor,
+        consulting_room=waiting_entry.consulting_room,
+        waiting_list_entry=waiting_entry,
+        appointment=waiting_entry.appointment,
+        chief_complaint="",
+        symptoms="",
+        status='in_progress'
+    )
+
+    # Get the latest vitals if they exist
+    latest_vitals = Vitals.objects.filter(patient=waiting_entry.patient).order_by('-date_time').first()
+    if latest_vitals:
+        consultation.vitals = latest_vitals
+        consultation.save()
+    return consultation
+
 @login_required
 @permission_required('consultations.create')
 def create_prescription(request, consultation_id):
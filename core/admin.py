@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import AuditLog, InternalNotification, SOAPNote, UIPermission, PermissionGroup, ServicePoint
+from .models import AuditLog, InternalNotification, SOAPNote, UIPermission, PermissionGroup, ServicePoint, OutboundEmail
 
 
 @admin.register(ServicePoint)
@@ -27,6 +27,14 @@ class InternalNotificationAdmin(admin.ModelAdmin):
     readonly_fields = ['created_at', 'read_at']
 
 
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ['template', 'recipient', 'send_date', 'status', 'attempts', 'sent_at']
+    list_filter = ['status', 'template', 'send_date']
+    search_fields = ['recipient', 'subject']
+    readonly_fields = ['created_at', 'sent_at', 'claim', 'last_error']
+
+
 @admin.register(SOAPNote)
 class SOAPNoteAdmin(admin.ModelAdmin):
     list_display = ['consultation', 'created_by', 'created_at']
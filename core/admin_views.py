@@ -14,7 +14,7 @@ from django.views.generic import ListView, DetailView
 from django.utils.decorators import method_decorator
 from django.db.models import Q, Count, Avg, Max
 from django.utils import timezone
-from datetime import timedelta
+from datetime import date, datetime, time, timedelta
 from django.http import JsonResponse, HttpResponseForbidden
 from django.urls import reverse_lazy, reverse
 from django.utils.crypto import get_random_string
@@ -23,6 +23,8 @@ import json
 from core.permissions import permission_required, get_client_ip
 from core.decorators import admin_required, role_required
 from core.activity_log import ActivityLog
+from core import retention
+from saas.current import get_current_hospital
 
 def is_admin(user):
     """Check if user is admin"""
@@ -109,6 +111,38 @@ def admin_dashboard(request):
 
     return render(request, 'admin/admin_dashboard.html', context)
 
+def _activity_logs_with_archives(date_from, date_to, search, category, action_type, level):
+    """ActivityLog rows, newest first, for a range that starts before the
+    retention horizon: retention.read() joins the archives to the live table,
+    and the filters the queryset would have applied are applied here."""
+    start = timezone.make_aware(datetime.combine(date_from, time.min))
+    last_day = date_to or timezone.localdate()
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min))
+    matches = {name: value for name, value in (
+        ('category', category), ('action_type', action_type), ('level', level),
+    ) if value}
+    hospital = get_current_hospital()
+    rows = retention.read(
+        'activity_log', start, end, hospital.pk if hospital else None, **matches
+    )
+    # Columns archived before a migration may no longer exist.
+    columns = {field.attname for field in ActivityLog._meta.concrete_fields}
+    users = User.objects.in_bulk({row['user_id'] for row in rows if row.get('user_id')})
+    logs = []
+    for row in reversed(rows):
+        log = ActivityLog(**{key: value for key, value in row.items() if key in columns})
+        log.user = users.get(log.user_id)
+        if search:
+            needle = search.lower()
+            haystack = [log.description or '']
+            if log.user:
+                haystack += [log.user.username, log.user.first_name, log.user.last_name]
+            if not any(needle in (text or '').lower() for text in haystack):
+                continue
+        logs.append(log)
+    return logs
+
+
 @login_required
 @user_passes_test(is_admin, login_url='/dashboard/')
 def activity_log_view(request):
@@ -157,13 +191,24 @@ def activity_log_view(request):
         except ValueError:
             pass
     
-    # Get statistics for filtered logs
-    total_logs = logs.count()
-    success_logs = logs.filter(success=True).count()
-    failed_logs = logs.filter(success=False).count()
-    warning_logs = logs.filter(level='warning').count()
-    error_logs = logs.filter(level='error').count()
-    permission_denied_logs = logs.filter(action_type='permission_denied').count()
+    # Rows older than the retention horizon have moved to the archives.
+    if isinstance(date_from, date) and date_from < retention.horizon().date():
+        logs = _activity_logs_with_archives(
+            date_from, date_to if isinstance(date_to, date) else None,
+            search, category, action_type, level,
+        )
+        total_logs = len(logs)
+        success_logs = sum(1 for log in logs if log.success)
+        warning_logs = sum(1 for log in logs if log.level == 'warning')
+        error_logs = sum(1 for log in logs if log.level == 'error')
+        permission_denied_logs = sum(1 for log in logs if log.action_type == 'permission_denied')
+    else:
+        # Get statistics for filtered logs
+        total_logs = logs.count()
+        success_logs = logs.filter(success=True).count()
+        warning_logs = logs.filter(level='warning').count()
+        error_logs = logs.filter(level='error').count()
+        permission_denied_logs = logs.filter(action_type='permission_denied').count()
     
     # Calculate success rate
     success_rate = 0
@@ -9,3 +9,6 @@ class CoreConfig(AppConfig):
         """Import signal handlers when the app is ready."""
         import core.signals  # noqa
         import core.activity_log  # noqa: F401  register ActivityLog model with the app registry
+        from . import events, turnaround
+        events.connect()
+        turnaround.connect()
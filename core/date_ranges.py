@@ -0,0 +1,80 @@
+"""Day filters as half-open timestamp ranges.
+
+`created_at__date=today` reads naturally but compiles to
+`DATE(created_at) = ...` (or a timezone conversion around it), which no index
+on created_at can serve: the database computes the function for every row of
+the tenant and compares. The same filter as
+
+    created_at >= <today 00:00 local>  AND  created_at < <tomorrow 00:00 local>
+
+is an index range scan, and with the (hospital, status, <timestamp>)
+indexes the tenant filter and the range come off one index.
+
+    Invoice.objects.filter(**day_range("invoice_date", today))
+    filter_days(qs, "created_at", week_start, today)
+
+Bounds are local midnights (settings.TIME_ZONE), the same days `__date` would
+have picked. DateField columns get plain date bounds.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.utils import timezone
+
+
+def day_bounds(first_day, last_day=None):
+    """Aware [start of first_day, start of the day after last_day)."""
+    last_day = last_day or first_day
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(first_day, time.min), tz)
+    end = timezone.make_aware(datetime.combine(last_day + timedelta(days=1), time.min), tz)
+    return start, end
+
+
+def _as_date(value):
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _is_date_only(model, field):
+    """True when `field` (possibly a__b__c) ends on a DateField, not a DateTimeField."""
+    if model is None:
+        return False
+    opts = model._meta
+    parts = field.split("__")
+    try:
+        for part in parts[:-1]:
+            opts = opts.get_field(part).related_model._meta
+        target = opts.get_field(parts[-1])
+    except (FieldDoesNotExist, AttributeError):
+        return False
+    return isinstance(target, models.DateField) and not isinstance(target, models.DateTimeField)
+
+
+def day_range(field, first_day, last_day=None, model=None):
+    """Filter kwargs selecting `field` on first_day..last_day inclusive
+    (`__date` / `__date__range`). Pass `model` so DateFields get date bounds."""
+    first_day, last_day = _as_date(first_day), _as_date(last_day or first_day)
+    if _is_date_only(model, field):
+        start, end = first_day, last_day + timedelta(days=1)
+    else:
+        start, end = day_bounds(first_day, last_day)
+    return {f"{field}__gte": start, f"{field}__lt": end}
+
+
+def since(field, first_day, model=None):
+    """Filter kwargs for `field` on or after first_day (`__date__gte`)."""
+    first_day = _as_date(first_day)
+    if _is_date_only(model, field):
+        return {f"{field}__gte": first_day}
+    return {f"{field}__gte": day_bounds(first_day)[0]}
+
+
+def filter_days(queryset, field, first_day, last_day=None):
+    """`queryset` narrowed to first_day..last_day on `field`; last_day=None
+    means just first_day."""
+    return queryset.filter(**day_range(field, first_day, last_day, model=queryset.model))
+
+
+def filter_since(queryset, field, first_day):
+    return queryset.filter(**since(field, first_day, model=queryset.model))
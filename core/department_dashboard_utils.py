@@ -15,6 +15,8 @@ from consultations.referral_mappings import (
     get_all_specialties_for_department,
 )
 import json
+from core import turnaround
+from core.date_ranges import day_range, filter_days, filter_since, since
 from core.json_safe import json_for_template
 
 
@@ -279,7 +281,7 @@ def get_department_time_periods():
     Returns:
         dict: Dictionary with today, week_start, month_start, year_start
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
 
     return {
         "today": today,
@@ -312,14 +314,12 @@ def build_department_dashboard_context(
 
     # Calculate record statistics
     total_records = record_queryset.count()
-    records_today = record_queryset.filter(
-        created_at__date=time_periods["today"]
+    records_today = filter_days(record_queryset, "created_at", time_periods["today"]).count()
+    records_this_week = filter_since(
+        record_queryset, "created_at", time_periods["week_start"]
     ).count()
-    records_this_week = record_queryset.filter(
-        created_at__date__gte=time_periods["week_start"]
-    ).count()
-    records_this_month = record_queryset.filter(
-        created_at__date__gte=time_periods["month_start"]
+    records_this_month = filter_since(
+        record_queryset, "created_at", time_periods["month_start"]
     ).count()
 
     # Get recent records
@@ -529,12 +529,12 @@ def get_daily_trend_data(record_model, days=7, date_field="created_at"):
             'dates': ['2025-01-01', '2025-01-02', ...]
         }
     """
-    today = timezone.now().date()
+    today = timezone.localdate()
     start_date = today - timedelta(days=days - 1)
 
     # Get daily counts
     daily_data = (
-        record_model.objects.filter(**{f"{date_field}__date__gte": start_date})
+        record_model.objects.filter(**since(date_field, start_date, model=record_model))
         .annotate(date=TruncDate(date_field))
         .values("date")
         .annotate(count=Count("id"))
@@ -824,13 +824,15 @@ def get_performance_metrics(record_model, date_field="created_at", days=30):
     avg_per_day = total_records / days if days > 0 else 0
 
     # Get today's count
-    today = timezone.now().date()
-    today_count = record_model.objects.filter(**{f"{date_field}__date": today}).count()
+    today = timezone.localdate()
+    today_count = record_model.objects.filter(
+        **day_range(date_field, today, model=record_model)
+    ).count()
 
     # Get yesterday's count for comparison
     yesterday = today - timedelta(days=1)
     yesterday_count = record_model.objects.filter(
-        **{f"{date_field}__date": yesterday}
+        **day_range(date_field, yesterday, model=record_model)
     ).count()
 
     # Calculate trend
@@ -915,4 +917,7 @@ def build_enhanced_dashboard_context(
     # Add active staff
     base_context["active_staff"] = get_active_staff(department)
 
+    # Add p50/p90 clinic waits from the hourly turnaround rollups
+    base_context["turnaround"] = turnaround.dashboard(department)
+
     return base_context
@@ -0,0 +1,121 @@
+"""
+Server-sent event stream for the live screens.
+
+    GET /core/events/stream/?channels=queue,alerts&since=<event id>
+
+One long-lived response per open screen, carrying the core.events deltas of
+the requested channels for the user's hospital. Each SSE message has the
+channel as its event name and {"type": ..., "data": ...} as its data, e.g.
+
+    id: 3f9a01c2-41
+    event: queue
+    data: {"type": "waiting_entry", "data": {"id": 7, "status": "in_progress", ...}}
+
+`reset` means the screen missed events and should re-read its page. The
+stream ends after EVENT_STREAM_SECONDS and EventSource reconnects with
+Last-Event-ID, so nothing is lost across the reconnect.
+
+Under WSGI (runserver, gunicorn's sync workers) a response cannot stay
+open without holding a worker, so the view answers with what was published
+since Last-Event-ID as one ordinary response, and the browser comes back
+after EVENT_STREAM_WSGI_RETRY_MS: still no database work per poll, only the
+backlog (shared through Redis, see core.events).
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+
+from core import events
+
+# A comment line this often keeps proxies from timing out a quiet stream.
+KEEPALIVE_SECONDS = 15
+RETRY_MS = 3000
+
+
+def _may_read(user, channel):
+    from accounts.permissions import user_has_permission
+    from accounts.views import is_admin_or_staff
+
+    if channel == "queue":
+        return user_has_permission(user, "consultations.view")
+    return is_admin_or_staff(user)
+
+
+def _message(event):
+    payload = json.dumps({"type": event.type, "data": event.data}, cls=DjangoJSONEncoder)
+    return f"id: {event.id}\nevent: {event.channel}\ndata: {payload}\n\n"
+
+
+def _reset():
+    # The id moves the browser's Last-Event-ID past the gap, so it
+    # reconnects from now once the page has re-read.
+    return f"id: {events.last_id()}\nevent: reset\ndata: {{}}\n\n"
+
+
+def _poll(hospital_id, channels, last_event_id):
+    """The WSGI answer: what was missed, then close."""
+    retry = getattr(settings, "EVENT_STREAM_WSGI_RETRY_MS", 10000)
+    found = events.missed(hospital_id, channels, last_event_id)
+    if found is events.RESET:
+        return f"retry: {retry}\n\n" + _reset()
+    if not found:
+        # An id with no data still moves Last-Event-ID on, so the next poll
+        # does not replay from the page's render.
+        return f"retry: {retry}\n\nid: {events.last_id()}\n\n"
+    return f"retry: {retry}\n\n" + "".join(_message(event) for event in found)
+
+
+async def _stream(hospital_id, channels, last_event_id):
+    loop = asyncio.get_running_loop()
+    # Off the loop: with Redis, subscribing is a round trip.
+    subscription = await sync_to_async(events.subscribe, thread_sensitive=False)(
+        hospital_id, channels, last_event_id, loop=loop,
+    )
+    deadline = loop.time() + getattr(settings, "EVENT_STREAM_SECONDS", 300)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            remaining = deadline - loop.time()
+            if remaining < 0:
+                return
+            item = await subscription.get(min(KEEPALIVE_SECONDS, remaining))
+            if item is events.RESET:
+                yield await sync_to_async(_reset, thread_sensitive=False)()
+                return
+            yield _message(item) if item is not None else ": keep-alive\n\n"
+    finally:
+        subscription.close()
+
+
+async def event_stream(request):
+    """Push core.events deltas for the requested channels (see module doc)."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponse("Authentication required", status=401)
+
+    channels = [c for c in request.GET.get("channels", "").split(",") if c]
+    if not channels or not set(channels) <= set(events.CHANNELS):
+        return HttpResponseBadRequest(f"channels must be some of {', '.join(events.CHANNELS)}")
+    for channel in channels:
+        if not await sync_to_async(_may_read)(user, channel):
+            return HttpResponseForbidden(f"No access to the {channel} channel")
+
+    hospital = getattr(request, "hospital", None)
+    last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    hospital_id = hospital.pk if hospital else None
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            _stream(hospital_id, channels, last_event_id), content_type="text/event-stream",
+        )
+    else:
+        body = await sync_to_async(_poll)(hospital_id, channels, last_event_id)
+        response = HttpResponse(body, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # nginx would otherwise buffer the stream until it closes.
+    response["X-Accel-Buffering"] = "no"
+    return response
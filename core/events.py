@@ -0,0 +1,420 @@
+"""Event bus behind the live screens' server-sent event stream.
+
+The activity monitor, the admin dashboards and the clinic queue pages used
+to poll: every open screen re-ran api_recent_activities / api_system_status
+or reloaded its whole list every few seconds, whether anything had changed
+or not. Now the writes publish instead. A post_save on UserActivity,
+ActivityLog, ActivityAlert, WaitingList or Consultation turns the row into a
+small JSON delta on one of the CHANNELS, tagged with the row's hospital,
+and core.event_views.event_stream pushes it to the screens subscribed to
+that channel of that hospital.
+
+    publish(hospital_id, channel, type, data)   # from any thread, after commit
+    subscribe(hospital_id, channels, last_id)   # one per open stream
+    missed(hospital_id, channels, last_id)      # one poll, no subscription
+
+The last BACKLOG events are kept, so a reconnecting EventSource (which sends
+Last-Event-ID) gets what it missed; if it missed more than the backlog holds
+it gets a `reset` event and re-reads the page.
+
+With EVENT_REDIS_URL (REDIS_URL by default) the backlog is a capped Redis
+stream, so every worker process sees every event: ids are the stream's, a
+reconnect replays whichever worker it lands on, and one listener thread per
+process hands new events to that process's open streams. Without it the
+backlog is in this process's memory, ids are "<boot>-<n>", and an event only
+reaches the screens connected to the process that made the write; the pages
+keep a slow poll for what that misses.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque, namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+logger = logging.getLogger(__name__)
+
+CHANNELS = ("activity", "alerts", "queue")
+BACKLOG = 500
+# Per stream; a screen that falls this far behind is told to reset.
+SUBSCRIBER_QUEUE = 200
+
+# `seq` orders events of one bus: an int in memory, (ms, n) from Redis.
+Event = namedtuple("Event", "id seq hospital_id channel type data")
+RESET = object()
+
+_lock = threading.Lock()
+_subscriptions = set()
+_bus = None
+
+
+def _wanted(event, hospital_id, channels):
+    # No hospital is the platform console, which TenantManager also leaves
+    # unscoped.
+    return event.channel in channels and (
+        hospital_id is None or event.hospital_id == hospital_id
+    )
+
+
+class Subscription:
+    """One open stream: the events of `channels` for `hospital_id` after
+    `after` (a seq), queued on the event loop the stream runs on."""
+
+    def __init__(self, hospital_id, channels, loop):
+        self.hospital_id = hospital_id
+        self.channels = frozenset(channels)
+        self.loop = loop
+        self.after = None
+        self.queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+
+    def wants(self, event):
+        return _wanted(event, self.hospital_id, self.channels)
+
+    def _put(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Drop what is queued and make the screen start over.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESET)
+
+    def deliver(self, item):
+        try:
+            self.loop.call_soon_threadsafe(self._put, item)
+        except RuntimeError:  # the stream's loop has closed
+            self.close()
+
+    async def get(self, timeout):
+        """The next Event, RESET, or None after `timeout` seconds of quiet
+        (at once if `timeout` is 0)."""
+        if timeout <= 0:
+            try:
+                return self.queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self):
+        with _lock:
+            _subscriptions.discard(self)
+
+
+def _dispatch(event):
+    """Hand `event` to this process's streams that have not replayed it."""
+    with _lock:
+        targets = [
+            s for s in _subscriptions if s.wants(event) and event.seq > s.after
+        ]
+    for subscription in targets:
+        subscription.deliver(event)
+
+
+class MemoryBus:
+    """The backlog in this process's memory."""
+
+    def __init__(self):
+        self.boot = uuid.uuid4().hex[:8]
+        self.last_seq = 0
+        self.backlog = deque(maxlen=BACKLOG)
+
+    def last_id(self):
+        return f"{self.boot}-{self.last_seq}"
+
+    def _parse(self, event_id):
+        boot, _, seq = (event_id or "").partition("-")
+        if boot != self.boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def since(self, last_event_id):
+        """(events after `last_event_id` or RESET, seq they run up to).
+        Called with _lock held."""
+        seq = self._parse(last_event_id)
+        # An id from another process (a restart, or a second worker) cannot
+        # be replayed; the stream starts from now rather than have every
+        # screen reload.
+        if seq is None or seq > self.last_seq:
+            return [], self.last_seq
+        oldest = self.backlog[0].seq if self.backlog else self.last_seq + 1
+        if seq < oldest - 1:
+            return RESET, self.last_seq
+        return [event for event in self.backlog if event.seq > seq], self.last_seq
+
+    def start(self):
+        pass
+
+    def publish(self, hospital_id, channel, event_type, data):
+        with _lock:
+            self.last_seq = seq = self.last_seq + 1
+            event = Event(f"{self.boot}-{seq}", seq, hospital_id, channel, event_type, data)
+            self.backlog.append(event)
+        _dispatch(event)
+        return event
+
+
+class RedisBus:
+    """The backlog as a Redis stream capped near BACKLOG entries, shared by
+    every process. Requires the `redis` package."""
+
+    KEY = "hms:events"
+
+    def __init__(self, url):
+        import redis
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.listener = None
+
+    @staticmethod
+    def _parse(event_id):
+        ms, _, n = (event_id or "").partition("-")
+        if not (ms.isdigit() and n.isdigit()):
+            return None
+        return int(ms), int(n)
+
+    def _event(self, event_id, fields):
+        body = json.loads(fields["event"])
+        return Event(
+            event_id, self._parse(event_id), body["hospital_id"], body["channel"],
+            body["type"], body["data"],
+        )
+
+    def last_id(self):
+        newest = self.client.xrevrange(self.KEY, count=1)
+        return newest[0][0] if newest else "0-0"
+
+    def since(self, last_event_id):
+        seq = self._parse(last_event_id)
+        pipe = self.client.pipeline()
+        pipe.xrevrange(self.KEY, count=1)
+        pipe.xrange(self.KEY, count=1)
+        pipe.xlen(self.KEY)
+        if seq is not None:
+            pipe.xrange(self.KEY, min=f"({last_event_id}", max="+")
+        newest, oldest, length, *replay = pipe.execute()
+        newest_seq = self._parse(newest[0][0]) if newest else (0, 0)
+        if seq is None or seq > newest_seq:
+            return [], newest_seq
+        # Capping keeps at least BACKLOG entries, so a shorter stream has
+        # never dropped any.
+        if length >= BACKLOG and oldest and seq < self._parse(oldest[0][0]):
+            return RESET, newest_seq
+        events = [self._event(event_id, fields) for event_id, fields in replay[0]]
+        return events, events[-1].seq if events else seq
+
+    def start(self):
+        """Start this process's listener, from the newest event, before the
+        first stream reads its replay, so nothing falls between the two."""
+        if self.listener is None:
+            self.listener = threading.Thread(
+                target=self._listen, args=(self.last_id(),), name="hms-events", daemon=True,
+            )
+            self.listener.start()
+
+    def _listen(self, cursor):
+        while True:
+            try:
+                batches = self.client.xread({self.KEY: cursor}, count=100, block=15000)
+            except Exception:  # noqa: BLE001 - keep listening once Redis is back
+                logger.exception("Reading live events from Redis failed")
+                time.sleep(1)
+                continue
+            for _, entries in batches or ():
+                for event_id, fields in entries:
+                    cursor = event_id
+                    _dispatch(self._event(event_id, fields))
+
+    def publish(self, hospital_id, channel, event_type, data):
+        body = json.dumps({
+            "hospital_id": hospital_id, "channel": channel, "type": event_type, "data": data,
+        }, cls=DjangoJSONEncoder)
+        try:
+            event_id = self.client.xadd(
+                self.KEY, {"event": body}, maxlen=BACKLOG, approximate=True,
+            )
+        except Exception:  # noqa: BLE001 - a live screen must never fail a write
+            logger.exception("Could not publish %s event", channel)
+            return None
+        return self._event(event_id, {"event": body})
+
+
+def bus():
+    """The process's bus: Redis when EVENT_REDIS_URL is set, else memory."""
+    global _bus
+    if _bus is None:
+        url = getattr(settings, "EVENT_REDIS_URL", "")
+        _bus = RedisBus(url) if url else MemoryBus()
+    return _bus
+
+
+def last_id():
+    """Id of the newest event, for a page to hand its stream as `since`."""
+    return bus().last_id()
+
+
+def subscribe(hospital_id, channels, last_event_id=None, loop=None):
+    """Open a Subscription on `loop` (default: the running one). With
+    `last_event_id`, the events after it are queued first, or RESET if some
+    are gone."""
+    subscription = Subscription(hospital_id, channels, loop or asyncio.get_running_loop())
+    events = bus()
+    events.start()
+    with _lock:
+        missed_events, subscription.after = events.since(last_event_id)
+        if missed_events is RESET:
+            subscription._put(RESET)
+        else:
+            for event in missed_events:
+                if subscription.wants(event):
+                    subscription._put(event)
+        _subscriptions.add(subscription)
+    return subscription
+
+
+def missed(hospital_id, channels, last_event_id):
+    """The events of `channels` for `hospital_id` after `last_event_id`, or
+    RESET: one poll's worth, without keeping a subscription open."""
+    with _lock:
+        found, _ = bus().since(last_event_id)
+    if found is RESET:
+        return RESET
+    return [event for event in found if _wanted(event, hospital_id, channels)]
+
+
+def publish(hospital_id, channel, event_type, data):
+    """Send one delta to the screens subscribed to `channel` of `hospital_id`."""
+    return bus().publish(hospital_id, channel, event_type, data)
+
+
+def _publisher(channel, event_type, serialise):
+    """A post_save/post_delete receiver publishing `serialise(instance)`
+    once the write has committed."""
+
+    def handler(sender, instance, created=False, raw=False, **kwargs):
+        if raw:
+            return
+        deleted = kwargs.get("signal") is post_delete
+        try:
+            data = {"id": instance.pk, "deleted": True} if deleted else serialise(instance, created)
+        except Exception:  # noqa: BLE001 - a live screen must never fail a write
+            logger.exception("Could not build %s event for %s #%s", channel, sender.__name__, instance.pk)
+            return
+        if data is None:
+            return
+        hospital_id = instance.hospital_id
+        transaction.on_commit(lambda: publish(hospital_id, channel, event_type, data))
+
+    return handler
+
+
+def _only_new(serialise):
+    """Skip updates: the activity feeds only show rows as they arrive, and
+    publishing every later touch of a log row is noise."""
+    return lambda instance, created: serialise(instance) if created else None
+
+
+def _user_activity(activity):
+    user = activity.user if activity.user_id else None
+    return {
+        "id": activity.pk,
+        "user": user.username if user else "Anonymous",
+        "user_id": activity.user_id,
+        "action_type": activity.get_action_type_display(),
+        "activity_level": activity.activity_level,
+        "activity_level_display": activity.get_activity_level_display(),
+        "description": activity.description,
+        "module": activity.module,
+        "ip_address": activity.ip_address,
+        "timestamp": activity.timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+        "response_time_ms": activity.response_time_ms,
+        "status_code": activity.status_code,
+    }
+
+
+def _activity_log(entry):
+    user = entry.user if entry.user_id else None
+    return {
+        "id": entry.pk,
+        "user": (user.get_full_name() or user.username) if user else "System",
+        "category": entry.category,
+        "action_type": entry.action_type,
+        "action_type_display": entry.get_action_type_display(),
+        "description": entry.description,
+        "level": entry.level,
+        "level_display": entry.get_level_display(),
+        "success": entry.success,
+        "ip_address": entry.ip_address,
+        "timestamp": entry.timestamp.isoformat(),
+    }
+
+
+def _alert(alert, created):
+    return {
+        "id": alert.pk,
+        "created": created,
+        "alert_type": alert.alert_type,
+        "alert_type_display": alert.get_alert_type_display(),
+        "severity": alert.severity,
+        "message": alert.message,
+        "is_resolved": alert.is_resolved,
+    }
+
+
+def _waiting_entry(entry, created):
+    return {
+        "id": entry.pk,
+        "created": created,
+        "patient_id": entry.patient_id,
+        "consulting_room_id": entry.consulting_room_id,
+        "doctor_id": entry.doctor_id,
+        "status": entry.status,
+        "status_display": entry.get_status_display(),
+        "priority": entry.priority,
+        "check_in_time": entry.check_in_time.isoformat(),
+    }
+
+
+def _consultation(consultation, created):
+    return {
+        "id": consultation.pk,
+        "created": created,
+        "waiting_list_entry_id": consultation.waiting_list_entry_id,
+        "doctor_id": consultation.doctor_id,
+        "status": consultation.status,
+    }
+
+
+def publish_instance(instance, created=False):
+    """Publish `instance` as its post_save would have, for writes that go
+    around save() (queryset.update)."""
+    channel, event_type, serialise, _ = PUBLISHED[instance._meta.label]
+    _publisher(channel, event_type, serialise)(type(instance), instance, created=created)
+
+
+# label -> (channel, event type, serialise(instance, created), publish deletes)
+PUBLISHED = {
+    "accounts.UserActivity": ("activity", "user_activity", _only_new(_user_activity), False),
+    "core.ActivityLog": ("activity", "activity_log", _only_new(_activity_log), False),
+    "accounts.ActivityAlert": ("alerts", "alert", _alert, True),
+    "consultations.WaitingList": ("queue", "waiting_entry", _waiting_entry, True),
+    "consultations.Consultation": ("queue", "consultation", _consultation, True),
+}
+
+
+def connect():
+    for label, (channel, event_type, serialise, deletes) in PUBLISHED.items():
+        model = apps.get_model(label)
+        handler = _publisher(channel, event_type, serialise)
+        post_save.connect(handler, sender=model, weak=False, dispatch_uid=f"events-save-{label}")
+        if deletes:
+            post_delete.connect(handler, sender=model, weak=False, dispatch_uid=f"events-delete-{label}")
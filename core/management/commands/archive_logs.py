@@ -0,0 +1,51 @@
+"""Move old log rows to the compressed monthly archives (core.retention).
+
+    python manage.py archive_logs                          # everything older than LOG_RETENTION_DAYS
+    python manage.py archive_logs --days 365 --table user_activity
+    python manage.py archive_logs --hospital <subdomain> --dry-run
+
+Schedule it nightly or weekly, after the database backup.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import retention
+
+
+class Command(BaseCommand):
+    help = "Archive ActivityLog, UserActivity and AuditLog rows past the retention horizon."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Retention horizon in days (default LOG_RETENTION_DAYS)")
+        parser.add_argument(
+            "--table", action="append", choices=sorted(retention.TABLES),
+            help="Only this table (repeatable; default all)",
+        )
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+        parser.add_argument("--batch-size", type=int, default=retention.BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would move")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        if options["days"] is not None and options["days"] < 1:
+            raise CommandError("--days must be at least 1")
+        hospital_id = None
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            hospital_id = hospital.pk
+
+        before = retention.horizon(options["days"])
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        total = 0
+        for name in options["table"] or sorted(retention.TABLES):
+            moved = retention.archive(
+                name, before, hospital_id=hospital_id,
+                batch_size=options["batch_size"], dry_run=options["dry_run"],
+            )
+            total += moved
+            self.stdout.write(f"{name}: {moved} row(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {total} row(s) older than {before:%Y-%m-%d} to {retention.archive_root()}"
+        ))
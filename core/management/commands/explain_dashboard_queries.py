@@ -0,0 +1,108 @@
+"""
+EXPLAIN the queries behind the busiest dashboards and report full table scans.
+
+Run against production-sized data after adding an index or a new dashboard
+query, or in CI with --strict:
+
+    python manage.py explain_dashboard_queries --hospital <subdomain>
+    python manage.py explain_dashboard_queries --verbose --strict
+"""
+import re
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.date_ranges import day_range, since
+from saas.current import clear_current_hospital, set_current_hospital
+
+# Plan lines that mean "read the whole table", per backend. Index scans and
+# SEARCH ... USING INDEX lines do not match.
+SCAN_PATTERNS = {
+    "sqlite": re.compile(r"\bSCAN (?:TABLE )?(\w+)\b(?! USING (?:COVERING )?INDEX)"),
+    "postgresql": re.compile(r"\bSeq Scan on (\w+)"),
+    # TRADITIONAL format: id, select_type, table, partitions, type, ...
+    "mysql": re.compile(r"^\S+\t\S+\t(\w+)\t\S+\tALL\b", re.M),
+}
+
+
+def full_scans(plan, vendor):
+    """Table names the plan reads in full."""
+    pattern = SCAN_PATTERNS.get(vendor)
+    if pattern is None:
+        return []
+    return sorted(set(pattern.findall(plan)))
+
+
+def dashboard_queries():
+    """(label, queryset) for the hot dashboard queries, tenant-scoped."""
+    from appointments.models import Appointment
+    from billing.models import Invoice, Payment
+    from laboratory.models import TestRequest
+    from pharmacy.models import DispensingLog, Prescription
+
+    today = timezone.localdate()
+    week_start = today - timedelta(days=today.weekday())
+    month_ago = today - timedelta(days=30)
+
+    return [
+        ("billing: pending invoices today",
+         Invoice.objects.filter(status="pending", **day_range("invoice_date", today))),
+        ("billing: revenue this month",
+         Payment.objects.filter(**since("payment_date", month_ago))),
+        ("laboratory: pending requests this week",
+         TestRequest.objects.filter(status="pending", **since("request_date", week_start))),
+        ("appointments: today's scheduled",
+         Appointment.objects.filter(status="scheduled", **day_range("appointment_date", today))),
+        ("pharmacy: pending prescriptions today",
+         Prescription.objects.filter(status="pending", **day_range("prescription_date", today))),
+        ("pharmacy: dispensed in the last 30 days",
+         DispensingLog.objects.filter(**since("dispensed_date", month_ago))),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the top dashboard queries and report full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hospital',
+            help='Subdomain of the hospital to scope the queries to (default: first active)',
+        )
+        parser.add_argument('--verbose', action='store_true', help='Print each full plan')
+        parser.add_argument('--strict', action='store_true', help='Exit non-zero on any full scan')
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        hospitals = Hospital.objects.filter(is_active=True)
+        if options['hospital']:
+            hospitals = hospitals.filter(subdomain=options['hospital'])
+        hospital = hospitals.order_by('pk').first()
+        if options['hospital'] and hospital is None:
+            raise CommandError(f"No active hospital '{options['hospital']}'")
+
+        vendor = connection.vendor
+        scanned = []
+        # Scoped like a request: TenantManager adds hospital= to each query,
+        # which is what the (hospital, status, <timestamp>) indexes are for.
+        set_current_hospital(hospital)
+        try:
+            for label, queryset in dashboard_queries():
+                plan = queryset.explain()
+                tables = full_scans(plan, vendor)
+                if tables:
+                    scanned.append(label)
+                    self.stdout.write(self.style.WARNING(f'FULL SCAN  {label}: {", ".join(tables)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok         {label}'))
+                if options['verbose']:
+                    self.stdout.write(f'{queryset.query}\n{plan}\n')
+        finally:
+            clear_current_hospital()
+
+        if not scanned:
+            self.stdout.write(self.style.SUCCESS('No full table scans'))
+        elif options['strict']:
+            raise CommandError(f'{len(scanned)} dashboard queries scan a whole table')
@@ -0,0 +1,55 @@
+"""Roll recorded workflow events up into the turnaround metrics.
+
+    python manage.py rollup_turnaround                     # all hospitals
+    python manage.py rollup_turnaround --hospital <subdomain>
+    python manage.py rollup_turnaround --backfill 90       # first run
+
+Celery beat runs it hourly (core.tasks.rollup_turnaround), so the
+dashboards lag by at most an hour. Each run reads only the WorkflowEvent
+rows recorded since the previous one (see core.turnaround). --backfill
+first records the events of the waiting-list entries, lab requests and
+radiology orders of the last N days, for history from before the events
+were recorded.
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import turnaround
+from core.models import WorkflowEvent
+
+
+class Command(BaseCommand):
+    help = "Fold new WorkflowEvent rows into the TurnaroundHourly p50/p90 rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+        parser.add_argument("--backfill", type=int, metavar="DAYS", help="Record the events of the last DAYS days first")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        if options["backfill"] is not None and options["backfill"] < 1:
+            raise CommandError("--backfill must be at least 1")
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            hospital_ids = [hospital.pk]
+        elif options["backfill"]:
+            hospital_ids = [None, *Hospital.objects.order_by("pk").values_list("pk", flat=True)]
+        else:
+            hospital_ids = sorted(
+                set(WorkflowEvent.all_objects.order_by().values_list("hospital_id", flat=True).distinct()),
+                key=lambda pk: (pk is not None, pk),
+            )
+
+        for hospital_id in hospital_ids:
+            label = f"hospital {hospital_id}" if hospital_id else "no hospital"
+            if options["backfill"]:
+                since = timezone.now() - timedelta(days=options["backfill"])
+                recorded = turnaround.backfill(hospital_id, since)
+                self.stdout.write(f"{label}: {recorded} event(s) backfilled")
+            read = turnaround.rollup(hospital_id)
+            self.stdout.write(self.style.SUCCESS(f"{label}: {read} new workflow event(s) rolled up"))
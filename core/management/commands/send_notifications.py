@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.notifications import BATCH_SIZE, dispatch
+
+
+class Command(BaseCommand):
+    help = 'Send queued emails from the outbox (safe to run every minute)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--time-budget', type=int, default=None,
+            help='Stop after this many seconds; the rest goes out next run',
+        )
+
+    def handle(self, *args, **options):
+        sent, failed = dispatch(
+            batch_size=options['batch_size'], time_budget=options['time_budget']
+        )
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f'Outbox: {sent} sent, {failed} failed'))
@@ -0,0 +1,45 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:35
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_backfill_tenant_hospital'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recipient', models.EmailField(max_length=254)),
+                ('template', models.CharField(help_text='Kind of message, e.g. appointment_reminder', max_length=64)),
+                ('send_date', models.DateField(default=django.utils.timezone.localdate, help_text='At most one message per recipient, template and day')),
+                ('subject', models.CharField(max_length=255)),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'), ('sent', 'Sent'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('claim', models.CharField(blank=True, default='', max_length=32)),
+                ('last_error', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+            options={
+                'verbose_name': 'Outbound Email',
+                'verbose_name_plural': 'Outbound Emails',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'next_attempt_at'], name='idx_outbox_due')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='outboundemail',
+            constraint=models.UniqueConstraint(fields=('recipient', 'template', 'send_date'), name='uniq_outbox_recipient_template_day'),
+        ),
+    ]
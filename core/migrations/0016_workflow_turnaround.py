@@ -0,0 +1,67 @@
+# Generated by Django 5.0.14 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0045_auditlog_timestamp_index'),
+        ('core', '0015_outboundemail'),
+        ('saas', '0009_hospital_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TurnaroundCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkflowEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('workflow', models.CharField(choices=[('consultation', 'Consultation'), ('laboratory', 'Laboratory'), ('radiology', 'Radiology')], max_length=20)),
+                ('subject_id', models.BigIntegerField(help_text='WaitingList, TestRequest or RadiologyOrder id')),
+                ('step', models.CharField(choices=[('queued', 'Queued'), ('started', 'Started'), ('completed', 'Completed')], max_length=10)),
+                ('at', models.DateTimeField()),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.department')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TurnaroundHourly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('metric', models.CharField(max_length=32)),
+                ('hour', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('p50_seconds', models.FloatField(default=0)),
+                ('p90_seconds', models.FloatField(default=0)),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.department')),
+                ('doctor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+            options={
+                'ordering': ['hour'],
+                'indexes': [models.Index(fields=['hospital', 'metric', 'hour'], name='idx_turnaround_metric_hour')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='workflowevent',
+            constraint=models.UniqueConstraint(fields=('workflow', 'subject_id', 'step'), name='uniq_workflow_event_step'),
+        ),
+    ]
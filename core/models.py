@@ -356,3 +356,117 @@ class ServicePoint(TenantModel):
 
     def __str__(self):
         return f"{self.name} ({self.get_point_type_display()})"
+
+
+class OutboundEmail(TenantModel):
+    """One queued email. Written by the jobs that used to call send_mail inline,
+    drained by core.notifications.dispatch over a single SMTP connection."""
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    recipient = models.EmailField()
+    template = models.CharField(max_length=64, help_text='Kind of message, e.g. appointment_reminder')
+    send_date = models.DateField(default=timezone.localdate, help_text='At most one message per recipient, template and day')
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim = models.CharField(max_length=32, blank=True, default='')
+    last_error = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipient', 'template', 'send_date'],
+                name='uniq_outbox_recipient_template_day',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='idx_outbox_due'),
+        ]
+
+    def __str__(self):
+        return f"{self.template} to {self.recipient} ({self.status})"
+
+
+class WorkflowEvent(TenantModel):
+    """One timestamped step of a patient's way through a clinical workflow:
+    a waiting-list entry queued, called in and completed; a lab request
+    raised and resulted; a radiology order placed and reported. Recorded
+    by core.turnaround as the records change, rolled up nightly into
+    TurnaroundHourly. The first time a subject reaches a step counts."""
+
+    WORKFLOW_CHOICES = (
+        ('consultation', 'Consultation'),
+        ('laboratory', 'Laboratory'),
+        ('radiology', 'Radiology'),
+    )
+    STEP_CHOICES = (
+        ('queued', 'Queued'),
+        ('started', 'Started'),
+        ('completed', 'Completed'),
+    )
+
+    workflow = models.CharField(max_length=20, choices=WORKFLOW_CHOICES)
+    subject_id = models.BigIntegerField(help_text='WaitingList, TestRequest or RadiologyOrder id')
+    step = models.CharField(max_length=10, choices=STEP_CHOICES)
+    at = models.DateTimeField()
+    department = models.ForeignKey('accounts.Department', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    doctor = models.ForeignKey('accounts.CustomUser', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['workflow', 'subject_id', 'step'], name='uniq_workflow_event_step',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.workflow} #{self.subject_id} {self.step} at {self.at}"
+
+
+class TurnaroundHourly(TenantModel):
+    """Turnaround times of one metric that ended in one UTC hour, for one
+    department and doctor: count, total and a histogram over
+    core.turnaround.BOUNDS, from which p50/p90 of any range of rows are
+    read. p50_seconds/p90_seconds are those of this row alone."""
+
+    metric = models.CharField(max_length=32)
+    hour = models.DateTimeField()
+    department = models.ForeignKey('accounts.Department', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    doctor = models.ForeignKey('accounts.CustomUser', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)
+    p50_seconds = models.FloatField(default=0)
+    p90_seconds = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['hour']
+        indexes = [
+            models.Index(fields=['hospital', 'metric', 'hour'], name='idx_turnaround_metric_hour'),
+        ]
+
+    def __str__(self):
+        return f"{self.metric} {self.hour:%Y-%m-%d %H}:00 x{self.count}"
+
+
+class TurnaroundCursor(TenantModel):
+    """The last WorkflowEvent id rolled up for a hospital, so each nightly
+    run reads only the events recorded since the previous one."""
+
+    last_event_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Turnaround cursor {self.hospital_id}: {self.last_event_id}"
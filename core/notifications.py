@@ -0,0 +1,170 @@
+"""Email outbox: queue now, send in batches over one SMTP connection.
+
+The reminder and alert jobs used to call send_mail once per message. Each
+call is a fresh TCP + TLS + AUTH handshake, a provider that throttles turns
+half the run into exceptions, a slow server stalls the cron job, and a rerun
+mails everyone twice. Jobs now write OutboundEmail rows:
+
+    enqueue("a@b.ng", "pharmacy_alerts", subject, body, hospital=h)
+    dispatch()
+
+and `dispatch` (also `manage.py send_notifications`, safe to run every
+minute) drains what is due:
+
+- one connection for the whole run, `send_messages` per message so one bad
+  address fails that message, not the batch;
+- at most NOTIFICATION_RATE_PER_MINUTE sends a minute when set;
+- failures are retried with exponential backoff, up to MAX_ATTEMPTS, then
+  left as "failed" in the admin with the last error;
+- (recipient, template, day) is unique, so re-running a job the same day
+  queues nothing new.
+
+Rows are claimed under a lease before sending, so two overlapping runs never
+send the same row, and a run killed mid-batch releases its rows when the
+lease expires.
+"""
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 50
+MAX_ATTEMPTS = 5
+RETRY_BASE_SECONDS = 60
+RETRY_MAX_SECONDS = 6 * 60 * 60
+# How long a claimed row stays reserved; comfortably longer than a batch.
+LEASE_SECONDS = 10 * 60
+
+
+def _outbox():
+    from .models import OutboundEmail
+
+    # The outbox is drained by cron with no tenant; never scope it.
+    return OutboundEmail.all_objects
+
+
+def enqueue(recipient, template, subject, body, hospital=None, day=None):
+    """Queue one email. Returns the row, or None if (recipient, template, day)
+    is already queued or sent."""
+    from .models import OutboundEmail
+
+    row = OutboundEmail(
+        recipient=recipient,
+        template=template,
+        send_date=day or timezone.localdate(),
+        subject=subject,
+        body=body,
+        hospital=hospital,
+    )
+    try:
+        with transaction.atomic():
+            row.save()
+    except IntegrityError:
+        return None
+    return row
+
+
+def enqueue_many(rows):
+    """bulk_create unsaved OutboundEmail rows, skipping duplicates.
+
+    bulk_create bypasses save(), so set `hospital` on each row yourself.
+    """
+    _outbox().bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+def retry_delay(attempts):
+    """Backoff after the `attempts`-th failure: 1, 2, 4, 8... minutes, capped."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def _claim(batch_size):
+    """Reserve up to `batch_size` due rows for this run and return them."""
+    now = timezone.now()
+    token = uuid.uuid4().hex
+    due = _outbox().filter(status__in=("pending", "sending"), next_attempt_at__lte=now)
+    ids = list(due.order_by("next_attempt_at", "pk").values_list("pk", flat=True)[:batch_size])
+    if not ids:
+        return []
+    # Re-checking the due condition in the UPDATE is what makes the claim
+    # safe: a row another run grabbed in between no longer matches.
+    due.filter(pk__in=ids).update(
+        status="sending", claim=token, next_attempt_at=now + timedelta(seconds=LEASE_SECONDS)
+    )
+    return list(_outbox().filter(claim=token, status="sending").order_by("next_attempt_at", "pk"))
+
+
+def _failed(row, error, max_attempts):
+    row.attempts += 1
+    row.last_error = str(error)[:255]
+    if row.attempts >= max_attempts:
+        row.status = "failed"
+    else:
+        row.status = "pending"
+        row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+    row.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+
+
+def dispatch(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS, time_budget=None, connection=None):
+    """Send everything due. Returns (sent, failed) for this run.
+
+    `time_budget` (seconds) stops after the batch that crosses it; whatever is
+    left goes out on the next run.
+    """
+    rate = getattr(settings, "NOTIFICATION_RATE_PER_MINUTE", 0) or 0
+    interval = 60.0 / rate if rate > 0 else 0
+    deadline = time.monotonic() + time_budget if time_budget else None
+    connection = connection or get_connection(fail_silently=False)
+    sent = failed = 0
+    last_send = None
+
+    try:
+        connection.open()
+    except Exception as e:  # noqa: BLE001 - server down: leave the queue as is
+        logger.warning("Outbox: could not connect to the mail server: %s", e)
+        return sent, failed
+
+    try:
+        while True:
+            batch = _claim(batch_size)
+            if not batch:
+                break
+            done = []
+            for row in batch:
+                if interval and last_send is not None:
+                    wait = interval - (time.monotonic() - last_send)
+                    if wait > 0:
+                        time.sleep(wait)
+                last_send = time.monotonic()
+                message = EmailMessage(
+                    subject=row.subject,
+                    body=row.body,
+                    from_email=settings.DEFAULT_FROM_EMAIL,
+                    to=[row.recipient],
+                    connection=connection,
+                )
+                try:
+                    if not connection.send_messages([message]):
+                        raise RuntimeError("Mail backend reported nothing sent")
+                except Exception as e:  # noqa: BLE001 - recorded on the row
+                    logger.warning("Outbox: %s to %s failed: %s", row.template, row.recipient, e)
+                    _failed(row, e, max_attempts)
+                    failed += 1
+                    continue
+                done.append(row.pk)
+            if done:
+                _outbox().filter(pk__in=done).update(
+                    status="sent", sent_at=timezone.now(), claim="", last_error=""
+                )
+                sent += len(done)
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+    finally:
+        connection.close()
+    return sent, failed
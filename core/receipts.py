@@ -20,6 +20,10 @@ page for the webview print bridge to feed straight to an ESC/POS printer
 
 import base64
 import textwrap
+import threading
+import time
+
+from django.core.cache import cache
 from django.shortcuts import render
 
 # 58mm rolls fit 32 characters at font A, 80mm rolls fit 48.
@@ -83,6 +87,72 @@ def escpos_logo(logo, width):
     return base64.b64encode(raster).decode()
 
 
+# Rasters per (hospital, logo content, roll width). The shared cache is keyed
+# by the file's sha256, so a fresh worker decodes each logo once per
+# deployment, not once per process. In front of it, a process-local copy
+# makes a warm receipt do no image work and no I/O; it is trusted for
+# LOCAL_LOGO_TTL only, then the file's hash is checked again. Only the process
+# that saves a Hospital knows the logo changed, and a stored name can be
+# reused once the old file is deleted, so neither the name nor a save can be
+# relied on to invalidate another worker's copy.
+LOGO_CACHE_TIMEOUT = 60 * 60 * 24 * 30
+LOCAL_LOGO_TTL = 60
+_LOCAL_LOGOS_MAX = 256
+_local_logos = {}
+_local_lock = threading.Lock()
+
+
+def _logo_cache_key(hospital_id, digest, width):
+    return f"escpos_logo:{hospital_id}:{digest}:{width}"
+
+
+def cached_escpos_logo(hospital, width):
+    """escpos_logo() for a hospital's letterhead, computed once and cached."""
+    logo = hospital.logo if hospital is not None and hospital.logo else None
+    if not logo:
+        return ""
+    local_key = (hospital.pk, logo.name, width)
+    now = time.monotonic()
+    entry = _local_logos.get(local_key)
+    if entry is not None and now - entry[2] < LOCAL_LOGO_TTL:
+        return entry[1]
+
+    from core.thumbnails import source_hash
+
+    digest = source_hash(logo.name, logo.storage)
+    if digest is None:
+        # A storage without modification times (or a file gone missing):
+        # render it, and let the short local TTL stand in for the hash.
+        raster = escpos_logo(logo, width)
+    elif entry is not None and entry[0] == digest:
+        raster = entry[1]
+    else:
+        shared_key = _logo_cache_key(hospital.pk, digest, width)
+        raster = cache.get(shared_key)
+        if raster is None:
+            raster = escpos_logo(logo, width)
+            cache.set(shared_key, raster, LOGO_CACHE_TIMEOUT)
+    with _local_lock:
+        if len(_local_logos) >= _LOCAL_LOGOS_MAX:
+            _local_logos.clear()
+        _local_logos[local_key] = (digest, raster, now)
+    return raster
+
+
+def refresh_escpos_logo(hospital):
+    """Drop this process's cached rasters for the hospital and pre-render
+    the current logo into the shared cache.
+
+    Run after a Hospital save commits, so the first receipt after a logo
+    change is as cheap as every other one.
+    """
+    with _local_lock:
+        for key in [k for k in _local_logos if k[0] == hospital.pk]:
+            del _local_logos[key]
+    for width in DOTS:
+        cached_escpos_logo(hospital, width)
+
+
 def money(value):
     """Amounts are printed without the Naira sign - most ESC/POS code pages
     have no glyph for it and print a blank or a garbage character instead."""
@@ -151,7 +221,6 @@ def render_thermal(request, title, meta, items, totals, footer=None):
 
     details = hospital_details(request)
     hospital = getattr(request, "hospital", None)
-    logo = hospital.logo if hospital and hospital.logo else None
     width = roll_width(request)
     cols = COLUMNS[width]
     header = [
@@ -173,7 +242,7 @@ def render_thermal(request, title, meta, items, totals, footer=None):
             "totals": totals,
             "header_lines": [h for h in header if h],
             "logo_url": details["hospital_logo"],
-            "logo_escpos": escpos_logo(logo, width),
+            "logo_escpos": cached_escpos_logo(hospital, width),
             "footer_lines": footer,
             "roll_width": width,
             "auto_print": request.GET.get("auto") == "1",
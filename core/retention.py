@@ -0,0 +1,152 @@
+"""Retention for the log tables: old rows move to compressed monthly archives.
+
+core.ActivityLog, accounts.UserActivity and both AuditLogs are written on
+every request or change and were never trimmed, so every analytics page and
+the live monitor read ever-growing tables. `manage.py archive_logs` moves
+rows older than LOG_RETENTION_DAYS out of them:
+
+    ARCHIVE_ROOT/<table>/<hospital id or "global">/<YYYY-MM>.jsonl.gz
+
+one gzip'd JSON object per row (the values() of the row, so foreign keys as
+user_id, hospital_id, ...), month by the row's UTC timestamp. Rows are taken
+in primary-key batches; each batch is appended to its files and synced to
+disk before it is deleted, so an interrupted run loses nothing. A batch that
+was written but not deleted is archived again on the next run, and read()
+drops the duplicate by id.
+
+read() answers "what happened between these dates" from the archives and the
+live table together, so an auditor does not need to know where the horizon
+was. The hourly activity rollups (accounts.activity_rollups) are kept, so the
+activity charts still cover archived months.
+"""
+import gzip
+import json
+import os
+from datetime import timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+# Archive name -> model label. Every one has a `timestamp` column.
+TABLES = {
+    "activity_log": "core.ActivityLog",
+    "user_activity": "accounts.UserActivity",
+    "accounts_audit_log": "accounts.AuditLog",
+    "core_audit_log": "core.AuditLog",
+}
+BATCH_SIZE = 2000
+
+
+def archive_root():
+    return Path(getattr(settings, "ARCHIVE_ROOT", None) or os.path.join(settings.BASE_DIR, "archive"))
+
+
+def horizon(days=None):
+    """Rows timestamped before this are archived."""
+    if days is None:
+        days = getattr(settings, "LOG_RETENTION_DAYS", 180)
+    return timezone.now() - timedelta(days=days)
+
+
+def archive_path(name, hospital_id, month):
+    """File holding `name` rows of one hospital (None: untenanted) for the
+    month starting `month` (a date or datetime)."""
+    folder = "global" if hospital_id is None else str(hospital_id)
+    return archive_root() / name / folder / f"{month:%Y-%m}.jsonl.gz"
+
+
+def _model(name):
+    return apps.get_model(TABLES[name])
+
+
+def _month_of(timestamp):
+    return timestamp.astimezone(dt_timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _append(path, rows):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "ab") as raw:
+        # Each append is its own gzip member; gzip readers concatenate them.
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for row in rows:
+                archive.write(json.dumps(row, cls=DjangoJSONEncoder).encode("utf-8"))
+                archive.write(b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+
+
+def archive(name, before, hospital_id=None, batch_size=BATCH_SIZE, dry_run=False):
+    """Move `name` rows timestamped before `before` to the archive files,
+    one hospital only if `hospital_id` is given. Returns the number of rows."""
+    model = _model(name)
+    rows = model._base_manager.filter(timestamp__lt=before).order_by("pk")
+    if hospital_id is not None:
+        rows = rows.filter(hospital_id=hospital_id)
+    if dry_run:
+        return rows.count()
+    moved, last_pk = 0, None
+    while True:
+        batch_qs = rows if last_pk is None else rows.filter(pk__gt=last_pk)
+        batch = list(batch_qs.values()[:batch_size])
+        if not batch:
+            return moved
+        files = {}
+        for row in batch:
+            key = archive_path(name, row["hospital_id"], _month_of(row["timestamp"]))
+            files.setdefault(key, []).append(row)
+        for path, file_rows in files.items():
+            _append(path, file_rows)
+        pks = [row["id"] for row in batch]
+        with transaction.atomic():
+            model._base_manager.filter(pk__in=pks).delete()
+        moved += len(batch)
+        last_pk = pks[-1]
+
+
+def _normalise(row):
+    row = json.loads(json.dumps(row, cls=DjangoJSONEncoder))
+    row["timestamp"] = parse_datetime(row["timestamp"])
+    return row
+
+
+def _archived(name, start, end, hospital_id):
+    month = _month_of(start)
+    while month < end:
+        path = archive_path(name, hospital_id, month)
+        if path.exists():
+            with gzip.open(path, "rt", encoding="utf-8") as archive_file:
+                for line in archive_file:
+                    row = json.loads(line)
+                    row["timestamp"] = parse_datetime(row["timestamp"])
+                    if start <= row["timestamp"] < end:
+                        yield row
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def read(name, start, end, hospital_id=None, **filters):
+    """Rows of `name` (a TABLES key) for one hospital timestamped in
+    [start, end), from the archives and the live table, oldest first.
+
+    Rows are dicts of JSON values keyed by column (user_id, not user), with
+    `timestamp` as an aware datetime. `filters` are exact matches on those
+    columns, e.g. read("user_activity", start, end, hospital.pk, user_id=7).
+    """
+    if any("__" in field for field in filters):
+        raise ValueError("read() only supports exact matches on columns")
+    expected = _normalise({"timestamp": start, **filters})
+    expected.pop("timestamp")
+    live = _model(name)._base_manager.filter(
+        hospital_id=hospital_id, timestamp__gte=start, timestamp__lt=end, **filters
+    ).values()
+    rows = {}
+    for row in _archived(name, start, end, hospital_id):
+        if all(row.get(field) == value for field, value in expected.items()):
+            rows[row["id"]] = row
+    for row in live.iterator():
+        rows[row["id"]] = _normalise(row)
+    return sorted(rows.values(), key=lambda row: (row["timestamp"], row["id"]))
@@ -3,9 +3,10 @@ Signal handlers for core app.
 Handles cache invalidation when UI permissions are modified.
 """
 
-from django.db.models.signals import m2m_changed
+from django.db.models.signals import m2m_changed, post_save
 from django.db.backends.signals import connection_created
 from django.dispatch import receiver
+from django.db import transaction
 from django.core.cache import cache
 import logging
 
@@ -55,3 +56,22 @@ def clear_cache_on_permission_change(sender, instance, action, **kwargs):
             # Fallback: clear all caches
             cache.clear()
             logger.info("Cleared entire cache as fallback")
+
+
+@receiver(post_save, sender='saas.Hospital')
+def refresh_receipt_logo(sender, instance, raw=False, **kwargs):
+    """Re-render the thermal receipt logo raster once a hospital save commits."""
+    if raw or not instance.logo:
+        return
+
+    def refresh():
+        try:
+            from core.receipts import refresh_escpos_logo
+
+            refresh_escpos_logo(instance)
+        except Exception as e:
+            # A bad logo must not break anything; receipts fall back to
+            # rendering it on demand (and printing without it if it is broken).
+            logger.error(f"Could not pre-render receipt logo for hospital {instance.pk}: {e}")
+
+    transaction.on_commit(refresh)
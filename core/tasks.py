@@ -3,7 +3,10 @@ Core Celery tasks for system maintenance and session management.
 """
 
 import logging
+from io import StringIO
+
 from celery import shared_task
+from django.core.management import call_command
 from django.utils import timezone
 from django.contrib.sessions.models import Session
 from django.conf import settings
@@ -145,4 +148,19 @@ def generate_session_security_report():
         
     except Exception as exc:
         logger.error(f"Error generating session security report: {str(exc)}")
-        return {'error': str(exc)}
\ No newline at end of file
+        return {'error': str(exc)}
+
+@shared_task
+def rollup_turnaround():
+    """
+    Fold the workflow events recorded since the last run into the
+    turnaround rollups the dashboards read (core.turnaround).
+
+    Returns:
+        dict: The command's per-hospital summary lines
+    """
+    out = StringIO()
+    call_command('rollup_turnaround', stdout=out)
+    lines = out.getvalue().splitlines()
+    logger.info(f"Turnaround rolled up: {len(lines)} hospital(s)")
+    return {'hospitals': lines}
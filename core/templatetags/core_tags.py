@@ -476,3 +476,34 @@ def static_v(path):
     except Exception:
         pass
     return url
+
+
+@register.filter
+def thumbnail_url(fieldfile, size="thumb"):
+    """
+    URL of a downscaled copy of an uploaded image (see core.thumbnails).
+    Usage: <img src="{{ patient.photo|thumbnail_url }}">
+           <img src="{{ result.image_file|thumbnail_url:'preview' }}">
+    """
+    from core.thumbnails import thumbnail_url as _thumbnail_url
+
+    return _thumbnail_url(fieldfile, size)
+
+
+@register.simple_tag
+def live_events_url(channels):
+    """
+    Event stream URL for a live screen, starting after the newest event so
+    nothing published while the page rendered is missed (see core.events).
+    Usage: new EventSource("{% live_events_url 'queue,alerts' %}")
+    """
+    from urllib.parse import urlencode
+
+    from django.urls import reverse
+
+    from core import events
+
+    query = urlencode({"channels": channels, "since": events.last_id()})
+    # Used inside <script>, where &amp; would not be decoded; urlencode has
+    # already made it safe.
+    return mark_safe(f"{reverse('core:event_stream')}?{query}")
@@ -0,0 +1,72 @@
+"""Day filters as ranges pick the same rows as __date, and the EXPLAIN check."""
+from datetime import date, datetime, time, timedelta
+from io import StringIO
+from zoneinfo import ZoneInfo
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from appointments.models import AppointmentFollowUp
+from core.date_ranges import day_bounds, day_range, filter_days, filter_since
+from core.management.commands.explain_dashboard_queries import full_scans
+from saas.models import Hospital
+
+
+class DayRangeTests(SimpleTestCase):
+    @override_settings(TIME_ZONE="Africa/Lagos")
+    def test_bounds_are_local_midnights(self):
+        start, end = day_bounds(date(2026, 3, 1), date(2026, 3, 2))
+        lagos = ZoneInfo("Africa/Lagos")
+        self.assertEqual(start, datetime(2026, 3, 1, tzinfo=lagos))
+        self.assertEqual(end, datetime(2026, 3, 3, tzinfo=lagos))
+
+    def test_date_fields_get_date_bounds(self):
+        kwargs = day_range("follow_up_date", date(2026, 3, 1), model=AppointmentFollowUp)
+        self.assertEqual(
+            kwargs, {"follow_up_date__gte": date(2026, 3, 1), "follow_up_date__lt": date(2026, 3, 2)}
+        )
+        # Through a relation, a DateTimeField still gets datetimes.
+        kwargs = day_range("appointment__appointment_date", date(2026, 3, 1), model=AppointmentFollowUp)
+        self.assertIsInstance(kwargs["appointment__appointment_date__gte"], datetime)
+
+    def test_plan_parsing(self):
+        sqlite_plan = (
+            "3 0 0 SCAN billing_invoice\n"
+            "5 0 0 SEARCH billing_payment USING INDEX idx_payment_hosp_date (hospital_id=?)\n"
+            "7 0 0 SCAN laboratory_testrequest USING INDEX idx_x\n"
+            "9 0 0 USE TEMP B-TREE FOR ORDER BY"
+        )
+        self.assertEqual(full_scans(sqlite_plan, "sqlite"), ["billing_invoice"])
+        pg_plan = "Sort\n  ->  Seq Scan on billing_invoice\n  ->  Index Scan using x on billing_payment"
+        self.assertEqual(full_scans(pg_plan, "postgresql"), ["billing_invoice"])
+        mysql_plan = "1\tSIMPLE\tbilling_invoice\tNone\tALL\tNone\tNone\tNone\tNone\t10\t10.0\tUsing where"
+        self.assertEqual(full_scans(mysql_plan, "mysql"), ["billing_invoice"])
+
+
+class DayRangeQueryTests(TestCase):
+    def test_same_rows_as_date_lookup(self):
+        from accounts.models import CustomUser
+
+        user = CustomUser.objects.create_user(phone_number="08015000031", username="dr", password="x")
+        tz = timezone.get_current_timezone()
+        today = timezone.localdate()
+        for day_offset, hour in ((-1, 23), (0, 0), (0, 23), (1, 0)):
+            stamp = timezone.make_aware(datetime.combine(today + timedelta(days=day_offset), time(hour, 30)), tz)
+            CustomUser.objects.filter(pk=user.pk).update(date_joined=stamp)
+            qs = CustomUser.objects.filter(pk=user.pk)
+            self.assertEqual(
+                filter_days(qs, "date_joined", today).exists(),
+                qs.filter(date_joined__date=today).exists(),
+            )
+            self.assertEqual(
+                filter_since(qs, "date_joined", today).exists(),
+                qs.filter(date_joined__date__gte=today).exists(),
+            )
+
+    def test_explain_command_reports_each_query(self):
+        Hospital.objects.create(name="H1", subdomain="h1")
+        out = StringIO()
+        call_command("explain_dashboard_queries", "--hospital", "h1", stdout=out)
+        self.assertIn("pending invoices today", out.getvalue())
+        self.assertIn("today's scheduled", out.getvalue())
@@ -0,0 +1,168 @@
+"""Live screens: the in-process event bus and the server-sent event stream."""
+import json
+import threading
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser, Department
+from consultations.models import ConsultingRoom, WaitingList
+from core import events
+from patients.models import Patient
+from saas.current import clear_current_hospital, set_current_hospital
+from saas.models import Hospital, Plan, Subscription
+
+
+class EventBusTest(SimpleTestCase):
+    async def test_events_reach_only_their_hospital(self):
+        mine = events.subscribe(1, ["queue"])
+        other = events.subscribe(2, ["queue"])
+        platform = events.subscribe(None, ["queue"])
+        alerts = events.subscribe(1, ["alerts"])
+        self.addCleanup(lambda: [s.close() for s in (mine, other, platform, alerts)])
+
+        # Writes publish from request threads, not the stream's event loop.
+        writer = threading.Thread(target=events.publish, args=(1, "queue", "waiting_entry", {"id": 5}))
+        writer.start()
+        writer.join()
+
+        event = await mine.get(1)
+        self.assertEqual((event.type, event.data), ("waiting_entry", {"id": 5}))
+        self.assertEqual((await platform.get(1)).id, event.id)
+        self.assertIsNone(await other.get(0))
+        self.assertIsNone(await alerts.get(0))
+
+    async def test_reconnect_replays_what_was_missed(self):
+        since = events.last_id()
+        first = events.publish(1, "queue", "waiting_entry", {"id": 1})
+        events.publish(2, "queue", "waiting_entry", {"id": 2})
+        third = events.publish(1, "queue", "waiting_entry", {"id": 3})
+
+        replay = events.subscribe(1, ["queue"], since)
+        self.addCleanup(replay.close)
+        self.assertEqual([(await replay.get(0)).id, (await replay.get(0)).id], [first.id, third.id])
+        self.assertIsNone(await replay.get(0))
+
+        # An id from another process starts from now instead.
+        fresh = events.subscribe(1, ["queue"], "otherboot-3")
+        self.addCleanup(fresh.close)
+        self.assertIsNone(await fresh.get(0))
+
+        # Missed more than the backlog holds: start over.
+        for n in range(events.BACKLOG):
+            events.publish(2, "queue", "waiting_entry", {"id": n})
+        behind = events.subscribe(1, ["queue"], since)
+        self.addCleanup(behind.close)
+        self.assertIs(await behind.get(0), events.RESET)
+
+
+class EventStreamTest(TestCase):
+    def setUp(self):
+        self.hospital = Hospital.objects.create(name="Live H", subdomain="liveh")
+        other = Hospital.objects.create(name="Other H", subdomain="otherh")
+        plan = Plan.objects.create(name="Free", price=0)
+        for hospital in (self.hospital, other):
+            Subscription.objects.create(
+                hospital=hospital, plan=plan, status="active",
+                current_period_end=timezone.now() + timedelta(days=30),
+            )
+        self.admin = CustomUser.objects.create_superuser(
+            phone_number="08016000471", username="liveadmin", password="pw12345",
+            hospital=self.hospital,
+        )
+        self.addCleanup(clear_current_hospital)
+        self.entries = {}
+        for hospital in (self.hospital, other):
+            set_current_hospital(hospital)
+            department, _ = Department.objects.get_or_create(name="Medicine")
+            room = ConsultingRoom.objects.create(room_number="L1", floor="1", department=department)
+            patient = Patient.objects.create(
+                first_name="Ada", last_name="Live", date_of_birth="1990-01-01",
+                gender="F", address="1 Live Street", city="Lagos", state="Lagos",
+            )
+            self.entries[hospital.pk] = (room, patient)
+        clear_current_hospital()
+
+    def check_in(self, hospital):
+        room, patient = self.entries[hospital.pk]
+        with self.captureOnCommitCallbacks(execute=True):
+            return WaitingList.objects.create(
+                hospital=hospital, patient=patient, consulting_room=room,
+            )
+
+    def read_stream(self, **params):
+        response = self.client.get("/core/events/stream/", params)
+        self.assertEqual(response.status_code, 200, response)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        # Under WSGI it is one ordinary response, not a held stream.
+        self.assertFalse(response.streaming)
+        self.blocks = [
+            dict(line.split(": ", 1) for line in block.splitlines() if ": " in line)
+            for block in response.content.decode().split("\n\n")
+        ]
+        return [
+            (fields["event"], json.loads(fields["data"]))
+            for fields in self.blocks if "event" in fields
+        ]
+
+    def test_queue_deltas_are_tenant_scoped(self):
+        since = events.last_id()
+        entry = self.check_in(self.hospital)
+        self.check_in(Hospital.objects.get(subdomain="otherh"))
+        with self.captureOnCommitCallbacks(execute=True):
+            entry.status = "in_progress"
+            entry.save()
+
+        self.client.force_login(self.admin)
+        messages = self.read_stream(channels="queue", since=since)
+        entries = [body for _, body in messages if body["type"] == "waiting_entry"]
+        self.assertEqual(
+            [(body["data"]["id"], body["data"]["status"]) for body in entries],
+            [(entry.pk, "waiting"), (entry.pk, "in_progress")],
+        )
+        self.assertTrue(entries[0]["data"]["created"])
+        # Each change also renumbers the queue (consultations.queue).
+        positions = [body["data"]["positions"] for _, body in messages if body["type"] == "positions"]
+        self.assertEqual(positions[0], {str(entry.pk): {"position": 1, "wait_minutes": 0}})
+
+    def test_a_quiet_poll_moves_the_last_event_id_on(self):
+        since = events.last_id()
+        self.client.force_login(self.admin)
+        self.assertEqual(self.read_stream(channels="queue", since=since), [])
+        self.assertIn({"id": since}, self.blocks)
+
+        self.check_in(self.hospital)
+        messages = self.read_stream(channels="queue", since=since)
+        self.assertEqual(messages[0][1]["type"], "waiting_entry")
+        self.assertEqual(self.blocks[-2]["id"], events.last_id())
+
+    @override_settings(EVENT_STREAM_SECONDS=0.5)
+    async def test_asgi_holds_the_stream_and_replays(self):
+        since = await sync_to_async(events.last_id)()
+        await sync_to_async(self.check_in)(self.hospital)
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.get(
+            "/core/events/stream/", {"channels": "queue", "since": since},
+        )
+        self.assertTrue(response.streaming)
+        body = "".join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertIn("event: queue", body)
+        self.assertIn('"type": "waiting_entry"', body)
+
+    def test_channels_are_checked(self):
+        response = self.client.get("/core/events/stream/", {"channels": "queue"})
+        self.assertEqual(response.status_code, 401)
+
+        self.client.force_login(self.admin)
+        response = self.client.get("/core/events/stream/", {"channels": "queue,gossip"})
+        self.assertEqual(response.status_code, 400)
+
+        nurse = CustomUser.objects.create_user(
+            phone_number="08016000472", username="livenurse", password="pw12345",
+            hospital=self.hospital,
+        )
+        self.client.force_login(nurse)
+        response = self.client.get("/core/events/stream/", {"channels": "activity"})
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,105 @@
+"""Email outbox: one connection per run, retries with backoff, no duplicates."""
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.test import TestCase
+from django.utils import timezone
+
+from core import notifications
+from core.models import OutboundEmail
+
+
+class _CountingBackend(EmailBackend):
+    """locmem backend that counts opens and can be told to refuse addresses."""
+
+    def __init__(self, refuse=(), **kwargs):
+        super().__init__(**kwargs)
+        self.refuse = set(refuse)
+        self.opens = 0
+
+    def open(self):
+        self.opens += 1
+        return super().open()
+
+    def send_messages(self, messages):
+        for message in messages:
+            if set(message.to) & self.refuse:
+                raise OSError("550 mailbox unavailable")
+        return super().send_messages(messages)
+
+
+class OutboxTests(TestCase):
+    def _queue(self, n, template="t"):
+        for i in range(n):
+            notifications.enqueue(f"p{i}@example.com", template, f"S{i}", "body")
+
+    def test_one_connection_for_many_messages(self):
+        self._queue(7)
+        backend = _CountingBackend()
+        sent, failed = notifications.dispatch(batch_size=3, connection=backend)
+        self.assertEqual((sent, failed), (7, 0))
+        self.assertEqual(backend.opens, 1)
+        self.assertEqual(len(mail.outbox), 7)
+        self.assertFalse(OutboundEmail.objects.exclude(status="sent").exists())
+
+    def test_same_recipient_template_and_day_is_queued_once(self):
+        self.assertIsNotNone(notifications.enqueue("a@example.com", "t", "S", "b"))
+        self.assertIsNone(notifications.enqueue("a@example.com", "t", "S", "b"))
+        self.assertIsNotNone(notifications.enqueue("a@example.com", "other", "S", "b"))
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        self.assertIsNotNone(notifications.enqueue("a@example.com", "t", "S", "b", day=tomorrow))
+        notifications.enqueue_many([
+            OutboundEmail(recipient="a@example.com", template="t", subject="S", body="b"),
+        ])
+        self.assertEqual(OutboundEmail.objects.count(), 3)
+
+    def test_failure_backs_off_then_gives_up(self):
+        notifications.enqueue("bad@example.com", "t", "S", "b")
+        notifications.enqueue("good@example.com", "t", "S", "b")
+        backend = _CountingBackend(refuse={"bad@example.com"})
+
+        self.assertEqual(notifications.dispatch(connection=backend), (1, 1))
+        row = OutboundEmail.objects.get(recipient="bad@example.com")
+        self.assertEqual((row.status, row.attempts), ("pending", 1))
+        self.assertIn("550", row.last_error)
+        self.assertGreater(row.next_attempt_at, timezone.now())
+        # Not due yet: a second run right away leaves it alone.
+        self.assertEqual(notifications.dispatch(connection=backend), (0, 0))
+
+        for attempt in range(2, 4):
+            OutboundEmail.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+            notifications.dispatch(max_attempts=3, connection=backend)
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ("failed", 3))
+
+    def test_retry_delay_grows_and_is_capped(self):
+        delays = [notifications.retry_delay(n).total_seconds() for n in (1, 2, 3)]
+        self.assertEqual(delays, [60, 120, 240])
+        self.assertEqual(
+            notifications.retry_delay(50).total_seconds(), notifications.RETRY_MAX_SECONDS
+        )
+
+    def test_rows_claimed_by_another_run_are_skipped(self):
+        self._queue(2)
+        OutboundEmail.objects.filter(recipient="p0@example.com").update(
+            status="sending", claim="other", next_attempt_at=timezone.now() + timedelta(minutes=5)
+        )
+        self.assertEqual(notifications.dispatch(connection=_CountingBackend()), (1, 0))
+        self.assertEqual([m.to for m in mail.outbox], [["p1@example.com"]])
+
+    def test_unreachable_server_leaves_the_queue_untouched(self):
+        self._queue(2)
+        backend = _CountingBackend()
+        with mock.patch.object(backend, "open", side_effect=OSError("timed out")):
+            self.assertEqual(notifications.dispatch(connection=backend), (0, 0))
+        self.assertEqual(OutboundEmail.objects.filter(status="pending").count(), 2)
+
+    def test_rate_limit_spaces_sends(self):
+        self._queue(3)
+        with self.settings(NOTIFICATION_RATE_PER_MINUTE=600), \
+                mock.patch("core.notifications.time.sleep") as sleep:
+            notifications.dispatch(connection=_CountingBackend())
+        self.assertEqual(sleep.call_count, 2)
+        self.assertTrue(all(0 < c.args[0] <= 0.1 for c in sleep.call_args_list))
@@ -1,7 +1,10 @@
 """Thermal receipt text layout - the only bit with real logic in it."""
 
-from django.test import SimpleTestCase
+from unittest import mock
 
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from core import receipts
 from core.receipts import receipt_text, COLUMNS
 
 
@@ -99,3 +102,93 @@ class EscposLogoTests(SimpleTestCase):
 
         self.assertEqual(escpos_logo(None, "80"), "")
         self.assertEqual(escpos_logo(self._file(b"not an image"), "80"), "")
+
+
+class CachedEscposLogoTests(TestCase):
+    """Busy cashier desks: the logo is rendered once, not once per receipt."""
+
+    def setUp(self):
+        import shutil
+        import tempfile
+
+        from django.core.cache import cache
+
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+        receipts._local_logos.clear()
+
+    def _png(self, w, h):
+        from io import BytesIO
+
+        from PIL import Image
+
+        buf = BytesIO()
+        Image.new("RGB", (w, h), "black").save(buf, "PNG")
+        return buf.getvalue()
+
+    def _hospital(self, png):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from saas.models import Hospital
+
+        h = Hospital.objects.create(name="Logo Clinic", subdomain="logoclinic")
+        with self.captureOnCommitCallbacks(execute=True):
+            h.logo.save("mark.png", SimpleUploadedFile("mark.png", png), save=True)
+        return h
+
+    def test_saving_the_hospital_prerenders_every_roll_width(self):
+        h = self._hospital(self._png(100, 40))
+        with mock.patch.object(receipts, "escpos_logo") as render:
+            for width in receipts.DOTS:
+                self.assertTrue(receipts.cached_escpos_logo(h, width))
+        render.assert_not_called()
+
+    def test_other_workers_reuse_the_shared_cache(self):
+        h = self._hospital(self._png(100, 40))
+        receipts._local_logos.clear()  # a fresh process
+        with mock.patch.object(receipts, "escpos_logo") as render:
+            receipts.cached_escpos_logo(h, "80")
+        render.assert_not_called()
+
+    def test_a_new_logo_replaces_the_old_raster(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        h = self._hospital(self._png(100, 40))
+        before = receipts.cached_escpos_logo(h, "58")
+        with self.captureOnCommitCallbacks(execute=True):
+            h.logo.save("mark.png", SimpleUploadedFile("mark.png", self._png(200, 20)), save=True)
+        after = receipts.cached_escpos_logo(h, "58")
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, receipts.escpos_logo(h.logo, "58"))
+
+    def test_another_workers_copy_expires_when_the_file_changes(self):
+        h = self._hospital(self._png(100, 40))
+        before = receipts.cached_escpos_logo(h, "80")
+        # Another process replaces the file in place, under the same name.
+        with h.logo.storage.open(h.logo.name, "wb") as fh:
+            fh.write(self._png(300, 10))
+        from django.core.cache import cache
+
+        cache.clear()  # the file's size/mtime hash memo
+        self.assertEqual(receipts.cached_escpos_logo(h, "80"), before)  # within the TTL
+        with mock.patch.object(receipts.time, "monotonic", return_value=receipts.time.monotonic() + receipts.LOCAL_LOGO_TTL + 1):
+            after = receipts.cached_escpos_logo(h, "80")
+        self.assertNotEqual(before, after)
+        self.assertEqual(after, receipts.escpos_logo(h.logo, "80"))
+
+    def test_storage_without_modified_times_still_prints(self):
+        h = self._hospital(self._png(100, 40))
+        receipts._local_logos.clear()
+        with mock.patch("core.thumbnails.source_hash", return_value=None):
+            self.assertEqual(receipts.cached_escpos_logo(h, "80"), receipts.escpos_logo(h.logo, "80"))
+
+    def test_no_hospital_or_no_logo(self):
+        from saas.models import Hospital
+
+        self.assertEqual(receipts.cached_escpos_logo(None, "80"), "")
+        h = Hospital.objects.create(name="Plain", subdomain="plain")
+        self.assertEqual(receipts.cached_escpos_logo(h, "80"), "")
@@ -0,0 +1,131 @@
+"""Log retention: old rows move to monthly gzip archives and read back."""
+import gzip
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import AuditLog, CustomUser, UserActivity
+from core import retention
+from core.activity_log import ActivityLog
+
+
+class RetentionTest(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, True)
+        override = override_settings(ARCHIVE_ROOT=self.root, LOG_RETENTION_DAYS=30)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = CustomUser.objects.create_user(
+            phone_number="08016000461", username="auditee", password="pw12345",
+        )
+
+    def activity(self, days_ago, action_type="view"):
+        row = UserActivity.objects.create(
+            user=self.user, action_type=action_type, description="viewed", module="Billing",
+        )
+        UserActivity.objects.filter(pk=row.pk).update(
+            timestamp=timezone.now() - timedelta(days=days_ago)
+        )
+        return row
+
+    def test_archive_moves_old_rows_by_month_and_reads_them_back(self):
+        old = [self.activity(days) for days in (95, 65, 64, 40)]
+        recent = self.activity(3, action_type="update")
+        ActivityLog.objects.create(
+            user=self.user, category="billing", action_type="view",
+            description="Opened invoice", timestamp=timezone.now() - timedelta(days=90),
+        )
+        AuditLog.objects.create(user=self.user, action="update", details={"field": "phone"})
+
+        out = io.StringIO()
+        call_command("archive_logs", "--batch-size", "2", stdout=out)
+        self.assertIn("Archived 5 row(s)", out.getvalue())
+        self.assertEqual(list(UserActivity.objects.values_list("pk", flat=True)), [recent.pk])
+        self.assertFalse(ActivityLog.objects.exists())
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+        months = {
+            path.name for path in (retention.archive_root() / "user_activity").rglob("*.jsonl.gz")
+        }
+        self.assertEqual(
+            months,
+            {f"{retention._month_of(timezone.now() - timedelta(days=d)):%Y-%m}.jsonl.gz"
+             for d in (95, 65, 64, 40)},
+        )
+
+        start = timezone.now() - timedelta(days=100)
+        rows = retention.read("user_activity", start, timezone.now(), None)
+        self.assertEqual([row["id"] for row in rows], [row.pk for row in old] + [recent.pk])
+        self.assertEqual(rows[0]["user_id"], self.user.pk)
+        self.assertEqual(
+            [row["id"] for row in retention.read(
+                "user_activity", start, timezone.now(), None, action_type="update")],
+            [recent.pk],
+        )
+
+    def test_interrupted_batch_is_not_read_twice(self):
+        row = self.activity(60)
+        before = retention.horizon()
+        # A previous run wrote the batch but died before deleting it.
+        data = UserActivity.objects.filter(pk=row.pk).values()[0]
+        retention._append(
+            retention.archive_path("user_activity", None, retention._month_of(data["timestamp"])),
+            [data],
+        )
+        self.assertEqual(retention.archive("user_activity", before), 1)
+        path = next((retention.archive_root() / "user_activity").rglob("*.jsonl.gz"))
+        with gzip.open(path, "rt") as archive_file:
+            self.assertEqual(len(archive_file.readlines()), 2)
+        rows = retention.read("user_activity", before - timedelta(days=60), before, None)
+        self.assertEqual([r["id"] for r in rows], [row.pk])
+
+    def test_dry_run_counts_only(self):
+        self.activity(45)
+        out = io.StringIO()
+        call_command("archive_logs", "--dry-run", "--table", "user_activity", stdout=out)
+        self.assertIn("Would archive 1 row(s)", out.getvalue())
+        self.assertEqual(UserActivity.objects.count(), 1)
+
+    def test_activity_log_page_reads_archived_ranges(self):
+        def log(days_ago, description, level="info"):
+            return ActivityLog.objects.create(
+                user=self.user, category="billing", action_type="view", level=level,
+                description=description, timestamp=timezone.now() - timedelta(days=days_ago),
+            )
+
+        old = log(90, "Opened old invoice", level="warning")
+        log(60, "Opened other invoice")
+        recent = log(3, "Opened new invoice")
+        call_command("archive_logs", "--table", "activity_log", stdout=io.StringIO())
+        self.assertEqual(list(ActivityLog.objects.values_list("pk", flat=True)), [recent.pk])
+
+        admin = CustomUser.objects.create_superuser(
+            phone_number="08016000462", username="auditor", password="pw12345",
+        )
+        self.client.force_login(admin)
+        url = reverse("core:activity_log")
+        response = self.client.get(url, {
+            "date_from": (timezone.localdate() - timedelta(days=100)).isoformat(),
+            "category": "billing", "search": "invoice",
+        })
+        self.assertEqual(response.status_code, 200)
+        logs = response.context["logs"]
+        self.assertEqual(logs.paginator.count, 3)
+        self.assertEqual([entry.pk for entry in logs][::2], [recent.pk, old.pk])
+        self.assertEqual(logs[2].user, self.user)
+        self.assertEqual(response.context["statistics"]["warning_count"], 1)
+        self.assertContains(response, "Opened old invoice")
+
+        response = self.client.get(url, {
+            "date_from": (timezone.localdate() - timedelta(days=100)).isoformat(),
+            "date_to": (timezone.localdate() - timedelta(days=70)).isoformat(),
+            "level": "warning",
+        })
+        self.assertEqual([entry.pk for entry in response.context["logs"]], [old.pk])
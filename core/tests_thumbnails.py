@@ -0,0 +1,93 @@
+"""Image derivatives: generated once, keyed by content, never a 500."""
+import io
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from PIL import Image
+
+from core import thumbnails
+
+
+def _jpeg(size=(2400, 1600), color="red"):
+    buf = io.BytesIO()
+    Image.new("RGB", size, color).save(buf, "JPEG")
+    return buf.getvalue()
+
+
+class ThumbnailTests(SimpleTestCase):
+    def setUp(self):
+        self.media = tempfile.mkdtemp()
+        self.derived = tempfile.mkdtemp()
+        self.storage = FileSystemStorage(location=self.media)
+        self.addCleanup(shutil.rmtree, self.media, True)
+        self.addCleanup(shutil.rmtree, self.derived, True)
+        override = override_settings(MEDIA_ROOT=self.media, THUMBNAIL_ROOT=self.derived)
+        override.enable()
+        self.addCleanup(override.disable)
+        cache.clear()
+
+    def _derive(self, name, size="thumb"):
+        return thumbnails.get_derivative(name, size, storage=self.storage)
+
+    def test_shrinks_to_the_size_bucket(self):
+        name = self.storage.save("profile_pics/a.jpg", ContentFile(_jpeg()))
+        path, digest = self._derive(name)
+        with Image.open(path) as img:
+            self.assertEqual(max(img.size), thumbnails.SIZES["thumb"])
+            self.assertEqual(img.format, "JPEG")
+        self.assertTrue(path.name.startswith(digest))
+
+    def test_second_request_reuses_the_file(self):
+        name = self.storage.save("profile_pics/a.jpg", ContentFile(_jpeg()))
+        first, _ = self._derive(name)
+        mtime = first.stat().st_mtime_ns
+        second, _ = self._derive(name)
+        self.assertEqual(first, second)
+        self.assertEqual(second.stat().st_mtime_ns, mtime)
+
+    def test_identical_uploads_share_a_derivative(self):
+        data = _jpeg()
+        a = self.storage.save("profile_pics/a.jpg", ContentFile(data))
+        b = self.storage.save("profile_pics/b.jpg", ContentFile(data))
+        self.assertEqual(self._derive(a)[0], self._derive(b)[0])
+
+    def test_small_images_are_not_upscaled(self):
+        name = self.storage.save("x.png", ContentFile(_jpeg(size=(40, 30))))
+        path, _ = self._derive(name, "preview")
+        with Image.open(path) as img:
+            self.assertEqual(img.size, (40, 30))
+
+    def test_corrupt_or_non_image_uploads_get_nothing(self):
+        bad = self.storage.save("x.jpg", ContentFile(b"not an image"))
+        pdf = self.storage.save("x.pdf", ContentFile(b"%PDF-1.4"))
+        self.assertEqual(self._derive(bad), (None, None))
+        self.assertEqual(self._derive(pdf), (None, None))
+        self.assertEqual(self._derive("missing.jpg"), (None, None))
+
+    def test_unknown_size_is_refused(self):
+        name = self.storage.save("x.jpg", ContentFile(_jpeg()))
+        self.assertEqual(self._derive(name, "huge"), (None, None))
+
+    def test_url_falls_back_to_the_original_for_documents(self):
+        class _Field:
+            name = "radiology_reports/r.pdf"
+            url = "/media/radiology_reports/r.pdf"
+
+        self.assertEqual(thumbnails.thumbnail_url(_Field()), _Field.url)
+        self.assertEqual(thumbnails.thumbnail_url(None), "")
+
+    def test_view_serves_jpeg_and_honours_etag(self):
+        from django.core.files.storage import default_storage
+
+        name = default_storage.save("profile_pics/v.jpg", ContentFile(_jpeg()))
+        request = RequestFactory().get("/")
+        response = thumbnails.serve_thumbnail(request, "thumb", name)
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("private", response["Cache-Control"])
+
+        request = RequestFactory().get("/", HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(thumbnails.serve_thumbnail(request, "thumb", name).status_code, 304)
@@ -0,0 +1,109 @@
+"""Workflow turnaround: events recorded on the clinical records, the hourly
+rollup into TurnaroundHourly, and the p50/p90 read back off it."""
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser, Department
+from consultations import queue
+from consultations.models import Consultation, ConsultingRoom, WaitingList
+from core import tasks, turnaround
+from core.models import TurnaroundHourly, WorkflowEvent
+from patients.models import Patient
+
+
+class TurnaroundTest(TestCase):
+    def setUp(self):
+        self.department, _ = Department.objects.get_or_create(name="Medicine")
+        self.now = timezone.now() - timedelta(hours=2)
+
+    def lab(self, subject_id, minutes, **dims):
+        subject = SimpleNamespace(pk=subject_id, hospital_id=None)
+        turnaround.record("laboratory", subject, {"queued": self.now}, **dims)
+        turnaround.record("laboratory", subject, {"completed": self.now + timedelta(minutes=minutes)})
+
+    def test_percentiles_from_the_rollup(self):
+        for n in range(1, 11):
+            self.lab(n, 10 * n, department_id=self.department.pk)
+        self.assertEqual(turnaround.rollup(None), 20)
+        self.assertEqual(turnaround.rollup(None), 0)
+
+        found = turnaround.summary(self.now - timedelta(hours=1), metrics=("lab_turnaround",))["lab_turnaround"]
+        self.assertEqual(found["count"], 10)
+        self.assertAlmostEqual(found["mean"], 55 * 60)
+        # Read off the histogram: within a bucket (a quarter) of the truth.
+        self.assertAlmostEqual(found["p50"] / 60, 50, delta=50 * 0.25)
+        self.assertAlmostEqual(found["p90"] / 60, 90, delta=90 * 0.25)
+        self.assertEqual(
+            turnaround.summary(self.now, department=self.department.pk, metrics=("lab_turnaround",))
+            ["lab_turnaround"]["count"], 10,
+        )
+
+        # Another night adds to the hour's existing row instead of a second one.
+        rows = TurnaroundHourly.objects.count()
+        self.lab(11, 10, department_id=self.department.pk)
+        turnaround.rollup(None)
+        self.assertEqual(TurnaroundHourly.objects.count(), rows)
+        self.assertEqual(sum(TurnaroundHourly.objects.values_list("count", flat=True)), 11)
+
+    def test_beat_runs_the_rollup(self):
+        from hms.celery import app
+
+        scheduled = {entry["task"] for entry in app.conf.beat_schedule.values()}
+        self.assertIn("core.tasks.rollup_turnaround", scheduled)
+        self.lab(1, 30)
+        self.assertEqual(len(tasks.rollup_turnaround()["hospitals"]), 1)
+        self.assertEqual(
+            turnaround.summary(self.now, metrics=("lab_turnaround",))["lab_turnaround"]["count"], 1,
+        )
+
+    def test_a_span_counts_once_whichever_end_arrives_last(self):
+        subject = SimpleNamespace(pk=99, hospital_id=None)
+        turnaround.record("radiology", subject, {"completed": self.now + timedelta(hours=3)})
+        turnaround.rollup(None)
+        self.assertFalse(TurnaroundHourly.objects.exists())
+
+        # The order's queued step only arrives later (a backfill).
+        turnaround.record("radiology", subject, {"queued": self.now})
+        turnaround.record("radiology", subject, {"queued": self.now - timedelta(days=1)})
+        turnaround.rollup(None)
+        row = TurnaroundHourly.objects.get()
+        self.assertEqual((row.metric, row.count, row.total_seconds), ("radiology_turnaround", 1, 3 * 3600))
+
+    def test_the_queue_records_its_steps(self):
+        room = ConsultingRoom.objects.create(room_number="T1", floor="1", department=self.department)
+        doctor = CustomUser.objects.create_user(
+            phone_number="08016000491", username="tatdoc", password="pw12345",
+        )
+        patient = Patient.objects.create(
+            first_name="Tade", last_name="Time", date_of_birth="1990-01-01",
+            gender="M", address="1 Clock Road", city="Lagos", state="Lagos",
+        )
+        entry = WaitingList.objects.create(patient=patient, consulting_room=room)
+        queue.claim(entry, doctor)
+        consultation = Consultation.objects.create(
+            patient=patient, doctor=doctor, consulting_room=room,
+            waiting_list_entry=entry, status="in_progress",
+        )
+        consultation.status = "completed"
+        consultation.save()
+
+        steps = dict(WorkflowEvent.objects.filter(workflow="consultation", subject_id=entry.pk)
+                     .values_list("step", "department_id"))
+        self.assertEqual(set(steps), {"queued", "started", "completed"})
+        self.assertEqual(set(steps.values()), {self.department.pk})
+
+        out = StringIO()
+        call_command("rollup_turnaround", stdout=out)
+        self.assertIn("3 new workflow event(s)", out.getvalue())
+        rows = turnaround.dashboard(self.department)["rows"]
+        self.assertEqual([(r["name"], r["count"]) for r in rows],
+                         [("consultation_wait", 1), ("consultation_length", 1)])
+        self.assertEqual(
+            set(TurnaroundHourly.objects.values_list("department_id", "doctor_id")),
+            {(self.department.pk, doctor.pk)},
+        )
@@ -0,0 +1,156 @@
+"""Downscaled copies of uploaded images, for lists, headers and the mobile app.
+
+Patient photos and radiology images are stored as uploaded - often a 4-8 MB
+phone photo or a full-resolution scan - and every page that shows one used to
+link the original. A 40px avatar in the patient header does not need 6 MB.
+
+    {% load core_tags %}
+    <img src="{{ patient.photo|thumbnail_url }}">
+    <img src="{{ result.image_file|thumbnail_url:'preview' }}">
+
+A derivative is made the first time it is asked for, then kept on disk under
+THUMBNAIL_ROOT keyed by the hash of the source bytes, so a re-uploaded photo
+gets a fresh copy and two records pointing at the same file share one.
+Anything Pillow cannot shrink (PDF, DICOM) links the original instead.
+"""
+
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+from core.upload_validators import IMAGE_EXTENSIONS
+
+# Longest edge in pixels. "thumb" is for lists and avatars (retina-sized for
+# the 150px profile circle), "preview" for the detail page and the app viewer.
+SIZES = {"thumb": 320, "preview": 1280}
+JPEG_QUALITY = 82
+# Source hash, memoised per (name, size, mtime) so a hit costs one stat() and
+# one cache read instead of re-reading the original.
+HASH_CACHE_TIMEOUT = 60 * 60 * 24 * 7
+
+
+def thumbnail_root():
+    return Path(
+        getattr(settings, "THUMBNAIL_ROOT", None)
+        or os.path.join(settings.BASE_DIR, "thumbnail_cache")
+    )
+
+
+def is_thumbnailable(name):
+    ext = os.path.splitext(name or "")[1].lstrip(".").lower()
+    return ext in IMAGE_EXTENSIONS
+
+
+def thumbnail_url(fieldfile, size="thumb"):
+    """URL of a `size` derivative of an uploaded file, or "" if there is none.
+
+    Non-image uploads fall back to the original's URL so a template can use
+    this unconditionally.
+    """
+    if not fieldfile:
+        return ""
+    name = getattr(fieldfile, "name", fieldfile)
+    if size not in SIZES or not is_thumbnailable(name):
+        return fieldfile.url if hasattr(fieldfile, "url") else ""
+    return reverse("media_thumbnail", kwargs={"size": size, "path": name})
+
+
+def source_hash(name, storage=default_storage):
+    """sha256 of the stored file, or None if it is gone."""
+    try:
+        stamp = f"{storage.size(name)}:{storage.get_modified_time(name).timestamp()}"
+    except (OSError, NotImplementedError):
+        return None
+    key = "thumbsrc:" + hashlib.md5(f"{name}:{stamp}".encode()).hexdigest()
+    digest = cache.get(key)
+    if digest is None:
+        h = hashlib.sha256()
+        try:
+            with storage.open(name, "rb") as fh:
+                for chunk in iter(lambda: fh.read(1024 * 1024), b""):
+                    h.update(chunk)
+        except OSError:
+            return None
+        digest = h.hexdigest()
+        cache.set(key, digest, HASH_CACHE_TIMEOUT)
+    return digest
+
+
+def derivative_path(digest, size):
+    return thumbnail_root() / digest[:2] / f"{digest}-{size}.jpg"
+
+
+def render_derivative(src, max_edge):
+    """Pillow image `src` shrunk to fit `max_edge`, flattened to RGB (or L)."""
+    from PIL import Image, ImageOps
+
+    # JPEG can decode straight at 1/2, 1/4 or 1/8 scale - far cheaper than
+    # decoding a 12-megapixel photo and throwing most of it away.
+    src.draft("RGB", (max_edge, max_edge))
+    img = ImageOps.exif_transpose(src)
+    img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        flat = Image.new("RGB", img.size, (255, 255, 255))
+        flat.paste(img, mask=img.getchannel("A"))
+        return flat
+    # Greyscale stays one channel: a third the JPEG size, same picture.
+    return img if img.mode == "L" else img.convert("RGB")
+
+
+def get_derivative(name, size, storage=default_storage):
+    """(path, digest) of the cached derivative, generating it if needed.
+
+    Returns (None, None) when the source is missing or not a decodable image.
+    """
+    if size not in SIZES or not is_thumbnailable(name):
+        return None, None
+    digest = source_hash(name, storage)
+    if digest is None:
+        return None, None
+    path = derivative_path(digest, size)
+    if path.exists():
+        return path, digest
+
+    try:
+        from PIL import Image
+    except ImportError:  # Pillow is a hard dep of ImageField, but stay quiet.
+        return None, None
+    try:
+        with storage.open(name, "rb") as fh:
+            img = render_derivative(Image.open(fh), SIZES[size])
+    except Exception:
+        # A corrupt upload gets a 404 for its thumbnail, not a 500 on the page.
+        return None, None
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write-then-rename: two workers racing on the same image must never let
+    # a reader see half a JPEG.
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    img.save(tmp, "JPEG", quality=JPEG_QUALITY, optimize=True, progressive=True)
+    os.replace(tmp, path)
+    return path, digest
+
+
+def serve_thumbnail(request, size, path):
+    """Stream a derivative. Mounted next to /media/ and guarded the same way."""
+    from django.http import FileResponse, Http404, HttpResponseNotModified
+    from django.utils.cache import patch_cache_control
+
+    derived, digest = get_derivative(path, size)
+    if derived is None:
+        raise Http404("No thumbnail for this file")
+    etag = f'"{digest[:32]}-{size}"'
+    if request.headers.get("If-None-Match") == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = FileResponse(open(derived, "rb"), content_type="image/jpeg")
+    response["ETag"] = etag
+    # Private: these are patient images behind a login.
+    patch_cache_control(response, private=True, max_age=60 * 60 * 24)
+    return response
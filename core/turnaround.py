@@ -0,0 +1,370 @@
+"""Turnaround times of the clinical workflows, and the p50/p90 reads on them.
+
+Nothing measured how long a patient waits to be called in, how long a
+consultation takes, or how long the laboratory and radiology take to answer
+a request; the one figure there was, RadiologyOrder.age_in_hours, was worked
+out per row on the order page. Now:
+
+  * connect() hooks the WaitingList, TestRequest, TestResult and
+    RadiologyOrder saves, and each workflow transition is recorded as a
+    WorkflowEvent (workflow, subject, step, time, department, doctor), an
+    insert-only table of narrow rows;
+  * rollup(hospital_id), run hourly by `manage.py rollup_turnaround`, reads
+    only the events recorded since its previous run (TurnaroundCursor),
+    pairs them into the METRICS spans and folds the durations into
+    TurnaroundHourly: per metric, UTC hour, department and doctor, a count
+    and a histogram over BOUNDS;
+  * summary() adds up the histograms of a date range and reads p50 and p90
+    off the total, so a dashboard costs one indexed query on the rollups
+    however many records lie behind it.
+
+The buckets grow by a quarter each, so a percentile read from them is
+within about 12% of the exact value. Unlike exact percentiles they add up
+across hours, doctors and departments.
+
+A span is counted when the second of its two events is rolled up, whichever
+of the two was recorded last, so steps recorded late (by a backfill, or
+a save that skipped a status) are not lost. `manage.py rollup_turnaround --backfill DAYS` records the
+events of existing records, for the first run.
+"""
+import bisect
+from collections import defaultdict, namedtuple
+from datetime import timedelta, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Max, Min
+from django.db.models.signals import post_save
+from django.utils import timezone
+
+from .models import TurnaroundCursor, TurnaroundHourly, WorkflowEvent
+
+Metric = namedtuple("Metric", "workflow start end label")
+
+METRICS = {
+    "consultation_wait": Metric("consultation", "queued", "started", "Wait to be seen"),
+    "consultation_length": Metric("consultation", "started", "completed", "Consultation"),
+    "lab_turnaround": Metric("laboratory", "queued", "completed", "Laboratory turnaround"),
+    "radiology_turnaround": Metric("radiology", "queued", "completed", "Radiology turnaround"),
+}
+CLINIC_METRICS = ("consultation_wait", "consultation_length")
+
+# Upper bounds (seconds) of the histogram buckets, 30 s to about 6 days; a
+# last bucket holds anything longer.
+BOUNDS = tuple(round(30 * 1.25 ** i) for i in range(45))
+DASHBOARD_DAYS = 7
+BATCH_SIZE = 2000
+
+
+def hour_of(moment):
+    """Start of the UTC hour containing `moment`."""
+    return moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _bucket(seconds):
+    return bisect.bisect_left(BOUNDS, seconds)
+
+
+def percentile(histogram, fraction):
+    """The `fraction` quantile (0.5 for the median) of a BOUNDS histogram,
+    interpolated within its bucket; None for an empty histogram."""
+    total = sum(histogram)
+    if not total:
+        return None
+    rank = fraction * total
+    seen = 0
+    for i, n in enumerate(histogram):
+        if n and seen + n >= rank:
+            low = BOUNDS[i - 1] if i else 0
+            high = BOUNDS[i] if i < len(BOUNDS) else low
+            return low + (high - low) * (rank - seen) / n
+        seen += n
+    return float(BOUNDS[-1])
+
+
+def _add(histogram, other):
+    if len(histogram) < len(other):
+        histogram.extend([0] * (len(other) - len(histogram)))
+    for i, n in enumerate(other):
+        histogram[i] += n
+    return histogram
+
+
+# --- recording ------------------------------------------------------------
+
+def record(workflow, subject, steps, department_id=None, doctor_id=None):
+    """Record the steps ({step: time}) `subject` has reached. A step already
+    recorded keeps its first time."""
+    events = [
+        WorkflowEvent(
+            hospital_id=subject.hospital_id, workflow=workflow, subject_id=subject.pk,
+            step=step, at=at, department_id=department_id, doctor_id=doctor_id,
+        )
+        for step, at in steps.items() if at
+    ]
+    if events:
+        WorkflowEvent._base_manager.bulk_create(events, ignore_conflicts=True)
+
+
+def _department_of(user_id):
+    from accounts.models import CustomUserProfile
+
+    if not user_id:
+        return None
+    return CustomUserProfile.objects.filter(user_id=user_id).values_list("department_id", flat=True).first()
+
+
+def _on_waiting_entry(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    steps = {}
+    if created:
+        steps["queued"] = instance.check_in_time
+    if instance.status in ("in_progress", "completed"):
+        steps["started"] = instance.started_at
+    if instance.status == "completed":
+        steps["completed"] = instance.completed_at
+    if steps:
+        record("consultation", instance, steps,
+               department_id=instance.consulting_room.department_id, doctor_id=instance.doctor_id)
+
+
+def _on_test_request(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record("laboratory", instance, {"queued": instance.request_date},
+               department_id=_department_of(instance.doctor_id), doctor_id=instance.doctor_id)
+    elif instance.status == "completed":
+        record("laboratory", instance, {"completed": timezone.now()})
+
+
+def _on_test_result(sender, instance, created=False, raw=False, **kwargs):
+    # The first result answers the request.
+    if created and not raw:
+        record("laboratory", instance.test_request, {"completed": instance.created_at})
+
+
+def _on_radiology_order(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        record("radiology", instance, {"queued": instance.order_date},
+               department_id=_department_of(instance.referring_doctor_id),
+               doctor_id=instance.referring_doctor_id)
+    elif instance.status == "completed":
+        record("radiology", instance, {"completed": instance.completed_date or timezone.now()})
+
+
+def connect():
+    for label, handler in (
+        ("consultations.WaitingList", _on_waiting_entry),
+        ("laboratory.TestRequest", _on_test_request),
+        ("laboratory.TestResult", _on_test_result),
+        ("radiology.RadiologyOrder", _on_radiology_order),
+    ):
+        post_save.connect(handler, sender=label, dispatch_uid=f"turnaround-{label}", weak=False)
+
+
+def backfill(hospital_id, since):
+    """Record the workflow events of the records created since `since`.
+    Returns the number of events offered (already recorded ones are kept)."""
+    from consultations.models import WaitingList
+    from laboratory.models import TestRequest
+    from radiology.models import RadiologyOrder
+
+    events = []
+    for pk, room_department, doctor, queued, started, completed in (
+        WaitingList._base_manager.filter(hospital_id=hospital_id, check_in_time__gte=since)
+        .values_list("pk", "consulting_room__department_id", "doctor_id",
+                     "check_in_time", "started_at", "completed_at").iterator()
+    ):
+        events.append(("consultation", pk, "queued", queued, room_department, doctor))
+        events.append(("consultation", pk, "started", started, None, doctor))
+        events.append(("consultation", pk, "completed", completed, None, doctor))
+    for pk, department, doctor, queued, resulted in (
+        TestRequest._base_manager.filter(hospital_id=hospital_id, request_date__gte=since)
+        .annotate(resulted=Min("results__created_at"))
+        .values_list("pk", "doctor__profile__department_id", "doctor_id", "request_date", "resulted")
+        .iterator()
+    ):
+        events.append(("laboratory", pk, "queued", queued, department, doctor))
+        events.append(("laboratory", pk, "completed", resulted, None, None))
+    for pk, department, doctor, queued, completed in (
+        RadiologyOrder._base_manager.filter(hospital_id=hospital_id, order_date__gte=since)
+        .values_list("pk", "referring_doctor__profile__department_id", "referring_doctor_id",
+                     "order_date", "completed_date").iterator()
+    ):
+        events.append(("radiology", pk, "queued", queued, department, doctor))
+        events.append(("radiology", pk, "completed", completed, None, None))
+
+    rows = [
+        WorkflowEvent(hospital_id=hospital_id, workflow=workflow, subject_id=pk, step=step,
+                      at=at, department_id=department, doctor_id=doctor)
+        for workflow, pk, step, at, department, doctor in events if at
+    ]
+    WorkflowEvent._base_manager.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+# --- hourly rollup --------------------------------------------------------
+
+def _spans(batch):
+    """(metric, end time, department, doctor, seconds) for the spans that
+    `batch` of new events completes."""
+    # For each event, the steps it pairs with: (metric, other step, is end).
+    pairs = defaultdict(list)
+    for name, metric in METRICS.items():
+        pairs[metric.workflow, metric.end].append((name, metric.start, True))
+        pairs[metric.workflow, metric.start].append((name, metric.end, False))
+
+    wanted = defaultdict(set)
+    for event in batch:
+        for _, other, _ in pairs[event.workflow, event.step]:
+            wanted[event.workflow, other].add(event.subject_id)
+    partners = {}
+    for (workflow, step), subject_ids in wanted.items():
+        for event in WorkflowEvent._base_manager.filter(
+            hospital_id=batch[0].hospital_id, workflow=workflow, step=step, subject_id__in=subject_ids,
+        ).only("pk", "subject_id", "at", "department_id", "doctor_id"):
+            partners[workflow, step, event.subject_id] = event
+
+    for event in batch:
+        for name, other_step, is_end in pairs[event.workflow, event.step]:
+            other = partners.get((event.workflow, other_step, event.subject_id))
+            # The later-recorded of the two events counts the span.
+            if other is None or other.pk > event.pk:
+                continue
+            start, end = (other, event) if is_end else (event, other)
+            seconds = (end.at - start.at).total_seconds()
+            if seconds < 0:
+                continue
+            yield (
+                name, end.at,
+                end.department_id or start.department_id,
+                end.doctor_id or start.doctor_id,
+                seconds,
+            )
+
+
+def rollup(hospital_id):
+    """Fold the hospital's WorkflowEvents recorded since the last run into
+    TurnaroundHourly. Returns the number of events read."""
+    with transaction.atomic():
+        cursor = TurnaroundCursor.all_objects.select_for_update().filter(hospital_id=hospital_id).first()
+        if cursor is None:
+            cursor = TurnaroundCursor.all_objects.create(hospital_id=hospital_id)
+        events = WorkflowEvent._base_manager.filter(hospital_id=hospital_id, pk__gt=cursor.last_event_id)
+        # Bound the run, so events recorded while it works wait for the next one.
+        high = events.aggregate(high=Max("pk"))["high"]
+        if high is None:
+            return 0
+
+        totals = defaultdict(lambda: [0, 0.0, [0] * (len(BOUNDS) + 1)])
+        read, batch = 0, []
+        for event in events.filter(pk__lte=high).order_by("pk").iterator(chunk_size=BATCH_SIZE):
+            batch.append(event)
+            if len(batch) == BATCH_SIZE:
+                read += _fold(batch, totals)
+                batch = []
+        if batch:
+            read += _fold(batch, totals)
+        _merge(hospital_id, totals)
+
+        cursor.last_event_id = high
+        cursor.save(update_fields=["last_event_id", "updated_at"])
+    return read
+
+
+def _fold(batch, totals):
+    for name, end_at, department_id, doctor_id, seconds in _spans(batch):
+        row = totals[name, hour_of(end_at), department_id, doctor_id]
+        row[0] += 1
+        row[1] += seconds
+        row[2][_bucket(seconds)] += 1
+    return len(batch)
+
+
+def _merge(hospital_id, totals):
+    if not totals:
+        return
+    existing = {
+        (row.metric, row.hour, row.department_id, row.doctor_id): row
+        for row in TurnaroundHourly._base_manager.filter(
+            hospital_id=hospital_id, hour__in={key[1] for key in totals},
+        )
+    }
+    new, changed = [], []
+    for key, (count, seconds, histogram) in totals.items():
+        row = existing.get(key)
+        if row is None:
+            metric, hour, department_id, doctor_id = key
+            row = TurnaroundHourly(
+                hospital_id=hospital_id, metric=metric, hour=hour,
+                department_id=department_id, doctor_id=doctor_id, histogram=[],
+            )
+            new.append(row)
+        else:
+            changed.append(row)
+        row.count += count
+        row.total_seconds += seconds
+        row.histogram = _add(list(row.histogram), histogram)
+        row.p50_seconds = percentile(row.histogram, 0.5)
+        row.p90_seconds = percentile(row.histogram, 0.9)
+    TurnaroundHourly._base_manager.bulk_create(new, batch_size=1000)
+    TurnaroundHourly._base_manager.bulk_update(
+        changed, ["count", "total_seconds", "histogram", "p50_seconds", "p90_seconds"], batch_size=1000,
+    )
+
+
+# --- reads ----------------------------------------------------------------
+
+def summary(start, end=None, department=None, doctor=None, metrics=tuple(METRICS)):
+    """{metric: {label, count, mean, p50, p90}} (seconds; None with no
+    data) over the spans that ended from `start`'s hour until `end`."""
+    rows = TurnaroundHourly.objects.filter(hour__gte=hour_of(start), metric__in=metrics)
+    if end is not None:
+        rows = rows.filter(hour__lt=end)
+    if department is not None:
+        rows = rows.filter(department=department)
+    if doctor is not None:
+        rows = rows.filter(doctor=doctor)
+
+    totals = {name: [0, 0.0, []] for name in metrics}
+    for name, count, seconds, histogram in rows.values_list("metric", "count", "total_seconds", "histogram"):
+        total = totals[name]
+        total[0] += count
+        total[1] += seconds
+        _add(total[2], histogram)
+    return {
+        name: {
+            "label": METRICS[name].label,
+            "count": count,
+            "mean": seconds / count if count else None,
+            "p50": percentile(histogram, 0.5),
+            "p90": percentile(histogram, 0.9),
+        }
+        for name, (count, seconds, histogram) in totals.items()
+    }
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "—"
+    if seconds < 2 * 3600:
+        return f"{round(seconds / 60)} min"
+    if seconds < 2 * 86400:
+        return f"{seconds / 3600:.1f} h"
+    return f"{seconds / 86400:.1f} d"
+
+
+def dashboard(department=None, metrics=CLINIC_METRICS, days=DASHBOARD_DAYS):
+    """Rows for includes/department_turnaround.html: each metric's label,
+    count and p50/p90 as text, over the last `days` days."""
+    found = summary(timezone.now() - timedelta(days=days), department=department, metrics=metrics)
+    return {
+        "days": days,
+        "rows": [
+            dict(values, name=name, p50_display=_duration(values["p50"]), p90_display=_duration(values["p90"]))
+            for name, values in found.items()
+        ],
+    }
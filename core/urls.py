@@ -7,6 +7,7 @@ from . import authorization_views
 from . import admin_views
 from . import ui_permission_views
 from . import service_point_views
+from . import event_views
 
 app_name = 'core'
 
@@ -24,6 +25,9 @@ urlpatterns = [
     path('notifications/<int:notification_id>/read/', views.mark_notification_read, name='mark_notification_read'),
     path('notifications/mark-all-read/', views.mark_all_notifications_read, name='mark_all_read'),
 
+    # Live screens: server-sent deltas (core.events)
+    path('events/stream/', event_views.event_stream, name='event_stream'),
+
     # NHIA Authorization Request
     path('request-authorization/<str:model_type>/<int:object_id>/', views.request_nhia_authorization_form, name='request_authorization_form'),
     path('request-nhia-authorization/', views.request_nhia_authorization, name='request_nhia_authorization'),
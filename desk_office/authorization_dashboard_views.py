@@ -13,12 +13,12 @@ from django.http import JsonResponse, HttpResponseNotAllowed
 
 from consultations.models import Consultation, Referral
 from pharmacy.models import Prescription
-from laboratory.models import TestRequest
-from radiology.models import RadiologyOrder
-from theatre.models import Surgery
-from nhia.models import AuthorizationCode
+from core.date_ranges import day_range
+from nhia.models import AuthorizationCode, AuthorizationRequest
 from nhia.services import (
-    AuthorizationError, authorize, generate_code_string, referral_estimated_cost,
+    PENDING_STATUSES, AuthorizationError, authorize, bulk_authorize,
+    generate_code_string, pending_counts, pending_queryset, referral_estimated_cost,
+    waiting,
 )
 from patients.models import Patient
 from .forms import PatientSearchForm, AuthorizationCodeForm
@@ -233,24 +233,17 @@ def authorization_dashboard(request):
                     }
                 )
 
-    # Get all consultations requiring authorization
+    # Everything below comes off the AuthorizationRequest queue: one grouped
+    # COUNT for the stats, and each list is the source rows behind the queue's
+    # pending entries for that kind.
     pending_consultations = (
-        Consultation.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
-        .select_related("patient", "doctor", "consulting_room")
+        pending_queryset("consultation")
+        .select_related("doctor", "consulting_room")
         .order_by("-consultation_date")
     )
-
-    # Get all referrals requiring authorization
     pending_referrals = (
-        Referral.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
+        pending_queryset("referral")
         .select_related(
-            "patient",
             "referring_doctor",
             "referred_to_doctor",
             "referred_to_department",
@@ -258,67 +251,36 @@ def authorization_dashboard(request):
         )
         .order_by("-referral_date")
     )
-
-    # Calculate estimated costs for referrals
-    for referral in pending_referrals:
-        referral.estimated_cost = calculate_referral_estimated_cost(referral)
-
-    # Get all prescriptions requiring authorization
     pending_prescriptions = (
-        Prescription.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
-        .select_related("patient", "doctor")
+        pending_queryset("prescription")
+        .select_related("doctor")
         .order_by("-prescription_date")
     )
-
-    # Get all lab test requests requiring authorization
     pending_lab_tests = (
-        TestRequest.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
-        .select_related("patient", "doctor")
+        pending_queryset("laboratory")
+        .select_related("doctor")
         .order_by("-request_date")
     )
-
-    # Get all radiology orders requiring authorization
     pending_radiology = (
-        RadiologyOrder.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
-        .select_related("patient", "referring_doctor", "test")
+        pending_queryset("radiology")
+        .select_related("referring_doctor", "test")
         .order_by("-order_date")
     )
-
-    # Get all surgeries requiring authorization
     pending_surgeries = (
-        Surgery.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
-        .select_related("patient", "surgery_type", "primary_surgeon", "theatre")
+        pending_queryset("surgery")
+        .select_related("surgery_type", "primary_surgeon", "theatre")
         .order_by("-scheduled_date")
     )
 
-    # Get statistics
+    counts = pending_counts()
     stats = {
-        "consultations": pending_consultations.count(),
-        "referrals": pending_referrals.count(),
-        "prescriptions": pending_prescriptions.count(),
-        "lab_tests": pending_lab_tests.count(),
-        "radiology": pending_radiology.count(),
-        "surgeries": pending_surgeries.count(),
-        "total": (
-            pending_consultations.count()
-            + pending_referrals.count()
-            + pending_prescriptions.count()
-            + pending_lab_tests.count()
-            + pending_radiology.count()
-            + pending_surgeries.count()
-        ),
+        "consultations": counts["consultation"],
+        "referrals": counts["referral"],
+        "prescriptions": counts["prescription"],
+        "lab_tests": counts["laboratory"],
+        "radiology": counts["radiology"],
+        "surgeries": counts["surgery"],
+        "total": counts["total"],
     }
 
     # Get recent authorization codes
@@ -358,39 +320,41 @@ def authorization_dashboard(request):
     return render(request, "desk_office/authorization_dashboard.html", context)
 
 
+def _queue_stats(kind):
+    """Header counts for a pending list, from the queue in one query."""
+    today = timezone.localdate()
+    counts = AuthorizationRequest.objects.filter(kind=kind).aggregate(
+        total_pending=Count("id", filter=Q(status__in=PENDING_STATUSES)),
+        nhia_count=Count(
+            "id", filter=Q(status__in=PENDING_STATUSES, patient__patient_type="nhia")
+        ),
+        authorized_today=Count(
+            "id", filter=Q(status="authorized", **day_range("authorized_at", today))
+        ),
+    )
+    # Neither consultations nor referrals carry an urgency yet.
+    counts["high_urgency_count"] = 0
+    return counts
+
+
 @login_required
 @permission_required("desk_office.view")
 def pending_consultations_list(request):
     """List all consultations requiring authorization"""
     consultations = (
-        Consultation.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
-        .select_related("patient", "doctor", "consulting_room")
+        pending_queryset("consultation")
+        .select_related("doctor", "consulting_room")
         .order_by("-consultation_date")
     )
 
-    # Create a simple paginator-like object for the main template
-    from django.core.paginator import Paginator
-
     paginator = Paginator(consultations, 25)  # 25 per page
     page_number = request.GET.get("page", 1)
     page_obj = paginator.get_page(page_number)
 
-    # Calculate stats for the main template
-    total_pending = consultations.count()
-    nhia_count = consultations.filter(patient__patient_type="nhia").count()
-    high_urgency_count = 0  # Consultations don't have urgency field in this model
-    authorized_today = 0  # Would need additional query to get today's authorized count
-
     context = {
         # Main template expected variables
         "page_obj": page_obj,
-        "total_pending": total_pending,
-        "nhia_count": nhia_count,
-        "high_urgency_count": high_urgency_count,
-        "authorized_today": authorized_today,
+        **_queue_stats("consultation"),
         # Original variables for fallback
         "consultations": consultations,
         "page_title": "Pending Consultation Authorizations",
@@ -405,12 +369,8 @@ def pending_consultations_list(request):
 def pending_referrals_list(request):
     """List all referrals requiring authorization"""
     referrals = (
-        Referral.objects.filter(
-            requires_authorization=True,
-            authorization_status__in=["required", "pending"],
-        )
+        pending_queryset("referral")
         .select_related(
-            "patient",
             "referring_doctor",
             "referred_to_doctor",
             "referred_to_department",
@@ -419,37 +379,23 @@ def pending_referrals_list(request):
         .order_by("-referral_date")
     )
 
-    # Calculate estimated costs for referrals
-    for referral in referrals:
-        referral.estimated_cost = calculate_referral_estimated_cost(referral)
-
-    # Create a simple paginator-like object for main template
-    from django.core.paginator import Paginator
-
-    paginator = Paginator(referrals, 25)  # 25 per page
-    page_number = request.GET.get("page", 1)
-    page_obj = paginator.get_page(page_number)
-
-    # Calculate stats for main template
-    total_pending = referrals.count()
-    nhia_count = referrals.filter(patient__patient_type="nhia").count()
-    high_urgency_count = 0  # Default for now, would need urgency field
-    authorized_today = 0  # Would need additional query to get today's authorized count
-
-    # Get unique destinations for filter dropdown
+    # The estimate was worked out when the referral was saved.
+    amounts = dict(waiting("referral").values_list("object_id", "amount"))
     destinations = []
     for referral in referrals:
+        referral.estimated_cost = amounts.get(referral.pk)
         dest = referral.get_referral_destination()
         if dest not in destinations:
             destinations.append(dest)
 
+    paginator = Paginator(referrals, 25)  # 25 per page
+    page_number = request.GET.get("page", 1)
+    page_obj = paginator.get_page(page_number)
+
     context = {
         # Main template expected variables
         "page_obj": page_obj,
-        "total_pending": total_pending,
-        "nhia_count": nhia_count,
-        "high_urgency_count": high_urgency_count,
-        "authorized_today": authorized_today,
+        **_queue_stats("referral"),
         "destinations": destinations,
         # Original variables for fallback
         "referrals": referrals,
@@ -741,6 +687,10 @@ def authorization_code_list(request):
     return render(request, "desk_office/authorization_code_list.html", context)
 
 
+def _ids(values):
+    return [int(v) for v in values if str(v).isdigit()]
+
+
 @login_required
 @permission_required("desk_office.generate_auth_code")
 def bulk_authorize_consultations(request):
@@ -752,22 +702,12 @@ def bulk_authorize_consultations(request):
             messages.error(request, "No consultations selected for authorization.")
             return redirect("desk_office:pending_consultations")
 
-        authorized_count = 0
-        for consultation_id in consultation_ids:
-            try:
-                consultation = Consultation.objects.get(id=consultation_id)
-            except Consultation.DoesNotExist:
-                continue
-            try:
-                # authorize() attaches the code; issuing one without linking it
-                # left the consultation sitting in the queue.
-                authorize(
-                    "consultation", consultation, request.user,
-                    notes="Bulk-authorized from the desk office.",
-                )
-            except AuthorizationError:
-                continue
-            authorized_count += 1
+        # authorize() semantics - a code per item, attached - but set-based:
+        # a code left unattached left the consultation sitting in the queue.
+        authorized_count = bulk_authorize(
+            "consultation", _ids(consultation_ids), request.user,
+            notes="Bulk-authorized from the desk office.",
+        )
 
         if authorized_count > 0:
             messages.success(
@@ -792,20 +732,10 @@ def bulk_authorize_referrals(request):
             messages.error(request, "No referrals selected for authorization.")
             return redirect("desk_office:pending_referrals")
 
-        authorized_count = 0
-        for referral_id in referral_ids:
-            try:
-                referral = Referral.objects.get(id=referral_id)
-            except Referral.DoesNotExist:
-                continue
-            try:
-                authorize(
-                    "referral", referral, request.user,
-                    notes="Bulk-authorized from the desk office.",
-                )
-            except AuthorizationError:
-                continue
-            authorized_count += 1
+        authorized_count = bulk_authorize(
+            "referral", _ids(referral_ids), request.user,
+            notes="Bulk-authorized from the desk office.",
+        )
 
         if authorized_count > 0:
             messages.success(
@@ -26,6 +26,8 @@ class _WardBoardScreenState extends State<WardBoardScreen> {
         emptyMessage: 'No wards',
         itemBuilder: (context, row) {
           final free = row['available_beds'] as int? ?? 0;
+          final outOfService = row['out_of_service_beds'] as int? ?? 0;
+          final pending = row['pending_discharge'] as int? ?? 0;
           return ListTile(
             leading: CircleAvatar(
               backgroundColor: free == 0
@@ -36,7 +38,9 @@ class _WardBoardScreenState extends State<WardBoardScreen> {
             title: Text('${row['name']}'),
             subtitle: Text(
               '${row['ward_type_display']} · floor ${row['floor']}\n'
-              '${row['occupied_beds']} occupied of ${row['total_beds']} · '
+              '${row['occupied_beds']} occupied of ${row['total_beds']}'
+              '${outOfService > 0 ? ' · $outOfService out of service' : ''}'
+              '${pending > 0 ? ' · $pending due out' : ''} · '
               '₦${row['charge_per_day']}/day',
             ),
             isThreeLine: true,
@@ -42,6 +42,14 @@ app.conf.beat_schedule = {
         'task': 'core.tasks.monitor_active_sessions',
         'schedule': crontab(minute='*/30'),  # Run every 30 minutes
     },
+    'reorder-forecasts': {
+        'task': 'pharmacy.tasks.forecast_reorders',
+        'schedule': crontab(hour=1, minute=0),  # Run daily at 1:00 AM
+    },
+    'turnaround-rollup': {
+        'task': 'core.tasks.rollup_turnaround',
+        'schedule': crontab(minute=5),  # Run hourly, 5 minutes past
+    },
 }
 
 app.conf.timezone = 'UTC'
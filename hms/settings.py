@@ -500,6 +500,11 @@ DEFAULT_FROM_EMAIL = os.environ.get(
     "DEFAULT_FROM_EMAIL", EMAIL_HOST_USER or "noreply@hospital.com"
 )
 SERVER_EMAIL = os.environ.get("SERVER_EMAIL", DEFAULT_FROM_EMAIL)
+# Seconds before an unresponsive SMTP server fails a send instead of hanging
+# the cron job that is draining the outbox (see core.notifications).
+EMAIL_TIMEOUT = int(os.environ.get("EMAIL_TIMEOUT", "20"))
+# Cap on outbox sends per minute, for providers that throttle (0 = no cap).
+NOTIFICATION_RATE_PER_MINUTE = int(os.environ.get("NOTIFICATION_RATE_PER_MINUTE", "0"))
 
 STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
@@ -558,6 +563,25 @@ ADMIN_INDEX_TITLE = "Welcome to HMS Administration"
 # Media files
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Downscaled copies of uploaded images (core.thumbnails). A disposable cache:
+# safe to delete, it refills on demand. It sits outside MEDIA_ROOT on purpose:
+# derivatives are only served through core.thumbnails.serve_thumbnail, which
+# applies the /media/ access checks, so keep it off any path the web server
+# maps straight to disk.
+THUMBNAIL_ROOT = os.environ.get("THUMBNAIL_ROOT", os.path.join(BASE_DIR, "thumbnail_cache"))
+# Where analyzers (or their middleware) drop ASTM/HL7 result files for
+# `manage.py import_analyzer_results --watch`. Imported files move to
+# processed/ or failed/ underneath it.
+LAB_ANALYZER_DROP_DIR = os.environ.get("LAB_ANALYZER_DROP_DIR", os.path.join(BASE_DIR, "analyzer_drop"))
+# `manage.py archive_logs` (core.retention) moves activity and audit log rows
+# older than LOG_RETENTION_DAYS into gzip'd monthly files under ARCHIVE_ROOT.
+# Not under MEDIA_ROOT: audit trails must not be web-reachable.
+ARCHIVE_ROOT = os.environ.get("ARCHIVE_ROOT", os.path.join(BASE_DIR, "archive"))
+LOG_RETENTION_DAYS = int(os.environ.get("LOG_RETENTION_DAYS", "180"))
+# Live screens (core.event_views): an open event stream is closed and
+# re-opened by the browser this often; under WSGI it is polled instead.
+EVENT_STREAM_SECONDS = int(os.environ.get("EVENT_STREAM_SECONDS", "300"))
+EVENT_STREAM_WSGI_RETRY_MS = int(os.environ.get("EVENT_STREAM_WSGI_RETRY_MS", "10000"))
 
 # Crispy Forms settings (temporarily disabled)
 # Use default crispy forms template pack
@@ -780,6 +804,18 @@ SESSION_ENGINE = (
     else "django.contrib.sessions.backends.db"
 )
 SESSION_CACHE_ALIAS = "default"
+
+# Seconds a mobile API token's resolution (user id, created, is_active) stays
+# cached (accounts/api/auth.py). Sign-ins, token deletion, user deactivation and
+# logout drop the entry. Same reasoning as the session engine: over DatabaseCache
+# a hit is still a query, and LocMemCache could not be revoked across workers.
+API_TOKEN_CACHE_SECONDS = int(
+    os.environ.get("API_TOKEN_CACHE_SECONDS", "60" if _REDIS_URL else "0")
+)
+# Live screens (core.events) share their event backlog through this Redis, so
+# an event written on one worker reaches streams on every other. Empty: each
+# process keeps its own, which only suits a single process.
+EVENT_REDIS_URL = os.environ.get("EVENT_REDIS_URL", _REDIS_URL)
 SESSION_COOKIE_AGE = int(
     os.environ.get("SESSION_COOKIE_AGE", "3600")
 )  # 1 hour default
@@ -822,6 +858,14 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_ENABLE_UTC = USE_TZ
+# Bulk patient imports from the upload page (patients.importer) run on a
+# celery worker. On by default only with REDIS_URL, the sign that a broker
+# and workers are deployed: without one the job would sit queued forever.
+# Off, or under tests, they run inline on the request.
+PATIENT_IMPORT_ASYNC = (
+    os.environ.get("PATIENT_IMPORT_ASYNC", "True" if _REDIS_URL else "False") == "True"
+    and not TESTING
+)
 
 # Celery Beat (Scheduler) Configuration
 # CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'  # Temporarily disabled
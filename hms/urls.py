@@ -24,6 +24,7 @@ from django.http import HttpResponse
 from django.templatetags.static import static as static_url
 from django.views.generic.base import RedirectView
 from core.views import home_view
+from core.thumbnails import serve_thumbnail
 from core.api.dashboard import dashboard as api_dashboard
 
 
@@ -91,7 +92,13 @@ urlpatterns = [
 # (e.g. a PythonAnywhere static-files entry) bypasses this and must be removed.
 # ponytail: django.views.static.serve is slow but safe (safe_join blocks
 # traversal); swap in X-Accel-Redirect/X-Sendfile if media traffic ever matters.
+# Downscaled copies for lists and headers (core.thumbnails), same guard.
 urlpatterns += [
+    re_path(
+        r"^thumbnails/(?P<size>[a-z]+)/(?P<path>.*)$",
+        login_required(serve_thumbnail),
+        name="media_thumbnail",
+    ),
     re_path(
         r"^media/(?P<path>.*)$",
         login_required(serve),
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Ward, Bed, Admission, DailyRound, NursingNote
+from .models import Ward, Bed, Admission, AdmissionLedger, DailyRound, NursingNote, WardCensus, WardOccupancy
 
 class BedInline(admin.TabularInline):
     model = Bed
@@ -16,6 +16,7 @@ class NursingNoteInline(admin.TabularInline):
 @admin.register(Ward)
 class WardAdmin(admin.ModelAdmin):
     list_display = ('name', 'ward_type', 'floor', 'capacity', 'charge_per_day', 'get_available_beds_count', 'is_active', 'primary_doctor')
+    list_select_related = ('census', 'primary_doctor')
     list_filter = ('ward_type', 'floor', 'is_active')
     search_fields = ('name', 'description')
     inlines = [BedInline]
@@ -31,6 +32,17 @@ class BedAdmin(admin.ModelAdmin):
     list_filter = ('ward', 'is_occupied', 'is_active')
     search_fields = ('bed_number', 'ward__name')
 
+@admin.register(WardCensus)
+class WardCensusAdmin(admin.ModelAdmin):
+    list_display = ('ward', 'total_beds', 'occupied', 'available', 'out_of_service', 'pending_discharge', 'updated_at')
+    readonly_fields = ('total_beds', 'occupied', 'available', 'out_of_service', 'pending_discharge', 'updated_at')
+
+@admin.register(WardOccupancy)
+class WardOccupancyAdmin(admin.ModelAdmin):
+    list_display = ('ward', 'recorded_at', 'event', 'occupied', 'available', 'out_of_service', 'pending_discharge')
+    list_filter = ('event', 'ward')
+    date_hierarchy = 'recorded_at'
+
 @admin.register(Admission)
 class AdmissionAdmin(admin.ModelAdmin):
     list_display = ('patient', 'admission_date', 'discharge_date', 'bed', 'status', 'attending_doctor')
@@ -54,6 +66,14 @@ class AdmissionAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(AdmissionLedger)
+class AdmissionLedgerAdmin(admin.ModelAdmin):
+    list_display = ('admission', 'billed', 'paid_from_wallet', 'outstanding', 'transaction_count', 'updated_at')
+    list_select_related = ('admission__patient',)
+    search_fields = ('admission__patient__first_name', 'admission__patient__last_name')
+    readonly_fields = ('admission_fees', 'daily_charges', 'payments', 'paid_from_wallet', 'billed',
+                       'outstanding', 'transaction_count', 'last_posted_at', 'updated_at')
+
 @admin.register(DailyRound)
 class DailyRoundAdmin(admin.ModelAdmin):
     list_display = ('admission', 'date_time', 'doctor')
@@ -10,13 +10,19 @@ class WardSerializer(serializers.ModelSerializer):
     ward_type_display = serializers.CharField(
         source='get_ward_type_display', read_only=True
     )
-    total_beds = serializers.IntegerField(source='beds.count', read_only=True)
+    total_beds = serializers.IntegerField(source='get_total_beds_count', read_only=True)
     available_beds = serializers.IntegerField(
         source='get_available_beds_count', read_only=True
     )
     occupied_beds = serializers.IntegerField(
         source='get_occupied_beds_count', read_only=True
     )
+    out_of_service_beds = serializers.IntegerField(
+        source='get_out_of_service_beds_count', read_only=True
+    )
+    pending_discharge = serializers.IntegerField(
+        source='census.pending_discharge', read_only=True, default=0
+    )
 
     class Meta:
         model = Ward
@@ -24,6 +30,7 @@ class WardSerializer(serializers.ModelSerializer):
             'id', 'name', 'ward_type', 'ward_type_display', 'floor',
             'description', 'capacity', 'charge_per_day', 'is_active',
             'total_beds', 'available_beds', 'occupied_beds',
+            'out_of_service_beds', 'pending_discharge',
         ]
 
 
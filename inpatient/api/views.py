@@ -51,7 +51,7 @@ class WardViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = InpatientPagination
 
     def get_queryset(self):
-        queryset = Ward.objects.prefetch_related('beds').order_by('name')
+        queryset = Ward.objects.select_related('census').order_by('name')
         params = self.request.query_params
         if params.get('search'):
             queryset = queryset.filter(
@@ -114,8 +114,8 @@ class AdmissionViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = (
             Admission.objects
-            .select_related('patient', 'patient__wallet', 'bed', 'bed__ward',
-                            'attending_doctor')
+            .select_related('patient', 'patient__wallet', 'patient__nhia_info',
+                            'bed', 'bed__ward', 'attending_doctor', 'ledger')
             .order_by('-admission_date')
         )
         params = self.request.query_params
@@ -7,3 +7,6 @@ class InpatientConfig(AppConfig):
 
     def ready(self):
         import inpatient.signals
+        from . import census, ledger
+        census.connect()
+        ledger.connect()
@@ -0,0 +1,110 @@
+"""Per-ward bed census (WardCensus) and its occupancy time series (WardOccupancy).
+
+Ward lists, the bed dashboard, ward detail and the mobile ward board used to
+count Bed rows for every ward they showed. refresh() recounts only the wards
+an event touched — one grouped query over their beds, one over their current
+admissions — and writes the result to their census rows, locked for the
+duration of the caller's transaction so concurrent admissions into one ward
+serialize.
+
+Who calls it:
+  * inpatient.services: admit_patient, discharge_patient and transfer_patient,
+    inside their own transaction, with an `event` so a WardOccupancy point is
+    appended for the time series;
+  * post_save/post_delete on Ward and Bed (connect(), from InpatientConfig.ready),
+    for bed edits and Admission.save()'s bed flips outside the services;
+  * views that change beds with queryset.update(), which fires no signals;
+  * `manage.py reconcile_ward_census`, which recounts every ward and records a
+    'reconcile' point — schedule it nightly.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from .models import Admission, Bed, Ward, WardCensus, WardOccupancy
+
+COUNT_FIELDS = ('total_beds', 'occupied', 'available', 'out_of_service', 'pending_discharge')
+
+
+def _counts(ward_ids):
+    counts = {
+        row.pop('ward_id'): row
+        for row in Bed._base_manager.filter(ward_id__in=ward_ids)
+        .order_by().values('ward_id')
+        .annotate(
+            total_beds=Count('id'),
+            occupied=Count('id', filter=Q(is_occupied=True)),
+            available=Count('id', filter=Q(is_occupied=False, is_active=True)),
+            out_of_service=Count('id', filter=Q(is_active=False)),
+        )
+    }
+    pending = dict(
+        Admission._base_manager.filter(
+            bed__ward_id__in=ward_ids, status='admitted', discharge_date__isnull=False,
+        ).order_by().values('bed__ward_id').annotate(n=Count('id')).values_list('bed__ward_id', 'n')
+    )
+    return counts, pending
+
+
+def refresh(ward_ids, event=None):
+    """Recount the census of these wards. With `event` (a WardOccupancy event),
+    also append one occupancy point per ward. Returns the census rows."""
+    ward_ids = sorted({pk for pk in ward_ids if pk})
+    if not ward_ids:
+        return []
+    hospitals = dict(Ward._base_manager.filter(pk__in=ward_ids).values_list('pk', 'hospital_id'))
+    with transaction.atomic():
+        WardCensus._base_manager.bulk_create(
+            [WardCensus(ward_id=pk, hospital_id=hospital_id) for pk, hospital_id in hospitals.items()],
+            ignore_conflicts=True,
+        )
+        rows = list(
+            WardCensus._base_manager.select_for_update()
+            .filter(ward_id__in=hospitals).order_by('ward_id')
+        )
+        counts, pending = _counts(list(hospitals))
+        history, now = [], timezone.now()
+        for census in rows:
+            values = counts.get(census.ward_id, {})
+            for field in COUNT_FIELDS[:-1]:
+                setattr(census, field, values.get(field, 0))
+            census.pending_discharge = pending.get(census.ward_id, 0)
+            census.updated_at = now
+            if event:
+                history.append(WardOccupancy(
+                    ward_id=census.ward_id, hospital_id=census.hospital_id, event=event,
+                    occupied=census.occupied, available=census.available,
+                    out_of_service=census.out_of_service,
+                    pending_discharge=census.pending_discharge,
+                ))
+        WardCensus._base_manager.bulk_update(rows, COUNT_FIELDS + ('updated_at',))
+        WardOccupancy._base_manager.bulk_create(history)
+    return rows
+
+
+def _on_ward(sender, instance, created=False, **kwargs):
+    if created:
+        refresh([instance.pk])
+
+
+def _before_bed_save(sender, instance, update_fields=None, **kwargs):
+    # A full save (the bed form) can move a bed to another ward; remember the
+    # old one so both are recounted.
+    if instance.pk and update_fields is None:
+        instance._census_old_ward_id = (
+            Bed._base_manager.filter(pk=instance.pk).values_list('ward_id', flat=True).first()
+        )
+
+
+def _on_bed(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Ward):
+        return  # the ward and its census are going too
+    refresh([instance.ward_id, getattr(instance, '_census_old_ward_id', None)])
+
+
+def connect():
+    post_save.connect(_on_ward, sender='inpatient.Ward', dispatch_uid='ward_census_ward', weak=False)
+    pre_save.connect(_before_bed_save, sender='inpatient.Bed', dispatch_uid='ward_census_bed', weak=False)
+    post_save.connect(_on_bed, sender='inpatient.Bed', dispatch_uid='ward_census_bed', weak=False)
+    post_delete.connect(_on_bed, sender='inpatient.Bed', dispatch_uid='ward_census_bed', weak=False)
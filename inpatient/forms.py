@@ -113,7 +113,14 @@ class AdmissionForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         # Only show available beds
         if not self.instance.pk:  # Only for new admissions
-            self.fields['bed'].queryset = Bed.objects.filter(is_occupied=False, is_active=True)
+            # Each option shows its ward's free-bed count from the census row
+            self.fields['bed'].queryset = Bed.objects.filter(
+                is_occupied=False, is_active=True
+            ).select_related('ward__census').order_by('ward__name', 'bed_number')
+            self.fields['bed'].label_from_instance = lambda bed: (
+                f"{bed.ward.name} - Bed {bed.bed_number} "
+                f"({bed.ward.get_available_beds_count()} free)"
+            )
         
         # Filter doctors by role or specialization
         from django.db.models import Q
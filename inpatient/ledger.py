@@ -0,0 +1,171 @@
+"""Per-admission billing ledger (AdmissionLedger).
+
+Admission.get_actual_charges_from_wallet used to run up to four aggregates
+over WalletTransaction on every call, two of them OR-joining the patient and
+the patient's wallet across a date range, and the admission screens, the
+wallet views, patient_outstanding and the nightly charge job call it many
+times per admission. The totals now live on one row per admission:
+
+    admission_fees, daily_charges, payments     wallet transactions linked
+                                                to the admission, by type
+    paid_from_wallet                            their sum
+    billed, outstanding                         Admission.get_total_cost() at
+                                                the last update, and what is
+                                                left after paid_from_wallet
+
+Admissions whose transactions predate the admission FK on WalletTransaction
+(no linked rows) keep the old date-range attribution, computed here once per
+change instead of on every read.
+
+refresh() recomputes the rows of any number of admissions. connect() calls it
+when an admission-related wallet transaction is saved or deleted and when an
+admission is saved. `manage.py refresh_admission_ledgers` backfills existing
+admissions; the nightly charge job keeps `billed` current as days accrue.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from patients.models import Patient, PatientWallet, WalletTransaction
+
+from .models import Admission, AdmissionLedger
+
+LEDGER_TYPES = ('admission_fee', 'daily_admission_charge', 'admission_payment')
+TOTAL_FIELDS = (
+    'admission_fees', 'daily_charges', 'payments', 'paid_from_wallet', 'billed',
+    'outstanding', 'transaction_count', 'last_posted_at',
+)
+
+_ZERO = Decimal('0.00')
+
+
+def _linked_totals(admission_ids):
+    return {
+        row.pop('admission_id'): row
+        for row in WalletTransaction._base_manager.filter(
+            admission_id__in=admission_ids, transaction_type__in=LEDGER_TYPES,
+        ).order_by().values('admission_id').annotate(
+            admission_fees=Sum('amount', filter=Q(transaction_type='admission_fee')),
+            daily_charges=Sum('amount', filter=Q(transaction_type='daily_admission_charge')),
+            payments=Sum('amount', filter=Q(transaction_type='admission_payment')),
+            transaction_count=Count('id'),
+            last_posted_at=Max('created_at'),
+        )
+    }
+
+
+def _date_range_totals(admission):
+    """The pre-FK attribution: the patient's admission fees since admission,
+    and daily charges dated within the stay."""
+    patient_rows = WalletTransaction._base_manager.filter(
+        Q(patient_id=admission.patient_id) | Q(patient_wallet__patient_id=admission.patient_id)
+    )
+    end_date = admission.discharge_date.date() if admission.discharge_date else timezone.now().date()
+    fees = patient_rows.filter(
+        transaction_type='admission_fee', created_at__gte=admission.admission_date,
+    )
+    charges = patient_rows.filter(
+        transaction_type='daily_admission_charge',
+        created_at__date__range=[admission.admission_date.date(), end_date],
+    )
+    row = (fees | charges).order_by().aggregate(
+        admission_fees=Sum('amount', filter=Q(transaction_type='admission_fee')),
+        daily_charges=Sum('amount', filter=Q(transaction_type='daily_admission_charge')),
+        transaction_count=Count('id'),
+        last_posted_at=Max('created_at'),
+    )
+    row['payments'] = None
+    return row
+
+
+def refresh(admission_ids):
+    """Recompute the ledger rows of these admissions. Returns the rows."""
+    admission_ids = sorted({pk for pk in admission_ids if pk})
+    if not admission_ids:
+        return []
+    admissions = {
+        admission.pk: admission
+        for admission in Admission._base_manager.filter(pk__in=admission_ids)
+        .select_related('patient__nhia_info', 'bed__ward')
+    }
+    if not admissions:
+        return []
+    with transaction.atomic():
+        AdmissionLedger._base_manager.bulk_create(
+            [AdmissionLedger(admission_id=pk, hospital_id=admission.hospital_id)
+             for pk, admission in admissions.items()],
+            ignore_conflicts=True,
+        )
+        rows = list(
+            AdmissionLedger._base_manager.select_for_update()
+            .filter(admission_id__in=admissions).order_by('admission_id')
+        )
+        linked, now = _linked_totals(list(admissions)), timezone.now()
+        for ledger in rows:
+            admission = admissions[ledger.admission_id]
+            totals = linked.get(ledger.admission_id) or _date_range_totals(admission)
+            ledger.admission_fees = totals['admission_fees'] or _ZERO
+            ledger.daily_charges = totals['daily_charges'] or _ZERO
+            ledger.payments = totals['payments'] or _ZERO
+            ledger.paid_from_wallet = ledger.admission_fees + ledger.daily_charges + ledger.payments
+            ledger.transaction_count = totals['transaction_count']
+            ledger.last_posted_at = totals['last_posted_at']
+            ledger.billed = admission.get_total_cost()
+            ledger.outstanding = max(_ZERO, ledger.billed - ledger.paid_from_wallet)
+            ledger.updated_at = now
+        AdmissionLedger._base_manager.bulk_update(rows, TOTAL_FIELDS + ('updated_at',))
+    return rows
+
+
+def _patient_admission_ids(transaction_row):
+    patient_id = transaction_row.patient_id
+    if patient_id is None and transaction_row.patient_wallet_id:
+        patient_id = PatientWallet._base_manager.filter(
+            pk=transaction_row.patient_wallet_id
+        ).values_list('patient_id', flat=True).first()
+    if patient_id is None:
+        return []
+    return list(Admission._base_manager.filter(patient_id=patient_id).values_list('pk', flat=True))
+
+
+def _forget_cached_ledger(transaction_row):
+    # Writers usually pass the Admission they hold (admission=admission) and
+    # read its balance straight after; drop the ledger cached on that object.
+    if WalletTransaction._meta.get_field('admission').is_cached(transaction_row):
+        admission = transaction_row.admission
+        cached = Admission._meta.get_field('ledger')
+        if admission is not None and cached.is_cached(admission):
+            cached.delete_cached_value(admission)
+
+
+def _on_transaction(sender, instance, update_fields=None, origin=None, **kwargs):
+    if instance.transaction_type not in LEDGER_TYPES or isinstance(origin, Patient):
+        return  # with a patient, its admissions and their ledgers are going too
+    _forget_cached_ledger(instance)
+    admission_ids = [instance.admission_id]
+    # Unlinked rows count towards whichever of the patient's admissions fall
+    # back to date ranges; a row being linked leaves them too.
+    if instance.admission_id is None or (update_fields and 'admission' in update_fields):
+        admission_ids += _patient_admission_ids(instance)
+    refresh(admission_ids)
+
+
+def _on_admission(sender, instance, created=False, update_fields=None, **kwargs):
+    cached = Admission._meta.get_field('ledger')
+    if cached.is_cached(instance):
+        cached.delete_cached_value(instance)
+    watched = {'status', 'discharge_date', 'bed', 'bed_id', 'admission_date'}
+    if created or update_fields is None or watched & set(update_fields):
+        refresh([instance.pk])
+
+
+def connect():
+    post_save.connect(_on_transaction, sender='patients.WalletTransaction',
+                      dispatch_uid='admission_ledger_transaction', weak=False)
+    post_delete.connect(_on_transaction, sender='patients.WalletTransaction',
+                        dispatch_uid='admission_ledger_transaction', weak=False)
+    post_save.connect(_on_admission, sender='inpatient.Admission',
+                      dispatch_uid='admission_ledger_admission', weak=False)
@@ -14,6 +14,7 @@ from django.utils import timezone
 from django.db import transaction
 from datetime import datetime, timedelta
 
+from inpatient import ledger
 from inpatient.models import Admission
 from inpatient.services import charge_admission_for_date
 from patients.models import PatientWallet
@@ -163,6 +164,10 @@ class Command(BaseCommand):
                 )
                 logger.error(f'Error processing daily charge for admission {admission.id}: {str(e)}')
 
+        if not dry_run:
+            # Another day has accrued on every stay, charged or not.
+            ledger.refresh(active_admissions.values_list('pk', flat=True))
+
         # Summary
         self.stdout.write(self.style.SUCCESS('\n=== SUMMARY ==='))
         self.stdout.write(f'Total admissions processed: {processed_count}')
@@ -0,0 +1,51 @@
+"""Recount every ward's census and record an occupancy point.
+
+    python manage.py reconcile_ward_census                 # all hospitals
+    python manage.py reconcile_ward_census --hospital <subdomain>
+
+Schedule it nightly: it repairs any drift left by bed writes that bypass
+signals (queryset.update() in shells or scripts) and its 'reconcile' points
+give the occupancy history a regular sample even on quiet days.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from inpatient import census
+from inpatient.models import Ward, WardCensus
+
+
+class Command(BaseCommand):
+    help = "Recount WardCensus rows from Bed and Admission and append WardOccupancy points."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        wards = Ward.all_objects.order_by("pk")
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            wards = wards.filter(hospital=hospital)
+        ward_ids = list(wards.values_list("pk", flat=True))
+
+        before = {
+            row["ward_id"]: row
+            for row in WardCensus.all_objects.filter(ward_id__in=ward_ids)
+            .values("ward_id", *census.COUNT_FIELDS)
+        }
+        rows = census.refresh(ward_ids, event="reconcile")
+        drifted = 0
+        for row in rows:
+            counts = {field: getattr(row, field) for field in census.COUNT_FIELDS}
+            old = before.get(row.ward_id)
+            if old is not None and any(old[field] != counts[field] for field in counts):
+                drifted += 1
+                self.stdout.write(self.style.WARNING(
+                    f"ward {row.ward_id}: "
+                    + ", ".join(f"{f} {old[f]} -> {counts[f]}" for f in counts if old[f] != counts[f])
+                ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {len(rows)} ward(s), {drifted} had drifted"
+        ))
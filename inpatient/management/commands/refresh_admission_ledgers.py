@@ -0,0 +1,59 @@
+"""Build or recompute AdmissionLedger rows from the wallet transactions.
+
+    python manage.py refresh_admission_ledgers                 # current stays, and any without a ledger
+    python manage.py refresh_admission_ledgers --all           # every admission
+    python manage.py refresh_admission_ledgers --hospital <subdomain>
+
+Run it once after deploying the ledger to backfill past admissions, and after
+any bulk repair of wallet transactions done with queryset.update().
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from inpatient import ledger
+from inpatient.models import Admission, AdmissionLedger
+
+BATCH_SIZE = 200
+
+
+class Command(BaseCommand):
+    help = "Recompute AdmissionLedger rows (charged, paid, outstanding) from WalletTransaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+        parser.add_argument(
+            "--all", action="store_true",
+            help="Every admission, not only current stays and those without a ledger",
+        )
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        admissions = Admission.all_objects.order_by("pk")
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            admissions = admissions.filter(hospital=hospital)
+        if not options["all"]:
+            admissions = admissions.filter(Q(status="admitted") | Q(ledger__isnull=True))
+        admission_ids = list(admissions.values_list("pk", flat=True))
+
+        refreshed = changed = 0
+        for start in range(0, len(admission_ids), BATCH_SIZE):
+            batch = admission_ids[start:start + BATCH_SIZE]
+            before = dict(
+                AdmissionLedger.all_objects.filter(admission_id__in=batch)
+                .values_list("admission_id", "paid_from_wallet")
+            )
+            for row in ledger.refresh(batch):
+                refreshed += 1
+                old = before.get(row.admission_id)
+                if old is not None and old != row.paid_from_wallet:
+                    changed += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"admission {row.admission_id}: paid from wallet {old} -> {row.paid_from_wallet}"
+                    ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {refreshed} admission ledger(s), {changed} had drifted"
+        ))
@@ -0,0 +1,78 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:27
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_census(apps, schema_editor):
+    Ward = apps.get_model('inpatient', 'Ward')
+    WardCensus = apps.get_model('inpatient', 'WardCensus')
+    Admission = apps.get_model('inpatient', 'Admission')
+    pending = dict(
+        Admission._base_manager.filter(status='admitted', discharge_date__isnull=False)
+        .order_by().values('bed__ward_id').annotate(n=Count('id'))
+        .values_list('bed__ward_id', 'n')
+    )
+    WardCensus._base_manager.bulk_create([
+        WardCensus(
+            ward_id=ward['pk'], hospital_id=ward['hospital_id'],
+            total_beds=ward['total_beds'], occupied=ward['occupied'],
+            available=ward['available'], out_of_service=ward['out_of_service'],
+            pending_discharge=pending.get(ward['pk'], 0),
+        )
+        for ward in Ward._base_manager.order_by().values('pk', 'hospital_id').annotate(
+            total_beds=Count('beds'),
+            occupied=Count('beds', filter=Q(beds__is_occupied=True)),
+            available=Count('beds', filter=Q(beds__is_occupied=False, beds__is_active=True)),
+            out_of_service=Count('beds', filter=Q(beds__is_active=False)),
+        )
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inpatient', '0011_alter_admission_options'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WardCensus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_beds', models.PositiveIntegerField(default=0)),
+                ('occupied', models.PositiveIntegerField(default=0)),
+                ('available', models.PositiveIntegerField(default=0)),
+                ('out_of_service', models.PositiveIntegerField(default=0)),
+                ('pending_discharge', models.PositiveIntegerField(default=0, help_text='Current admissions with a discharge date already set')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('ward', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='census', to='inpatient.ward')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='WardOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('event', models.CharField(choices=[('admit', 'Admission'), ('discharge', 'Discharge'), ('transfer_in', 'Transfer In'), ('transfer_out', 'Transfer Out'), ('reconcile', 'Reconcile')], max_length=20)),
+                ('occupied', models.PositiveIntegerField()),
+                ('available', models.PositiveIntegerField()),
+                ('out_of_service', models.PositiveIntegerField()),
+                ('pending_discharge', models.PositiveIntegerField()),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('ward', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy_history', to='inpatient.ward')),
+            ],
+            options={
+                'ordering': ['-recorded_at'],
+                'indexes': [models.Index(fields=['ward', 'recorded_at'], name='idx_occupancy_ward_time')],
+            },
+        ),
+        migrations.RunPython(backfill_census, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:32
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inpatient', '0012_ward_census'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdmissionLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('admission_fees', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('daily_charges', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('payments', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('paid_from_wallet', models.DecimalField(decimal_places=2, default=0, help_text='Admission fees, daily charges and payments taken from the wallet', max_digits=12)),
+                ('billed', models.DecimalField(decimal_places=2, default=0, help_text='Admission cost as of the last update', max_digits=12)),
+                ('outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('transaction_count', models.PositiveIntegerField(default=0)),
+                ('last_posted_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('admission', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='ledger', to='inpatient.admission')),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+    ]
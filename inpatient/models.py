@@ -1,6 +1,5 @@
 from django.db import models
 from saas.models import TenantModel
-from django.db.models import Q
 from django.utils import timezone
 from django.conf import settings
 from patients.models import Patient, PatientWallet
@@ -52,11 +51,32 @@ class Ward(TenantModel):
     def __str__(self):
         return f"{self.name} ({self.get_ward_type_display()})"
 
+    def _census(self):
+        # Reverse one-to-one: free with select_related('census'), one query otherwise.
+        try:
+            return self.census
+        except WardCensus.DoesNotExist:
+            return None
+
+    def get_total_beds_count(self):
+        census = self._census()
+        return census.total_beds if census else self.beds.count()
+
     def get_available_beds_count(self):
+        census = self._census()
+        if census:
+            return census.available
         return self.beds.filter(is_occupied=False, is_active=True).count()
 
     def get_occupied_beds_count(self):
-        return self.beds.filter(is_occupied=True, is_active=True).count()
+        census = self._census()
+        if census:
+            return census.occupied
+        return self.beds.filter(is_occupied=True).count()
+
+    def get_out_of_service_beds_count(self):
+        census = self._census()
+        return census.out_of_service if census else self.beds.filter(is_active=False).count()
 
 class Bed(TenantModel):
     ward = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='beds')
@@ -74,6 +94,60 @@ class Bed(TenantModel):
     class Meta:
         unique_together = ('ward', 'bed_number')
 
+class WardCensus(TenantModel):
+    """Live bed counts of one ward, kept by inpatient.census.
+
+    Admitting, discharging and transferring recount the affected wards inside
+    the same transaction, and bed edits recount their ward, so bed boards read
+    one row per ward instead of counting Bed rows on every page.
+    """
+    ward = models.OneToOneField(Ward, on_delete=models.CASCADE, related_name='census')
+    total_beds = models.PositiveIntegerField(default=0)
+    occupied = models.PositiveIntegerField(default=0)
+    available = models.PositiveIntegerField(default=0)
+    out_of_service = models.PositiveIntegerField(default=0)
+    pending_discharge = models.PositiveIntegerField(
+        default=0, help_text='Current admissions with a discharge date already set'
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.ward.name}: {self.occupied}/{self.total_beds} occupied"
+
+    @property
+    def occupancy_rate(self):
+        return (self.occupied / self.total_beds * 100) if self.total_beds else 0
+
+
+class WardOccupancy(TenantModel):
+    """One point of a ward's occupancy time series, appended on every
+    admission event and by the nightly reconcile."""
+    EVENT_CHOICES = (
+        ('admit', 'Admission'),
+        ('discharge', 'Discharge'),
+        ('transfer_in', 'Transfer In'),
+        ('transfer_out', 'Transfer Out'),
+        ('reconcile', 'Reconcile'),
+    )
+
+    ward = models.ForeignKey(Ward, on_delete=models.CASCADE, related_name='occupancy_history')
+    recorded_at = models.DateTimeField(default=timezone.now)
+    event = models.CharField(max_length=20, choices=EVENT_CHOICES)
+    occupied = models.PositiveIntegerField()
+    available = models.PositiveIntegerField()
+    out_of_service = models.PositiveIntegerField()
+    pending_discharge = models.PositiveIntegerField()
+
+    class Meta:
+        ordering = ['-recorded_at']
+        indexes = [
+            models.Index(fields=['ward', 'recorded_at'], name='idx_occupancy_ward_time'),
+        ]
+
+    def __str__(self):
+        return f"{self.ward.name} {self.get_event_display()} at {self.recorded_at:%Y-%m-%d %H:%M}"
+
+
 class Admission(TenantModel):
     STATUS_CHOICES = (
         ('admitted', 'Admitted'),
@@ -143,46 +217,18 @@ class Admission(TenantModel):
             return daily_charge * duration  # Return as a positive value
         return 0
 
+    def get_ledger(self):
+        """This admission's AdmissionLedger, built on first use if missing."""
+        try:
+            return self.ledger
+        except AdmissionLedger.DoesNotExist:
+            from . import ledger
+            ledger.refresh([self.pk])
+            return AdmissionLedger._base_manager.get(admission_id=self.pk)
+
     def get_actual_charges_from_wallet(self):
         """Get the actual charges deducted from patient wallet for this admission"""
-        from patients.models import WalletTransaction
-
-        # Try to use direct admission FK relationship first (more accurate)
-        direct_charges = WalletTransaction.objects.filter(
-            admission=self,
-            transaction_type__in=['admission_fee', 'daily_admission_charge', 'admission_payment']
-        ).aggregate(total=models.Sum('amount'))['total']
-
-        if direct_charges is not None:
-            return direct_charges
-
-        # Fallback to date-range method for backward compatibility
-        # Get admission fee
-        admission_fee = WalletTransaction.objects.filter(
-            Q(patient=self.patient) | Q(patient_wallet__patient=self.patient),
-            transaction_type='admission_fee',
-            created_at__gte=self.admission_date
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-
-        # Get daily charges for this admission period
-        admission_date = self.admission_date.date()
-        end_date = self.discharge_date.date() if self.discharge_date else timezone.now().date()
-
-        daily_charges = WalletTransaction.objects.filter(
-            Q(patient=self.patient) | Q(patient_wallet__patient=self.patient),
-            transaction_type='daily_admission_charge',
-            created_at__date__range=[admission_date, end_date]
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-
-        # Also include admission_payment transactions for this admission
-        admission_payments = WalletTransaction.objects.filter(
-            Q(patient=self.patient) | Q(patient_wallet__patient=self.patient),
-            transaction_type='admission_payment',
-            created_at__date__range=[admission_date, end_date],
-            admission=self  # Ensure it's linked to this specific admission
-        ).aggregate(total=models.Sum('amount'))['total'] or 0
-
-        return admission_fee + daily_charges + admission_payments
+        return self.get_ledger().paid_from_wallet
 
     def get_outstanding_admission_cost(self):
         """Get the unpaid admission cost that would impact wallet balance"""
@@ -277,6 +323,36 @@ class Admission(TenantModel):
 
         # No redirect from model save method
 
+
+class AdmissionLedger(TenantModel):
+    """What an admission has cost and what the wallet has covered so far.
+
+    inpatient.ledger keeps this current whenever an admission-related wallet
+    transaction is posted, changed or removed, and whenever the admission
+    itself changes, so balances are read from one row instead of aggregating
+    the wallet-transaction table on every call.
+    """
+    admission = models.OneToOneField(Admission, on_delete=models.CASCADE, related_name='ledger')
+    admission_fees = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    daily_charges = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    payments = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    paid_from_wallet = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text='Admission fees, daily charges and payments taken from the wallet',
+    )
+    billed = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0,
+        help_text='Admission cost as of the last update',
+    )
+    outstanding = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+    last_posted_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Ledger for admission #{self.admission_id}: {self.outstanding} outstanding"
+
+
 class DailyRound(TenantModel):
     admission = models.ForeignKey(Admission, on_delete=models.CASCADE, related_name='daily_rounds')
     date_time = models.DateTimeField(default=timezone.now)
@@ -13,6 +13,7 @@ from django.utils import timezone
 
 from patients.models import PatientWallet, WalletTransaction
 
+from . import census
 from .models import Admission, Bed, BedTransfer, WardTransfer
 
 
@@ -87,6 +88,7 @@ def admit_patient(patient, bed, attending_doctor, diagnosis,
         admission.save()
         # Admission.save() flips the bed, but only for the row it holds.
         bed.refresh_from_db(fields=["is_occupied"])
+        census.refresh([bed.ward_id], event="admit")
 
         if admission_service is None:
             return admission, None
@@ -157,6 +159,8 @@ def discharge_patient(admission, user=None, status="discharged",
             admission.discharge_notes = discharge_notes
         # Admission.save() releases the bed when the status leaves 'admitted'.
         admission.save()
+        if admission.bed is not None:
+            census.refresh([admission.bed.ward_id], event="discharge")
 
     return admission
 
@@ -197,6 +201,13 @@ def transfer_patient(admission, to_bed, user=None, notes=""):
         admission.bed = to_bed
         admission.save()
 
+        # Both updates above bypass Bed signals, so recount here.
+        if from_bed is not None and from_bed.ward_id != to_bed.ward_id:
+            census.refresh([from_bed.ward_id], event="transfer_out")
+            census.refresh([to_bed.ward_id], event="transfer_in")
+        else:
+            census.refresh([to_bed.ward_id])
+
     return admission
 
 
@@ -0,0 +1,108 @@
+"""Admission balances read from the per-admission ledger."""
+import io
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from inpatient.models import Admission, AdmissionLedger, Bed, Ward
+from inpatient.services import admit_patient, charge_admission_for_date, discharge_patient
+from patients.models import Patient, PatientWallet, WalletTransaction
+from patients.outstanding import patient_outstanding
+
+
+class AdmissionLedgerTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_superuser(
+            phone_number="08013000441", username="ledgeradmin", password="pw12345",
+        )
+        self.patient = Patient.objects.create(
+            first_name="Ngozi", last_name="Eze", date_of_birth="1982-07-07",
+            gender="F", address="6 Ward Road", city="Owerri", state="Imo",
+        )
+        self.wallet = PatientWallet.objects.get(patient=self.patient)
+        self.wallet.credit(Decimal("50000.00"), description="Deposit", transaction_type="deposit")
+        ward = Ward.objects.create(
+            name="Female Medical", ward_type="general", floor="2", capacity=2,
+            charge_per_day=Decimal("5000.00"),
+        )
+        self.bed = Bed.objects.create(ward=ward, bed_number="1")
+
+    def admit(self, days_ago=3):
+        admission, _ = admit_patient(
+            self.patient, self.bed, self.user, "Typhoid", "Fever", self.user,
+            admission_date=timezone.now() - timedelta(days=days_ago),
+        )
+        return admission
+
+    def test_charges_and_payments_post_to_the_ledger(self):
+        admission = self.admit()
+        self.assertEqual(admission.get_ledger().billed, Decimal("15000.00"))
+        self.assertEqual(admission.get_outstanding_admission_cost(), Decimal("15000.00"))
+
+        charge_admission_for_date(admission)
+        self.assertEqual(admission.get_actual_charges_from_wallet(), Decimal("5000.00"))
+        # Same instance: the ledger it had cached is dropped when a
+        # transaction naming it is posted.
+        self.wallet.debit(
+            Decimal("4000.00"), description="Part payment",
+            transaction_type="admission_payment", admission=admission,
+        )
+        self.assertEqual(admission.get_outstanding_admission_cost(), Decimal("6000.00"))
+        ledger = AdmissionLedger.objects.get(admission=admission)
+        self.assertEqual(
+            (ledger.daily_charges, ledger.payments, ledger.paid_from_wallet, ledger.outstanding,
+             ledger.transaction_count),
+            (Decimal("5000.00"), Decimal("4000.00"), Decimal("9000.00"), Decimal("6000.00"), 2),
+        )
+        self.assertEqual(patient_outstanding(self.patient)["admissions"], Decimal("6000.00"))
+
+        WalletTransaction.objects.filter(transaction_type="admission_payment").delete()
+        self.assertEqual(
+            Admission.objects.get(pk=admission.pk).get_outstanding_admission_cost(),
+            Decimal("10000.00"),
+        )
+
+    def test_unlinked_charges_fall_back_to_the_stay(self):
+        admission = self.admit()
+        charge = self.wallet.debit(
+            Decimal("5000.00"), description="Old-style charge",
+            transaction_type="daily_admission_charge",
+        )
+        self.assertEqual(admission.get_actual_charges_from_wallet(), Decimal("5000.00"))
+
+        charge.admission = admission
+        charge.save(update_fields=["admission"])
+        admission.refresh_from_db()
+        self.assertEqual(admission.get_ledger().transaction_count, 1)
+        self.assertEqual(admission.get_actual_charges_from_wallet(), Decimal("5000.00"))
+
+    def test_balances_read_without_aggregates(self):
+        for _ in range(2):
+            admission = self.admit()
+            charge_admission_for_date(admission)
+            discharge_patient(admission, user=self.user)
+        self.admit()
+        with self.assertNumQueries(1):
+            rows = list(
+                Admission.objects.filter(patient=self.patient)
+                .select_related("ledger", "patient__nhia_info", "bed__ward")
+            )
+            outstanding = [admission.get_outstanding_admission_cost() for admission in rows]
+        self.assertEqual(len(outstanding), 3)
+
+    def test_refresh_command_backfills_and_repairs(self):
+        admission = self.admit()
+        charge_admission_for_date(admission)
+        AdmissionLedger.objects.all().delete()
+        WalletTransaction.objects.filter(admission=admission).update(amount=Decimal("7000.00"))
+        out = io.StringIO()
+        call_command("refresh_admission_ledgers", stdout=out)
+        self.assertIn("Refreshed 1 admission ledger(s)", out.getvalue())
+        self.assertEqual(
+            AdmissionLedger.objects.get(admission=admission).paid_from_wallet,
+            Decimal("7000.00"),
+        )
@@ -0,0 +1,109 @@
+"""Per-ward census rows kept current by admissions, bed edits and reconcile."""
+import io
+from decimal import Decimal
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, modify_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from inpatient.models import Bed, Ward, WardCensus, WardOccupancy
+from inpatient.services import admit_patient, discharge_patient, transfer_patient
+from patients.models import Patient
+
+
+class WardCensusTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_superuser(
+            phone_number="08013000431", username="censusadmin", password="pw12345",
+        )
+        self.patient = Patient.objects.create(
+            first_name="Uche", last_name="Obi", date_of_birth="1979-03-03",
+            gender="M", address="4 Ward Road", city="Enugu", state="Enugu",
+        )
+        self.medical = self.ward("Male Medical", beds=3)
+        self.surgical = self.ward("Surgical", beds=2)
+
+    def ward(self, name, beds):
+        ward = Ward.objects.create(
+            name=name, ward_type="general", floor="1", capacity=beds,
+            charge_per_day=Decimal("5000.00"),
+        )
+        for number in range(1, beds + 1):
+            Bed.objects.create(ward=ward, bed_number=str(number))
+        return ward
+
+    def census(self, ward):
+        census = WardCensus.objects.get(ward=ward)
+        return (census.total_beds, census.occupied, census.available, census.out_of_service)
+
+    def admit(self, bed):
+        admission, _ = admit_patient(
+            self.patient, bed, self.user, "Malaria", "Fever", self.user,
+        )
+        return admission
+
+    def test_admit_transfer_discharge(self):
+        self.assertEqual(self.census(self.medical), (3, 0, 3, 0))
+        admission = self.admit(self.medical.beds.get(bed_number="1"))
+        self.assertEqual(self.census(self.medical), (3, 1, 2, 0))
+
+        transfer_patient(admission, self.surgical.beds.get(bed_number="2"), user=self.user)
+        self.assertEqual(self.census(self.medical), (3, 0, 3, 0))
+        self.assertEqual(self.census(self.surgical), (2, 1, 1, 0))
+
+        discharge_patient(admission, user=self.user)
+        self.assertEqual(self.census(self.surgical), (2, 0, 2, 0))
+        self.assertEqual(
+            list(WardOccupancy.objects.order_by("pk").values_list("ward__name", "event", "occupied")),
+            [("Male Medical", "admit", 1), ("Male Medical", "transfer_out", 0),
+             ("Surgical", "transfer_in", 1), ("Surgical", "discharge", 0)],
+        )
+
+    def test_bed_edits_and_bulk_actions(self):
+        bed = Bed.objects.create(ward=self.medical, bed_number="4")
+        self.assertEqual(self.census(self.medical), (4, 0, 4, 0))
+        bed.ward = self.surgical
+        bed.is_active = False
+        bed.save()
+        self.assertEqual(self.census(self.medical), (3, 0, 3, 0))
+        self.assertEqual(self.census(self.surgical), (3, 0, 2, 1))
+        bed.delete()
+        self.assertEqual(self.census(self.surgical), (2, 0, 2, 0))
+
+        self.client.force_login(self.user)
+        self.client.post(reverse("inpatient:bed_dashboard"), {
+            "selected_beds": list(self.medical.beds.values_list("pk", flat=True)[:2]),
+            "bulk_action": "mark_inactive",
+        })
+        self.assertEqual(self.census(self.medical), (3, 0, 1, 2))
+        response = self.client.get(reverse("inpatient:bed_dashboard"))
+        self.assertEqual(response.context["inactive_beds"], 2)
+        self.assertEqual(response.context["available_beds"], 3)
+
+    # The DEBUG query counter resets the query log mid-request.
+    @modify_settings(MIDDLEWARE={"remove": "core.query_count_middleware.QueryCountMiddleware"})
+    def test_ward_list_queries_do_not_grow_with_wards(self):
+        self.client.force_login(self.user)
+        url = reverse("inpatient:wards")
+        self.client.get(url)  # warm session and permission caches
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        two_wards = len(queries)
+        for n in range(4):
+            self.ward(f"Annex {n}", beds=2)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), two_wards)
+        self.assertContains(response, "Annex 3")
+
+    def test_reconcile_repairs_drift(self):
+        Bed.objects.filter(ward=self.medical).update(is_active=False)
+        self.assertEqual(self.census(self.medical), (3, 0, 3, 0))
+        out = io.StringIO()
+        call_command("reconcile_ward_census", stdout=out)
+        self.assertIn("1 had drifted", out.getvalue())
+        self.assertEqual(self.census(self.medical), (3, 0, 0, 3))
+        self.assertEqual(WardOccupancy.objects.filter(event="reconcile").count(), 2)
@@ -7,14 +7,15 @@ from django.shortcuts import render, get_object_or_404, redirect
 from billing.models import Service, Invoice, InvoiceItem, Payment
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.db.models import Q, Count
+from django.db.models import Q, Count, Sum
 from django.core.paginator import Paginator
 from django.utils import timezone
 from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from datetime import timedelta
 from django.views.decorators.http import require_http_methods
 from django.db import models
-from .models import Ward, Bed, Admission, DailyRound, NursingNote, ClinicalRecord, BedTransfer, WardTransfer
+from . import census
+from .models import Ward, WardCensus, Bed, Admission, DailyRound, NursingNote, ClinicalRecord, BedTransfer, WardTransfer
 from .forms import WardForm, BedForm, AdmissionForm, DischargeForm, DailyRoundForm, NursingNoteForm, AdmissionSearchForm, ClinicalRecordForm, PatientTransferForm
 from .services import (
     InpatientActionError,
@@ -37,19 +38,18 @@ def bed_dashboard(request):
         )
     ).order_by('ward__name', 'bed_number')
 
-    # Pre-calculate stats in a single query
-    from django.db.models import Count, Case, When, IntegerField
-    bed_stats = Bed.objects.aggregate(
-        total=Count('id'),
-        occupied=Count('id', filter=Q(is_occupied=True)),
-        available=Count('id', filter=Q(is_occupied=False, is_active=True)),
-        inactive=Count('id', filter=Q(is_active=False))
+    # Totals from the per-ward census rows, one per ward
+    bed_stats = WardCensus.objects.aggregate(
+        total=Sum('total_beds'),
+        occupied=Sum('occupied'),
+        available=Sum('available'),
+        inactive=Sum('out_of_service'),
     )
 
-    total_beds = bed_stats['total']
-    occupied_beds = bed_stats['occupied']
-    available_beds = bed_stats['available']
-    inactive_beds = bed_stats['inactive']
+    total_beds = bed_stats['total'] or 0
+    occupied_beds = bed_stats['occupied'] or 0
+    available_beds = bed_stats['available'] or 0
+    inactive_beds = bed_stats['inactive'] or 0
     occupancy_rate = (occupied_beds / total_beds * 100) if total_beds > 0 else 0
 
     paginator = Paginator(beds_list, 20)  # Show 20 beds per page
@@ -61,12 +61,15 @@ def bed_dashboard(request):
         action = request.POST.get('bulk_action')
         if selected_ids and action:
             selected_beds = Bed.objects.filter(id__in=selected_ids)
+            ward_ids = set(selected_beds.values_list('ward_id', flat=True))
             if action == 'mark_available':
                 selected_beds.update(is_occupied=False, is_active=True)
                 messages.success(request, f'{selected_beds.count()} beds marked as available.')
             elif action == 'mark_inactive':
                 selected_beds.update(is_active=False)
                 messages.success(request, f'{selected_beds.count()} beds marked as inactive.')
+            # queryset.update() sends no signals
+            census.refresh(ward_ids)
             return redirect('inpatient:bed_dashboard')
 
     context = {
@@ -112,7 +115,7 @@ def patient_admissions(request, patient_id):
 @permission_required('inpatient.view')
 def ward_list(request):
     """View for listing all wards"""
-    wards = Ward.objects.all().order_by('name')
+    wards = Ward.objects.select_related('census').order_by('name')
 
     # Search functionality
     search_query = request.GET.get('search', '')
@@ -177,7 +180,7 @@ def add_ward(request):
 @permission_required('inpatient.view')
 def ward_detail(request, ward_id):
     """View for displaying ward details - Optimized to avoid N+1 queries"""
-    ward = get_object_or_404(Ward.objects.prefetch_related(
+    ward = get_object_or_404(Ward.objects.select_related('census').prefetch_related(
         models.Prefetch(
             'beds',
             queryset=Bed.objects.prefetch_related(
@@ -192,11 +195,11 @@ def ward_detail(request, ward_id):
 
     beds = ward.beds.all()
 
-    # Pre-calculate bed stats in single queries
-    total_beds = beds.count()
-    available_beds = beds.filter(is_occupied=False, is_active=True).count()
-    occupied_beds = beds.filter(is_occupied=True).count()
-    inactive_beds = beds.filter(is_active=False).count()
+    # Bed stats from the ward's census row
+    total_beds = ward.get_total_beds_count()
+    available_beds = ward.get_available_beds_count()
+    occupied_beds = ward.get_occupied_beds_count()
+    inactive_beds = ward.get_out_of_service_beds_count()
 
     context = {
         'ward': ward,
@@ -405,7 +408,7 @@ def admission_list(request):
     """View for listing all admissions"""
     search_form = AdmissionSearchForm(request.GET)
     # Use select_related for ForeignKey/OneToOne, prefetch_related for reverse/many-to-many
-    admissions = Admission.objects.filter(status='admitted').select_related('patient', 'bed', 'bed__ward', 'attending_doctor').order_by('-admission_date')
+    admissions = Admission.objects.filter(status='admitted').select_related('patient', 'patient__nhia_info', 'bed', 'bed__ward', 'attending_doctor', 'ledger').order_by('-admission_date')
 
     # Apply filters if the form is valid
     if search_form.is_valid():
@@ -425,7 +428,7 @@ def admission_list(request):
             )
 
         if status:
-            admissions = Admission.objects.all().select_related('patient', 'bed', 'bed__ward', 'attending_doctor').order_by('-admission_date')
+            admissions = Admission.objects.all().select_related('patient', 'patient__nhia_info', 'bed', 'bed__ward', 'attending_doctor', 'ledger').order_by('-admission_date')
             admissions = admissions.filter(status=status)
 
         if date_from:
@@ -487,7 +490,9 @@ def admission_list(request):
 @permission_required('inpatient.view')
 def admission_detail(request, pk):
     """View for displaying admission details."""
-    admission = get_object_or_404(Admission, pk=pk)
+    admission = get_object_or_404(
+        Admission.objects.select_related('ledger', 'patient__nhia_info', 'bed__ward'), pk=pk
+    )
     
     # Handle POST requests for adding nursing notes and daily rounds
     if request.method == 'POST':
@@ -699,7 +704,9 @@ def transfer_patient(request, admission_id):
 @permission_required('inpatient.discharge')
 def discharge_patient(request, admission_id):
     """View for discharging a patient"""
-    admission = get_object_or_404(Admission, id=admission_id)
+    admission = get_object_or_404(
+        Admission.objects.select_related('ledger', 'patient__nhia_info', 'bed__ward'), id=admission_id
+    )
 
     if request.method == 'POST':
         # Bind to a separate copy: validation writes the POSTed status onto the
@@ -1,5 +1,8 @@
 from django.contrib import admin
-from .models import TestCategory, Test, TestParameter, TestRequest, TestResult, TestResultParameter
+from .models import (
+    AnalyzerImport, TestCategory, Test, TestParameter, TestRequest, TestResult,
+    TestResultParameter, UnmatchedAnalyzerResult,
+)
 
 class TestParameterInline(admin.TabularInline):
     model = TestParameter
@@ -23,9 +26,9 @@ class TestAdmin(admin.ModelAdmin):
 
 @admin.register(TestParameter)
 class TestParameterAdmin(admin.ModelAdmin):
-    list_display = ('name', 'test', 'normal_range', 'unit', 'order')
+    list_display = ('name', 'test', 'code', 'normal_range', 'unit', 'order')
     list_filter = ('test',)
-    search_fields = ('name', 'test__name')
+    search_fields = ('name', 'code', 'test__name')
 
 @admin.register(TestRequest)
 class TestRequestAdmin(admin.ModelAdmin):
@@ -49,3 +52,16 @@ class TestResultParameterAdmin(admin.ModelAdmin):
     list_display = ('test_result', 'parameter', 'value', 'is_normal')
     list_filter = ('is_normal',)
     search_fields = ('test_result__test_request__patient__first_name', 'test_result__test_request__patient__last_name', 'parameter__name')
+
+
+class UnmatchedAnalyzerResultInline(admin.TabularInline):
+    model = UnmatchedAnalyzerResult
+    extra = 0
+    readonly_fields = ('line_number', 'specimen_id', 'analyte_code', 'value', 'reason', 'message', 'resolved_at')
+
+@admin.register(AnalyzerImport)
+class AnalyzerImportAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'format', 'source', 'status', 'readings', 'filed', 'unmatched', 'created_at')
+    list_filter = ('status', 'format', 'source')
+    search_fields = ('file_name',)
+    inlines = [UnmatchedAnalyzerResultInline]
@@ -0,0 +1,278 @@
+"""Analyzer result import: ASTM E1394 and HL7 v2 ORU files into lab results.
+
+Analyzers (or the middleware in front of them) write a file per run, either
+into a drop directory that `manage.py import_analyzer_results --watch` polls,
+or through the upload page / `POST /laboratory/api/results/import/`. A file is
+read as a stream, a few hundred readings at a time:
+
+- the specimen ID on the order record (ASTM O-3, HL7 OBR-2/OBR-3) is the test
+  request number printed on the sample label; trailing digits are used, so
+  "LAB-000123" finds request 123;
+- the analyte code (ASTM R-3 fourth component, HL7 OBX-3 first component) is
+  matched against TestParameter.code on the tests of that request;
+- matched readings go through laboratory.services.enter_results, so they are
+  validated and written in bulk exactly like a panel typed in by hand;
+- everything else lands in UnmatchedAnalyzerResult, the error queue, where it
+  can be retried once the code mapping or the request is fixed.
+
+Both parsers work on local files alone; no live analyzer connection is needed.
+ASTM frames are accepted with or without the low-level STX/ETX/checksum
+wrapping. Records split across intermediate (ETB) frames are not re-joined.
+"""
+import logging
+import re
+from collections import defaultdict, namedtuple
+from itertools import chain, islice
+
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .models import (
+    AnalyzerImport, TestParameter, TestRequest, UnmatchedAnalyzerResult,
+)
+from .services import enter_results
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+UPLOAD_EXTENSIONS = ("astm", "hl7", "oru", "txt", "dat", "msg")
+
+Reading = namedtuple("Reading", "line specimen code name value units flag")
+
+# Optional STX/ENQ/ACK/EOT and frame number in front, ETX/ETB and checksum behind.
+_FRAME_START = re.compile(r"^[\x02\x04\x05\x06]*[0-7]?(?=[A-Za-z][^A-Za-z0-9\s])")
+_FRAME_END = re.compile(r"[\x03\x17].*$")
+_TRAILING_NUMBER = re.compile(r"(\d+)\s*$")
+
+
+class AnalyzerFormatError(Exception):
+    """A file that is neither ASTM E1394 nor HL7 v2."""
+
+
+def _lines(stream, chunk_size=64 * 1024):
+    """Non-empty records from a binary or text stream, split on CR and/or LF
+    (HL7 separates segments with a bare CR)."""
+    pending = b""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, str):
+            chunk = chunk.encode("latin-1")
+        *complete, pending = re.split(rb"[\r\n]", pending + chunk)
+        for line in complete:
+            if line.strip():
+                yield line.decode("latin-1")
+    if pending.strip():
+        yield pending.decode("latin-1")
+
+
+def _field(fields, index, component_sep, component=0):
+    """fields[index], component `component`, or "" when absent."""
+    if index >= len(fields):
+        return ""
+    parts = fields[index].split(component_sep)
+    return parts[component].strip() if component < len(parts) else ""
+
+
+def _flag_normal(flag):
+    """Abnormal flags (ASTM R-7, HL7 OBX-8): empty or N means normal."""
+    return flag.upper() in ("", "N")
+
+
+def parse_astm(lines):
+    field_sep, component_sep = "|", "^"
+    specimen = ""
+    for number, raw in lines:
+        line = _FRAME_END.sub("", _FRAME_START.sub("", raw))
+        if len(line) < 2:
+            continue
+        kind = line[0].upper()
+        if kind == "H":
+            # H|\^& declares the field, repeat, component and escape delimiters.
+            field_sep = line[1]
+            component_sep = line[3] if len(line) > 3 else "^"
+            continue
+        fields = line.split(field_sep)
+        if kind == "O":
+            specimen = _field(fields, 2, component_sep) or _field(fields, 3, component_sep)
+        elif kind == "P":
+            specimen = ""
+        elif kind == "R":
+            # Universal test ID: ^^^<local code>^...
+            parts = [p.strip() for p in fields[2].split(component_sep)] if len(fields) > 2 else []
+            code = parts[3] if len(parts) > 3 and parts[3] else next((p for p in parts if p), "")
+            name = parts[4] if len(parts) > 4 else ""
+            yield Reading(
+                number, specimen, code, name,
+                _field(fields, 3, component_sep), _field(fields, 4, component_sep),
+                _field(fields, 6, component_sep),
+            )
+
+
+def parse_hl7(lines):
+    field_sep, component_sep = "|", "^"
+    specimen = ""
+    for number, line in lines:
+        line = line.strip("\x0b\x1c")
+        if line.startswith("MSH"):
+            field_sep = line[3]
+            component_sep = line[4] if len(line) > 4 else "^"
+            specimen = ""
+            continue
+        fields = line.split(field_sep)
+        segment = fields[0]
+        if segment == "OBR":
+            specimen = _field(fields, 2, component_sep) or _field(fields, 3, component_sep)
+        elif segment == "OBX":
+            yield Reading(
+                number, specimen,
+                _field(fields, 3, component_sep), _field(fields, 3, component_sep, 1),
+                _field(fields, 5, component_sep), _field(fields, 6, component_sep),
+                _field(fields, 8, component_sep),
+            )
+
+
+def readings(stream):
+    """(format, iterator of Reading) for an analyzer file, read lazily."""
+    numbered = enumerate(_lines(stream), start=1)
+    first = next(numbered, None)
+    if first is None:
+        raise AnalyzerFormatError("The file is empty.")
+    head = _FRAME_START.sub("", first[1]).lstrip("\x0b")
+    numbered = chain([first], numbered)
+    if head.startswith("MSH"):
+        return "hl7", parse_hl7(numbered)
+    if head[:1].upper() == "H" and len(head) > 1 and not head[1].isalnum():
+        return "astm", parse_astm(numbered)
+    raise AnalyzerFormatError("Not an ASTM E1394 or HL7 v2 file.")
+
+
+def _request_id(specimen):
+    match = _TRAILING_NUMBER.search(specimen or "")
+    return int(match.group(1)) if match else None
+
+
+def _file_readings(chunk, user):
+    """Write what can be matched. Returns (filed, failed): the readings whose
+    values were saved, and [(reading, reason, message)] for the ones that
+    could not be. A matched reading with no value is neither."""
+    request_ids = {_request_id(r.specimen) for r in chunk} - {None}
+    requests = set(TestRequest.objects.filter(pk__in=request_ids).values_list("pk", flat=True))
+    ordered = defaultdict(set)
+    for request_id, test_id in TestRequest.tests.through.objects.filter(
+        testrequest_id__in=requests
+    ).values_list("testrequest_id", "test_id"):
+        ordered[request_id].add(test_id)
+
+    codes = {r.code.upper() for r in chunk if r.code}
+    by_code = defaultdict(list)
+    for parameter in (
+        TestParameter.objects.annotate(code_upper=Upper("code"))
+        .filter(code_upper__in=codes, test_id__in=set().union(*ordered.values()))
+    ):
+        by_code[parameter.code_upper].append(parameter)
+
+    failed, entries, sources = [], {}, defaultdict(list)
+    for reading in chunk:
+        request_id = _request_id(reading.specimen)
+        if request_id not in requests:
+            failed.append((reading, "specimen", f"No test request matches specimen '{reading.specimen}'."))
+            continue
+        parameter = next(
+            (p for p in by_code.get(reading.code.upper(), ()) if p.test_id in ordered[request_id]),
+            None,
+        )
+        if parameter is None:
+            failed.append((
+                reading, "analyte",
+                f"No parameter with code '{reading.code}' on request {request_id}'s tests.",
+            ))
+            continue
+        if not reading.value:
+            continue
+        key = (request_id, parameter.test_id)
+        entry = entries.setdefault(key, {"test_request": request_id, "test": parameter.test_id, "parameters": {}})
+        # A rerun later in the file supersedes the earlier reading.
+        entry["parameters"][parameter.pk] = {"value": reading.value, "is_normal": _flag_normal(reading.flag)}
+        sources[key].append(reading)
+
+    keys = list(entries)
+    rejected = []
+    enter_results([entries[key] for key in keys], user, rejected=rejected)
+    messages = defaultdict(list)
+    for index, message in rejected:
+        messages[index].append(message)
+    for index, problems in messages.items():
+        failed.extend((reading, "rejected", " ".join(problems)) for reading in sources[keys[index]])
+    filed = [
+        reading
+        for index, key in enumerate(keys) if index not in messages
+        for reading in sources[key]
+    ]
+    return filed, failed
+
+
+def _queue(batch, failed):
+    UnmatchedAnalyzerResult.objects.bulk_create([
+        UnmatchedAnalyzerResult(
+            batch=batch, hospital_id=batch.hospital_id, line_number=reading.line,
+            specimen_id=reading.specimen[:64], analyte_code=reading.code[:64],
+            analyte_name=reading.name[:100], value=reading.value[:100],
+            units=reading.units[:50], flag=reading.flag[:10],
+            reason=reason, message=message,
+        )
+        for reading, reason, message in failed
+    ])
+
+
+def import_file(stream, file_name, user=None, source="upload", batch_size=BATCH_SIZE):
+    """Parse an analyzer file and file its results. Returns the AnalyzerImport."""
+    batch = AnalyzerImport.objects.create(file_name=file_name, source=source, uploaded_by=user)
+    try:
+        batch.format, parsed = readings(stream)
+        while True:
+            chunk = list(islice(parsed, batch_size))
+            if not chunk:
+                break
+            filed, failed = _file_readings(chunk, user)
+            _queue(batch, failed)
+            batch.readings += len(chunk)
+            batch.unmatched += len(failed)
+            batch.filed += len(filed)
+        batch.status = "done"
+    except AnalyzerFormatError as e:
+        batch.status, batch.error = "failed", str(e)
+    except Exception as e:
+        # Chunks already written stay written; the rest of the file did not run.
+        logger.exception("Analyzer import of %s failed", file_name)
+        batch.status, batch.error = "failed", f"Stopped after {batch.readings} readings: {e}"
+    batch.finished_at = timezone.now()
+    batch.save()
+    return batch
+
+
+def retry_unmatched(rows, user=None):
+    """Try queued readings again, e.g. after mapping an analyte code.
+    Returns how many were filed; the rest get the new reason."""
+    pending = [
+        (Reading(row.line_number, row.specimen_id, row.analyte_code, row.analyte_name,
+                 row.value, row.units, row.flag), row)
+        for row in rows.filter(resolved_at__isnull=True)
+    ]
+    saved, failed = _file_readings([r for r, _ in pending], user)
+    failures = {id(reading): (reason, message) for reading, reason, message in failed}
+
+    now, filed, still = timezone.now(), [], []
+    for reading, row in pending:
+        if id(reading) in failures:
+            row.reason, row.message = failures[id(reading)]
+            still.append(row)
+        else:
+            row.resolved_at = now
+            filed.append(row)
+    UnmatchedAnalyzerResult.objects.bulk_update(filed, ["resolved_at"])
+    UnmatchedAnalyzerResult.objects.bulk_update(still, ["reason", "message"])
+    # A row with no value is resolved (there is nothing left to file) but
+    # not counted as filed.
+    return len(saved)
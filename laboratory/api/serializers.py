@@ -9,7 +9,7 @@ from ..models import (
 class TestParameterSerializer(serializers.ModelSerializer):
     class Meta:
         model = TestParameter
-        fields = ['id', 'name', 'normal_range', 'unit', 'order']
+        fields = ['id', 'name', 'code', 'normal_range', 'unit', 'order']
 
 
 class TestSerializer(serializers.ModelSerializer):
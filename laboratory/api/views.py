@@ -11,9 +11,11 @@ from rest_framework.decorators import action
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
 
+from ..analyzers import import_file
 from ..models import Test, TestCategory, TestRequest, TestResult
 from ..services import (
-    LabActionError, create_result, update_status, verify_result,
+    LabActionError, ResultEntryError, create_result, enter_results,
+    update_status, verify_result,
 )
 from .serializers import (
     TestCategorySerializer, TestRequestSerializer, TestResultSerializer,
@@ -163,18 +165,66 @@ class TestResultViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(verified_by__isnull=True)
         return queryset
 
+    def _forbidden(self, request, doing):
+        if request.user.is_superuser or request.user.has_perm('laboratory.enter_testresults'):
+            return None
+        return Response(
+            {'error': f'You do not have permission to {doing}.'},
+            status=status.HTTP_403_FORBIDDEN,
+        )
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Enter many results at once — a panel, or an analyzer run.
+
+        `results` is a list of {test_request, test, notes, parameters}, with
+        `parameters` as for enter-result. All rows are written or none.
+        """
+        denied = self._forbidden(request, 'enter results')
+        if denied:
+            return denied
+        rows = request.data.get('results')
+        if not isinstance(rows, list) or not rows:
+            return _error('No results to enter.')
+        try:
+            results = enter_results([row for row in rows if isinstance(row, dict)], request.user)
+        except ResultEntryError as e:
+            return Response({'error': str(e), 'errors': e.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        results = self.get_queryset().filter(pk__in=[r.pk for r in results])
+        return Response(
+            {'results': TestResultSerializer(results, many=True).data},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_results(self, request):
+        """Upload an ASTM E1394 / HL7 v2 ORU file (multipart `file`).
+
+        Matched readings are filed; the rest go to the import's error queue.
+        """
+        denied = self._forbidden(request, 'import results')
+        if denied:
+            return denied
+        upload = request.FILES.get('file')
+        if upload is None:
+            return _error('No file uploaded.')
+        batch = import_file(upload, upload.name, user=request.user)
+        body = {
+            'id': batch.id, 'file_name': batch.file_name, 'format': batch.format,
+            'status': batch.status, 'readings': batch.readings,
+            'filed': batch.filed, 'unmatched': batch.unmatched, 'error': batch.error,
+        }
+        return Response(body, status=status.HTTP_400_BAD_REQUEST if batch.status == 'failed'
+                        else status.HTTP_201_CREATED)
+
     @action(detail=True, methods=['post'])
     def verify(self, request, pk=None):
         """Sign off a result. Needs the lab's own result permission, not just
         whatever allows reading."""
-        if not (
-            request.user.is_superuser
-            or request.user.has_perm('laboratory.enter_testresults')
-        ):
-            return Response(
-                {'error': 'You do not have permission to verify results.'},
-                status=status.HTTP_403_FORBIDDEN,
-            )
+        denied = self._forbidden(request, 'verify results')
+        if denied:
+            return denied
         try:
             result = verify_result(self.get_object(), request.user)
         except LabActionError as e:
@@ -42,7 +42,8 @@ class TestParameterForm(forms.ModelForm):
 
     class Meta:
         model = TestParameter
-        fields = ['name', 'normal_range', 'unit', 'order']
+        fields = ['name', 'code', 'normal_range', 'unit', 'order']
+        labels = {'code': 'Analyzer code'}
 
 class TestRequestForm(forms.ModelForm):
     """Form for creating and editing test requests with patient search"""
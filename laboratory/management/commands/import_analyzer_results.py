@@ -0,0 +1,96 @@
+"""Import analyzer result files (ASTM E1394 / HL7 v2 ORU).
+
+    python manage.py import_analyzer_results run1.astm run2.hl7
+    python manage.py import_analyzer_results --watch --hospital <subdomain>
+
+With no paths, the files in LAB_ANALYZER_DROP_DIR are imported; --watch keeps
+polling it. Each file moves to processed/ or failed/ underneath the drop
+directory once read, so a file is never imported twice.
+
+--hospital may be left out only when there is a single hospital (or none):
+with several, unscoped specimen matching would file one hospital's readings
+against another's requests.
+"""
+import os
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from laboratory.analyzers import import_file
+from saas.current import clear_current_hospital, set_current_hospital
+
+
+# Analyzers write "<name>.tmp" / "<name>.part" (or a dotfile) and rename it
+# when done; until then the file is incomplete and must be left alone.
+PARTIAL_SUFFIXES = (".tmp", ".part")
+
+
+def _still_writing(name):
+    return name.startswith(".") or name.lower().endswith(PARTIAL_SUFFIXES)
+
+
+class Command(BaseCommand):
+    help = "Import ASTM/HL7 analyzer result files, from paths or the drop directory."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="Files to import (default: the drop directory)")
+        parser.add_argument("--dir", help="Drop directory (default: LAB_ANALYZER_DROP_DIR)")
+        parser.add_argument("--watch", action="store_true", help="Keep polling the drop directory")
+        parser.add_argument("--interval", type=int, default=10, help="Seconds between polls with --watch")
+        parser.add_argument("--hospital", help="Subdomain of the hospital the files belong to")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+        else:
+            hospitals = list(Hospital.objects.all()[:2])
+            if len(hospitals) > 1:
+                raise CommandError("Several hospitals: say which one with --hospital <subdomain>")
+            hospital = hospitals[0] if hospitals else None
+
+        set_current_hospital(hospital)
+        try:
+            if options["paths"]:
+                for path in options["paths"]:
+                    self._import(path, source="upload")
+                return
+            drop_dir = options["dir"] or settings.LAB_ANALYZER_DROP_DIR
+            if not os.path.isdir(drop_dir):
+                raise CommandError(f"Drop directory {drop_dir} does not exist")
+            while True:
+                for name in sorted(os.listdir(drop_dir)):
+                    path = os.path.join(drop_dir, name)
+                    if os.path.isfile(path) and not _still_writing(name):
+                        batch = self._import(path, source="drop")
+                        self._move(path, drop_dir, "processed" if batch.status == "done" else "failed")
+                if not options["watch"]:
+                    break
+                time.sleep(options["interval"])
+        finally:
+            clear_current_hospital()
+
+    def _import(self, path, source):
+        with open(path, "rb") as stream:
+            batch = import_file(stream, os.path.basename(path), source=source)
+        message = (
+            f"{batch.file_name}: {batch.readings} reading(s), {batch.filed} filed, "
+            f"{batch.unmatched} unmatched"
+        )
+        if batch.status == "failed":
+            self.stdout.write(self.style.WARNING(f"{batch.file_name}: {batch.error}"))
+        elif batch.unmatched:
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+        return batch
+
+    def _move(self, path, drop_dir, folder):
+        target = os.path.join(drop_dir, folder)
+        os.makedirs(target, exist_ok=True)
+        shutil.move(path, os.path.join(target, os.path.basename(path)))
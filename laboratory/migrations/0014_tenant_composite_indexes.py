@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratory', '0013_alter_testresult_result_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='testrequest',
+            index=models.Index(fields=['hospital', 'status', 'request_date'], name='idx_labreq_hosp_status_date'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:48
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('laboratory', '0014_tenant_composite_indexes'),
+        ('saas', '0009_hospital_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='testparameter',
+            name='code',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=50),
+        ),
+        migrations.CreateModel(
+            name='AnalyzerImport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('format', models.CharField(blank=True, choices=[('astm', 'ASTM E1394'), ('hl7', 'HL7 v2 ORU')], max_length=10)),
+                ('source', models.CharField(choices=[('drop', 'Drop directory'), ('upload', 'Upload')], default='upload', max_length=10)),
+                ('status', models.CharField(choices=[('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='processing', max_length=20)),
+                ('readings', models.PositiveIntegerField(default=0)),
+                ('filed', models.PositiveIntegerField(default=0)),
+                ('unmatched', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('uploaded_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='analyzer_imports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UnmatchedAnalyzerResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('line_number', models.PositiveIntegerField()),
+                ('specimen_id', models.CharField(blank=True, max_length=64)),
+                ('analyte_code', models.CharField(blank=True, max_length=64)),
+                ('analyte_name', models.CharField(blank=True, max_length=100)),
+                ('value', models.CharField(blank=True, max_length=100)),
+                ('units', models.CharField(blank=True, max_length=50)),
+                ('flag', models.CharField(blank=True, max_length=10)),
+                ('reason', models.CharField(choices=[('specimen', 'Unknown specimen'), ('analyte', 'Unmapped analyte code'), ('rejected', 'Rejected')], max_length=20)),
+                ('message', models.TextField(blank=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='unmatched_results', to='laboratory.analyzerimport')),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+            options={
+                'ordering': ['batch', 'line_number'],
+                'indexes': [models.Index(fields=['hospital', 'resolved_at', 'created_at'], name='idx_analyzer_unmatched_open')],
+            },
+        ),
+    ]
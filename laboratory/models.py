@@ -46,6 +46,9 @@ class TestParameter(TenantModel):
     normal_range = models.CharField(max_length=100, blank=True, null=True)
     unit = models.CharField(max_length=50, blank=True, null=True)
     order = models.IntegerField(default=0)  # For ordering parameters in a test
+    # The analyte code analyzers send for this parameter (ASTM universal test
+    # ID, HL7 OBX-3), e.g. "HGB". Matched case-insensitively on import.
+    code = models.CharField(max_length=50, blank=True, default="", db_index=True)
 
     def __str__(self):
         return f"{self.test.name} - {self.name}"
@@ -235,6 +238,11 @@ class TestRequest(TenantModel):
             models.Index(fields=["doctor"]),
             models.Index(fields=["status"]),
             models.Index(fields=["request_date"]),
+            # Tenant first: TenantManager adds hospital= to every query.
+            models.Index(
+                fields=["hospital", "status", "request_date"],
+                name="idx_labreq_hosp_status_date",
+            ),
         ]
         ordering = ["-request_date", "-created_at"]
 
@@ -310,3 +318,80 @@ class TestResultParameter(TenantModel):
 
     def __str__(self):
         return f"{self.parameter.name}: {self.value} {self.parameter.unit or ''}"
+
+
+class AnalyzerImport(TenantModel):
+    """One analyzer file, dropped or uploaded, and what became of its readings."""
+
+    FORMAT_CHOICES = (
+        ("astm", "ASTM E1394"),
+        ("hl7", "HL7 v2 ORU"),
+    )
+    SOURCE_CHOICES = (
+        ("drop", "Drop directory"),
+        ("upload", "Upload"),
+    )
+    STATUS_CHOICES = (
+        ("processing", "Processing"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    file_name = models.CharField(max_length=255)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, blank=True)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default="upload")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="processing")
+    readings = models.PositiveIntegerField(default=0)
+    filed = models.PositiveIntegerField(default=0)
+    unmatched = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="analyzer_imports",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
+
+
+class UnmatchedAnalyzerResult(TenantModel):
+    """The import error queue: readings that could not be filed against a
+    request. Fix the mapping (or the request) and retry from the import page."""
+
+    REASON_CHOICES = (
+        ("specimen", "Unknown specimen"),
+        ("analyte", "Unmapped analyte code"),
+        ("rejected", "Rejected"),
+    )
+
+    batch = models.ForeignKey(
+        AnalyzerImport, on_delete=models.CASCADE, related_name="unmatched_results"
+    )
+    line_number = models.PositiveIntegerField()
+    specimen_id = models.CharField(max_length=64, blank=True)
+    analyte_code = models.CharField(max_length=64, blank=True)
+    analyte_name = models.CharField(max_length=100, blank=True)
+    value = models.CharField(max_length=100, blank=True)
+    units = models.CharField(max_length=50, blank=True)
+    flag = models.CharField(max_length=10, blank=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    message = models.TextField(blank=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["batch", "line_number"]
+        indexes = [
+            models.Index(
+                fields=["hospital", "resolved_at", "created_at"],
+                name="idx_analyzer_unmatched_open",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.specimen_id} {self.analyte_code}: {self.get_reason_display()}"
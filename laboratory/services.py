@@ -4,17 +4,81 @@ The rules themselves live on TestRequest (`can_be_processed`,
 `is_payment_verified`); this is where the surrounding workflow lives — which
 status changes are legal, when a result may be entered, and what verifying one
 does to the request.
+
+Result values are written set-based: `enter_results` takes a whole panel, or
+an analyzer run across many requests, validates every row first, works out
+`is_normal` from the reference ranges in memory and writes the parameters with
+bulk_create/bulk_update in one transaction — a few queries per batch instead
+of a few per value.
 """
+import re
+from collections import defaultdict
+
 from django.db import transaction
 from django.utils import timezone
 
-from .models import TestRequest, TestResult, TestResultParameter
+from core import turnaround
+
+from .models import Test, TestParameter, TestRequest, TestResult, TestResultParameter
 
 
 class LabActionError(Exception):
     """A laboratory action that is not allowed right now."""
 
 
+class ResultEntryError(LabActionError):
+    """A batch of results that failed validation; nothing was written."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(self.errors))
+
+
+_NUMBER = r"[-+]?\d+(?:\.\d+)?"
+# "12-16", "136–145 mEq/L", "4.0 to 11.0"
+_BETWEEN = re.compile(rf"^\s*({_NUMBER})\s*(?:-|–|—|to)\s*({_NUMBER})", re.I)
+# "<0.04 ng/mL", "> 60", "≤ 5"
+_BOUND = re.compile(rf"^\s*(<=|>=|≤|≥|<|>)\s*({_NUMBER})")
+
+
+def _number(value):
+    try:
+        return float(str(value).strip())
+    except (TypeError, ValueError):
+        return None
+
+
+def in_range(value, normal_range):
+    """True/False when a numeric value can be checked against the range,
+    None when it cannot (text results, sex-specific or free-text ranges)."""
+    number = _number(value)
+    if number is None or not normal_range:
+        return None
+    match = _BETWEEN.match(normal_range)
+    if match:
+        low, high = float(match.group(1)), float(match.group(2))
+        return low <= number <= high
+    match = _BOUND.match(normal_range)
+    if match:
+        op, bound = match.group(1), float(match.group(2))
+        return {
+            "<": number < bound, "<=": number <= bound, "≤": number <= bound,
+            ">": number > bound, ">=": number >= bound, "≥": number >= bound,
+        }[op]
+    bound = _number(normal_range)
+    return None if bound is None else number == bound
+
+
+def flag_normal(parameter, value, supplied=None):
+    """The reference range decides when it can; otherwise the caller's flag."""
+    verdict = in_range(value, parameter.normal_range)
+    if verdict is not None:
+        return verdict
+    if isinstance(supplied, str):
+        return supplied.lower() not in ("false", "0", "no", "")
+    return True if supplied is None else bool(supplied)
+
+
 def assert_can_enter_results(test_request):
     """Raise unless results may be entered against this request."""
     can_process, message = test_request.can_be_processed()
@@ -71,31 +135,214 @@ def create_result(test_request, test, user, notes="", parameters=None,
             notes=notes,
             sample_collection_date=sample_collection_date,
         )
-        _save_parameters(result, parameters or {})
+        save_parameters(result, parameters or {})
         sync_request_completion(test_request)
 
     return result
 
 
-def _save_parameters(result, parameters):
+def save_parameters(result, parameters):
     """Write parameter values, ignoring any that are not part of this test."""
-    valid = {p.id: p for p in result.test.parameters.all()}
-    for parameter_id, data in parameters.items():
-        parameter = valid.get(int(parameter_id))
+    panel = {p.id: p for p in result.test.parameters.all()}
+    values = _plan_values(result.test, panel, parameters, errors=None)
+    _write_parameters([(result, values)])
+
+
+def _pk(value):
+    value = getattr(value, "pk", value)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _plan_values(test, panel, parameters, errors):
+    """[(parameter, value, is_normal, notes)] for the non-empty values.
+
+    Unknown parameter ids are skipped, or reported into `errors` when given.
+    """
+    values = []
+    for parameter_id, data in (parameters or {}).items():
+        if not isinstance(data, dict):
+            data = {"value": data}
+        parameter = panel.get(_pk(parameter_id))
         if parameter is None:
+            if errors is not None:
+                errors.append(f"parameter {parameter_id} is not part of {test.name}.")
             continue
         value = str(data.get("value", "")).strip()
         if not value:
             continue
-        TestResultParameter.objects.update_or_create(
-            test_result=result,
-            parameter=parameter,
-            defaults={
-                "value": value,
-                "is_normal": bool(data.get("is_normal", True)),
-                "notes": data.get("notes", ""),
-            },
+        values.append((
+            parameter,
+            value,
+            flag_normal(parameter, value, data.get("is_normal")),
+            data.get("notes"),
+        ))
+    return values
+
+
+def _write_parameters(planned, batch_size=500):
+    """Create or update every (result, values) pair with one read and at most
+    one INSERT and one UPDATE batch."""
+    results = [result for result, values in planned if values]
+    if not results:
+        return 0
+    current = {
+        (row.test_result_id, row.parameter_id): row
+        for row in TestResultParameter.objects.filter(test_result__in=results)
+    }
+    to_create, to_update = [], []
+    for result, values in planned:
+        for parameter, value, is_normal, notes in values:
+            row = current.get((result.pk, parameter.pk))
+            if row is None:
+                # bulk_create skips TenantModel.save(), so stamp the tenant here.
+                row = TestResultParameter(
+                    test_result=result, parameter=parameter,
+                    hospital_id=result.hospital_id, notes=notes or "",
+                )
+                current[(result.pk, parameter.pk)] = row
+                to_create.append(row)
+            elif row.pk is not None:
+                to_update.append(row)
+            row.value, row.is_normal = value, is_normal
+            if notes is not None:
+                row.notes = notes
+    TestResultParameter.objects.bulk_create(to_create, batch_size=batch_size)
+    TestResultParameter.objects.bulk_update(
+        to_update, ["value", "is_normal", "notes"], batch_size=batch_size
+    )
+    return len(to_create) + len(to_update)
+
+
+def add_missing_parameters(result):
+    """Give the result an empty row for every predefined parameter it lacks."""
+    existing = result.parameters.values_list("parameter_id", flat=True)
+    missing = result.test.parameters.exclude(id__in=existing).order_by("order")
+    rows = [
+        TestResultParameter(
+            test_result=result, parameter=parameter, value="", is_normal=True,
+            hospital_id=result.hospital_id,
         )
+        for parameter in missing
+    ]
+    TestResultParameter.objects.bulk_create(rows)
+    return len(rows)
+
+
+def enter_results(entries, user, rejected=None):
+    """Record a batch of results — one panel or an analyzer run across many
+    requests — in one transaction.
+
+    Each entry is {"test_request", "test", "notes", "parameters"} (ids or
+    instances), `parameters` mapping TestParameter id -> {"value", "is_normal",
+    "notes"} as for create_result. An entry for a test that already has an
+    unverified result updates it; verified results are never touched. The
+    whole batch is validated before anything is written and ResultEntryError
+    lists every problem — unless a `rejected` list is passed, in which case
+    the bad entries are appended to it as (index, message) and the rest are
+    written. Returns the results written, in entry order.
+    """
+    entries = list(entries)
+    request_ids = {_pk(e.get("test_request")) for e in entries} - {None}
+    test_ids = {_pk(e.get("test")) for e in entries} - {None}
+
+    requests = (
+        TestRequest.objects
+        .select_related("invoice", "authorization_code")
+        .prefetch_related("tests")
+        .in_bulk(request_ids)
+    )
+    tests = Test.objects.in_bulk(test_ids)
+    panels = defaultdict(dict)
+    for parameter in TestParameter.objects.filter(test_id__in=test_ids):
+        panels[parameter.test_id][parameter.id] = parameter
+    existing = {
+        (result.test_request_id, result.test_id): result
+        for result in TestResult.objects.filter(
+            test_request_id__in=request_ids, test_id__in=test_ids
+        )
+    }
+
+    errors, planned, seen, blocked = [], [], set(), {}
+    for index, entry in enumerate(entries):
+        problems = []
+        test_request = requests.get(_pk(entry.get("test_request")))
+        test = tests.get(_pk(entry.get("test")))
+        if test_request is None:
+            problems.append(f"test request {entry.get('test_request')} not found.")
+        elif test is None:
+            problems.append(f"test {entry.get('test')} not found.")
+        else:
+            if test_request.pk not in blocked:
+                try:
+                    assert_can_enter_results(test_request)
+                    blocked[test_request.pk] = None
+                except LabActionError as e:
+                    blocked[test_request.pk] = str(e)
+            key = (test_request.pk, test.pk)
+            result = existing.get(key)
+            if blocked[test_request.pk]:
+                problems.append(blocked[test_request.pk])
+            elif test.pk not in {t.pk for t in test_request.tests.all()}:
+                problems.append(f"{test.name} is not part of this test request.")
+            elif key in seen:
+                problems.append(f"{test.name} appears twice for this request.")
+            elif result is not None and result.verified_by_id:
+                problems.append(f"{test.name} is already verified.")
+            else:
+                values = _plan_values(test, panels[test.pk], entry.get("parameters"), problems)
+        if problems:
+            errors.extend((index, problem) for problem in problems)
+            continue
+        seen.add(key)
+        planned.append((test_request, test, entry.get("notes"), values))
+
+    if errors and rejected is None:
+        raise ResultEntryError(f"Row {index + 1}: {problem}" for index, problem in errors)
+    if rejected is not None:
+        rejected.extend(errors)
+    if not planned:
+        return []
+
+    with transaction.atomic():
+        new = [
+            TestResult(
+                test_request=test_request, test=test, performed_by=user,
+                notes=notes or "", hospital_id=test_request.hospital_id,
+            )
+            for test_request, test, notes, values in planned
+            if (test_request.pk, test.pk) not in existing
+        ]
+        if new:
+            TestResult.objects.bulk_create(new)
+            # bulk_create sent no post_save: record the first-result step
+            # turnaround's TestResult receiver would have.
+            now = timezone.now()
+            for test_request in {r.test_request_id: r.test_request for r in new}.values():
+                turnaround.record("laboratory", test_request, {"completed": now})
+            # Not every backend returns primary keys from bulk_create.
+            for result in TestResult.objects.filter(
+                test_request_id__in={r.test_request_id for r in new},
+                test_id__in={r.test_id for r in new},
+            ):
+                existing.setdefault((result.test_request_id, result.test_id), result)
+
+        results, renoted = [], []
+        for test_request, test, notes, values in planned:
+            result = existing[(test_request.pk, test.pk)]
+            if notes is not None and result.notes != notes:
+                result.notes = notes
+                renoted.append(result)
+            results.append((result, values))
+        TestResult.objects.bulk_update(renoted, ["notes"])
+        _write_parameters(results)
+
+        for test_request in {tr.pk: tr for tr, *_ in planned}.values():
+            sync_request_completion(test_request)
+
+    return [result for result, values in results]
 
 
 def sync_request_completion(test_request):
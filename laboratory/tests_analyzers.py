@@ -0,0 +1,183 @@
+"""Analyzer import against the sample files in laboratory/testdata: parsing,
+specimen/analyte matching, bulk filing and the error queue."""
+import io
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from laboratory.analyzers import (
+    AnalyzerFormatError, import_file, readings, retry_unmatched,
+)
+from laboratory.models import (
+    AnalyzerImport, Test, TestParameter, TestRequest, TestResultParameter,
+    UnmatchedAnalyzerResult,
+)
+from patients.models import Patient
+from saas.models import Hospital
+
+TESTDATA = os.path.join(os.path.dirname(__file__), "testdata")
+
+
+def sample(name):
+    return open(os.path.join(TESTDATA, name), "rb")
+
+
+class ParserTests(SimpleTestCase):
+    def test_astm(self):
+        with sample("fbc_run.astm") as stream:
+            fmt, parsed = readings(stream)
+            rows = list(parsed)
+        self.assertEqual(fmt, "astm")
+        self.assertEqual(
+            [(r.specimen, r.code, r.value, r.units, r.flag) for r in rows],
+            [
+                ("LAB-1001", "HGB", "9.1", "g/dL", "L"),
+                ("LAB-1001", "WBC", "7.4", "10*9/L", "N"),
+                ("LAB-1001", "XYZ", "5", "", "N"),
+                ("LAB-9999", "HGB", "13.0", "g/dL", "N"),
+            ],
+        )
+        self.assertEqual(rows[0].line, 4)
+
+    def test_astm_transport_framing_is_stripped(self):
+        framed = (
+            b"\x05\x021H|\\^&|||BC-5380\r\x0312\r\n"
+            b"\x022O|1|77||^^^FBC\r\x03A1\r\n"
+            b"\x023R|1|^^^HGB|14.2|g/dL||N||F\r\x0355\r\n\x04"
+        )
+        fmt, parsed = readings(io.BytesIO(framed))
+        self.assertEqual(fmt, "astm")
+        self.assertEqual([(r.specimen, r.code, r.value) for r in parsed], [("77", "HGB", "14.2")])
+
+    def test_hl7(self):
+        with sample("chemistry_oru.hl7") as stream:
+            fmt, parsed = readings(stream)
+            rows = list(parsed)
+        self.assertEqual(fmt, "hl7")
+        self.assertEqual(
+            [(r.specimen, r.code, r.name, r.value, r.flag) for r in rows],
+            [
+                ("1002", "GLU", "Glucose", "6.8", "H"),
+                ("1002", "CREA", "Creatinine", "80", "N"),
+                ("1002", "COMMENT", "Note", "Haemolysed", ""),
+            ],
+        )
+
+    def test_other_files_are_refused(self):
+        with self.assertRaises(AnalyzerFormatError):
+            readings(io.BytesIO(b"patient,value\n1,2\n"))
+
+
+class AnalyzerImportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_superuser(
+            phone_number="08012000341", username="analyzer", password="pw12345",
+        )
+        self.patient = Patient.objects.create(
+            first_name="Bola", last_name="Ade", date_of_birth="1979-02-02",
+            gender="F", address="3 Lab Close", city="Ibadan", state="Oyo",
+        )
+        self.fbc = Test.objects.create(name="Full Blood Count", price=Decimal("3500"), sample_type="blood")
+        self.hgb = TestParameter.objects.create(test=self.fbc, name="Haemoglobin", code="hgb", normal_range="12-16")
+        self.wbc = TestParameter.objects.create(test=self.fbc, name="WBC", code="WBC", normal_range="4-11")
+        self.request = TestRequest.objects.create(
+            id=1001, patient=self.patient, doctor=self.user, status="payment_confirmed",
+        )
+        self.request.tests.add(self.fbc)
+
+    def test_matched_readings_are_filed_and_the_rest_queued(self):
+        with sample("fbc_run.astm") as stream:
+            batch = import_file(stream, "fbc_run.astm", user=self.user)
+
+        self.assertEqual(
+            (batch.status, batch.format, batch.readings, batch.filed, batch.unmatched),
+            ("done", "astm", 4, 2, 2),
+        )
+        values = {
+            row.parameter.code: (row.value, row.is_normal)
+            for row in TestResultParameter.objects.filter(test_result__test_request=self.request)
+        }
+        self.assertEqual(values, {"hgb": ("9.1", False), "WBC": ("7.4", True)})
+        self.request.refresh_from_db()
+        self.assertEqual(self.request.status, "processing")
+
+        queued = {(row.analyte_code, row.reason) for row in batch.unmatched_results.all()}
+        self.assertEqual(queued, {("XYZ", "analyte"), ("HGB", "specimen")})
+
+    def test_retry_files_readings_once_the_code_is_mapped(self):
+        with sample("fbc_run.astm") as stream:
+            batch = import_file(stream, "fbc_run.astm", user=self.user)
+        TestParameter.objects.create(test=self.fbc, name="Platelets", code="XYZ")
+
+        self.assertEqual(retry_unmatched(batch.unmatched_results.all(), self.user), 1)
+        self.assertEqual(UnmatchedAnalyzerResult.objects.filter(resolved_at__isnull=True).count(), 1)
+        self.assertTrue(TestResultParameter.objects.filter(parameter__code="XYZ", value="5").exists())
+
+    def test_rows_for_a_verified_result_are_rejected_not_overwritten(self):
+        with sample("fbc_run.astm") as stream:
+            import_file(stream, "fbc_run.astm", user=self.user)
+        self.request.results.update(verified_by=self.user)
+        with sample("fbc_run.astm") as stream:
+            batch = import_file(stream, "fbc_run.astm", user=self.user)
+        self.assertEqual(batch.unmatched, 4)
+        self.assertEqual(batch.unmatched_results.filter(reason="rejected").count(), 2)
+
+    def test_unreadable_file_fails_the_import(self):
+        batch = import_file(io.BytesIO(b"not an analyzer file"), "junk.txt")
+        self.assertEqual(batch.status, "failed")
+        self.assertIn("Not an ASTM", batch.error)
+
+    def test_drop_directory_command(self):
+        drop = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, drop)
+        shutil.copy(os.path.join(TESTDATA, "fbc_run.astm"), drop)
+        with open(os.path.join(drop, "junk.txt"), "w") as junk:
+            junk.write("nothing to see")
+
+        # Still being written by the analyzer: left for a later pass.
+        shutil.copy(os.path.join(TESTDATA, "fbc_run.astm"), os.path.join(drop, "next.astm.part"))
+        call_command("import_analyzer_results", "--dir", drop, stdout=io.StringIO())
+        self.assertTrue(os.path.exists(os.path.join(drop, "processed", "fbc_run.astm")))
+        self.assertTrue(os.path.exists(os.path.join(drop, "failed", "junk.txt")))
+        self.assertTrue(os.path.exists(os.path.join(drop, "next.astm.part")))
+        self.assertEqual(AnalyzerImport.objects.filter(source="drop").count(), 2)
+
+    def test_readings_without_a_value_are_not_counted_as_filed(self):
+        run = b"1H|\\^&|||BC-5380\r2O|1|1001||^^^FBC\r3R|1|^^^HGB|9.1|g/dL||L||F\r4R|2|^^^WBC||10*9/L||N||F\r"
+        batch = import_file(io.BytesIO(run), "blank.astm", user=self.user)
+        self.assertEqual((batch.readings, batch.filed, batch.unmatched), (2, 1, 0))
+
+    def test_drop_directory_needs_a_hospital_when_there_are_several(self):
+        drop = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, drop)
+        shutil.copy(os.path.join(TESTDATA, "fbc_run.astm"), drop)
+        Hospital.objects.create(name="North", subdomain="north")
+        south = Hospital.objects.create(name="South", subdomain="south")
+        with self.assertRaisesMessage(CommandError, "--hospital"):
+            call_command("import_analyzer_results", "--dir", drop, stdout=io.StringIO())
+        self.assertTrue(os.path.exists(os.path.join(drop, "fbc_run.astm")))
+
+        call_command("import_analyzer_results", "--dir", drop, "--hospital", "south", stdout=io.StringIO())
+        self.assertEqual(AnalyzerImport.all_objects.get().hospital, south)
+
+    def test_upload_page_and_api(self):
+        self.client.force_login(self.user)
+        with sample("fbc_run.astm") as stream:
+            upload = SimpleUploadedFile("fbc_run.astm", stream.read())
+        response = self.client.post(reverse("laboratory:analyzer_imports"), {"file": upload})
+        batch = AnalyzerImport.objects.get()
+        self.assertRedirects(response, reverse("laboratory:analyzer_import_detail", args=[batch.id]))
+        self.assertContains(self.client.get(response.url), "Unmapped analyte code")
+
+        with sample("chemistry_oru.hl7") as stream:
+            upload = SimpleUploadedFile("chemistry_oru.hl7", stream.read())
+        response = self.client.post("/laboratory/api/results/import/", {"file": upload})
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(response.json()["unmatched"], 3)
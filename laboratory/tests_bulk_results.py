@@ -0,0 +1,167 @@
+"""Bulk result entry: a panel or an analyzer run goes in as one validated,
+set-based write, with is_normal worked out from the reference ranges."""
+from decimal import Decimal
+
+from django.db import connection
+from django.test import SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from core import turnaround
+from core.models import WorkflowEvent
+from laboratory.models import (
+    Test, TestCategory, TestParameter, TestRequest, TestResult,
+    TestResultParameter,
+)
+from laboratory.services import ResultEntryError, enter_results, in_range
+from patients.models import Patient
+
+
+class ReferenceRangeTests(SimpleTestCase):
+    def test_range_formats(self):
+        self.assertIs(in_range("13", "12-16"), True)
+        self.assertIs(in_range("9.1", "12-16"), False)
+        self.assertIs(in_range("140", "136–145 mEq/L"), True)
+        self.assertIs(in_range("0.05", "<0.04 ng/mL"), False)
+        self.assertIs(in_range("75", "> 60"), True)
+        self.assertIs(in_range("5", "≤ 5"), True)
+
+    def test_unreadable_values_and_ranges(self):
+        self.assertIsNone(in_range("Positive", "12-16"))
+        self.assertIsNone(in_range("40", "Male: 38–174 U/L, Female: 26–140 U/L"))
+        self.assertIsNone(in_range("40", ""))
+
+
+class BulkResultEntryTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_superuser(
+            phone_number="08012000301", username="bulklab", password="pw12345",
+        )
+        self.patient = Patient.objects.create(
+            first_name="Ada", last_name="Eze", date_of_birth="1985-01-01",
+            gender="F", address="1 Lab Road", city="Enugu", state="Enugu",
+        )
+        category = TestCategory.objects.create(name="Chemistry")
+        self.test = Test.objects.create(
+            name="Electrolytes", category=category, price=Decimal("4000.00"),
+            sample_type="blood",
+        )
+        self.sodium = TestParameter.objects.create(
+            test=self.test, name="Sodium", normal_range="136–145", order=1,
+        )
+        self.potassium = TestParameter.objects.create(
+            test=self.test, name="Potassium", normal_range="3.5-5.0", order=2,
+        )
+
+    def make_request(self, *tests):
+        test_request = TestRequest.objects.create(
+            patient=self.patient, doctor=self.user, status="payment_confirmed",
+        )
+        test_request.tests.add(*(tests or [self.test]))
+        return test_request
+
+    def panel(self, test_request, test=None, **values):
+        test = test or self.test
+        return {
+            "test_request": test_request.pk,
+            "test": test.pk,
+            "parameters": {
+                str(p.pk): {"value": values.get(p.name, "1")} for p in test.parameters.all()
+            },
+        }
+
+    def test_panel_is_written_and_flagged_from_ranges(self):
+        test_request = self.make_request()
+        results = enter_results(
+            [self.panel(test_request, Sodium="150", Potassium="4.1")], self.user,
+        )
+        self.assertEqual(len(results), 1)
+        rows = {
+            row.parameter.name: row
+            for row in TestResultParameter.objects.filter(test_result=results[0])
+        }
+        self.assertEqual((rows["Sodium"].value, rows["Sodium"].is_normal), ("150", False))
+        self.assertTrue(rows["Potassium"].is_normal)
+        self.assertEqual(rows["Sodium"].hospital_id, test_request.hospital_id)
+        test_request.refresh_from_db()
+        self.assertEqual(test_request.status, "processing")
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def queries_for(requests):
+            with CaptureQueriesContext(connection) as ctx:
+                enter_results([self.panel(r) for r in requests], self.user)
+            return len(ctx.captured_queries)
+
+        small = queries_for([self.make_request()])
+        for n in range(3, 40):
+            TestParameter.objects.create(test=self.test, name=f"Analyte {n}", order=n)
+        # Per-request status sync aside, 40 parameters cost what 2 did.
+        large = queries_for([self.make_request()])
+        self.assertEqual(small, large)
+        self.assertEqual(TestResultParameter.objects.count(), 2 + 39)
+
+    def test_one_bad_row_rejects_the_whole_batch(self):
+        good = self.make_request()
+        other = Test.objects.create(name="Urinalysis", price=Decimal("1500.00"), sample_type="urine")
+        unpaid = TestRequest.objects.create(patient=self.patient, doctor=self.user, status="awaiting_payment")
+        unpaid.tests.add(self.test)
+        panel = self.panel(good)
+        panel["parameters"]["999999"] = {"value": "3"}
+
+        with self.assertRaises(ResultEntryError) as caught:
+            enter_results(
+                [panel, {"test_request": good.pk, "test": other.pk}, self.panel(unpaid)],
+                self.user,
+            )
+        self.assertEqual(len(caught.exception.errors), 3)
+        self.assertIn("Row 2: Urinalysis is not part of this test request.", caught.exception.errors)
+        self.assertFalse(TestResult.objects.exists())
+
+    def test_rerun_updates_unverified_results_only(self):
+        test_request = self.make_request()
+        first, = enter_results([self.panel(test_request, Sodium="150")], self.user)
+        second, = enter_results([self.panel(test_request, Sodium="140")], self.user)
+        self.assertEqual(first.pk, second.pk)
+        row = TestResultParameter.objects.get(test_result=first, parameter=self.sodium)
+        self.assertEqual((row.value, row.is_normal), ("140", True))
+        self.assertEqual(TestResultParameter.objects.count(), 2)
+
+        TestResult.objects.filter(pk=first.pk).update(verified_by=self.user)
+        with self.assertRaisesMessage(ResultEntryError, "already verified"):
+            enter_results([self.panel(test_request)], self.user)
+
+    def test_api_and_web_endpoints(self):
+        self.client.force_login(self.user)
+        test_request = self.make_request()
+        response = self.client.post(
+            "/laboratory/api/results/bulk/",
+            {"results": [self.panel(test_request, Sodium="150")]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201, response.content)
+        values = {p["name"]: p for p in response.json()["results"][0]["parameters"]}
+        self.assertIs(values["Sodium"]["is_normal"], False)
+
+        test_request = self.make_request()
+        panel = self.panel(test_request)
+        del panel["test_request"]
+        response = self.client.post(
+            reverse("laboratory:bulk_result_entry", args=[test_request.pk]),
+            {"results": [panel]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertTrue(TestResult.objects.filter(test_request=test_request).exists())
+
+    def test_bulk_entry_records_the_first_result_for_turnaround(self):
+        first, second = self.make_request(), self.make_request()
+        enter_results([self.panel(first), self.panel(second)], self.user)
+        completed = WorkflowEvent.objects.filter(workflow="laboratory", step="completed")
+        self.assertEqual(set(completed.values_list("subject_id", flat=True)), {first.pk, second.pk})
+
+        turnaround.rollup(None)
+        found = turnaround.summary(first.request_date, metrics=("lab_turnaround",))["lab_turnaround"]
+        self.assertEqual(found["count"], 2)
+        # Time to the first result, not to verification.
+        self.assertEqual(TestRequest.objects.filter(status="completed").count(), 0)
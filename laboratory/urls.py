@@ -33,6 +33,9 @@ urlpatterns = [
     path('results/', views.result_list, name='results'),
     path('requests/<int:request_id>/results/create/', views.create_test_result, name='create_test_result'),
     path('requests/<int:request_id>/results/manual-entry/', views.manual_test_result_entry, name='manual_test_result_entry'),
+    path('requests/<int:request_id>/results/bulk/', views.bulk_result_entry, name='bulk_result_entry'),
+    path('analyzer-imports/', views.analyzer_imports, name='analyzer_imports'),
+    path('analyzer-imports/<int:import_id>/', views.analyzer_import_detail, name='analyzer_import_detail'),
     path('results/<int:result_id>/', views.result_detail, name='result_detail'),
     path('results/<int:result_id>/edit/', views.edit_test_result, name='edit_test_result'),
     path('results/<int:result_id>/add-parameter/', views.add_result_parameter, name='add_result_parameter'),
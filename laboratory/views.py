@@ -20,14 +20,16 @@ from decimal import Decimal
 import json
 
 from .models import (
-    TestCategory, Test, TestParameter, TestRequest,
-    TestResult, TestResultParameter
+    AnalyzerImport, TestCategory, Test, TestParameter, TestRequest,
+    TestResult, TestResultParameter, UnmatchedAnalyzerResult,
 )
+from .analyzers import UPLOAD_EXTENSIONS, import_file, retry_unmatched
 # Workflow rules live in services so the HTML views and the mobile API agree on
 # when a status may change, when results may be entered, and what verifying does.
 from .services import (
-    LabActionError, assert_can_enter_results, sync_request_completion,
-    update_status, verify_result,
+    LabActionError, ResultEntryError, add_missing_parameters,
+    assert_can_enter_results, enter_results, flag_normal, save_parameters,
+    sync_request_completion, update_status, verify_result,
 )
 from .forms import (
     TestCategoryForm, TestForm, TestParameterForm, TestRequestForm,
@@ -37,6 +39,7 @@ from .forms import (
 from patients.models import Patient
 from accounts.models import CustomUser
 from pharmacy.models import Prescription, PrescriptionItem
+from core import turnaround
 from core.decorators import department_access_required
 from core.department_dashboard_utils import (
     get_user_department,
@@ -101,24 +104,12 @@ def laboratory_dashboard(request):
         priority='emergency'
     ).count()
 
-    # Calculate average turnaround time (for completed tests in last 30 days)
-    from django.db.models import Avg, F, ExpressionWrapper, DurationField
-    avg_turnaround = TestRequest.objects.filter(
-        status='completed',
-        created_at__gte=timezone.now() - timedelta(days=30)
-    ).annotate(
-        turnaround=ExpressionWrapper(
-            F('updated_at') - F('created_at'),
-            output_field=DurationField()
-        )
-    ).aggregate(avg=Avg('turnaround'))['avg']
-
-    # Format turnaround time
-    if avg_turnaround:
-        hours = avg_turnaround.total_seconds() / 3600
-        avg_turnaround_hours = round(hours, 1)
-    else:
-        avg_turnaround_hours = 0
+    # Average turnaround (request to first result, last 30 days) from the
+    # hourly rollups rather than the raw requests
+    avg_turnaround = turnaround.summary(
+        timezone.now() - timedelta(days=30), metrics=('lab_turnaround',)
+    )['lab_turnaround']['mean']
+    avg_turnaround_hours = round(avg_turnaround / 3600, 1) if avg_turnaround else 0
 
     # Get tests requiring verification
     tests_needing_verification = TestResult.objects.filter(
@@ -148,6 +139,7 @@ def laboratory_dashboard(request):
         'urgent_tests': urgent_tests,
         'emergency_tests': emergency_tests,
         'avg_turnaround_hours': avg_turnaround_hours,
+        'turnaround': turnaround.dashboard(metrics=('lab_turnaround',)),
         'tests_needing_verification': tests_needing_verification,
         'categorized_referrals': categorized_referrals,
         'priority_labels': json_for_template(priority_labels),
@@ -1001,35 +993,11 @@ def create_test_result(request, request_id):
             test_result.save()
 
             # Check if parameters were submitted via AJAX (dynamically loaded)
-            parameter_ids = request.POST.getlist('parameter_ids[]')
-            if parameter_ids:
-                # Process dynamically submitted parameters
-                for param_id in parameter_ids:
-                    try:
-                        parameter = TestParameter.objects.get(id=param_id, test=test_result.test)
-                        value = request.POST.get(f'parameter_values[{param_id}]', '').strip()
-                        is_normal = request.POST.get(f'parameter_normal[{param_id}]', '') == 'true'
-                        notes = request.POST.get(f'parameter_notes[{param_id}]', '').strip()
-
-                        if value:
-                            TestResultParameter.objects.create(
-                                test_result=test_result,
-                                parameter=parameter,
-                                value=value,
-                                is_normal=is_normal,
-                                notes=notes
-                            )
-                    except TestParameter.DoesNotExist:
-                        continue
+            if request.POST.getlist('parameter_ids[]'):
+                save_parameters(test_result, _posted_parameters(request.POST))
             else:
                 # Create empty result parameters for each parameter in the test (legacy behavior)
-                for parameter in test_result.test.parameters.all():
-                    TestResultParameter.objects.create(
-                        test_result=test_result,
-                        parameter=parameter,
-                        value='',
-                        is_normal=True
-                    )
+                add_missing_parameters(test_result)
 
             # Update test request status if it was 'payment_confirmed' or 'sample_collected'
             if test_request.status in ['payment_confirmed', 'sample_collected']:
@@ -1197,7 +1165,7 @@ def add_result_parameter(request, result_id):
                         test_result=result,
                         parameter=test_parameter,
                         value=parameter_value,
-                        is_normal=is_normal,
+                        is_normal=flag_normal(test_parameter, parameter_value, is_normal),
                         notes=notes
                     )
 
@@ -1256,17 +1224,7 @@ def add_all_result_parameters(request, result_id):
     Rows are created with empty values for the user to fill in the main table.
     """
     result = get_object_or_404(TestResult, id=result_id)
-
-    existing_ids = result.parameters.values_list('parameter_id', flat=True)
-    missing = result.test.parameters.exclude(id__in=existing_ids).order_by('order')
-
-    created = 0
-    with transaction.atomic():
-        for param in missing:
-            TestResultParameter.objects.create(
-                test_result=result, parameter=param, value='', is_normal=True
-            )
-            created += 1
+    created = add_missing_parameters(result)
 
     if created:
         message = f'Added {created} parameter(s).'
@@ -1275,6 +1233,105 @@ def add_all_result_parameters(request, result_id):
     return JsonResponse({'success': True, 'added': created, 'message': message})
 
 
+def _posted_parameters(post):
+    """The result form's parameter_*[<id>] fields as create_result's mapping.
+
+    The "within normal range" box only counts when the value cannot be
+    checked against the parameter's range.
+    """
+    parameters = {}
+    for param_id in post.getlist('parameter_ids[]'):
+        parameters[param_id] = {
+            'value': post.get(f'parameter_values[{param_id}]', ''),
+            'is_normal': post.get(f'parameter_normal[{param_id}]', '') == 'true',
+            'notes': post.get(f'parameter_notes[{param_id}]', '').strip(),
+        }
+    return parameters
+
+
+@login_required
+@permission_required('lab.results')
+@require_http_methods(["POST"])
+def bulk_result_entry(request, request_id):
+    """Enter a whole request's results in one JSON post.
+
+    Body: {"results": [{"test": id, "notes": "...", "parameters":
+    {"<parameter id>": {"value": "...", "is_normal": bool, "notes": "..."}}}]}.
+    Either every row is written or none is; errors come back as a list.
+    """
+    test_request = get_object_or_404(TestRequest, id=request_id)
+    try:
+        rows = json.loads(request.body or b'{}').get('results') or []
+    except (ValueError, AttributeError):
+        return JsonResponse({'success': False, 'errors': ['Invalid JSON body.']}, status=400)
+    if not isinstance(rows, list) or not rows:
+        return JsonResponse({'success': False, 'errors': ['No results to enter.']}, status=400)
+
+    entries = [{**row, 'test_request': test_request.id} for row in rows if isinstance(row, dict)]
+    try:
+        results = enter_results(entries, request.user)
+    except ResultEntryError as e:
+        return JsonResponse({'success': False, 'errors': e.errors}, status=400)
+    return JsonResponse({
+        'success': True,
+        'results': [result.id for result in results],
+        'message': f'Saved {len(results)} result(s).',
+    })
+
+
+@login_required
+@permission_required('lab.results')
+def analyzer_imports(request):
+    """Upload analyzer files and see recent imports with their open errors."""
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        extension = os.path.splitext(upload.name)[1].lstrip('.').lower() if upload else ''
+        if not upload:
+            messages.error(request, 'Choose a file to import.')
+        elif extension not in UPLOAD_EXTENSIONS:
+            messages.error(request, f'Unsupported file type .{extension}.')
+        else:
+            batch = import_file(upload, upload.name, user=request.user)
+            if batch.status == 'failed':
+                messages.error(request, f'{batch.file_name}: {batch.error}')
+            else:
+                messages.success(
+                    request,
+                    f'{batch.file_name}: {batch.filed} reading(s) filed, {batch.unmatched} unmatched.',
+                )
+            return redirect('laboratory:analyzer_import_detail', import_id=batch.id)
+        return redirect('laboratory:analyzer_imports')
+
+    imports = AnalyzerImport.objects.select_related('uploaded_by')[:50]
+    context = {
+        'imports': imports,
+        'open_errors': UnmatchedAnalyzerResult.objects.filter(resolved_at__isnull=True).count(),
+        'extensions': ', '.join(f'.{e}' for e in UPLOAD_EXTENSIONS),
+        'title': 'Analyzer Imports',
+    }
+    return render(request, 'laboratory/analyzer_imports.html', context)
+
+
+@login_required
+@permission_required('lab.results')
+def analyzer_import_detail(request, import_id):
+    """One import's error queue; POST retries its open rows."""
+    batch = get_object_or_404(AnalyzerImport, id=import_id)
+    open_rows = batch.unmatched_results.filter(resolved_at__isnull=True)
+    if request.method == 'POST':
+        filed = retry_unmatched(open_rows, request.user)
+        messages.success(request, f'{filed} reading(s) filed on retry.')
+        return redirect('laboratory:analyzer_import_detail', import_id=batch.id)
+
+    context = {
+        'batch': batch,
+        'rows': batch.unmatched_results.all(),
+        'open_count': open_rows.count(),
+        'title': f'Analyzer Import: {batch.file_name}',
+    }
+    return render(request, 'laboratory/analyzer_import_detail.html', context)
+
+
 @login_required
 @permission_required('lab.view')
 def get_test_parameters(request, test_id):
@@ -1356,25 +1413,7 @@ def manual_test_result_entry(request, request_id):
             test_result.save()
 
             # Process dynamically added parameters from the form
-            parameter_ids = request.POST.getlist('parameter_ids[]')
-            for param_id in parameter_ids:
-                try:
-                    parameter = TestParameter.objects.get(id=param_id, test=test_result.test)
-                    value = request.POST.get(f'parameter_values[{param_id}]', '').strip()
-                    is_normal = request.POST.get(f'parameter_normal[{param_id}]', '') == 'true'
-                    notes = request.POST.get(f'parameter_notes[{param_id}]', '').strip()
-
-                    # Only create parameter if value is provided
-                    if value:
-                        TestResultParameter.objects.create(
-                            test_result=test_result,
-                            parameter=parameter,
-                            value=value,
-                            is_normal=is_normal,
-                            notes=notes
-                        )
-                except TestParameter.DoesNotExist:
-                    continue
+            save_parameters(test_result, _posted_parameters(request.POST))
 
             # Update test request status if it's still pending payment
             if test_request.status in ['pending', 'awaiting_payment']:
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 
 from ..models import AuthorizationCode, NHIAPatient
-from ..services import AUTHORIZABLE
+from ..services import AUTHORIZABLE, DATE_FIELDS
 
 
 class AuthorizationCodeSerializer(serializers.ModelSerializer):
@@ -85,14 +85,7 @@ KIND_LABELS = {
 }
 
 # Where each model keeps the date the request was raised.
-KIND_DATE_FIELDS = {
-    'consultation': 'consultation_date',
-    'referral': 'referral_date',
-    'prescription': 'prescription_date',
-    'laboratory': 'request_date',
-    'radiology': 'order_date',
-    'surgery': 'scheduled_date',
-}
+KIND_DATE_FIELDS = DATE_FIELDS
 
 
 def describe(kind, item):
@@ -112,7 +105,8 @@ def describe(kind, item):
     return KIND_LABELS.get(kind, kind)
 
 
-def pending_row(kind, item):
+def pending_row(kind, item, amount=None):
+    """`amount` is the queue's stored estimate, when the caller has it."""
     from ..services import estimated_amount
 
     date_field = KIND_DATE_FIELDS.get(kind)
@@ -125,6 +119,6 @@ def pending_row(kind, item):
         'patient_number': item.patient.patient_id,
         'description': describe(kind, item),
         'requested_on': getattr(item, date_field, None) if date_field else None,
-        'estimated_amount': estimated_amount(kind, item),
+        'estimated_amount': amount if amount is not None else estimated_amount(kind, item),
         'authorization_status': item.authorization_status,
     }
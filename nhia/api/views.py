@@ -22,7 +22,7 @@ from ..models import AuthorizationCode, NHIAPatient
 from ..services import (
     AUTHORIZABLE, AuthorizationError, authorize, cancel_code,
     expire_stale_codes, issue_code, model_for, pending_counts,
-    pending_queryset,
+    pending_queryset, waiting,
 )
 from .serializers import (
     AuthorizationCodeSerializer, NHIAPatientSerializer, PendingItemSerializer,
@@ -187,7 +187,13 @@ class PendingAuthorizationView(APIView):
                 return _error(e)
             if patient:
                 queryset = queryset.filter(patient_id=patient)
-            rows.extend(pending_row(kind, item) for item in queryset[:100])
+            items = list(queryset[:100])
+            amounts = dict(
+                waiting(kind)
+                .filter(object_id__in=[item.pk for item in items])
+                .values_list('object_id', 'amount')
+            )
+            rows.extend(pending_row(kind, item, amounts.get(item.pk)) for item in items)
 
         # Undated rows sort last rather than blowing up the comparison.
         rows.sort(key=lambda row: row['requested_on'] or OLDEST, reverse=True)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class NhiaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'nhia'
+
+    def ready(self):
+        import nhia.signals  # noqa: F401
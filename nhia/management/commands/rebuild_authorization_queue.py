@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from nhia.models import AuthorizationRequest
+from nhia.services import AUTHORIZABLE, QUEUE_STATUSES, model_for, sync_request
+
+
+class Command(BaseCommand):
+    help = (
+        'Re-sync the desk-office authorization queue from the six modules '
+        '(after bulk imports or raw updates, and to refresh estimates)'
+    )
+
+    def handle(self, *args, **options):
+        for kind in AUTHORIZABLE:
+            model = model_for(kind)
+            items = model.all_objects.filter(
+                requires_authorization=True, authorization_status__in=QUEUE_STATUSES
+            ).select_related('patient')
+            synced = 0
+            for item in items.iterator(chunk_size=500):
+                sync_request(kind, item)
+                synced += 1
+            # Rows whose source no longer needs a code, or is gone.
+            stale = AuthorizationRequest.all_objects.filter(kind=kind).exclude(
+                object_id__in=items.values('pk')
+            ).delete()[0]
+            self.stdout.write(self.style.SUCCESS(
+                f'{kind}: {synced} synced, {stale} stale rows removed'
+            ))
@@ -0,0 +1,42 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhia', '0007_alter_authorizationcode_code_and_more'),
+        ('patients', '0030_alter_patient_id_document'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorizationRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('consultation', 'Consultation'), ('referral', 'Referral'), ('prescription', 'Prescription'), ('laboratory', 'Lab request'), ('radiology', 'Radiology order'), ('surgery', 'Surgery')], max_length=20)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('status', models.CharField(choices=[('required', 'Required'), ('pending', 'Pending Authorization'), ('authorized', 'Authorized'), ('rejected', 'Rejected')], default='required', max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, help_text='Estimated amount the code should cover', max_digits=12)),
+                ('requested_at', models.DateTimeField(blank=True, null=True)),
+                ('authorized_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('authorization_code', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requests', to='nhia.authorizationcode')),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='authorization_requests', to='patients.patient')),
+            ],
+            options={
+                'verbose_name': 'Authorization Request',
+                'verbose_name_plural': 'Authorization Requests',
+                'ordering': ['-requested_at'],
+                'indexes': [models.Index(fields=['hospital', 'status', 'kind', 'requested_at'], name='idx_authreq_queue'), models.Index(fields=['hospital', 'status', 'authorized_at'], name='idx_authreq_authorized')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='authorizationrequest',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='uniq_authreq_source'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+from django.db import migrations
+
+# kind: (app_label, model, date field, default estimate). Estimates here are
+# the flat defaults; `manage.py rebuild_authorization_queue` recomputes them
+# from the items themselves.
+SOURCES = {
+    "consultation": ("consultations", "Consultation", "consultation_date", 5000),
+    "referral": ("consultations", "Referral", "referral_date", 10000),
+    "prescription": ("pharmacy", "Prescription", "prescription_date", 0),
+    "laboratory": ("laboratory", "TestRequest", "request_date", 0),
+    "radiology": ("radiology", "RadiologyOrder", "order_date", 0),
+    "surgery": ("theatre", "Surgery", "scheduled_date", 0),
+}
+STATUSES = ("required", "pending", "authorized", "rejected")
+
+
+def backfill(apps, schema_editor):
+    AuthorizationRequest = apps.get_model("nhia", "AuthorizationRequest")
+    for kind, (app_label, model_name, date_field, default) in SOURCES.items():
+        model = apps.get_model(app_label, model_name)
+        rows = model.objects.filter(
+            requires_authorization=True, authorization_status__in=STATUSES
+        ).values_list(
+            "pk", "hospital_id", "patient_id", "authorization_status",
+            "authorization_code_id", date_field,
+        )
+        AuthorizationRequest.objects.bulk_create(
+            [
+                AuthorizationRequest(
+                    kind=kind, object_id=pk, hospital_id=hospital_id,
+                    patient_id=patient_id, status=status, amount=default,
+                    authorization_code_id=code_id, requested_at=requested_at,
+                )
+                for pk, hospital_id, patient_id, status, code_id, requested_at in rows.iterator()
+            ],
+            batch_size=500,
+            ignore_conflicts=True,
+        )
+
+
+def unfill(apps, schema_editor):
+    apps.get_model("nhia", "AuthorizationRequest").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nhia', '0008_authorizationrequest'),
+        ('consultations', '0019_alter_consultingroom_room_number_and_more'),
+        ('laboratory', '0014_tenant_composite_indexes'),
+        ('pharmacy', '0038_tenant_composite_indexes'),
+        ('radiology', '0010_dicominstance'),
+        ('theatre', '0020_alter_equipmentmaintenancelog_document_file'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, unfill),
+    ]
@@ -112,4 +112,55 @@ class AuthorizationCode(TenantModel):
                 condition=models.Q(hospital__isnull=True),
                 name="uniq_authorization_code_when_no_hospital",
             ),
-        ]
\ No newline at end of file
+        ]
+
+class AuthorizationRequest(TenantModel):
+    """One item waiting on (or dealt with by) the desk office, whichever module
+    it lives in.
+
+    A mirror, not a source of truth: written by nhia.signals whenever one of
+    the six authorizable models is saved (after its
+    check_authorization_requirement has run), so the dashboard counts and
+    lists come off one indexed table instead of six.
+    """
+    KIND_CHOICES = (
+        ('consultation', 'Consultation'),
+        ('referral', 'Referral'),
+        ('prescription', 'Prescription'),
+        ('laboratory', 'Lab request'),
+        ('radiology', 'Radiology order'),
+        ('surgery', 'Surgery'),
+    )
+    STATUS_CHOICES = (
+        ('required', 'Required'),
+        ('pending', 'Pending Authorization'),
+        ('authorized', 'Authorized'),
+        ('rejected', 'Rejected'),
+    )
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='authorization_requests')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='required')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=0, help_text="Estimated amount the code should cover")
+    requested_at = models.DateTimeField(null=True, blank=True)
+    authorization_code = models.ForeignKey(
+        AuthorizationCode, on_delete=models.SET_NULL, null=True, blank=True, related_name='requests'
+    )
+    authorized_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.object_id} ({self.get_status_display()})"
+
+    class Meta:
+        verbose_name = "Authorization Request"
+        verbose_name_plural = "Authorization Requests"
+        ordering = ['-requested_at']
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='uniq_authreq_source'),
+        ]
+        indexes = [
+            models.Index(fields=['hospital', 'status', 'kind', 'requested_at'], name='idx_authreq_queue'),
+            models.Index(fields=['hospital', 'status', 'authorized_at'], name='idx_authreq_authorized'),
+        ]
@@ -5,15 +5,23 @@ laboratory, radiology and theatre all carry `requires_authorization`,
 `authorization_status` and an `authorization_code` FK — so issuing a code and
 attaching it to the thing that was waiting is one operation here rather than
 six copies.
+
+The desk office's queue is AuthorizationRequest: one row per item that
+needs (or needed) a code, kept in step with the source row by nhia.signals.
+Counts, lists and bulk authorization run off that one indexed table.
 """
+import logging
 import random
 import string
 from decimal import Decimal, InvalidOperation
 
 from django.db import transaction
+from django.db.models import Count
 from django.utils import timezone
 
-from .models import AuthorizationCode
+from .models import AuthorizationCode, AuthorizationRequest, NHIAPatient
+
+logger = logging.getLogger(__name__)
 
 # What is waiting, by the name the API and the dashboard use for it.
 # (model path, the code's service_type, a default amount when none is given)
@@ -28,6 +36,18 @@ AUTHORIZABLE = {
 
 # Statuses that mean "the desk office has not dealt with this yet".
 PENDING_STATUSES = ("required", "pending")
+# Statuses mirrored into AuthorizationRequest; "not_required" drops the row.
+QUEUE_STATUSES = PENDING_STATUSES + ("authorized", "rejected")
+
+# Where each model keeps the date the request was raised.
+DATE_FIELDS = {
+    "consultation": "consultation_date",
+    "referral": "referral_date",
+    "prescription": "prescription_date",
+    "laboratory": "request_date",
+    "radiology": "order_date",
+    "surgery": "scheduled_date",
+}
 
 
 class AuthorizationError(Exception):
@@ -162,22 +182,159 @@ def authorize(kind, item, user, amount=None, expiry_days=30, notes="", code=None
     return auth_code
 
 
+def sync_request(kind, item):
+    """Bring the queue row for `item` in line with its authorization fields.
+
+    Called after every save of an authorizable model. The estimate is only
+    recomputed while the item is waiting; after that it is history.
+    """
+    status = item.authorization_status if item.requires_authorization else None
+    queue = AuthorizationRequest.all_objects.filter(kind=kind, object_id=item.pk)
+    if status not in QUEUE_STATUSES:
+        queue.delete()
+        return None
+
+    row = queue.first() or AuthorizationRequest(kind=kind, object_id=item.pk)
+    row.hospital_id = item.hospital_id
+    row.patient_id = item.patient_id
+    row.status = status
+    row.requested_at = getattr(item, DATE_FIELDS[kind], None)
+    row.authorization_code_id = item.authorization_code_id
+    if status in PENDING_STATUSES:
+        row.amount = estimated_amount(kind, item)
+        row.authorized_at = None
+    elif status == "authorized" and row.authorized_at is None:
+        row.authorized_at = timezone.now()
+    row.save()
+    return row
+
+
+def waiting(kind=None):
+    """Queue rows still waiting on the desk office (tenant-scoped)."""
+    rows = AuthorizationRequest.objects.filter(status__in=PENDING_STATUSES)
+    return rows.filter(kind=kind) if kind else rows
+
+
 def pending_queryset(kind):
     """Items of one kind still waiting on the desk office."""
     model = model_for(kind)
     return model.objects.filter(
-        requires_authorization=True,
-        authorization_status__in=PENDING_STATUSES,
+        pk__in=waiting(kind).values("object_id")
     ).select_related("patient")
 
 
 def pending_counts():
-    """How much is waiting, per kind, for the dashboard."""
-    counts = {kind: pending_queryset(kind).count() for kind in AUTHORIZABLE}
+    """How much is waiting, per kind, for the dashboard. One grouped query."""
+    counts = dict.fromkeys(AUTHORIZABLE, 0)
+    for row in waiting().values("kind").annotate(n=Count("id")).order_by():
+        counts[row["kind"]] = row["n"]
     counts["total"] = sum(counts.values())
     return counts
 
 
+def bulk_authorize(kind, item_ids, user, expiry_days=30, notes=""):
+    """Issue and attach one code per waiting item in `item_ids`, set-based.
+
+    The per-item path (authorize) is a handful of queries per item; this is
+    a fixed number for the whole selection: lock the queue rows, check NHIA
+    cover for all their patients at once, bulk-insert the codes and
+    bulk-update the source rows and the queue. Items that are not waiting,
+    whose patient has no active NHIA cover, or with nothing to cover are
+    skipped. Returns the number authorized.
+
+    bulk_update skips save(), so what save() would have done is done here
+    once for the whole selection: `updated_at` is written with the rest, and
+    prescriptions are re-totalled in one UPDATE so each code covers the
+    script as it stands now.
+    """
+    model = model_for(kind)
+    service_type, default_amount = AUTHORIZABLE[kind][1], AUTHORIZABLE[kind][2]
+    expiry_date = timezone.now().date() + timezone.timedelta(days=int(expiry_days))
+    now = timezone.now()
+
+    with transaction.atomic():
+        rows = list(
+            waiting(kind)
+            .select_for_update()
+            .filter(object_id__in=item_ids, authorization_code__isnull=True)
+        )
+        covered = set(
+            NHIAPatient.objects.filter(
+                patient_id__in={r.patient_id for r in rows}, is_active=True
+            ).values_list("patient_id", flat=True)
+        )
+        rows = [r for r in rows if r.patient_id in covered]
+        if kind == "prescription" and rows:
+            _refresh_prescription_estimates(rows)
+        rows = [r for r in rows if (r.amount or default_amount) > 0]
+        if not rows:
+            return 0
+
+        strings = _unique_codes(len(rows))
+        AuthorizationCode.objects.bulk_create([
+            AuthorizationCode(
+                code=code,
+                hospital_id=row.hospital_id,
+                patient_id=row.patient_id,
+                service_type=service_type,
+                amount=row.amount or default_amount,
+                expiry_date=expiry_date,
+                status="active",
+                notes=f"Generated for {kind} #{row.object_id}. {notes}".strip(),
+                generated_by=user,
+            )
+            for code, row in zip(strings, rows)
+        ])
+        # Re-read rather than trust bulk_create to return keys (MySQL does not).
+        code_ids = dict(
+            AuthorizationCode.all_objects.filter(code__in=strings).values_list("code", "pk")
+        )
+
+        items = []
+        for code, row in zip(strings, rows):
+            row.authorization_code_id = code_ids[code]
+            row.status = "authorized"
+            row.authorized_at = now
+            items.append(model(
+                pk=row.object_id,
+                authorization_code_id=row.authorization_code_id,
+                authorization_status="authorized",
+                updated_at=now,
+            ))
+        model.all_objects.bulk_update(
+            items, ["authorization_code", "authorization_status", "updated_at"]
+        )
+        AuthorizationRequest.all_objects.bulk_update(
+            rows, ["authorization_code", "status", "authorized_at", "amount"]
+        )
+    return len(rows)
+
+
+def _refresh_prescription_estimates(rows):
+    """Re-total the selected prescriptions in one UPDATE and take the queue
+    amounts from the result."""
+    from pharmacy import prescription_summary
+    from pharmacy.models import Prescription
+
+    ids = [row.object_id for row in rows]
+    prescription_summary.refresh(ids)
+    totals = dict(
+        Prescription.all_objects.filter(pk__in=ids).values_list("pk", "total_prescribed_price")
+    )
+    for row in rows:
+        row.amount = totals.get(row.object_id, row.amount)
+
+
+def _unique_codes(n):
+    """`n` fresh code strings, checked against existing codes in one query."""
+    codes = set()
+    while len(codes) < n:
+        batch = {generate_code_string() for _ in range(n - len(codes))} - codes
+        taken = set(AuthorizationCode.all_objects.filter(code__in=batch).values_list("code", flat=True))
+        codes |= batch - taken
+    return list(codes)
+
+
 def cancel_code(auth_code):
     """Cancel an active code. Used codes stay used — that is the audit trail."""
     if auth_code.status != "active":
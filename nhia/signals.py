@@ -0,0 +1,103 @@
+"""Keep AuthorizationRequest in step with the six authorizable models.
+
+Each model decides whether it needs a code in check_authorization_requirement,
+which its save() runs; post_save then mirrors the outcome into the queue.
+Writes that bypass save() (queryset.update, bulk_update) must call
+services.sync_request themselves, as bulk_authorize does, or be repaired
+with `manage.py rebuild_authorization_queue`.
+"""
+import logging
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from .models import AuthorizationRequest
+from .services import AUTHORIZABLE, DATE_FIELDS, sync_request
+
+logger = logging.getLogger(__name__)
+
+# A save limited to other columns (a status change, a note) cannot change
+# the queue row; skip the sync and its estimate.
+_QUEUE_FIELDS = {"requires_authorization", "authorization_status", "authorization_code", "patient"}
+
+
+def _sync(kind, item):
+    try:
+        sync_request(kind, item)
+    except Exception:  # noqa: BLE001 - the clinical save must not fail on the queue
+        logger.exception("Authorization queue sync failed for %s #%s", kind, item.pk)
+
+
+def _saved(kind):
+    def handler(sender, instance, update_fields=None, **kwargs):
+        if kwargs.get("raw"):
+            return
+        if update_fields is not None and not (
+            set(update_fields) & (_QUEUE_FIELDS | {DATE_FIELDS[kind]})
+        ):
+            return
+        _sync(kind, instance)
+    return handler
+
+
+def _deleted(kind):
+    def handler(sender, instance, **kwargs):
+        AuthorizationRequest.all_objects.filter(kind=kind, object_id=instance.pk).delete()
+    return handler
+
+
+# weak=False: the handlers are closures nothing else holds on to.
+for _kind, (_path, _service_type, _default) in AUTHORIZABLE.items():
+    _model = apps.get_model(_path)
+    post_save.connect(_saved(_kind), sender=_model, weak=False, dispatch_uid=f"authreq-save-{_kind}")
+    post_delete.connect(_deleted(_kind), sender=_model, weak=False, dispatch_uid=f"authreq-delete-{_kind}")
+
+
+def _lab_tests_changed(sender, instance, action, **kwargs):
+    """The estimate for a lab request is the tests on it, added after save."""
+    if action in ("post_add", "post_remove", "post_clear") and getattr(instance, "requires_authorization", False):
+        _sync("laboratory", instance)
+
+
+def _prescription_item_changed(sender, instance, **kwargs):
+    """Likewise a prescription's estimate is its items.
+
+    The prescription is re-estimated once, when the transaction commits,
+    rather than after each item: a script written item by item would
+    otherwise re-total itself once per item. By then the summary columns the
+    estimate reads have been refreshed too.
+    """
+    if kwargs.get("raw"):
+        return
+    prescription = getattr(instance, "prescription", None)
+    if prescription is None or not prescription.requires_authorization:
+        return
+    if getattr(prescription, "_authreq_resync", False):
+        return
+    prescription._authreq_resync = True
+
+    def resync():
+        prescription._authreq_resync = False
+        current = prescription.__class__.all_objects.filter(pk=prescription.pk).first()
+        if current is not None:
+            _sync("prescription", current)
+
+    transaction.on_commit(resync)
+
+
+m2m_changed.connect(
+    _lab_tests_changed,
+    sender=apps.get_model("laboratory.TestRequest").tests.through,
+    dispatch_uid="authreq-lab-tests",
+)
+post_save.connect(
+    _prescription_item_changed,
+    sender=apps.get_model("pharmacy.PrescriptionItem"),
+    dispatch_uid="authreq-rx-item-save",
+)
+post_delete.connect(
+    _prescription_item_changed,
+    sender=apps.get_model("pharmacy.PrescriptionItem"),
+    dispatch_uid="authreq-rx-item-delete",
+)
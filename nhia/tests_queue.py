@@ -0,0 +1,159 @@
+"""The desk-office queue: AuthorizationRequest mirrors the six modules, and the
+dashboard and bulk authorization run off it."""
+from decimal import Decimal
+
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import CustomUser, Department
+from consultations.models import Consultation, ConsultingRoom, Referral
+from laboratory.models import Test, TestCategory, TestRequest
+from nhia.models import AuthorizationCode, AuthorizationRequest, NHIAPatient
+from nhia.services import authorize, bulk_authorize, pending_counts
+from patients.models import Patient
+from pharmacy.models import Medication, MedicationCategory, Prescription, PrescriptionItem
+
+
+class AuthorizationQueueTest(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_superuser(
+            phone_number="08014000101", username="deskqueue", password="pw12345",
+        )
+        self.patient = self._patient("Ngozi", "NHIA-0101")
+        department, _ = Department.objects.get_or_create(name="General Medicine")
+        self.room = ConsultingRoom.objects.create(
+            room_number="Q1", floor="1", department=department,
+        )
+
+    def _patient(self, first_name, nhia_number=None):
+        patient = Patient.objects.create(
+            first_name=first_name, last_name="Obi", date_of_birth="1988-03-03",
+            gender="F", address="7 Scheme Road", city="Aba", state="Abia",
+            patient_type="nhia" if nhia_number else "regular",
+        )
+        if nhia_number:
+            NHIAPatient.objects.create(patient=patient, nhia_reg_number=nhia_number)
+        return patient
+
+    def _consultation(self, patient=None):
+        return Consultation.objects.create(
+            patient=patient or self.patient, doctor=self.user,
+            consulting_room=self.room, chief_complaint="Headache",
+        )
+
+    def test_saving_an_item_that_needs_a_code_queues_it(self):
+        consultation = self._consultation()
+        row = AuthorizationRequest.objects.get(kind="consultation", object_id=consultation.pk)
+        self.assertEqual((row.status, row.patient_id), ("required", self.patient.pk))
+        self.assertEqual(row.amount, Decimal("5000.00"))
+        self.assertEqual(row.requested_at, consultation.consultation_date)
+
+        # No NHIA cover: nothing to authorize, nothing queued.
+        self._consultation(self._patient("Emeka"))
+        self.assertEqual(AuthorizationRequest.objects.count(), 1)
+
+    def test_authorizing_moves_the_row_out_of_the_pending_counts(self):
+        consultation = self._consultation()
+        Referral.objects.create(
+            patient=self.patient, referring_doctor=self.user, reason="Opinion",
+            requires_authorization=True, authorization_status="required",
+        )
+        self.assertEqual(pending_counts()["total"], 2)
+
+        code = authorize("consultation", consultation, self.user)
+        row = AuthorizationRequest.objects.get(kind="consultation", object_id=consultation.pk)
+        self.assertEqual((row.status, row.authorization_code), ("authorized", code))
+        self.assertIsNotNone(row.authorized_at)
+        self.assertEqual(pending_counts(), {**pending_counts(), "consultation": 0, "total": 1})
+
+    def test_lab_estimate_follows_the_tests_added_after_save(self):
+        category = TestCategory.objects.create(name="Chemistry")
+        test = Test.objects.create(name="FBC", category=category, price=Decimal("3500.00"))
+        request = TestRequest.objects.create(
+            patient=self.patient, doctor=self.user,
+            requires_authorization=True, authorization_status="required",
+        )
+        request.tests.add(test)
+        row = AuthorizationRequest.objects.get(kind="laboratory", object_id=request.pk)
+        self.assertEqual(row.amount, Decimal("3500.00"))
+
+    def test_deleting_the_source_drops_the_row(self):
+        consultation = self._consultation()
+        consultation.delete()
+        self.assertFalse(AuthorizationRequest.objects.exists())
+
+    def test_bulk_authorize_is_set_based(self):
+        consultations = [self._consultation() for _ in range(4)]
+        fifth = self._consultation()
+        NHIAPatient.objects.filter(patient=self.patient).update(is_active=True)
+        ids = [c.pk for c in consultations] + [fifth.pk, 999999]
+
+        with self.assertNumQueries(9):
+            done = bulk_authorize("consultation", ids, self.user, notes="Bulk")
+        # The fifth shares the patient, so it is authorized too; 999999 is not queued.
+        self.assertEqual(done, 5)
+
+        for consultation in consultations:
+            consultation.refresh_from_db()
+            self.assertEqual(consultation.authorization_status, "authorized")
+            self.assertEqual(consultation.authorization_code.patient, self.patient)
+        self.assertEqual(AuthorizationCode.objects.count(), 5)
+        self.assertEqual(len(set(AuthorizationCode.objects.values_list("code", flat=True))), 5)
+        self.assertEqual(pending_counts()["total"], 0)
+        # Running it again finds nothing waiting.
+        self.assertEqual(bulk_authorize("consultation", ids, self.user), 0)
+
+    def test_prescription_items_are_estimated_once_and_bulk_authorized(self):
+        medication = Medication.objects.create(
+            name="Amoxicillin", category=MedicationCategory.objects.create(name="Antibiotic"),
+            dosage_form="capsule", strength="500mg", price=Decimal("40.00"),
+        )
+        prescription = Prescription.objects.create(patient=self.patient, doctor=self.user)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            for quantity in (10, 20, 30):
+                PrescriptionItem.objects.create(
+                    prescription=prescription, medication=medication, quantity=quantity,
+                )
+        # One re-estimate for the script, not one per item.
+        self.assertEqual(len([c for c in callbacks if c.__name__ == "resync"]), 1)
+        row = AuthorizationRequest.objects.get(kind="prescription", object_id=prescription.pk)
+        self.assertEqual(row.amount, Decimal("2400.00"))
+
+        # A price change the queue has not seen is picked up when authorizing.
+        Medication.objects.filter(pk=medication.pk).update(price=Decimal("50.00"))
+        stamped = Prescription.objects.get(pk=prescription.pk).updated_at
+        self.assertEqual(bulk_authorize("prescription", [prescription.pk], self.user), 1)
+        prescription.refresh_from_db()
+        self.assertEqual(prescription.authorization_status, "authorized")
+        self.assertGreater(prescription.updated_at, stamped)
+        self.assertEqual(prescription.authorization_code.amount, Decimal("3000.00"))
+
+    def test_bulk_authorize_skips_patients_without_active_cover(self):
+        consultation = self._consultation()
+        NHIAPatient.objects.filter(patient=self.patient).update(is_active=False)
+        self.assertEqual(bulk_authorize("consultation", [consultation.pk], self.user), 0)
+        consultation.refresh_from_db()
+        self.assertIsNone(consultation.authorization_code_id)
+
+    def test_dashboard_and_lists_render_from_the_queue(self):
+        self._consultation()
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("desk_office:authorization_dashboard"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["stats"]["consultations"], 1)
+        self.assertEqual(len(response.context["pending_consultations"]), 1)
+
+        response = self.client.get(reverse("desk_office:pending_consultations"))
+        self.assertEqual(response.context["total_pending"], 1)
+        self.assertEqual(response.context["nhia_count"], 1)
+
+    def test_bulk_view_authorizes_the_selection(self):
+        consultation = self._consultation()
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("desk_office:bulk_authorize_consultations"),
+            {"consultation_ids": [consultation.pk]},
+        )
+        self.assertEqual(response.status_code, 302)
+        consultation.refresh_from_db()
+        self.assertEqual(consultation.authorization_status, "authorized")
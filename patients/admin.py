@@ -1,7 +1,7 @@
 from django.contrib import admin, messages
 from django import forms
 from django.shortcuts import render, redirect
-from .models import Patient, MedicalHistory, Vitals, PatientWallet, WalletTransaction, SharedWallet, WalletMembership
+from .models import Patient, MedicalHistory, Vitals, PatientWallet, WalletTransaction, SharedWallet, WalletMembership, WalletBalanceSnapshot, PatientImport
 from nhia.models import NHIAPatient
 from .utils import merge_patients
 
@@ -142,6 +142,20 @@ class WalletTransactionAdmin(admin.ModelAdmin):
         return self.readonly_fields
 
 
+@admin.register(WalletBalanceSnapshot)
+class WalletBalanceSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['month', 'shared_wallet', 'patient_wallet', 'credits', 'debits', 'closing_balance']
+    list_filter = ['month']
+    readonly_fields = ['created_at']
+
+
+@admin.register(PatientImport)
+class PatientImportAdmin(admin.ModelAdmin):
+    list_display = ['file_name', 'source', 'status', 'rows_done', 'imported', 'rejected', 'created_at']
+    list_filter = ['status', 'source']
+    readonly_fields = ['rows_done', 'imported', 'rejected', 'created_at', 'started_at', 'heartbeat_at', 'finished_at']
+
+
 @admin.register(SharedWallet)
 class SharedWalletAdmin(admin.ModelAdmin):
     list_display = ['wallet_name', 'wallet_type', 'balance', 'is_active', 'created_at']
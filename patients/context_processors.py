@@ -60,7 +60,7 @@ def current_patient_context(request):
                     'address': patient.address,
                     'city': patient.city,
                     'state': patient.state,
-                    'photo_url': patient.get_profile_image_url(),
+                    'photo_url': patient.get_profile_thumbnail_url(),
                     'has_photo': patient.has_profile_image(),
                     'is_active': patient.is_active,
                     'registration_date': patient.registration_date,
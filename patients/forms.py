@@ -13,6 +13,37 @@ import datetime
 from saas.fields import TenantChoiceField
 
 
+def clean_special_characters(text, field_type='text'):
+    """
+    Clean special characters from text based on field type (also used by
+    the bulk importer, patients.importer)
+    """
+    if not text:
+        return text
+
+    # Define allowed characters based on field type
+    if field_type == 'name':
+        # Allow letters, spaces, hyphens, apostrophes, and periods
+        allowed_chars = r"[^a-zA-Z\s\-\.']"
+    elif field_type == 'location':
+        # Allow letters, spaces, hyphens, apostrophes, periods, and commas
+        allowed_chars = r"[^a-zA-Z\s\-\.',]"
+    else:  # text fields
+        # Allow most characters but remove potentially harmful ones
+        allowed_chars = r"[<>\"']"
+
+    # Remove disallowed characters
+    cleaned_text = re.sub(allowed_chars, '', text)
+    
+    # Remove leading/trailing whitespace
+    cleaned_text = cleaned_text.strip()
+    
+    # Replace multiple spaces with single space
+    cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
+    
+    return cleaned_text
+
+
 class PatientForm(forms.ModelForm):
     """
     Form for patient registration and editing
@@ -358,30 +389,7 @@ class PatientForm(forms.ModelForm):
         """
         Clean special characters from text based on field type
         """
-        if not text:
-            return text
-
-        # Define allowed characters based on field type
-        if field_type == 'name':
-            # Allow letters, spaces, hyphens, apostrophes, and periods
-            allowed_chars = r"[^a-zA-Z\s\-\.']"
-        elif field_type == 'location':
-            # Allow letters, spaces, hyphens, apostrophes, periods, and commas
-            allowed_chars = r"[^a-zA-Z\s\-\.',]"
-        else:  # text fields
-            # Allow most characters but remove potentially harmful ones
-            allowed_chars = r"[<>\"']"
-
-        # Remove disallowed characters
-        cleaned_text = re.sub(allowed_chars, '', text)
-        
-        # Remove leading/trailing whitespace
-        cleaned_text = cleaned_text.strip()
-        
-        # Replace multiple spaces with single space
-        cleaned_text = re.sub(r'\s+', ' ', cleaned_text)
-        
-        return cleaned_text
+        return clean_special_characters(text, field_type)
 
     def save(self, commit=True):
         patient = super().save(commit=False)
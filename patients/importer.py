@@ -0,0 +1,588 @@
+"""Bulk patient registration: CSV/XLSX files of patients into the register.
+
+A hospital moving off paper or another system brings tens or hundreds of
+thousands of patients at once. PatientForm and the post_save signals take
+them one at a time, several queries each. Here a file is read as a stream,
+`chunk_size` rows at a time, and every chunk is:
+
+- validated row by row as PatientForm would (required fields, names and
+  places stripped of stray characters, NCC phone numbers, a date of birth
+  neither in the future nor over 150 years ago), with the uniqueness checks
+  (patient ID, email, NHIA and retainership numbers) made in one query each
+  for the whole chunk;
+- given its patient IDs in a block: random candidates with the prefixes of
+  Patient._generate_patient_id, one query to drop those already taken;
+- written with bulk_create: the patients, their wallets (what the post_save
+  signal and create_patient_wallets would add) and the NHIAPatient or
+  RetainershipPatient row of nhia/retainership patients, in one transaction
+  that also advances the job's rows_done.
+
+So an interrupted import resumes after the last chunk that committed. Rows
+that fail go to the job's rejects file: `row` (the spreadsheet row, the
+header being 1) and `error`, then the row as it was. Fix them there and
+import that file; the two extra columns are ignored.
+
+Columns are matched by header, ignoring case and spacing. first_name,
+last_name, date_of_birth, gender, address, city and state are required; any
+other Patient field in OPTIONAL may be given, patient_id to keep a legacy
+number, nhia_reg_number / retainership_reg_number to keep a scheme number
+(otherwise one is allocated). Other columns are ignored.
+
+    job = create_job(upload, upload.name, user=request.user)
+    start(job)   # on a celery worker (PATIENT_IMPORT_ASYNC), else inline
+    run(job)     # what the task and `manage.py import_patients` call
+
+XLSX needs openpyxl; without it only CSV files can be imported.
+"""
+import csv
+import io
+import logging
+import os
+import random
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from core.validators import normalize_nigerian_phone, validate_nigerian_phone
+from nhia.models import NHIAPatient
+from nhia.utils import generate_nhia_reg_number
+from retainership.models import RetainershipPatient
+from retainership.utils import generate_retainership_reg_number
+
+from .forms import clean_special_characters
+from .models import Patient, PatientImport, PatientWallet
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+UPLOAD_EXTENSIONS = ("csv", "xlsx")
+# A running import whose last chunk committed longer ago than this has died
+# (worker killed, server restarted) and may be resumed.
+STALE_AFTER = timedelta(minutes=10)
+
+REQUIRED = ("first_name", "last_name", "date_of_birth", "gender", "address", "city", "state")
+OPTIONAL = (
+    "patient_id", "patient_type", "phone_number", "email", "marital_status",
+    "blood_group", "country", "postal_code", "occupation", "tribe", "lga",
+    "emergency_contact_name", "emergency_contact_relation", "emergency_contact_phone",
+    "allergies", "chronic_diseases", "current_medications", "insurance_provider",
+    "insurance_policy_number", "notes", "registration_date",
+    "nhia_reg_number", "retainership_reg_number",
+)
+# How PatientForm cleans each free-text field (forms.clean_special_characters).
+CLEANING = {
+    "first_name": "name", "last_name": "name", "emergency_contact_name": "name",
+    "city": "location", "state": "location", "country": "location",
+    "lga": "location", "tribe": "location",
+}
+DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+GENDERS = {"m": "M", "male": "M", "f": "F", "female": "F", "o": "O", "other": "O"}
+ID_PREFIXES = {"nhia": "4", "retainership": "3"}
+
+MAX_ROUNDS = 20
+
+
+class ImportFormatError(Exception):
+    """A file that cannot be read as a patient list at all."""
+
+
+class _Row:
+    """One data row: where it was, what it said, and the Patient it makes."""
+
+    __slots__ = ("number", "cells", "fields", "nhia", "retainership")
+
+    def __init__(self, number, cells, fields, nhia=None, retainership=None):
+        self.number = number
+        self.cells = cells
+        self.fields = fields
+        self.nhia = nhia
+        self.retainership = retainership
+
+
+def _column(header):
+    return "_".join(str(header or "").strip().lower().replace("-", " ").split())
+
+
+def _text(value):
+    if value is None:
+        return ""
+    # Spreadsheets hand numbers back as floats: 8012345678.0.
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(_text(value), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _choice(field, value):
+    value = value.lower()
+    for key, label in Patient._meta.get_field(field).choices:
+        if value in (key.lower(), label.lower()):
+            return key
+    return None
+
+
+def _clean(record):
+    """The Patient fields and scheme numbers of one row, or ValueError with
+    everything wrong with it."""
+    errors = []
+    fields = {}
+    values = {name: _text(record.get(name)) for name in REQUIRED + OPTIONAL}
+
+    for name in REQUIRED:
+        if not values[name]:
+            errors.append(f"{name} is required")
+
+    for name in REQUIRED + OPTIONAL:
+        value = values[name]
+        if not value or name in ("date_of_birth", "registration_date", "gender",
+                                 "patient_type", "marital_status", "blood_group",
+                                 "nhia_reg_number", "retainership_reg_number"):
+            continue
+        if name in ("phone_number", "emergency_contact_phone"):
+            try:
+                validate_nigerian_phone(value)
+            except ValidationError as exc:
+                errors.append(f"{name}: {exc.messages[0]}")
+                continue
+            value = normalize_nigerian_phone(value)
+        elif name == "email":
+            try:
+                validate_email(value)
+            except ValidationError:
+                errors.append(f"email: {value} is not a valid address")
+                continue
+        elif name != "patient_id":
+            value = clean_special_characters(value, CLEANING.get(name, "text"))
+            if not value and name in REQUIRED:
+                errors.append(f"{name} is required")
+                continue
+        max_length = Patient._meta.get_field(name).max_length
+        if max_length and len(value) > max_length:
+            errors.append(f"{name} is longer than {max_length} characters")
+            continue
+        fields[name] = value
+
+    if values["date_of_birth"]:
+        born = _date(record.get("date_of_birth"))
+        today = timezone.now().date()
+        if born is None:
+            errors.append("date_of_birth: use YYYY-MM-DD or DD/MM/YYYY")
+        elif born > today:
+            errors.append("Date of birth cannot be in the future")
+        elif today.year - born.year - ((today.month, today.day) < (born.month, born.day)) > 150:
+            errors.append("Patient age cannot exceed 150 years")
+        else:
+            fields["date_of_birth"] = born
+
+    if values["registration_date"]:
+        raw = record.get("registration_date")
+        registered = _date(raw)
+        if registered is None:
+            errors.append("registration_date: use YYYY-MM-DD or DD/MM/YYYY")
+        elif isinstance(raw, datetime):
+            fields["registration_date"] = raw if timezone.is_aware(raw) else timezone.make_aware(raw)
+        else:
+            fields["registration_date"] = timezone.make_aware(datetime.combine(registered, time()))
+
+    if values["gender"]:
+        gender = GENDERS.get(values["gender"].lower())
+        if gender is None:
+            errors.append(f"gender: {values['gender']} is not M, F or O")
+        else:
+            fields["gender"] = gender
+
+    for name in ("patient_type", "marital_status", "blood_group"):
+        if values[name]:
+            key = _choice(name, values[name])
+            if key is None:
+                errors.append(f"{name}: {values[name]} is not one of the choices")
+            else:
+                fields[name] = key
+    patient_type = fields.setdefault("patient_type", "regular")
+    fields.setdefault("country", "Nigeria")
+
+    nhia = values["nhia_reg_number"] or None
+    if nhia and patient_type != "nhia":
+        errors.append(f"nhia_reg_number given for a {patient_type} patient")
+    elif nhia and len(nhia) > NHIAPatient._meta.get_field("nhia_reg_number").max_length:
+        errors.append("nhia_reg_number is too long")
+
+    retainership = values["retainership_reg_number"] or None
+    if retainership and patient_type != "retainership":
+        errors.append(f"retainership_reg_number given for a {patient_type} patient")
+    elif retainership:
+        if retainership.isdigit() and 3000000000 <= int(retainership) <= 3999999999:
+            retainership = int(retainership)
+        else:
+            errors.append("retainership_reg_number must be 10 digits starting with 3")
+
+    if errors:
+        raise ValueError("; ".join(errors))
+    return fields, nhia, retainership
+
+
+# (what, label, the row's value, the values of them already registered)
+UNIQUE_CHECKS = (
+    ("patient_id", "Patient ID", lambda row: row.fields.get("patient_id"),
+     lambda job, values: Patient.all_objects.filter(patient_id__in=values)
+     .values_list("patient_id", flat=True)),
+    # Like PatientForm.clean_email: unique within the hospital.
+    ("email", "Email", lambda row: row.fields.get("email"),
+     lambda job, values: Patient.all_objects.filter(hospital_id=job.hospital_id, email__in=values)
+     .values_list("email", flat=True)),
+    ("nhia", "NHIA number", lambda row: row.nhia,
+     lambda job, values: NHIAPatient.all_objects.filter(nhia_reg_number__in=values)
+     .values_list("nhia_reg_number", flat=True)),
+    ("retainership", "Retainership number", lambda row: row.retainership,
+     lambda job, values: RetainershipPatient.all_objects.filter(retainership_reg_number__in=values)
+     .values_list("retainership_reg_number", flat=True)),
+)
+
+
+def _unique(job, rows, failed):
+    """Drop the rows reusing a number or email already registered, or taken
+    by an earlier row of the file."""
+    for _, label, value_of, registered in UNIQUE_CHECKS:
+        values = {value_of(row) for row in rows} - {None}
+        if not values:
+            continue
+        taken = set(registered(job, values))
+        kept = []
+        for row in rows:
+            value = value_of(row)
+            if value is None:
+                kept.append(row)
+            elif value in taken:
+                failed.append((row.number, row.cells, f"{label} {value} is already registered"))
+            else:
+                taken.add(value)
+                kept.append(row)
+        rows = kept
+    return rows
+
+
+def _block(need, candidate, registered, reserved):
+    """`need` new values from `candidate()`, none of them in `reserved` or
+    already registered: one query per round of candidates."""
+    found = []
+    for _ in range(MAX_ROUNDS):
+        wanted = need - len(found)
+        if wanted <= 0:
+            return found
+        batch = {candidate() for _ in range(wanted + wanted // 10 + 8)} - reserved - set(found)
+        batch -= set(registered(batch))
+        found.extend(list(batch)[:wanted])
+    if len(found) < need:
+        raise RuntimeError(f"Could not allocate {need} unique number(s)")
+    return found
+
+
+def _allocate(rows):
+    """Fill in the patient IDs and scheme numbers the file left blank."""
+    by_prefix = {}
+    for row in rows:
+        if not row.fields.get("patient_id"):
+            prefix = ID_PREFIXES.get(row.fields["patient_type"], "0")
+            by_prefix.setdefault(prefix, []).append(row)
+    reserved = {row.fields["patient_id"] for row in rows if row.fields.get("patient_id")}
+    for prefix, group in by_prefix.items():
+        ids = _block(
+            len(group),
+            lambda: prefix + f"{random.randint(0, 999999999):09d}",
+            lambda batch: Patient.all_objects.filter(patient_id__in=batch).values_list("patient_id", flat=True),
+            reserved,
+        )
+        for row, patient_id in zip(group, ids):
+            row.fields["patient_id"] = patient_id
+
+    group = [row for row in rows if row.fields["patient_type"] == "retainership" and row.retainership is None]
+    if group:
+        numbers = _block(
+            len(group),
+            generate_retainership_reg_number,
+            lambda batch: RetainershipPatient.all_objects.filter(retainership_reg_number__in=batch)
+            .values_list("retainership_reg_number", flat=True),
+            {row.retainership for row in rows if row.retainership},
+        )
+        for row, number in zip(group, numbers):
+            row.retainership = number
+
+    # NHIA numbers run in sequence (nhia.utils): continue it for the block.
+    group = [row for row in rows if row.fields["patient_type"] == "nhia" and row.nhia is None]
+    if group:
+        reserved = {row.nhia for row in rows if row.nhia}
+        serial = int(generate_nhia_reg_number())
+        numbers = []
+        while len(numbers) < len(group):
+            batch = [str(serial + n) for n in range(len(group) - len(numbers))]
+            serial += len(batch)
+            taken = set(NHIAPatient.all_objects.filter(nhia_reg_number__in=batch)
+                        .values_list("nhia_reg_number", flat=True))
+            numbers.extend(n for n in batch if n not in taken and n not in reserved)
+        for row, number in zip(group, numbers):
+            row.nhia = number
+
+
+def _create(job, rows):
+    """bulk_create the rows' patients, wallets and scheme registrations."""
+    hospital_id = job.hospital_id
+    patients = Patient.objects.bulk_create(
+        [Patient(hospital_id=hospital_id, **row.fields) for row in rows]
+    )
+    if any(patient.pk is None for patient in patients):
+        # MySQL does not hand back the new keys; patient_id is unique.
+        pks = dict(Patient.all_objects.filter(patient_id__in=[p.patient_id for p in patients])
+                   .values_list("patient_id", "pk"))
+        for patient in patients:
+            patient.pk = pks[patient.patient_id]
+    PatientWallet.objects.bulk_create(
+        [PatientWallet(hospital_id=hospital_id, patient=patient) for patient in patients]
+    )
+    NHIAPatient.objects.bulk_create([
+        NHIAPatient(hospital_id=hospital_id, patient=patient, nhia_reg_number=row.nhia)
+        for row, patient in zip(rows, patients) if row.fields["patient_type"] == "nhia"
+    ])
+    RetainershipPatient.objects.bulk_create([
+        RetainershipPatient(hospital_id=hospital_id, patient=patient, retainership_reg_number=row.retainership)
+        for row, patient in zip(rows, patients) if row.fields["patient_type"] == "retainership"
+    ])
+
+
+def _room(job):
+    """How many more patients the hospital's plan allows (None: no cap),
+    as saas.models.enforce_limit counts them."""
+    plan = job.hospital.plan if job.hospital_id else None
+    cap = getattr(plan, "max_patients", 0) if plan else 0
+    if not cap:
+        return None
+    return max(cap - Patient._base_manager.filter(hospital_id=job.hospital_id).count(), 0)
+
+
+def _write_chunk(job, columns, numbered):
+    """Validate and write one chunk; (rows imported, [(row, cells, error)])."""
+    failed = []
+    rows = []
+    for number, cells in numbered:
+        if not any(_text(cell) for cell in cells):
+            continue
+        record = {column: cell for column, cell in zip(columns, cells) if column}
+        try:
+            fields, nhia, retainership = _clean(record)
+        except ValueError as exc:
+            failed.append((number, cells, str(exc)))
+            continue
+        rows.append(_Row(number, cells, fields, nhia, retainership))
+
+    rows = _unique(job, rows, failed)
+    room = _room(job)
+    if room is not None and len(rows) > room:
+        for row in rows[room:]:
+            failed.append((row.number, row.cells, f"Plan limit reached for Patient ({job.hospital.plan.max_patients})"))
+        rows = rows[:room]
+    if not rows:
+        return 0, failed
+    _allocate(rows)
+    try:
+        with transaction.atomic():
+            _create(job, rows)
+        return len(rows), failed
+    except IntegrityError:
+        # Something was registered between the checks and the insert (the
+        # front desk, another import): go row by row so only that row fails.
+        imported = 0
+        for row in rows:
+            try:
+                with transaction.atomic():
+                    _create(job, [row])
+                imported += 1
+            except IntegrityError as exc:
+                failed.append((row.number, row.cells, f"Already registered: {exc}"))
+        return imported, failed
+
+
+class _Rejects:
+    """The job's rejects CSV. On resume the rows rejected after the last
+    committed chunk are dropped; that chunk is read again."""
+
+    def __init__(self, job, header):
+        self.name = job.rejects_file.name or f"patient_imports/rejects/import-{job.pk}-rejects.csv"
+        self.path = job.rejects_file.storage.path(self.name)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        kept = []
+        if job.rows_done and os.path.exists(self.path):
+            with open(self.path, newline="", encoding="utf-8") as stream:
+                kept = [
+                    line for line in islice(csv.reader(stream), 1, None)
+                    if line and line[0].isdigit() and int(line[0]) <= job.rows_done + 1
+                ]
+        with open(self.path, "w", newline="", encoding="utf-8") as stream:
+            writer = csv.writer(stream)
+            writer.writerow(["row", "error", *header])
+            writer.writerows(kept)
+        if job.rejects_file.name != self.name:
+            job.rejects_file.name = self.name
+            PatientImport.all_objects.filter(pk=job.pk).update(rejects_file=self.name)
+
+    def write(self, failed):
+        if not failed:
+            return
+        with open(self.path, "a", newline="", encoding="utf-8") as stream:
+            writer = csv.writer(stream)
+            for number, cells, error in sorted(failed, key=lambda item: item[0]):
+                writer.writerow([number, error, *("" if cell is None else cell for cell in cells)])
+
+
+def _table(job):
+    """The file's rows, header first, as lists of cells."""
+    extension = os.path.splitext(job.file_name)[1].lstrip(".").lower()
+    if extension == "xlsx":
+        try:
+            import openpyxl
+        except ImportError:
+            raise ImportFormatError(
+                "Reading .xlsx files needs openpyxl (pip install openpyxl); save the sheet as CSV instead."
+            )
+        with job.file.open("rb") as stream:
+            book = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+            try:
+                for cells in book.active.iter_rows(values_only=True):
+                    yield list(cells)
+            finally:
+                book.close()
+    elif extension == "csv":
+        with job.file.open("rb") as stream:
+            text = io.TextIOWrapper(stream.file, encoding="utf-8-sig", errors="replace", newline="")
+            try:
+                yield from csv.reader(text)
+            finally:
+                text.detach()
+    else:
+        raise ImportFormatError(f"Unsupported file type .{extension}; use {', '.join(UPLOAD_EXTENSIONS)}.")
+
+
+def _import(job, progress):
+    rows = _table(job)
+    header = next(rows, None)
+    if not header:
+        raise ImportFormatError("The file is empty.")
+    columns = [_column(cell) for cell in header]
+    columns = [column if column in REQUIRED + OPTIONAL else None for column in columns]
+    missing = [name for name in REQUIRED if name not in columns]
+    if missing:
+        raise ImportFormatError(f"Missing column(s): {', '.join(missing)}.")
+
+    rejects = _Rejects(job, header)
+    position = job.rows_done
+    rows = islice(rows, position, None)
+    while True:
+        chunk = list(islice(rows, job.chunk_size))
+        if not chunk:
+            break
+        numbered = [(position + n + 2, cells) for n, cells in enumerate(chunk)]
+        with transaction.atomic():
+            imported, failed = _write_chunk(job, columns, numbered)
+            rejects.write(failed)
+            position += len(chunk)
+            PatientImport.all_objects.filter(pk=job.pk).update(
+                rows_done=position,
+                imported=F("imported") + imported,
+                rejected=F("rejected") + len(failed),
+                heartbeat_at=timezone.now(),
+            )
+        # What the post_save signal does per patient, once per chunk.
+        cache.delete("ctx_all_patients")
+        job.rows_done = position
+        job.imported += imported
+        job.rejected += len(failed)
+        if progress:
+            progress(job)
+
+
+def resumable(job):
+    """Whether `job` may be (re)started: not finished, and not running
+    unless it has gone quiet for STALE_AFTER."""
+    if job.status in ("pending", "failed"):
+        return True
+    return job.status == "running" and (
+        job.heartbeat_at is None or job.heartbeat_at < timezone.now() - STALE_AFTER
+    )
+
+
+def run(job, progress=None):
+    """Import (or resume) `job` in this process. `progress(job)` is called
+    after each committed chunk. Returns the job as it ended."""
+    now = timezone.now()
+    claimed = PatientImport.all_objects.filter(
+        Q(status__in=("pending", "failed"))
+        | Q(status="running", heartbeat_at__lt=now - STALE_AFTER)
+        | Q(status="running", heartbeat_at__isnull=True),
+        pk=job.pk,
+    ).update(status="running", heartbeat_at=now, error="")
+    job.refresh_from_db()
+    if not claimed:
+        return job
+    if job.started_at is None:
+        job.started_at = now
+        PatientImport.all_objects.filter(pk=job.pk).update(started_at=now)
+
+    try:
+        _import(job, progress)
+    except Exception as exc:  # noqa: BLE001 - recorded on the job, resumable
+        if not isinstance(exc, ImportFormatError):
+            logger.exception("Patient import %s failed", job.pk)
+        PatientImport.all_objects.filter(pk=job.pk).update(
+            status="failed", error=str(exc), finished_at=timezone.now(),
+        )
+    else:
+        PatientImport.all_objects.filter(pk=job.pk).update(status="done", finished_at=timezone.now())
+    job.refresh_from_db()
+    return job
+
+
+def create_job(stream, file_name, user=None, source="upload", chunk_size=CHUNK_SIZE):
+    """Store the file and record a pending import of it (for the current
+    hospital, like any TenantModel)."""
+    job = PatientImport(
+        file_name=os.path.basename(file_name), source=source,
+        uploaded_by=user, chunk_size=chunk_size,
+    )
+    job.file.save(job.file_name, stream, save=False)
+    job.save()
+    return job
+
+
+def _enqueue(job_id):
+    from .tasks import run_patient_import
+
+    try:
+        run_patient_import.delay(job_id)
+    except Exception:  # noqa: BLE001 - broker down: the job waits, resumable
+        logger.exception("Could not queue patient import %s", job_id)
+
+
+def start(job):
+    """Run `job` on a celery worker once the current transaction commits,
+    or here and now when PATIENT_IMPORT_ASYNC is off."""
+    if getattr(settings, "PATIENT_IMPORT_ASYNC", False):
+        transaction.on_commit(lambda: _enqueue(job.pk))
+        return job
+    return run(job)
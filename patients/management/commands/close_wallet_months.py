@@ -0,0 +1,46 @@
+"""Snapshot the completed months of every wallet (WalletBalanceSnapshot).
+
+    python manage.py close_wallet_months                 # all hospitals
+    python manage.py close_wallet_months --hospital <subdomain>
+
+Schedule it nightly, or early each month. Statements never write snapshots:
+months this has not closed yet are summed from their transactions, so a late
+run only makes prints slower, never wrong. Safe to run twice at once.
+"""
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+
+from patients import wallet_analytics
+from patients.models import PatientWallet, SharedWallet, WalletTransaction
+
+
+class Command(BaseCommand):
+    help = "Write monthly balance snapshots for shared and patient wallets."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        transactions = WalletTransaction.all_objects.order_by()
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            transactions = transactions.filter(hospital=hospital)
+
+        # Only wallets that have transactions can have snapshots.
+        shared_ids = transactions.filter(shared_wallet__isnull=False).values("shared_wallet_id")
+        patient_ids = transactions.filter(patient_wallet__isnull=False).values("patient_wallet_id")
+        written = wallets = 0
+        for wallet in chain(
+            SharedWallet.all_objects.filter(pk__in=shared_ids).iterator(),
+            PatientWallet.all_objects.filter(pk__in=patient_ids).iterator(),
+        ):
+            written += wallet_analytics.close_months(wallet)
+            wallets += 1
+        self.stdout.write(self.style.SUCCESS(
+            f"{written} snapshot(s) written for {wallets} wallet(s)"
+        ))
@@ -0,0 +1,82 @@
+"""Bulk-register patients from a CSV or XLSX file.
+
+    python manage.py import_patients patients.csv --hospital <subdomain>
+    python manage.py import_patients patients.xlsx --chunk-size 1000
+    python manage.py import_patients --resume 12
+
+Each patient gets a wallet, and nhia/retainership patients their scheme
+registration, as if registered at the front desk; see patients.importer for
+the columns. Rows that cannot be imported are listed in the import's rejects
+file. An interrupted import (this command killed, or an upload whose worker
+died) carries on from its last committed chunk with --resume.
+"""
+import os
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from patients import importer
+from patients.models import PatientImport
+from saas.current import clear_current_hospital, set_current_hospital
+
+
+class Command(BaseCommand):
+    help = "Bulk-register patients, with wallets and NHIA/retainership rows, from a CSV/XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="CSV or XLSX file to import")
+        parser.add_argument("--hospital", help="Subdomain of the hospital the patients belong to")
+        parser.add_argument("--chunk-size", type=int, default=importer.CHUNK_SIZE, help="Rows per transaction")
+        parser.add_argument("--resume", type=int, metavar="IMPORT_ID", help="Carry on an interrupted import")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        if bool(options["path"]) == bool(options["resume"]):
+            raise CommandError("Give a file to import, or --resume IMPORT_ID")
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        if options["resume"]:
+            job = PatientImport.all_objects.filter(pk=options["resume"]).first()
+            if job is None:
+                raise CommandError(f"No patient import {options['resume']}")
+            if not importer.resumable(job):
+                raise CommandError(f"Import {job.pk} is {job.get_status_display().lower()}; nothing to resume")
+            self.stdout.write(f"{job.file_name}: resuming after row {job.rows_done + 1}")
+        else:
+            path = options["path"]
+            extension = os.path.splitext(path)[1].lstrip(".").lower()
+            if extension not in importer.UPLOAD_EXTENSIONS:
+                raise CommandError(f"Unsupported file type .{extension}")
+            if not os.path.isfile(path):
+                raise CommandError(f"{path} does not exist")
+            hospital = None
+            if options["hospital"]:
+                hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+                if hospital is None:
+                    raise CommandError(f"No hospital '{options['hospital']}'")
+            set_current_hospital(hospital)
+            try:
+                with open(path, "rb") as stream:
+                    job = importer.create_job(
+                        File(stream), path, source="command", chunk_size=options["chunk_size"],
+                    )
+            finally:
+                clear_current_hospital()
+            self.stdout.write(f"{job.file_name}: import {job.pk}")
+
+        job = importer.run(job, progress=self._progress)
+        message = f"{job.file_name}: {job.imported} imported, {job.rejected} rejected"
+        if job.status == "failed":
+            raise CommandError(
+                f"{job.file_name}: {job.error} (committed through row {job.rows_done + 1}; "
+                f"resume with --resume {job.pk})"
+            )
+        if job.rejected:
+            self.stdout.write(self.style.WARNING(f"{message}; rejects in {job.rejects_file.path}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(message))
+
+    def _progress(self, job):
+        self.stdout.write(f"  {job.rows_done} row(s) read: {job.imported} imported, {job.rejected} rejected")
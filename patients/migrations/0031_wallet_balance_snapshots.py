@@ -0,0 +1,48 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('patients', '0030_alter_patient_id_document'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WalletBalanceSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('credits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('debits', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('credit_count', models.PositiveIntegerField(default=0)),
+                ('debit_count', models.PositiveIntegerField(default=0)),
+                ('closing_balance', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('patient_wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='patients.patientwallet')),
+                ('shared_wallet', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='balance_snapshots', to='patients.sharedwallet')),
+            ],
+            options={
+                'verbose_name': 'Wallet Balance Snapshot',
+                'verbose_name_plural': 'Wallet Balance Snapshots',
+                'ordering': ['-month'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='walletbalancesnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('shared_wallet__isnull', False)), fields=('shared_wallet', 'month'), name='uniq_wallet_snapshot_shared_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='walletbalancesnapshot',
+            constraint=models.UniqueConstraint(condition=models.Q(('patient_wallet__isnull', False)), fields=('patient_wallet', 'month'), name='uniq_wallet_snapshot_patient_month'),
+        ),
+        migrations.AddConstraint(
+            model_name='walletbalancesnapshot',
+            constraint=models.CheckConstraint(check=models.Q(('shared_wallet__isnull', True), ('patient_wallet__isnull', True), _connector='XOR'), name='wallet_snapshot_one_wallet'),
+        ),
+    ]
@@ -444,6 +444,15 @@ class Patient(TenantModel):
         """
         return self.photo.url if self.photo else None
 
+    def get_profile_thumbnail_url(self, size="thumb"):
+        """
+        URL of a downscaled copy of the profile image, for lists and headers.
+        Returns None if no image is available.
+        """
+        from core.thumbnails import thumbnail_url
+
+        return thumbnail_url(self.photo, size) if self.photo else None
+
     def has_profile_image(self):
         """
         Check if the patient has a profile image available.
@@ -1150,87 +1159,9 @@ class PatientWallet(TenantModel):
 
     def get_transaction_statistics(self):
         """Get comprehensive transaction statistics"""
-        from django.db.models import Sum, Count
-
-        # Credit transactions
-        credit_types = [
-            "credit",
-            "deposit",
-            "refund",
-            "transfer_in",
-            "adjustment",
-            "insurance_claim",
-            "bonus",
-            "cashback",
-            "reversal",
-        ]
-
-        # Debit transactions
-        debit_types = [
-            "debit",
-            "withdrawal",
-            "payment",
-            "transfer_out",
-            "admission_fee",
-            "daily_admission_charge",
-            "lab_test_payment",
-            "pharmacy_payment",
-            "consultation_fee",
-            "procedure_fee",
-            "penalty_fee",
-            "discount_applied",
-        ]
-
-        stats = {}
+        from .wallet_analytics import transaction_statistics
 
-        # Overall statistics
-        stats["total_credits"] = self.transactions.filter(
-            transaction_type__in=credit_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        stats["total_debits"] = self.transactions.filter(
-            transaction_type__in=debit_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        # Category-wise statistics
-        stats["by_category"] = {}
-
-        # Medical Services
-        medical_types = [
-            "consultation_fee",
-            "procedure_fee",
-            "lab_test_payment",
-            "pharmacy_payment",
-        ]
-        stats["by_category"]["medical_services"] = self.transactions.filter(
-            transaction_type__in=medical_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        # Hospital Services
-        hospital_types = ["admission_fee", "daily_admission_charge"]
-        stats["by_category"]["hospital_services"] = self.transactions.filter(
-            transaction_type__in=hospital_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        # Transfers
-        transfer_types = ["transfer_in", "transfer_out"]
-        stats["by_category"]["transfers"] = self.transactions.filter(
-            transaction_type__in=transfer_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        # Deposits & Withdrawals
-        deposit_types = ["deposit", "withdrawal"]
-        stats["by_category"]["deposits_withdrawals"] = self.transactions.filter(
-            transaction_type__in=deposit_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        # Refunds & Adjustments
-        adjustment_types = ["refund", "adjustment", "reversal"]
-        stats["by_category"]["adjustments"] = self.transactions.filter(
-            transaction_type__in=adjustment_types
-        ).aggregate(total=Sum("amount"), count=Count("id"))
-
-        return stats
+        return transaction_statistics(self.transactions.all())
 
     def transfer_to(self, recipient_wallet, amount, description="Transfer", user=None):
         """Transfer funds to another wallet atomically"""
@@ -1354,7 +1285,7 @@ class PatientWallet(TenantModel):
             # Get all active admissions for this patient
             active_admissions = Admission.objects.filter(
                 patient=self.patient, status="admitted"
-            )
+            ).select_related("ledger", "patient__nhia_info", "bed__ward")
 
             # Calculate outstanding admission costs
             admission_outstanding = sum(
@@ -1665,6 +1596,63 @@ class WalletTransaction(TenantModel):
         ]
 
 
+class WalletBalanceSnapshot(TenantModel):
+    """Totals and closing balance of one wallet for one completed calendar month.
+
+    Written by patients.wallet_analytics.close_months; statements over any date
+    range start from the nearest snapshot instead of re-reading the wallet's
+    whole transaction history.
+    """
+
+    shared_wallet = models.ForeignKey(
+        SharedWallet,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+        null=True,
+        blank=True,
+    )
+    patient_wallet = models.ForeignKey(
+        PatientWallet,
+        on_delete=models.CASCADE,
+        related_name="balance_snapshots",
+        null=True,
+        blank=True,
+    )
+    month = models.DateField(help_text="First day of the month")
+    credits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    debits = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    credit_count = models.PositiveIntegerField(default=0)
+    debit_count = models.PositiveIntegerField(default=0)
+    closing_balance = models.DecimalField(max_digits=14, decimal_places=2)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        wallet = self.shared_wallet or self.patient_wallet
+        return f"{wallet} - {self.month:%Y-%m}: ₦{self.closing_balance}"
+
+    class Meta:
+        verbose_name = "Wallet Balance Snapshot"
+        verbose_name_plural = "Wallet Balance Snapshots"
+        ordering = ["-month"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["shared_wallet", "month"],
+                condition=models.Q(shared_wallet__isnull=False),
+                name="uniq_wallet_snapshot_shared_month",
+            ),
+            models.UniqueConstraint(
+                fields=["patient_wallet", "month"],
+                condition=models.Q(patient_wallet__isnull=False),
+                name="uniq_wallet_snapshot_patient_month",
+            ),
+            models.CheckConstraint(
+                check=models.Q(shared_wallet__isnull=True)
+                ^ models.Q(patient_wallet__isnull=True),
+                name="wallet_snapshot_one_wallet",
+            ),
+        ]
+
+
 class NHIAPatientManager(TenantManager):
     def get_queryset(self):
         return super().get_queryset().filter(patient_type="nhia")
@@ -1825,3 +1813,49 @@ class PhysiotherapyRequest(TenantModel):
 
 class VaccinationRecord(TenantModel):
     """Model to track patient vaccinations"""
+
+
+class PatientImport(TenantModel):
+    """One bulk registration file (CSV/XLSX) and how far its import got.
+
+    patients.importer commits `rows_done` with each chunk it writes, so an
+    interrupted import resumes after the last committed row.
+    """
+
+    SOURCE_CHOICES = (
+        ("upload", "Upload"),
+        ("command", "Management command"),
+    )
+    STATUS_CHOICES = (
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    )
+
+    file = models.FileField(upload_to="patient_imports/")
+    file_name = models.CharField(max_length=255)
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default="upload")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    chunk_size = models.PositiveIntegerField(default=500)
+    rows_done = models.PositiveIntegerField(default=0, help_text="Data rows read and committed")
+    imported = models.PositiveIntegerField(default=0)
+    rejected = models.PositiveIntegerField(default=0)
+    rejects_file = models.FileField(upload_to="patient_imports/rejects/", blank=True)
+    error = models.TextField(blank=True)
+    uploaded_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="patient_imports",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Touched with every committed chunk; a running import that has gone
+    # quiet for importer.STALE_AFTER is taken to have died and may resume.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.file_name} ({self.get_status_display()})"
@@ -17,7 +17,7 @@ def patient_outstanding(patient):
             admission.get_outstanding_admission_cost()
             for admission in Admission.objects.filter(
                 patient=patient, status="admitted"
-            )
+            ).select_related("ledger", "patient__nhia_info", "bed__ward")
         ),
         Decimal("0.00"),
     )
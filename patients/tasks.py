@@ -0,0 +1,29 @@
+"""
+Celery tasks for patient registration.
+Bulk imports queued from the upload page run here, off the request.
+"""
+
+import logging
+from celery import shared_task
+
+from .models import PatientImport
+from . import importer
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def run_patient_import(job_id):
+    """
+    Run (or resume) one bulk patient import; see patients.importer.
+
+    Returns:
+        dict: The job's status and counts
+    """
+    job = PatientImport.all_objects.filter(pk=job_id).first()
+    if job is None:
+        logger.warning(f"Patient import {job_id} no longer exists")
+        return {'error': f'No patient import {job_id}'}
+    job = importer.run(job)
+    logger.info(f"Patient import {job.pk} {job.status}: {job.imported} imported, {job.rejected} rejected")
+    return {'status': job.status, 'imported': job.imported, 'rejected': job.rejected}
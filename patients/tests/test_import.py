@@ -0,0 +1,168 @@
+"""Bulk patient import (patients.importer).
+
+Pinned here: a file becomes patients with wallets and NHIA/retainership
+registrations, bad rows land in the rejects file with their row number, an
+interrupted import resumes after its last committed chunk, and the upload
+page and management command drive it.
+"""
+import csv
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from nhia.models import NHIAPatient
+from patients import importer
+from patients.models import Patient, PatientImport, PatientWallet
+from retainership.models import RetainershipPatient
+from saas.current import clear_current_hospital, set_current_hospital
+from saas.models import Hospital, Plan, Subscription
+
+HEADER = "First Name,Last Name,Date of Birth,Gender,Address,City,State,Patient Type,Phone Number,Email,Patient ID,NHIA Reg Number\n"
+
+
+def patient_list(*rows):
+    return (HEADER + "".join(row + "\n" for row in rows)).encode()
+
+
+class PatientImportTest(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def job(self, content, chunk_size=importer.CHUNK_SIZE, name="patients.csv"):
+        return importer.create_job(ContentFile(content), name, chunk_size=chunk_size)
+
+    def rejects(self, job):
+        with open(job.rejects_file.path, newline="", encoding="utf-8") as stream:
+            return list(csv.DictReader(stream))
+
+    def test_rows_become_patients_wallets_and_scheme_registrations(self):
+        Patient.objects.create(
+            first_name="Old", last_name="Timer", date_of_birth="1950-01-01", gender="M",
+            address="1 Old Road", city="Ibadan", state="Oyo", email="old@example.com",
+        )
+        job = importer.run(self.job(patient_list(
+            "Ada<>,Obi,1990-05-01,F,1 Marina,Lagos,Lagos,,+234 803 123 4567,,,",
+            "Musa,Bello,12/03/1985,male,2 Ahmadu Bello Way,Kaduna,Kaduna,NHIA,,,,",
+            "Ngozi,Eze,1970-01-01,F,3 Ring Road,Enugu,Enugu,nhia,,,,4999999001",
+            "Tunde,Ade,2001-07-07,M,4 Allen Avenue,Ikeja,Lagos,Retainership,,,,",
+            "Legacy,Number,1960-01-01,O,5 Broad Street,Lagos,Lagos,,,,HOSP-0001,",
+            ",Nameless,1990-01-01,F,6 Road,Lagos,Lagos,,,,,",
+            "Future,Child,2999-01-01,F,7 Road,Lagos,Lagos,,,,,",
+            "Same,Email,1990-01-01,F,8 Road,Lagos,Lagos,,,old@example.com,,",
+            "Again,Legacy,1990-01-01,F,9 Road,Lagos,Lagos,,,,HOSP-0001,",
+            "Bad,Phone,1990-01-01,X,10 Road,Lagos,Lagos,,12345,,,",
+        ), chunk_size=4))
+
+        assert (job.status, job.rows_done, job.imported, job.rejected) == ("done", 10, 5, 5), job.error
+        ada = Patient.objects.get(first_name="Ada")
+        assert (ada.phone_number, ada.country, ada.patient_type) == ("08031234567", "Nigeria", "regular")
+        assert ada.patient_id[0] == "0" and len(ada.patient_id) == 10
+        assert Patient.objects.get(last_name="Number").patient_id == "HOSP-0001"
+
+        musa = Patient.objects.get(first_name="Musa")
+        assert musa.patient_id.startswith("4") and str(musa.date_of_birth) == "1985-03-12"
+        assert NHIAPatient.objects.get(patient__first_name="Ngozi").nhia_reg_number == "4999999001"
+        assert NHIAPatient.objects.get(patient=musa).nhia_reg_number.startswith("4")
+        tunde = RetainershipPatient.objects.get(patient__first_name="Tunde")
+        assert 3000000000 <= tunde.retainership_reg_number <= 3999999999
+        assert tunde.patient.patient_id.startswith("3")
+        # One wallet per patient, as the post_save signal gives one.
+        assert PatientWallet.objects.filter(patient__in=Patient.objects.all()).count() == Patient.objects.count() == 6
+
+        rejects = self.rejects(job)
+        assert [r["row"] for r in rejects] == ["7", "8", "9", "10", "11"]
+        assert rejects[0]["error"] == "first_name is required"
+        assert rejects[1]["error"] == "Date of birth cannot be in the future"
+        assert rejects[2]["error"] == "Email old@example.com is already registered"
+        assert rejects[3]["error"] == "Patient ID HOSP-0001 is already registered"
+        assert "gender: X is not M, F or O" in rejects[4]["error"]
+        assert "phone_number:" in rejects[4]["error"]
+        assert rejects[4]["Last Name"] == "Phone"
+
+    def test_an_interrupted_import_resumes_after_its_last_chunk(self):
+        job = self.job(patient_list(*(
+            f"P{n},Resume,1990-01-01,F,{n} Road,Lagos,Lagos,,,,," if n != 2 else ",Resume,1990-01-01,F,2 Road,Lagos,Lagos,,,,,"
+            for n in range(1, 6)
+        )), chunk_size=2)
+
+        def die_after_first_chunk(job):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            importer.run(job, progress=die_after_first_chunk)
+        job.refresh_from_db()
+        assert (job.status, job.rows_done, job.imported, job.rejected) == ("running", 2, 1, 1)
+        # Still "running": only a stalled import may be picked up again.
+        assert not importer.resumable(job)
+        assert importer.run(job).rows_done == 2
+
+        PatientImport.objects.filter(pk=job.pk).update(
+            heartbeat_at=timezone.now() - importer.STALE_AFTER - timedelta(seconds=1),
+        )
+        out = StringIO()
+        call_command("import_patients", resume=job.pk, stdout=out)
+        job.refresh_from_db()
+        assert (job.status, job.rows_done, job.imported, job.rejected) == ("done", 5, 4, 1)
+        assert Patient.objects.filter(last_name="Resume").count() == 4
+        assert [r["row"] for r in self.rejects(job)] == ["3"]
+        assert "4 imported, 1 rejected" in out.getvalue()
+
+    def test_the_plan_cap_and_unreadable_files(self):
+        hospital = Hospital.objects.create(name="Capped", subdomain="capped")
+        Subscription.objects.create(
+            hospital=hospital, plan=Plan.objects.create(name="Tiny", max_patients=2),
+            status="active", current_period_end=timezone.now() + timedelta(days=30),
+        )
+        set_current_hospital(hospital)
+        self.addCleanup(clear_current_hospital)
+        job = importer.run(self.job(patient_list(*(
+            f"P{n},Capped,1990-01-01,F,{n} Road,Lagos,Lagos,,,,," for n in range(3)
+        ))))
+        assert (job.imported, job.rejected) == (2, 1)
+        assert set(Patient.all_objects.filter(last_name="Capped").values_list("hospital_id", flat=True)) == {hospital.pk}
+        assert self.rejects(job)[0]["error"].startswith("Plan limit reached")
+
+        job = importer.run(self.job(b"Name,Surname\nA,B\n"))
+        assert job.status == "failed"
+        assert "Missing column(s): first_name, last_name" in job.error
+
+    def test_upload_page_and_command(self):
+        user = CustomUser.objects.create_superuser(
+            phone_number="08016000501", username="importer", password="pw12345",
+        )
+        self.client.force_login(user)
+        self.assertContains(self.client.get("/patients/imports/"), "Import Patients")
+
+        upload = SimpleUploadedFile("legacy.csv", patient_list(
+            "Kemi,Upload,1990-01-01,F,1 Road,Lagos,Lagos,,,,,",
+            "Kemi,Upload,1990-01-01,F,1 Road,Lagos,Lagos,,,,,",
+            "Nope,Upload,1990-13-45,F,1 Road,Lagos,Lagos,,,,,",
+        ))
+        response = self.client.post("/patients/imports/", {"file": upload})
+        job = PatientImport.objects.get()
+        self.assertRedirects(response, f"/patients/imports/{job.pk}/")
+        assert (job.status, job.imported, job.rejected, job.uploaded_by) == ("done", 2, 1, user)
+        self.assertContains(self.client.get(f"/patients/imports/{job.pk}/"), "Download 1 rejected row")
+        rejects = self.client.get(f"/patients/imports/{job.pk}/rejects/")
+        assert b"date_of_birth: use YYYY-MM-DD or DD/MM/YYYY" in b"".join(rejects.streaming_content)
+
+        path = f"{tempfile.mkdtemp()}/more.csv"
+        self.addCleanup(shutil.rmtree, path.rsplit("/", 1)[0], ignore_errors=True)
+        with open(path, "wb") as stream:
+            stream.write(patient_list("Femi,Command,1990-01-01,M,1 Road,Lagos,Lagos,,,,,"))
+        out = StringIO()
+        call_command("import_patients", path, stdout=out)
+        assert "more.csv: 1 imported, 0 rejected" in out.getvalue()
+        assert PatientImport.objects.get(file_name="more.csv").source == "command"
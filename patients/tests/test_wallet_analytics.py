@@ -0,0 +1,160 @@
+"""Wallet statistics in one query, and statements built on monthly snapshots."""
+import io
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from patients import wallet_analytics
+from patients.models import (
+    Patient, PatientWallet, SharedWallet, WalletBalanceSnapshot, WalletTransaction,
+)
+
+User = get_user_model()
+
+
+def months_ago(n, day):
+    month = timezone.localdate().replace(day=1)
+    for _ in range(n):
+        month = (month - timedelta(days=1)).replace(day=1)
+    return month.replace(day=day)
+
+
+class WalletAnalyticsTest(TestCase):
+    def setUp(self):
+        self.patient = Patient.objects.create(
+            first_name="Kemi", last_name="Bello", date_of_birth="1985-05-05",
+            gender="F", address="2 Marina", city="Lagos", state="LA", patient_id="P4201",
+        )
+        self.wallet = PatientWallet.objects.get(patient=self.patient)
+        self.company = SharedWallet.objects.create(
+            wallet_name="Acme Staff", wallet_type="retainership",
+        )
+
+    def post(self, transaction_type, amount, day, wallet=None):
+        wallet = wallet or self.company
+        field = "shared_wallet" if isinstance(wallet, SharedWallet) else "patient_wallet"
+        txn = WalletTransaction.objects.create(
+            transaction_type=transaction_type, amount=Decimal(amount),
+            balance_after=Decimal("0"), description=transaction_type, **{field: wallet},
+        )
+        WalletTransaction.objects.filter(pk=txn.pk).update(
+            created_at=timezone.make_aware(datetime.combine(day, time(10)))
+        )
+        return txn
+
+    def brute_force(self, from_date, to_date):
+        rows = WalletTransaction.objects.filter(shared_wallet=self.company)
+        before = rows.filter(created_at__date__lt=from_date)
+        rows = rows.filter(created_at__date__gte=from_date, created_at__date__lte=to_date)
+
+        def net(qs):
+            return sum(t.amount if t.is_credit_transaction() else -t.amount for t in qs)
+
+        credits = sum(t.amount for t in rows if t.is_credit_transaction())
+        debits = sum(t.amount for t in rows if not t.is_credit_transaction())
+        return net(before), credits, debits, rows.count()
+
+    def test_statistics_in_one_query(self):
+        today = timezone.localdate()
+        for transaction_type, amount in (
+            ("deposit", "1000"), ("consultation_fee", "200"), ("pharmacy_payment", "50"),
+            ("admission_fee", "300"), ("refund", "25"), ("outstanding_admission_recovery", "5"),
+        ):
+            self.post(transaction_type, amount, today, wallet=self.wallet)
+        with self.assertNumQueries(1):
+            stats = self.wallet.get_transaction_statistics()
+        self.assertEqual(stats["total_transactions"], 6)
+        self.assertEqual(stats["total_credits"], {"total": Decimal("1025"), "count": 2})
+        # outstanding_admission_recovery was never in the debit buckets.
+        self.assertEqual(stats["total_debits"], {"total": Decimal("550"), "count": 3})
+        self.assertEqual(stats["by_category"]["medical_services"]["total"], Decimal("250"))
+        self.assertEqual(stats["by_category"]["hospital_services"]["count"], 1)
+        self.assertEqual(stats["by_category"]["transfers"], {"total": None, "count": 0})
+
+    def test_statement_matches_full_scan(self):
+        self.post("deposit", "5000", months_ago(3, 5))
+        self.post("admission_fee", "1200", months_ago(3, 20))
+        self.post("deposit", "2000", months_ago(2, 1))
+        self.post("pharmacy_payment", "300", months_ago(2, 15))
+        self.post("lab_test_payment", "150", months_ago(1, 28))
+        self.post("refund", "40", months_ago(0, 1))
+
+        self.assertEqual(wallet_analytics.close_months(self.company), 3)
+        closing = WalletBalanceSnapshot.objects.order_by("month").values_list(
+            "closing_balance", flat=True
+        )
+        self.assertEqual(list(closing), [Decimal("3800"), Decimal("5500"), Decimal("5350")])
+        self.assertEqual(wallet_analytics.close_months(self.company), 0)
+
+        today = timezone.localdate()
+        for from_date, to_date in (
+            (months_ago(3, 10), today),
+            (months_ago(3, 1), months_ago(1, 27)),
+            (months_ago(2, 2), months_ago(2, 20)),
+            (months_ago(2, 1), today),
+        ):
+            opening, credits, debits, count = self.brute_force(from_date, to_date)
+            summary = wallet_analytics.statement(self.company, from_date, to_date)
+            self.assertEqual(
+                (summary["opening_balance"], summary["credits"], summary["debits"],
+                 summary["transaction_count"]),
+                (opening, credits, debits, count),
+                (from_date, to_date),
+            )
+            self.assertEqual(summary["closing_balance"], opening + credits - debits)
+
+        everything = wallet_analytics.statement(self.company)
+        self.assertEqual(everything["closing_balance"], Decimal("5390"))
+
+    def test_statement_sums_open_months_without_writing(self):
+        self.post("deposit", "5000", months_ago(3, 5))
+        self.post("admission_fee", "1200", months_ago(2, 20))
+        self.post("pharmacy_payment", "300", months_ago(1, 15))
+        self.post("refund", "40", months_ago(0, 1))
+        today = timezone.localdate()
+
+        def check():
+            for from_date in (months_ago(3, 10), months_ago(2, 1), months_ago(1, 2)):
+                opening, credits, debits, count = self.brute_force(from_date, today)
+                summary = wallet_analytics.statement(self.company, from_date, today)
+                self.assertEqual(
+                    (summary["opening_balance"], summary["credits"], summary["debits"],
+                     summary["transaction_count"]),
+                    (opening, credits, debits, count),
+                    from_date,
+                )
+
+        check()
+        self.assertFalse(WalletBalanceSnapshot.objects.exists())
+        # The nightly run has only reached the oldest month: the rest is open.
+        self.assertEqual(wallet_analytics.close_months(self.company, months_ago(2, 1)), 1)
+        check()
+        self.assertEqual(WalletBalanceSnapshot.objects.count(), 1)
+
+    def test_print_views_and_command(self):
+        self.post("deposit", "800", months_ago(1, 3))
+        self.post("debit", "100", months_ago(0, 1))
+        call_command("close_wallet_months", stdout=io.StringIO())
+        self.assertEqual(WalletBalanceSnapshot.objects.filter(shared_wallet=self.company).count(), 1)
+
+        user = User.objects.create_superuser(
+            phone_number="08012000421", username="walletadmin", password="pw12345",
+        )
+        self.client.force_login(user)
+        url = reverse("retainership:print_wallet_transactions_html", args=[self.company.pk])
+        response = self.client.get(url, {"from_date": months_ago(0, 1).isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["opening_balance"], Decimal("800"))
+        self.assertEqual(response.context["closing_balance"], Decimal("700"))
+        self.assertEqual(response.context["transaction_count"], 1)
+
+        response = self.client.get(
+            reverse("retainership:print_wallet_transactions", args=[self.company.pk]),
+            {"from_date": "not-a-date"},
+        )
+        self.assertEqual(response["Content-Type"], "application/pdf")
@@ -15,6 +15,9 @@ urlpatterns = [
     path('', views.patient_list, name='list'),
     path('list/', views.patient_list, name='patient_list'),
     path('register/', views.register_patient, name='register'),
+    path('imports/', views.patient_imports, name='imports'),
+    path('imports/<int:import_id>/', views.patient_import_detail, name='import_detail'),
+    path('imports/<int:import_id>/rejects/', views.patient_import_rejects, name='import_rejects'),
     path('<int:patient_id>/', views.patient_detail, name='detail'),
     path('<int:patient_id>/edit/', views.edit_patient, name='edit'),
     path('<int:patient_id>/toggle-active/', views.toggle_patient_status, name='toggle_active'),
@@ -4,7 +4,7 @@ from django.contrib import messages
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q, Sum
 from django.core.paginator import Paginator
-from django.http import JsonResponse
+from django.http import FileResponse, Http404, JsonResponse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
@@ -19,6 +19,7 @@ from .models import (
     PhysiotherapyRequest,
     SharedWallet,
     WalletMembership,
+    PatientImport,
 )
 from .forms import (
     PatientForm,
@@ -33,6 +34,7 @@ from .forms import (
     PhysiotherapyRequestForm,
 )
 from .utils import get_safe_vitals_for_patient
+from . import importer
 from accounts.permissions import permission_required, user_has_permission
 from core.service_point_views import service_point_required
 from appointments.models import Appointment
@@ -42,6 +44,7 @@ from laboratory.models import TestRequest
 from radiology.models import RadiologyOrder
 from billing.models import Invoice, Payment
 from datetime import datetime, timedelta
+import os
 
 
 @login_required
@@ -247,6 +250,76 @@ def register_patient(request):
     return render(request, "patients/register.html", context)
 
 
+@login_required
+@permission_required("patients.create")
+def patient_imports(request):
+    """Upload a CSV/XLSX patient list for bulk registration; recent imports."""
+    if request.method == "POST":
+        upload = request.FILES.get("file")
+        extension = os.path.splitext(upload.name)[1].lstrip(".").lower() if upload else ""
+        if not upload:
+            messages.error(request, "Choose a file to import.")
+        elif extension not in importer.UPLOAD_EXTENSIONS:
+            messages.error(request, f"Unsupported file type .{extension}.")
+        else:
+            job = importer.create_job(upload, upload.name, user=request.user)
+            job = importer.start(job)
+            if job.status == "failed":
+                messages.error(request, f"{job.file_name}: {job.error}")
+            elif job.status == "done":
+                messages.success(
+                    request,
+                    f"{job.file_name}: {job.imported} patient(s) registered, {job.rejected} rejected.",
+                )
+            else:
+                messages.info(request, f"{job.file_name} is being imported.")
+            return redirect("patients:import_detail", import_id=job.id)
+        return redirect("patients:imports")
+
+    context = {
+        "imports": PatientImport.objects.select_related("uploaded_by")[:50],
+        "required": importer.REQUIRED,
+        "optional": importer.OPTIONAL,
+        "extensions": ", ".join(f".{e}" for e in importer.UPLOAD_EXTENSIONS),
+        "page_title": "Import Patients",
+        "active_nav": "patients",
+    }
+    return render(request, "patients/patient_imports.html", context)
+
+
+@login_required
+@permission_required("patients.create")
+def patient_import_detail(request, import_id):
+    """One import's progress; POST resumes it if it failed or stalled."""
+    job = get_object_or_404(PatientImport, id=import_id)
+    if request.method == "POST":
+        if importer.resumable(job):
+            importer.start(job)
+            messages.info(request, f"Resuming {job.file_name} after row {job.rows_done + 1}.")
+        return redirect("patients:import_detail", import_id=job.id)
+
+    context = {
+        "job": job,
+        "resumable": importer.resumable(job),
+        "page_title": f"Import Patients: {job.file_name}",
+        "active_nav": "patients",
+    }
+    return render(request, "patients/patient_import_detail.html", context)
+
+
+@login_required
+@permission_required("patients.create")
+def patient_import_rejects(request, import_id):
+    """Download the rows an import rejected, with the reason for each."""
+    job = get_object_or_404(PatientImport, id=import_id)
+    if not job.rejects_file:
+        raise Http404("This import has no rejects file.")
+    stem = os.path.splitext(job.file_name)[0]
+    return FileResponse(
+        job.rejects_file.open("rb"), as_attachment=True, filename=f"{stem}-rejects.csv",
+    )
+
+
 @login_required
 @permission_required("patients.view")
 def patient_detail(request, patient_id):
@@ -1483,7 +1556,9 @@ def wallet_net_impact(request, patient_id):
     # Get all active admissions for this patient
     from inpatient.models import Admission
 
-    active_admissions = Admission.objects.filter(patient=patient, status="admitted")
+    active_admissions = Admission.objects.filter(
+        patient=patient, status="admitted"
+    ).select_related("ledger", "patient__nhia_info", "bed__ward")
 
     # Calculate outstanding admission costs
     admission_outstanding = sum(
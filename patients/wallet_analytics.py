@@ -0,0 +1,207 @@
+"""Wallet statistics and statements without re-reading the full history.
+
+transaction_statistics() computes every per-type and per-category sum and
+count that PatientWallet.get_transaction_statistics reports in a single
+conditional-aggregation query, instead of one aggregate per bucket.
+
+Statements (the retainership print views) need an opening balance and the
+credit/debit totals over a date range. Completed months are summarised once
+into WalletBalanceSnapshot rows (close_months, run nightly by the
+close_wallet_months command): credits, debits, counts and the running closing
+balance. statement() then reads whole months from snapshots and only
+aggregates the transactions in the partial months at either end and in the
+months not closed yet, so a corporate wallet with years of history costs a
+handful of small queries. statement() never writes: printing is a GET, and
+two prints at once must not race to insert the same snapshot.
+
+Balances here are the running sum of signed transaction amounts (credit types
+add, everything else subtracts, as WalletTransaction.is_credit_transaction),
+starting from zero. Past months never change: transactions are stamped with
+created_at on insert and corrections are posted as new reversal rows.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Case, Count, DateField, DecimalField, F, Q, Sum, When
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import SharedWallet, WalletBalanceSnapshot, WalletTransaction
+
+# The type groupings PatientWallet.get_transaction_statistics has always used.
+STAT_CREDIT_TYPES = (
+    "credit", "deposit", "refund", "transfer_in", "adjustment",
+    "insurance_claim", "bonus", "cashback", "reversal",
+)
+STAT_DEBIT_TYPES = (
+    "debit", "withdrawal", "payment", "transfer_out", "admission_fee",
+    "daily_admission_charge", "lab_test_payment", "pharmacy_payment",
+    "consultation_fee", "procedure_fee", "penalty_fee", "discount_applied",
+)
+CATEGORIES = {
+    "medical_services": (
+        "consultation_fee", "procedure_fee", "lab_test_payment", "pharmacy_payment",
+    ),
+    "hospital_services": ("admission_fee", "daily_admission_charge"),
+    "transfers": ("transfer_in", "transfer_out"),
+    "deposits_withdrawals": ("deposit", "withdrawal"),
+    "adjustments": ("refund", "adjustment", "reversal"),
+}
+
+_MONEY = DecimalField(max_digits=14, decimal_places=2)
+_IS_CREDIT = Q(transaction_type__in=WalletTransaction.CREDIT_TYPES)
+
+
+def transaction_statistics(transactions):
+    """Totals and counts per direction and per category, in one query."""
+    buckets = {"total_credits": STAT_CREDIT_TYPES, "total_debits": STAT_DEBIT_TYPES}
+    buckets.update(CATEGORIES)
+    aggregates = {"total_transactions": Count("id")}
+    for name, types in buckets.items():
+        in_bucket = Q(transaction_type__in=types)
+        aggregates[f"{name}_total"] = Sum("amount", filter=in_bucket)
+        aggregates[f"{name}_count"] = Count("id", filter=in_bucket)
+    row = transactions.order_by().aggregate(**aggregates)
+
+    def bucket(name):
+        return {"total": row[f"{name}_total"], "count": row[f"{name}_count"]}
+
+    return {
+        "total_transactions": row["total_transactions"],
+        "total_credits": bucket("total_credits"),
+        "total_debits": bucket("total_debits"),
+        "by_category": {name: bucket(name) for name in CATEGORIES},
+    }
+
+
+def _wallet_filter(wallet):
+    if isinstance(wallet, SharedWallet):
+        return {"shared_wallet": wallet}
+    return {"patient_wallet": wallet}
+
+
+def _transactions(wallet):
+    # _base_manager: the wallet pins the tenant, and commands run with none active.
+    return WalletTransaction._base_manager.filter(**_wallet_filter(wallet))
+
+
+def _snapshots(wallet):
+    return WalletBalanceSnapshot._base_manager.filter(**_wallet_filter(wallet))
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _next_month(month):
+    return (month.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _totals(transactions):
+    row = transactions.order_by().aggregate(
+        credits=Sum("amount", filter=_IS_CREDIT),
+        debits=Sum("amount", filter=~_IS_CREDIT),
+        credit_count=Count("id", filter=_IS_CREDIT),
+        debit_count=Count("id", filter=~_IS_CREDIT),
+    )
+    row["credits"] = row["credits"] or Decimal("0")
+    row["debits"] = row["debits"] or Decimal("0")
+    return row
+
+
+def close_months(wallet, today=None):
+    """Snapshot every completed month of this wallet that has transactions and
+    no snapshot yet. Returns the number of snapshots written."""
+    this_month = (today or timezone.localdate()).replace(day=1)
+    last = _snapshots(wallet).order_by("-month").first()
+    transactions = _transactions(wallet).filter(created_at__lt=_start_of(this_month))
+    balance = Decimal("0")
+    if last is not None:
+        transactions = transactions.filter(created_at__gte=_start_of(_next_month(last.month)))
+        balance = last.closing_balance
+    months = (
+        transactions.annotate(month=TruncMonth("created_at", output_field=DateField()))
+        .values("month")
+        .annotate(
+            credits=Sum("amount", filter=_IS_CREDIT),
+            debits=Sum("amount", filter=~_IS_CREDIT),
+            credit_count=Count("id", filter=_IS_CREDIT),
+            debit_count=Count("id", filter=~_IS_CREDIT),
+        )
+        .order_by("month")
+    )
+    snapshots = []
+    for row in months:
+        credits, debits = row["credits"] or Decimal("0"), row["debits"] or Decimal("0")
+        balance += credits - debits
+        snapshots.append(WalletBalanceSnapshot(
+            hospital_id=wallet.hospital_id, month=row["month"],
+            credits=credits, debits=debits, credit_count=row["credit_count"],
+            debit_count=row["debit_count"], closing_balance=balance,
+            **_wallet_filter(wallet),
+        ))
+    # A second run racing this one writes the same rows: let it lose quietly.
+    WalletBalanceSnapshot._base_manager.bulk_create(snapshots, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def _balance_before(wallet, day):
+    """Running balance at the start of `day`: the nearest earlier snapshot's
+    closing balance plus the transactions posted since that month ended."""
+    snapshot = _snapshots(wallet).filter(month__lt=day.replace(day=1)).order_by("-month").first()
+    transactions = _transactions(wallet).filter(created_at__lt=_start_of(day))
+    balance = Decimal("0")
+    if snapshot is not None:
+        transactions = transactions.filter(created_at__gte=_start_of(_next_month(snapshot.month)))
+        balance = snapshot.closing_balance
+    net = transactions.order_by().aggregate(net=Sum(
+        Case(When(_IS_CREDIT, then=F("amount")), default=-F("amount"), output_field=_MONEY)
+    ))["net"]
+    return balance + (net or 0)
+
+
+def statement(wallet, from_date=None, to_date=None):
+    """Opening balance, credit/debit totals and counts, and closing balance of
+    a wallet between two dates (inclusive; either may be None)."""
+    end = (to_date + timedelta(days=1)) if to_date else None  # exclusive
+    # Snapshots cover every month before this one (close_months only ever
+    # appends after the latest); later months are still open.
+    last = _snapshots(wallet).order_by("-month").values_list("month", flat=True).first()
+    closed_to = _next_month(last) if last else None
+
+    # Whole closed months inside the range come from snapshots; the partial
+    # months at either end, and the open months, are read transaction by
+    # transaction.
+    full_from = None
+    if from_date:
+        full_from = from_date if from_date.day == 1 else _next_month(from_date)
+    full_to = closed_to
+    if end and closed_to:
+        full_to = min(end.replace(day=1), closed_to)
+    transactions = _transactions(wallet)
+    if full_to is not None and (full_from is None or full_from < full_to):
+        snapshots = _snapshots(wallet).filter(month__lt=full_to)
+        edges = Q(created_at__gte=_start_of(full_to))
+        if full_from is not None:
+            snapshots = snapshots.filter(month__gte=full_from)
+            edges |= Q(created_at__lt=_start_of(full_from))
+        transactions = transactions.filter(edges)
+        totals = snapshots.aggregate(
+            credits=Sum("credits"), debits=Sum("debits"),
+            credit_count=Sum("credit_count"), debit_count=Sum("debit_count"),
+        )
+    else:
+        totals = {}
+    if from_date:
+        transactions = transactions.filter(created_at__gte=_start_of(from_date))
+    if end:
+        transactions = transactions.filter(created_at__lt=_start_of(end))
+    edge = _totals(transactions)
+    result = {
+        field: (totals.get(field) or 0) + edge[field]
+        for field in ("credits", "debits", "credit_count", "debit_count")
+    }
+    result["transaction_count"] = result["credit_count"] + result["debit_count"]
+    result["opening_balance"] = _balance_before(wallet, from_date) if from_date else Decimal("0")
+    result["closing_balance"] = result["opening_balance"] + result["credits"] - result["debits"]
+    return result
@@ -178,4 +178,59 @@ try:
             return self.readonly_fields
 
 except ImportError:
-    pass
\ No newline at end of file
+    pass
+
+# Transfer documents and the stock ledger they write
+from .models import StockMovement, StockSnapshot, TransferDocument
+
+
+@admin.register(TransferDocument)
+class TransferDocumentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'from_dispensary', 'to_dispensary', 'status', 'requested_by', 'created_at', 'transferred_at')
+    list_filter = ('status', 'from_dispensary', 'to_dispensary')
+    readonly_fields = ('created_at', 'transferred_at')
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'medication', 'active_store', 'bulk_store', 'movement_type', 'quantity', 'batch_number', 'document_type', 'document_id')
+    list_filter = ('movement_type', 'document_type', 'active_store', 'bulk_store')
+    search_fields = ('medication__name', 'batch_number')
+    date_hierarchy = 'created_at'
+
+    # The ledger is append-only; rows are written by the code that moves stock.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('taken_at', 'medication', 'active_store', 'bulk_store', 'quantity', 'value')
+    list_filter = ('active_store', 'bulk_store')
+    search_fields = ('medication__name',)
+    date_hierarchy = 'taken_at'
+
+
+# Reorder engine output (forecast_reorders)
+from .models import DailyConsumption, ReorderForecast
+
+
+@admin.register(ReorderForecast)
+class ReorderForecastAdmin(admin.ModelAdmin):
+    list_display = ('medication', 'dispensary', 'stock_quantity', 'velocity', 'days_of_cover', 'needs_reorder', 'reorder_quantity', 'units_at_risk', 'computed_at')
+    list_filter = ('needs_reorder', 'dispensary')
+    search_fields = ('medication__name',)
+
+
+@admin.register(DailyConsumption)
+class DailyConsumptionAdmin(admin.ModelAdmin):
+    list_display = ('day', 'medication', 'dispensary', 'quantity')
+    list_filter = ('dispensary',)
+    search_fields = ('medication__name',)
+    date_hierarchy = 'day'
@@ -10,6 +10,7 @@ from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from .. import stats_service
 from ..models import (
     Dispensary, MedicalPack, MedicalPackItem, PackOrder,
     PharmacistDispensaryAssignment, PharmacyExpense,
@@ -180,6 +181,19 @@ class DispensaryAdminViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_active=True)
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def statistics(self, request):
+        """Headline pharmacy counters, optionally for one ?dispensary=."""
+        dispensary_id = request.query_params.get('dispensary')
+        if dispensary_id and not (
+            dispensary_id.isdigit() and Dispensary.objects.filter(pk=dispensary_id).exists()
+        ):
+            return _error('Unknown dispensary')
+        hospital = getattr(request, 'hospital', None)
+        return Response(stats_service.statistics(
+            hospital.pk if hospital else None, int(dispensary_id) if dispensary_id else None,
+        ))
+
     @action(detail=True, methods=['get'])
     def pharmacists(self, request, pk=None):
         assignments = (
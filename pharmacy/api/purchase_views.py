@@ -95,11 +95,13 @@ class PurchaseViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], url_path='receive-delivery')
     def receive_delivery(self, request, pk=None):
-        """`quantities` maps purchase item id -> quantity received now."""
+        """`quantities` maps purchase item id -> quantity received now;
+        optional `bulk_store` is the id of the store to receive into."""
         return self._run(
             receive_delivery,
             self.get_object(),
             request.data.get('quantities') or {},
+            request.data.get('bulk_store'),
         )
 
     @action(detail=True, methods=['post'])
@@ -7,3 +7,7 @@ class PharmacyConfig(AppConfig):
 
     def ready(self):
         import pharmacy.signals  # noqa
+        from . import prescription_summary, stats_service
+
+        stats_service.connect()
+        prescription_summary.connect()
@@ -14,6 +14,7 @@ from django.utils import timezone
 
 from core.audit_utils import log_audit_action
 
+from . import stock_ledger
 from .billing_utils import create_pharmacy_invoice
 from .cart_models import PrescriptionCart, PrescriptionCartItem
 from .models import ActiveStoreInventory, DispensingLog
@@ -481,7 +482,7 @@ def dispense_cart(cart, user, quantities=None):
                 quantity_to_dispense = available_to_dispense
 
             unit_price = cart_item.unit_price
-            DispensingLog.objects.create(
+            log = DispensingLog.objects.create(
                 prescription_item=p_item,
                 dispensed_by=user,
                 dispensed_quantity=quantity_to_dispense,
@@ -490,7 +491,7 @@ def dispense_cart(cart, user, quantities=None):
                 dispensary=cart.dispensary,
             )
 
-            _deduct_stock(cart.dispensary, medication, quantity_to_dispense)
+            _deduct_stock(cart.dispensary, medication, quantity_to_dispense, log, user)
 
             p_item.quantity_dispensed_so_far += quantity_to_dispense
             if p_item.quantity_dispensed_so_far >= p_item.quantity:
@@ -547,12 +548,14 @@ def dispense_cart(cart, user, quantities=None):
     }
 
 
-def _deduct_stock(dispensary, medication, quantity):
-    """Take `quantity` off the dispensary's active store, oldest batch first."""
+def _deduct_stock(dispensary, medication, quantity, log=None, user=None):
+    """Take `quantity` off the dispensary's active store, oldest batch first,
+    and book it in the stock ledger against the dispensing log."""
     active_store = getattr(dispensary, "active_store", None)
     if active_store is None:
         return
 
+    movements = []
     try:
         # select_for_update locks the rows for the txn so a concurrent dispense
         # of the same stock can't oversell (lost update).
@@ -572,5 +575,13 @@ def _deduct_stock(dispensary, medication, quantity):
             inv_item.stock_quantity -= take
             inv_item.save()
             remaining -= take
+            if log is not None:
+                movements.append(stock_ledger.movement(
+                    medication.pk, -take, "dispense", "dispensing_log", log.pk,
+                    active_store=active_store, batch_number=inv_item.batch_number,
+                    expiry_date=inv_item.expiry_date, unit_cost=inv_item.unit_cost,
+                    user=user,
+                ))
     except Exception as e:  # noqa: BLE001 - matches the previous view behaviour
         logger.warning("Error updating active store inventory: %s", e)
+    stock_ledger.record(movements)
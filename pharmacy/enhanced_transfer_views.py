@@ -17,8 +17,10 @@ import json
 
 from .models import (
     InterDispensaryTransfer, Medication, Dispensary,
-    ActiveStoreInventory, DispensaryTransfer, MedicationTransfer
+    ActiveStoreInventory, DispensaryTransfer, MedicationTransfer,
+    TransferDocument
 )
+from . import transfer_services
 from .enhanced_transfer_forms import (
     EnhancedMedicationTransferForm,
     BulkMedicationTransferForm,
@@ -123,37 +125,27 @@ def create_bulk_transfer(request):
         formset = MedicationTransferItemFormSet(request.POST, prefix='items')
         
         if form.is_valid() and formset.is_valid():
+            lines = [
+                (item_form.cleaned_data['medication'], item_form.cleaned_data['quantity'])
+                for item_form in formset
+                if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE')
+            ]
             try:
-                with transaction.atomic():
-                    from_dispensary = form.cleaned_data['from_dispensary']
-                    to_dispensary = form.cleaned_data['to_dispensary']
-                    bulk_notes = form.cleaned_data.get('notes', '')
-                    
-                    transfers_created = []
-                    
-                    for item_form in formset:
-                        if item_form.cleaned_data and not item_form.cleaned_data.get('DELETE'):
-                            medication = item_form.cleaned_data['medication']
-                            quantity = item_form.cleaned_data['quantity']
-                            
-                            # Create individual transfer
-                            transfer = InterDispensaryTransfer.create_transfer(
-                                medication=medication,
-                                from_dispensary=from_dispensary,
-                                to_dispensary=to_dispensary,
-                                quantity=quantity,
-                                requested_by=request.user,
-                                notes=f"{bulk_notes} (Part of bulk transfer)"
-                            )
-                            transfers_created.append(transfer)
-                
+                document = transfer_services.create_document(
+                    from_dispensary=form.cleaned_data['from_dispensary'],
+                    to_dispensary=form.cleaned_data['to_dispensary'],
+                    lines=lines,
+                    requested_by=request.user,
+                    notes=form.cleaned_data.get('notes', ''),
+                )
+
                 messages.success(
-                    request, 
-                    f'Created {len(transfers_created)} transfers successfully. '
-                    'They are now pending approval.'
+                    request,
+                    f'Transfer document #{document.id} created with '
+                    f'{document.lines.count()} lines. They are now pending approval.'
                 )
                 return redirect('pharmacy:enhanced_transfer_list')
-                
+
             except ValueError as e:
                 messages.error(request, str(e))
     else:
@@ -244,7 +236,7 @@ def enhanced_transfer_detail(request, transfer_id):
     transfer = get_object_or_404(
         InterDispensaryTransfer.objects.select_related(
             'medication', 'from_dispensary', 'to_dispensary',
-            'requested_by', 'approved_by', 'transferred_by'
+            'requested_by', 'approved_by', 'transferred_by', 'document'
         ),
         id=transfer_id
     )
@@ -364,6 +356,36 @@ def execute_transfer(request, transfer_id):
     return redirect('pharmacy:enhanced_transfer_detail', transfer_id=transfer_id)
 
 
+@login_required
+@permission_required('pharmacy.edit')
+@require_POST
+def approve_transfer_document(request, document_id):
+    """Approve every pending line of a transfer document"""
+
+    document = get_object_or_404(TransferDocument, id=document_id)
+    approved = transfer_services.approve_document(document, request.user)
+    messages.success(request, f'Approved {approved} lines of transfer document #{document.id}.')
+    return redirect('pharmacy:enhanced_transfer_list')
+
+
+@login_required
+@permission_required('pharmacy.edit')
+@require_POST
+def execute_transfer_document(request, document_id):
+    """Move every approved line of a transfer document in one transaction"""
+
+    document = get_object_or_404(TransferDocument, id=document_id)
+
+    try:
+        transfer_services.execute_document(document, request.user)
+        messages.success(request, f'Transfer document #{document.id} executed successfully.')
+
+    except ValueError as e:
+        messages.error(request, str(e))
+
+    return redirect('pharmacy:enhanced_transfer_list')
+
+
 @login_required
 @permission_required('pharmacy.edit')
 @require_POST
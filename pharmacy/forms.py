@@ -514,6 +514,17 @@ class PrescriptionSearchForm(forms.Form):
         label="To Date",
     )
 
+    sort = forms.ChoiceField(
+        choices=[
+            ("", "Newest First"),
+            ("amount_desc", "Amount (High to Low)"),
+            ("amount_asc", "Amount (Low to High)"),
+        ],
+        required=False,
+        widget=forms.Select(attrs={"class": "form-control"}),
+        label="Sort By",
+    )
+
 
 class DispensedItemsSearchForm(forms.Form):
     """Form for searching dispensed items with advanced filters"""
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from django.db import transaction
+from pharmacy import stock_ledger
 from pharmacy.models import MedicationTransfer, BulkStoreInventory, ActiveStoreInventory
 from datetime import date
 
@@ -110,6 +111,26 @@ class Command(BaseCommand):
 
                     active_inventory.save()
 
+                    stock_ledger.record([
+                        stock_ledger.movement(
+                            transfer.medication_id, -transfer.quantity, 'transfer_out',
+                            'medication_transfer', transfer.pk,
+                            bulk_store=transfer.from_bulk_store,
+                            batch_number=bulk_inventory.batch_number,
+                            expiry_date=bulk_inventory.expiry_date,
+                            unit_cost=bulk_inventory.unit_cost,
+                        ),
+                        stock_ledger.movement(
+                            transfer.medication_id, transfer.quantity, 'transfer_in',
+                            'medication_transfer', transfer.pk,
+                            active_store=transfer.to_active_store,
+                            batch_number=bulk_inventory.batch_number,
+                            expiry_date=bulk_inventory.expiry_date,
+                            # The cost MedicationTransfer.execute_transfer books.
+                            unit_cost=bulk_inventory.marked_up_cost or bulk_inventory.unit_cost,
+                        ),
+                    ])
+
                     # Mark transfer as delivered
                     transfer.status = 'delivered'
                     # The requester belongs to the transfer's own hospital; a
@@ -0,0 +1,47 @@
+"""Fold new dispensing into the daily aggregates and recompute reorder forecasts.
+
+    python manage.py forecast_reorders                 # all hospitals
+    python manage.py forecast_reorders --hospital <subdomain> --rebuild
+
+Schedule it nightly. Each run reads only the DispensingLog rows logged since
+the previous one; --rebuild re-aggregates the whole log (after logs were
+edited or deleted) before forecasting.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from pharmacy import reorder_engine
+from pharmacy.models import ActiveStoreInventory, DispensingLog
+
+
+class Command(BaseCommand):
+    help = "Update daily consumption from DispensingLog and recompute ReorderForecast rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+        parser.add_argument("--rebuild", action="store_true", help="Re-aggregate the whole log first")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            hospital_ids = [hospital.pk]
+        else:
+            hospital_ids = sorted(
+                set(DispensingLog.all_objects.order_by().values_list("hospital_id", flat=True).distinct())
+                | set(ActiveStoreInventory.all_objects.order_by().values_list("hospital_id", flat=True).distinct()),
+                key=lambda pk: (pk is not None, pk),
+            )
+
+        for hospital_id in hospital_ids:
+            label = f"hospital {hospital_id}" if hospital_id else "no hospital"
+            if options["rebuild"]:
+                read = reorder_engine.rebuild(hospital_id)
+            else:
+                read = reorder_engine.ingest(hospital_id)
+            rows = reorder_engine.forecast(hospital_id)
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: {read} new dispensing log(s), {rows} forecast(s)"
+            ))
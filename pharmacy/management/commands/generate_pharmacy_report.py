@@ -129,6 +129,8 @@ class Command(BaseCommand):
                 f'{disp["total_items"]:>15,}'
             )
         
+        self.output_stock_valuation(start_date, end_date)
+
         self.stdout.write('\n' + '='*60)
         self.stdout.write('REPORT GENERATED SUCCESSFULLY')
         self.stdout.write('='*60)
@@ -163,4 +165,41 @@ class Command(BaseCommand):
             ])
         
         # Output CSV content
-        self.stdout.write(output.getvalue())
\ No newline at end of file
+        self.stdout.write(output.getvalue())
+
+    def output_stock_valuation(self, start_date, end_date):
+        """Opening and closing stock value per store, replayed from the stock
+        ledger (nearest snapshot plus movements), so no inventory walk."""
+        from datetime import datetime, time
+
+        from pharmacy import stock_ledger
+        from pharmacy.models import ActiveStore, BulkStore, StockSnapshot
+
+        hospital_ids = StockSnapshot.all_objects.order_by().values_list('hospital_id', flat=True).distinct()
+        if not hospital_ids:
+            return
+        tz = timezone.get_current_timezone()
+        opening_at = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+        closing_at = timezone.make_aware(datetime.combine(end_date, time.max), tz)
+        names = {
+            ('active', pk): name for pk, name in ActiveStore.all_objects.values_list('pk', 'name')
+        }
+        names.update(
+            {('bulk', pk): name for pk, name in BulkStore.all_objects.values_list('pk', 'name')}
+        )
+
+        self.stdout.write('\nSTOCK VALUATION (from the stock ledger):')
+        self.stdout.write('  Store'.ljust(30) + 'Opening'.rjust(15) + 'Closing'.rjust(15))
+        self.stdout.write('-' * 60)
+        for hospital_id in hospital_ids:
+            opening = stock_ledger.valuation_at(opening_at, hospital_id)
+            closing = stock_ledger.valuation_at(closing_at, hospital_id)
+            for active_id, bulk_id in sorted(set(opening) | set(closing), key=str):
+                key = ('active', active_id) if active_id else ('bulk', bulk_id)
+                start_value = opening.get((active_id, bulk_id), (0, Decimal('0')))[1]
+                end_value = closing.get((active_id, bulk_id), (0, Decimal('0')))[1]
+                self.stdout.write(
+                    f'  {names.get(key, "?")[:28]:<28} '
+                    f'₦{start_value:>13,.2f} '
+                    f'₦{end_value:>13,.2f}'
+                )
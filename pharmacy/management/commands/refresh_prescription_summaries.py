@@ -0,0 +1,43 @@
+"""Recompute the denormalized pricing, payment and dispensing columns on
+Prescription (see pharmacy.prescription_summary).
+
+    python manage.py refresh_prescription_summaries                 # all hospitals
+    python manage.py refresh_prescription_summaries --hospital <subdomain>
+
+Run it once after migrating to backfill existing prescriptions, and again
+after any bulk repair done with queryset.update(), which fires no signals.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from pharmacy import prescription_summary
+from pharmacy.models import Prescription
+
+
+class Command(BaseCommand):
+    help = "Backfill or repair Prescription pricing/payment/dispensing summary columns."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        prescriptions = Prescription.all_objects.order_by("pk")
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            prescriptions = prescriptions.filter(hospital=hospital)
+
+        # One UPDATE per pk range keeps each statement (and its locks) short.
+        updated, last_pk = 0, 0
+        while True:
+            ids = list(
+                prescriptions.filter(pk__gt=last_pk).values_list("pk", flat=True)[: options["batch_size"]]
+            )
+            if not ids:
+                break
+            updated += prescription_summary.refresh(ids)
+            last_pk = ids[-1]
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {updated} prescription(s)"))
@@ -1,12 +1,12 @@
 from datetime import timedelta
 
 from django.conf import settings
-from django.core.mail import send_mail
 from django.core.management.base import BaseCommand
-from django.db import models
 from django.utils import timezone
 
-from pharmacy.models import ActiveStoreInventory
+from core.notifications import dispatch, enqueue
+from pharmacy import reorder_engine
+from pharmacy.models import ActiveStoreInventory, ReorderForecast
 from saas.models import Hospital
 
 
@@ -28,14 +28,24 @@ class Command(BaseCommand):
                     self.style.WARNING(f'{hospital}: alerts skipped, no email on file')
                 )
                 continue
-            send_mail(
+            # Queued, not sent inline: a rerun the same day is a no-op, and a
+            # slow or throttling mail server is the outbox's problem.
+            queued = enqueue(
+                recipient,
+                # Per hospital: several may share the PHARMACY_ALERT_EMAIL fallback.
+                f'pharmacy_alerts:{hospital.pk}',
                 subject=f'Pharmacy Inventory Alerts - {hospital.name}',
-                message=message,
-                from_email=settings.DEFAULT_FROM_EMAIL,
-                recipient_list=[recipient],
-                fail_silently=False,
+                body=message,
+                hospital=hospital,
             )
-            self.stdout.write(self.style.SUCCESS(f'{hospital}: alerts sent to {recipient}'))
+            if queued is None:
+                self.stdout.write(f'{hospital}: alerts already queued today for {recipient}')
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{hospital}: alerts queued for {recipient}'))
+
+        sent, failed = dispatch()
+        style = self.style.WARNING if failed else self.style.SUCCESS
+        self.stdout.write(style(f'Outbox: {sent} sent, {failed} failed'))
 
     def build_message(self, hospital):
         """Alert text for one hospital, or '' when it has nothing to report."""
@@ -44,11 +54,23 @@ class Command(BaseCommand):
             hospital=hospital
         ).select_related('medication', 'active_store__dispensary')
 
+        # Low stock comes from the reorder engine (forecast_reorders), which
+        # judges stock against each dispensary's actual usage.
+        reorder_engine.ensure_forecast(hospital.pk)
+        forecasts = ReorderForecast.all_objects.filter(
+            hospital=hospital
+        ).select_related('medication', 'dispensary')
+
         sections = (
             (
                 'Low Stock Items',
-                stock.filter(stock_quantity__lte=models.F('reorder_level')),
-                lambda i: f'{i.stock_quantity} units (Reorder level: {i.reorder_level})',
+                forecasts.filter(needs_reorder=True),
+                lambda f: f'{f.stock_quantity} units, {self.cover(f)} (Suggested order: {f.reorder_quantity})',
+            ),
+            (
+                'Stock Likely to Expire Before Use',
+                forecasts.filter(units_at_risk__gt=0).order_by('-units_at_risk'),
+                lambda f: f'{f.units_at_risk} of {f.stock_quantity} units at {f.velocity:.1f}/day',
             ),
             (
                 'Expired Items',
@@ -71,9 +93,21 @@ class Command(BaseCommand):
             for item in items:
                 body += (
                     f'- {item.medication.name} ({item.medication.strength}) '
-                    f'at {item.active_store.dispensary.name}: {detail(item)}\n'
+                    f'at {self.dispensary(item).name}: {detail(item)}\n'
                 )
             body += '\n'
         if not body:
             return ''
         return f'Pharmacy Inventory Alerts - {hospital.name}\n\n{body}'
+
+    @staticmethod
+    def dispensary(item):
+        if isinstance(item, ReorderForecast):
+            return item.dispensary
+        return item.active_store.dispensary
+
+    @staticmethod
+    def cover(forecast):
+        if forecast.days_of_cover is None:
+            return f'reorder level {forecast.reorder_level}'
+        return f'{forecast.days_of_cover:.0f} days of cover'
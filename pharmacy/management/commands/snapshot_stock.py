@@ -0,0 +1,55 @@
+"""Snapshot every store's stock so ledger replays stay short.
+
+    python manage.py snapshot_stock                 # all hospitals
+    python manage.py snapshot_stock --hospital <subdomain> --check
+
+Schedule it nightly (or at least at month end). --check first replays the
+ledger to now and reports where it disagrees with the inventory tables, which
+is the audit reconciliation; the snapshot taken afterwards re-anchors on the
+live figures either way.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from pharmacy import stock_ledger
+from pharmacy.models import ActiveStoreInventory, BulkStoreInventory
+
+
+class Command(BaseCommand):
+    help = "Write a StockSnapshot of every store; --check reconciles the ledger first."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hospital", help="Subdomain of one hospital (default: all)")
+        parser.add_argument("--check", action="store_true", help="Report ledger drift before snapshotting")
+        parser.add_argument("--dry-run", action="store_true", help="With --check, report only")
+
+    def handle(self, *args, **options):
+        from saas.models import Hospital
+
+        if options["hospital"]:
+            hospital = Hospital.objects.filter(subdomain=options["hospital"]).first()
+            if hospital is None:
+                raise CommandError(f"No hospital '{options['hospital']}'")
+            hospital_ids = [hospital.pk]
+        else:
+            hospital_ids = sorted(
+                set(ActiveStoreInventory.all_objects.order_by().values_list("hospital_id", flat=True).distinct())
+                | set(BulkStoreInventory.all_objects.order_by().values_list("hospital_id", flat=True).distinct()),
+                key=lambda pk: (pk is not None, pk),
+            )
+
+        for hospital_id in hospital_ids:
+            label = f"hospital {hospital_id}" if hospital_id else "no hospital"
+            if options["check"]:
+                drift = stock_ledger.reconcile(hospital_id)
+                for active_id, bulk_id, medication_id, ledger_qty, live_qty in drift:
+                    store = f"active store {active_id}" if active_id else f"bulk store {bulk_id}"
+                    self.stdout.write(self.style.WARNING(
+                        f"{label}, {store}, medication {medication_id}: "
+                        f"ledger {ledger_qty}, on hand {live_qty}"
+                    ))
+                if not drift:
+                    self.stdout.write(self.style.SUCCESS(f"{label}: ledger matches stock on hand"))
+                if options["dry_run"]:
+                    continue
+            rows = stock_ledger.take_snapshot(hospital_id)
+            self.stdout.write(self.style.SUCCESS(f"{label}: snapshot of {rows} stock line(s)"))
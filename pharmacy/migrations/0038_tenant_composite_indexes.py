@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0037_backfill_prescription_hospital'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='dispensinglog',
+            index=models.Index(fields=['hospital', 'dispensed_date'], name='idx_displog_hosp_date'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['hospital', 'status', 'prescription_date'], name='idx_presc_hosp_status_date'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.0.14 on 2026-10-19 08:55
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0038_tenant_composite_indexes'),
+        ('saas', '0009_hospital_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TransferDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('transferred_at', models.DateTimeField(blank=True, null=True)),
+                ('from_dispensary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outgoing_transfer_documents', to='pharmacy.dispensary')),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('requested_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='requested_transfer_documents', to=settings.AUTH_USER_MODEL)),
+                ('to_dispensary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='incoming_transfer_documents', to='pharmacy.dispensary')),
+                ('transferred_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='executed_transfer_documents', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='interdispensarytransfer',
+            name='document',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='pharmacy.transferdocument'),
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('batch_number', models.CharField(blank=True, max_length=50)),
+                ('expiry_date', models.DateField(blank=True, null=True)),
+                ('quantity', models.IntegerField(help_text='Positive into the store, negative out of it')),
+                ('unit_cost', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('movement_type', models.CharField(choices=[('transfer_out', 'Transfer Out'), ('transfer_in', 'Transfer In')], max_length=20)),
+                ('document_type', models.CharField(max_length=40)),
+                ('document_id', models.PositiveIntegerField()),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('active_store', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='pharmacy.activestore')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to=settings.AUTH_USER_MODEL)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('medication', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='pharmacy.medication')),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['active_store', 'medication', 'created_at'], name='idx_movement_store_med'), models.Index(fields=['document_type', 'document_id'], name='idx_movement_document')],
+            },
+        ),
+    ]
@@ -0,0 +1,85 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0039_transfer_documents_stock_movements'),
+        ('saas', '0009_hospital_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('value', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['-taken_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='bulk_store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='pharmacy.bulkstore'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='active_store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='pharmacy.activestore'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='medication',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='pharmacy.medication'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='movement_type',
+            field=models.CharField(choices=[('receipt', 'Receipt'), ('dispense', 'Dispense'), ('adjustment', 'Adjustment'), ('transfer_out', 'Transfer Out'), ('transfer_in', 'Transfer In')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['bulk_store', 'medication', 'created_at'], name='idx_movement_bulk_med'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['hospital', 'created_at'], name='idx_movement_tenant_time'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockmovement',
+            constraint=models.CheckConstraint(check=models.Q(models.Q(('active_store__isnull', False), ('bulk_store__isnull', True)), models.Q(('active_store__isnull', True), ('bulk_store__isnull', False)), _connector='OR'), name='stock_movement_one_store'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='active_store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='pharmacy.activestore'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='bulk_store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='pharmacy.bulkstore'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='hospital',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital'),
+        ),
+        migrations.AddField(
+            model_name='stocksnapshot',
+            name='medication',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='pharmacy.medication'),
+        ),
+        migrations.AddIndex(
+            model_name='stocksnapshot',
+            index=models.Index(fields=['hospital', 'taken_at'], name='idx_snapshot_tenant_time'),
+        ),
+    ]
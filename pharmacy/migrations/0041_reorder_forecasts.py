@@ -0,0 +1,70 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0040_stock_ledger_snapshots'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConsumptionCursor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_log_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyConsumption',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('dispensary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_consumption', to='pharmacy.dispensary')),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('medication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_consumption', to='pharmacy.medication')),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['hospital', 'day'], name='idx_consumption_tenant_day')],
+                'unique_together': {('dispensary', 'medication', 'day')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReorderForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_quantity', models.IntegerField(default=0)),
+                ('reorder_level', models.IntegerField(default=0)),
+                ('avg_daily_7', models.FloatField(default=0)),
+                ('avg_daily_28', models.FloatField(default=0)),
+                ('avg_daily_90', models.FloatField(default=0)),
+                ('velocity', models.FloatField(default=0, help_text='Forecast units dispensed per day')),
+                ('days_of_cover', models.FloatField(blank=True, help_text='Days until stock runs out; empty with no recent usage', null=True)),
+                ('reorder_point', models.IntegerField(default=0)),
+                ('reorder_quantity', models.IntegerField(default=0)),
+                ('needs_reorder', models.BooleanField(default=False)),
+                ('units_at_risk', models.IntegerField(default=0, help_text='Units expected to expire before they are dispensed')),
+                ('expiry_risk', models.FloatField(default=0, help_text='units_at_risk / stock_quantity')),
+                ('computed_at', models.DateTimeField()),
+                ('dispensary', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_forecasts', to='pharmacy.dispensary')),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('medication', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_forecasts', to='pharmacy.medication')),
+            ],
+            options={
+                'ordering': [models.OrderBy(models.F('days_of_cover'), nulls_last=True), '-reorder_quantity'],
+                'indexes': [models.Index(fields=['hospital', 'needs_reorder'], name='idx_forecast_tenant_reorder')],
+                'unique_together': {('dispensary', 'medication')},
+            },
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.0.14 on 2026-10-19 09:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    from pharmacy.prescription_summary import refresh
+
+    Prescription = apps.get_model("pharmacy", "Prescription")
+    ids = list(Prescription._base_manager.values_list("pk", flat=True))
+    for start in range(0, len(ids), 2000):
+        refresh(ids[start:start + 2000], apps=apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0016_tenant_composite_indexes'),
+        ('consultations', '0019_alter_consultingroom_room_number_and_more'),
+        ('nhia', '0009_backfill_authorizationrequest'),
+        ('patients', '0030_alter_patient_id_document'),
+        ('pharmacy', '0041_reorder_forecasts'),
+        ('saas', '0009_hospital_logo'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='prescription',
+            name='items_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='items_fully_dispensed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='items_partially_dispensed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='patient_payable_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='payment_state',
+            field=models.CharField(choices=[('paid', 'Payment completed'), ('paid_invoice', 'Payment completed via invoice'), ('paid_cart', 'Payment completed via cart invoice'), ('waived', 'Payment waived'), ('cart_pending', 'Payment pending - invoice generated'), ('unpaid', 'Payment required')], default='unpaid', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='payment_verified',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='prescription',
+            name='total_prescribed_price',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['hospital', 'payment_state', 'prescription_date'], name='idx_presc_hosp_payment_state'),
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0042_prescription_summary_columns'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='active_store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='pharmacy.activestore'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='bulk_store',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='pharmacy.bulkstore'),
+        ),
+        migrations.AlterField(
+            model_name='stockmovement',
+            name='medication',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='stock_movements', to='pharmacy.medication'),
+        ),
+    ]
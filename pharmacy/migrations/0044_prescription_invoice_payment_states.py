@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-19 11:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pharmacy', '0043_protect_stock_movement_history'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='prescription',
+            name='payment_state',
+            field=models.CharField(choices=[('paid', 'Payment completed'), ('paid_invoice', 'Payment completed via invoice'), ('paid_cart', 'Payment completed via cart invoice'), ('waived', 'Payment waived'), ('invoice_pending', 'Payment pending'), ('cart_pending', 'Payment pending - invoice generated'), ('unpaid', 'Payment required')], default='unpaid', max_length=20),
+        ),
+    ]
@@ -3,7 +3,6 @@ import logging
 from django.db import models, transaction
 from saas.models import TenantModel
 from core.validators import NigerianPhoneField
-from nhia.utils import NHIA_PATIENT_RATE, NHIA_COVERED_RATE
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from accounts.models import CustomUser
@@ -218,18 +217,23 @@ class Purchase(TenantModel):
             "partial",
         ]
 
-    def receive_items(self, received_quantities):
+    def receive_items(self, received_quantities, bulk_store=None):
         """Receive delivered goods into stock.
 
         ``received_quantities`` maps PurchaseItem id -> quantity received in
         this delivery. Quantities are validated against each item's
         outstanding balance. Supports partial deliveries; updates
         delivery_status and stamps actual_delivery_date when fully received.
+        Stock goes into ``bulk_store`` (default: BulkStore.main()).
         Caller is responsible for wrapping in a transaction and locking the
         purchase row.
+
+        Set-based: the whole delivery is validated first, then booked with a
+        fixed number of queries however many lines it has.
         """
         items = {item.pk: item for item in self.items.select_related("medication")}
 
+        received = {}
         for item_id, qty in received_quantities.items():
             item = items.get(item_id)
             if item is None:
@@ -242,12 +246,14 @@ class Purchase(TenantModel):
                     f"{item.medication.name}: received quantity ({qty}) exceeds "
                     f"outstanding balance ({outstanding})."
                 )
-            if qty == 0:
-                continue
+            if qty:
+                received[item] = qty
 
-            item.add_to_bulk_store(qty)
-            item.quantity_received += qty
-            item.save(update_fields=["quantity_received"])
+        if received:
+            self._book_into_bulk_store(received, bulk_store or BulkStore.main())
+            for item, qty in received.items():
+                item.quantity_received += qty
+            PurchaseItem.objects.bulk_update(list(received), ["quantity_received"])
 
         fully_received = all(
             item.quantity_received >= item.quantity for item in items.values()
@@ -262,6 +268,74 @@ class Purchase(TenantModel):
             self.delivery_status = "partial"
             self.save(update_fields=["delivery_status"])
 
+    def _book_into_bulk_store(self, received, bulk_store):
+        """Add ``received`` ({PurchaseItem: quantity}) to the store's batches.
+
+        One locked read finds the batches already in the store; matching ones
+        are topped up with one bulk_update, the rest inserted with one
+        bulk_create. Lines sharing a batch are summed first.
+        """
+        today = timezone.now().strftime("%Y%m%d")
+        batches = {}
+        for item, qty in received.items():
+            key = (item.medication_id, item.batch_number or f"BATCH-{today}-{item.pk}")
+            batches.setdefault(key, []).append((item, qty))
+
+        existing = {}
+        for row in (
+            BulkStoreInventory.objects.select_for_update()
+            .filter(
+                bulk_store=bulk_store,
+                medication_id__in={m for m, _ in batches},
+                batch_number__in={b for _, b in batches},
+            )
+            .order_by("pk")
+        ):
+            existing.setdefault((row.medication_id, row.batch_number), row)
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        for (medication_id, batch_number), lines in batches.items():
+            quantity = sum(qty for _, qty in lines)
+            row = existing.get((medication_id, batch_number))
+            if row is not None:
+                row.stock_quantity += quantity
+                row.updated_at = now
+                to_update.append(row)
+                continue
+            item = lines[0][0]
+            row = BulkStoreInventory(
+                hospital_id=self.hospital_id or bulk_store.hospital_id,
+                medication_id=medication_id,
+                bulk_store=bulk_store,
+                batch_number=batch_number,
+                stock_quantity=quantity,
+                expiry_date=item.expiry_date,
+                unit_cost=item.unit_price,
+                supplier_id=self.supplier_id,
+                purchase_date=self.purchase_date,
+            )
+            # bulk_create skips save(), which normally fills this in.
+            row.marked_up_cost = row.calculate_marked_up_cost()
+            to_create.append(row)
+
+        BulkStoreInventory.objects.bulk_create(to_create, batch_size=500)
+        BulkStoreInventory.objects.bulk_update(
+            to_update, ["stock_quantity", "updated_at"], batch_size=500
+        )
+
+        from .stock_ledger import movement, record
+
+        record([
+            movement(
+                item.medication_id, qty, "receipt", "purchase", self.pk,
+                bulk_store=bulk_store, batch_number=batch_number,
+                expiry_date=item.expiry_date, unit_cost=item.unit_price, at=now,
+            )
+            for (_, batch_number), lines in batches.items()
+            for item, qty in lines
+        ])
+
     class Meta:
         ordering = ["-created_at"]
         permissions = [
@@ -379,49 +453,15 @@ class PurchaseItem(TenantModel):
         # Update purchase total amount after deleting the item
         purchase.update_total_amount()
 
-    def add_to_bulk_store(self, quantity=None):
+    def add_to_bulk_store(self, quantity=None, bulk_store=None):
         """Add received medication to bulk store. ``quantity`` defaults to the
         full ordered quantity for backward compatibility."""
         if quantity is None:
             quantity = self.quantity
-        # Get or create a default bulk store
-        bulk_store, created = BulkStore.objects.get_or_create(
-            name="Main Bulk Store",
-            defaults={
-                "location": "Central Storage Area",
-                "description": "Main bulk storage for all procured medications",
-                "capacity": 50000,
-                "temperature_controlled": True,
-                "humidity_controlled": True,
-                "security_level": "high",
-                "is_active": True,
-            },
-        )
-
-        # Add to bulk store inventory
-        bulk_inventory, created = BulkStoreInventory.objects.get_or_create(
-            medication=self.medication,
-            bulk_store=bulk_store,
-            batch_number=self.batch_number
-            or f"BATCH-{timezone.now().strftime('%Y%m%d')}-{self.pk or 'NEW'}",
-            defaults={
-                "stock_quantity": 0,
-                "expiry_date": self.expiry_date,
-                "unit_cost": self.unit_price,
-                "supplier": self.purchase.supplier,
-                "purchase_date": self.purchase.purchase_date,
-            },
+        self.purchase._book_into_bulk_store(
+            {self: quantity}, bulk_store or BulkStore.main()
         )
 
-        if not created:
-            # Update existing inventory
-            bulk_inventory.stock_quantity += quantity
-            bulk_inventory.save()
-        else:
-            # Set initial quantity for new inventory
-            bulk_inventory.stock_quantity = quantity
-            bulk_inventory.save()
-
 
 class PharmacistDispensaryAssignment(TenantModel):
     """Model to track which pharmacists are assigned to which dispensary"""
@@ -604,9 +644,28 @@ class BulkStore(TenantModel):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    MAIN_STORE_NAME = "Main Bulk Store"
+
     def __str__(self):
         return self.name
 
+    @classmethod
+    def main(cls):
+        """The store deliveries go into unless another is chosen."""
+        store, _ = cls.objects.get_or_create(
+            name=cls.MAIN_STORE_NAME,
+            defaults={
+                "location": "Central Storage Area",
+                "description": "Main bulk storage for all procured medications",
+                "capacity": 50000,
+                "temperature_controlled": True,
+                "humidity_controlled": True,
+                "security_level": "high",
+                "is_active": True,
+            },
+        )
+        return store
+
     class Meta:
         ordering = ["name"]
         unique_together = (("hospital", "name"),)
@@ -919,84 +978,22 @@ class MedicationTransfer(TenantModel):
         if not self.can_execute():
             raise ValueError("Transfer cannot be executed in current status")
 
-        with transaction.atomic():
-            # Candidate bulk batches, locked so concurrent transfers can't both
-            # pass the stock check (double-spend). When batch_number is pinned we
-            # transfer that one batch; otherwise we FIFO across all batches of the
-            # medication (oldest expiry first), so a request larger than any single
-            # batch still succeeds when total stock is sufficient.
-            bulk_qs = BulkStoreInventory.objects.select_for_update().filter(
-                medication=self.medication,
-                bulk_store=self.from_bulk_store,
-            )
-            if self.batch_number:
-                bulk_qs = bulk_qs.filter(batch_number=self.batch_number)
-            bulk_batches = list(bulk_qs.order_by("expiry_date", "id"))
-
-            if not bulk_batches:
-                raise ValueError(
-                    f"Batch {self.batch_number} not found in bulk store"
-                    if self.batch_number
-                    else f"No stock for {self.medication.name} in bulk store"
-                )
-
-            # Never transfer expired stock.
-            today = timezone.now().date()
-            available = [
-                b for b in bulk_batches
-                if not (b.expiry_date and b.expiry_date < today)
-            ]
-            total_available = sum(b.stock_quantity for b in available)
-            if total_available < self.quantity:
-                raise ValueError(
-                    f"Insufficient non-expired stock in bulk store: "
-                    f"have {total_available}, need {self.quantity}"
-                )
+        from .transfer_services import move_stock
 
-            # Get or create consolidated active store inventory. Summary fields
-            # (stock_quantity, batch_number, expiry_date) are recomputed below.
-            active_inventory, _ = ActiveStoreInventory.objects.get_or_create(
-                medication=self.medication,
-                active_store=self.to_active_store,
-                defaults={
-                    "stock_quantity": 0,
-                    "reorder_level": getattr(self.medication, "reorder_level", 10),
-                    "batch_number": available[0].batch_number,
-                    "expiry_date": available[0].expiry_date,
-                    "unit_cost": available[0].marked_up_cost
-                    or available[0].unit_cost,
-                    "last_restock_date": timezone.now(),
-                },
+        with transaction.atomic():
+            # One-line case of the set-based move: locks the bulk batches and
+            # the active store's row, FIFO across unexpired batches (or just
+            # the pinned one), and writes the StockMovement ledger.
+            move_stock(
+                self.from_bulk_store,
+                self.to_active_store,
+                {self.medication_id: self.quantity},
+                user,
+                "medication_transfer",
+                self.pk,
+                batch_number=self.batch_number,
             )
 
-            # Deduct FIFO, mirroring each source batch into its own ActiveStoreBatch
-            # so per-batch expiry/cost survive into the active store.
-            remaining = self.quantity
-            for src in available:
-                if remaining <= 0:
-                    break
-                take = min(src.stock_quantity, remaining)
-                src.stock_quantity -= take
-                src.save(update_fields=["stock_quantity"])
-                remaining -= take
-
-                batch_record, batch_created = ActiveStoreBatch.objects.get_or_create(
-                    active_inventory=active_inventory,
-                    batch_number=src.batch_number,
-                    defaults={
-                        "quantity": take,
-                        "expiry_date": src.expiry_date,
-                        "unit_cost": src.marked_up_cost or src.unit_cost,
-                    },
-                )
-                if not batch_created:
-                    batch_record.quantity += take
-                    batch_record.save(update_fields=["quantity"])
-
-            # Update consolidated inventory summary
-            active_inventory.last_restock_date = timezone.now()
-            active_inventory.update_summary_fields()
-
             # Update transfer status
             self.status = "completed"
             self.transferred_by = user
@@ -1048,6 +1045,9 @@ class DispensingLog(TenantModel):
         ordering = ["-dispensed_date"]
         verbose_name = "Dispensing Log"
         verbose_name_plural = "Dispensing Logs"
+        indexes = [
+            models.Index(fields=["hospital", "dispensed_date"], name="idx_displog_hosp_date"),
+        ]
 
 
 class Prescription(TenantModel):
@@ -1079,6 +1079,18 @@ class Prescription(TenantModel):
         ("rejected", "Rejected"),
     )
 
+    # Where payment stands once payment_status, the invoice and the cart
+    # invoices are taken together (see pharmacy.prescription_summary).
+    PAYMENT_STATE_CHOICES = (
+        ("paid", "Payment completed"),
+        ("paid_invoice", "Payment completed via invoice"),
+        ("paid_cart", "Payment completed via cart invoice"),
+        ("waived", "Payment waived"),
+        ("invoice_pending", "Payment pending"),
+        ("cart_pending", "Payment pending - invoice generated"),
+        ("unpaid", "Payment required"),
+    )
+
     patient = models.ForeignKey(
         Patient, on_delete=models.CASCADE, related_name="prescriptions"
     )
@@ -1140,6 +1152,18 @@ class Prescription(TenantModel):
         help_text="Link to the consultation this prescription was created from",
     )
 
+    # Denormalized from items, invoices and carts by
+    # pharmacy.prescription_summary.refresh(); never set these directly.
+    total_prescribed_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    patient_payable_amount = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    items_count = models.PositiveIntegerField(default=0)
+    items_fully_dispensed = models.PositiveIntegerField(default=0)
+    items_partially_dispensed = models.PositiveIntegerField(default=0)
+    payment_verified = models.BooleanField(default=False)
+    payment_state = models.CharField(
+        max_length=20, choices=PAYMENT_STATE_CHOICES, default="unpaid"
+    )
+
     def __str__(self):
         return f"Prescription for {self.patient.get_full_name()} - {self.prescription_date}"
 
@@ -1205,80 +1229,36 @@ class Prescription(TenantModel):
         super().save(*args, **kwargs)
 
     def get_total_prescribed_price(self):  # Renamed for clarity
-        """Calculate the total price of all originally prescribed medications in this prescription"""
-        total = 0
-        for item in self.items.all():
-            total += (
-                item.medication.price * item.quantity
-            )  # item.quantity is prescribed quantity
-        return total
+        """Total price of all originally prescribed medications in this prescription"""
+        return self.total_prescribed_price
 
     def get_patient_payable_amount(self):
-        """Calculate the amount patient needs to pay based on their type"""
-        from decimal import Decimal
-
-        total_price = Decimal(str(self.get_total_prescribed_price()))
-
-        # NHIA patients pay 10%, others pay 100%
-        if self.patient.patient_type == "nhia":
-            return total_price * NHIA_PATIENT_RATE
-        else:
-            return total_price
+        """Amount the patient pays: 10% for NHIA patients, 100% for others"""
+        return self.patient_payable_amount
 
     def get_pricing_breakdown(self):
         """Get detailed pricing breakdown for the prescription"""
-        from decimal import Decimal
-
-        total_price = Decimal(str(self.get_total_prescribed_price()))
+        total_price = self.total_prescribed_price
         is_nhia = self.patient.patient_type == "nhia"
-
-        if is_nhia:
-            patient_portion = total_price * NHIA_PATIENT_RATE
-            nhia_portion = total_price * NHIA_COVERED_RATE
-        else:
-            patient_portion = total_price
-            nhia_portion = Decimal("0.00")
-
         return {
             "total_medication_cost": total_price,
-            "patient_portion": patient_portion,
-            "nhia_portion": nhia_portion,
+            "patient_portion": self.patient_payable_amount,
+            "nhia_portion": total_price - self.patient_payable_amount,
             "is_nhia_patient": is_nhia,
             "discount_percentage": 90 if is_nhia else 0,
         }
 
     def is_payment_verified(self):
         """Check if the prescription payment has been verified and completed"""
-        # Check payment_status field first
-        if self.payment_status == "paid":
-            return True
-        elif self.payment_status == "waived":
-            return True
-        elif self.payment_status == "unpaid":
-            # Check billing invoice if it exists
-            if self.invoice:
-                if self.invoice.status == "paid":
-                    return True
-
-            # Check if there's any active cart with paid invoice for this prescription
-            # This handles partial dispensing - each cart can have its own invoice
-            from pharmacy.cart_models import PrescriptionCart
-
-            active_cart_with_payment = (
-                PrescriptionCart.objects.filter(
-                    prescription=self, status__in=["paid", "partially_dispensed"]
-                )
-                .filter(
-                    models.Q(invoice__status="paid") | models.Q(invoice__isnull=False)
-                )
-                .exists()
-            )
+        return self.payment_verified
 
-            if active_cart_with_payment:
-                return True
+    def refresh_summary(self):
+        """Recompute the denormalized pricing, payment and dispensing columns
+        and reload them onto this instance."""
+        from .prescription_summary import SUMMARY_FIELDS, refresh
 
-            return False
-        return False
+        refresh([self.pk])
+        self.refresh_from_db(fields=SUMMARY_FIELDS)
 
     def can_be_dispensed(self):
         """Check if prescription can be dispensed based on authorization and other conditions"""
@@ -1360,99 +1340,27 @@ class Prescription(TenantModel):
 
     def get_payment_status_display_info(self):
         """Get detailed payment status information for display"""
-        if self.payment_status == "paid":
-            return {
-                "status": "paid",
-                "message": "Payment completed",
-                "css_class": "success",
-                "icon": "check-circle",
-            }
-        elif self.payment_status == "waived":
-            return {
-                "status": "waived",
-                "message": "Payment waived",
-                "css_class": "info",
-                "icon": "info-circle",
-            }
-        else:
-            # Check billing invoice status if available
-            if self.invoice:
-                if self.invoice.status == "paid":
-                    return {
-                        "status": "paid",
-                        "message": "Payment completed via invoice",
-                        "css_class": "success",
-                        "icon": "check-circle",
-                    }
-                elif self.invoice.status == "unpaid":
-                    return {
-                        "status": "unpaid",
-                        "message": "Payment pending",
-                        "css_class": "danger",
-                        "icon": "exclamation-circle",
-                    }
-                elif self.invoice.status == "waived":
-                    return {
-                        "status": "waived",
-                        "message": "Payment waived",
-                        "css_class": "info",
-                        "icon": "info-circle",
-                    }
-
-            # Check if there's an active cart with paid invoice for partial dispensing
-            from pharmacy.cart_models import PrescriptionCart
-
-            paid_carts = (
-                PrescriptionCart.objects.filter(
-                    prescription=self, status__in=["paid", "partially_dispensed"]
-                )
-                .filter(invoice__status="paid")
-                .exists()
-            )
-
-            if paid_carts:
-                return {
-                    "status": "paid",
-                    "message": "Payment completed via cart invoice",
-                    "css_class": "success",
-                    "icon": "check-circle",
-                }
-
-            # Check for pending cart invoices
-            pending_carts = PrescriptionCart.objects.filter(
-                prescription=self, status__in=["invoiced", "active"]
-            ).exists()
-
-            if pending_carts:
-                return {
-                    "status": "unpaid",
-                    "message": "Payment pending - invoice generated",
-                    "css_class": "warning",
-                    "icon": "exclamation-circle",
-                }
-
-            return {
-                "status": "unpaid",
-                "message": "Payment required",
-                "css_class": "danger",
-                "icon": "exclamation-circle",
-            }
+        status, css_class, icon = {
+            "paid": ("paid", "success", "check-circle"),
+            "paid_invoice": ("paid", "success", "check-circle"),
+            "paid_cart": ("paid", "success", "check-circle"),
+            "waived": ("waived", "info", "info-circle"),
+            "cart_pending": ("unpaid", "warning", "exclamation-circle"),
+        }.get(self.payment_state, ("unpaid", "danger", "exclamation-circle"))
+        return {
+            "status": status,
+            "message": self.get_payment_state_display(),
+            "css_class": css_class,
+            "icon": icon,
+        }
 
     def get_dispensing_status(self):
         """Get the dispensing status of the prescription"""
-        items = self.items.all()
-        if not items.exists():
+        if not self.items_count:
             return "no_items"
-
-        fully_dispensed_count = items.filter(is_dispensed=True).count()
-        partially_dispensed_count = items.filter(
-            is_dispensed=False, quantity_dispensed_so_far__gt=0
-        ).count()
-        total_items = items.count()
-
-        if fully_dispensed_count == total_items:
+        if self.items_fully_dispensed == self.items_count:
             return "fully_dispensed"
-        elif fully_dispensed_count > 0 or partially_dispensed_count > 0:
+        elif self.items_fully_dispensed or self.items_partially_dispensed:
             return "partially_dispensed"
         else:
             return "not_dispensed"
@@ -1507,34 +1415,15 @@ class Prescription(TenantModel):
 
     def get_dispensing_progress(self):
         """Get dispensing progress information"""
-        items = self.items.all()
-        if not items.exists():
-            return {
-                "total_items": 0,
-                "fully_dispensed": 0,
-                "partially_dispensed": 0,
-                "not_dispensed": 0,
-                "progress_percentage": 0,
-            }
-
-        fully_dispensed = items.filter(is_dispensed=True).count()
-        partially_dispensed = items.filter(
-            is_dispensed=False, quantity_dispensed_so_far__gt=0
-        ).count()
-        not_dispensed = items.filter(
-            is_dispensed=False, quantity_dispensed_so_far=0
-        ).count()
-
-        total_items = items.count()
+        total_items = self.items_count
         progress_percentage = (
-            (fully_dispensed / total_items * 100) if total_items > 0 else 0
+            (self.items_fully_dispensed / total_items * 100) if total_items > 0 else 0
         )
-
         return {
             "total_items": total_items,
-            "fully_dispensed": fully_dispensed,
-            "partially_dispensed": partially_dispensed,
-            "not_dispensed": not_dispensed,
+            "fully_dispensed": self.items_fully_dispensed,
+            "partially_dispensed": self.items_partially_dispensed,
+            "not_dispensed": total_items - self.items_fully_dispensed - self.items_partially_dispensed,
             "progress_percentage": round(progress_percentage, 1),
         }
 
@@ -1555,6 +1444,15 @@ class Prescription(TenantModel):
             models.Index(fields=["payment_status"], name="idx_presc_payment"),
             models.Index(fields=["authorization_status"], name="idx_presc_auth"),
             models.Index(fields=["created_at"], name="idx_presc_created"),
+            # Tenant first: TenantManager adds hospital= to every query.
+            models.Index(
+                fields=["hospital", "status", "prescription_date"],
+                name="idx_presc_hosp_status_date",
+            ),
+            models.Index(
+                fields=["hospital", "payment_state", "prescription_date"],
+                name="idx_presc_hosp_payment_state",
+            ),
         ]
         ordering = ["-prescription_date", "-created_at"]
         # Backs pharmacy.dispense_medication (checked in pharmacy.middleware and
@@ -2406,6 +2304,48 @@ class MedicalPackItem(TenantModel):
             raise ValidationError("Item cannot be both critical and optional.")
 
 
+class TransferDocument(TenantModel):
+    """A multi-line transfer between two dispensaries. The lines are
+    InterDispensaryTransfer rows; executing the document moves every approved
+    line in one transaction (see pharmacy.transfer_services)."""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("completed", "Completed"),
+        ("cancelled", "Cancelled"),
+    ]
+
+    from_dispensary = models.ForeignKey(
+        "Dispensary", on_delete=models.CASCADE, related_name="outgoing_transfer_documents"
+    )
+    to_dispensary = models.ForeignKey(
+        "Dispensary", on_delete=models.CASCADE, related_name="incoming_transfer_documents"
+    )
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    notes = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name="requested_transfer_documents",
+    )
+    transferred_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="executed_transfer_documents",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    transferred_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"Transfer document #{self.pk}: {self.from_dispensary} to {self.to_dispensary}"
+
+
 class InterDispensaryTransfer(TenantModel):
     """Model to track transfers of medications between dispensaries"""
 
@@ -2426,6 +2366,13 @@ class InterDispensaryTransfer(TenantModel):
     to_dispensary = models.ForeignKey(
         "Dispensary", on_delete=models.CASCADE, related_name="incoming_inter_transfers"
     )
+    document = models.ForeignKey(
+        TransferDocument,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="lines",
+    )
     quantity = models.IntegerField()
     batch_number = models.CharField(max_length=50, blank=True, null=True)
     expiry_date = models.DateField(blank=True, null=True)
@@ -2557,78 +2504,20 @@ class InterDispensaryTransfer(TenantModel):
         if self.is_self_transfer():
             raise ValueError("Cannot execute self-transfer")
 
-        with transaction.atomic():
-            # Stock lives in ActiveStoreInventory/ActiveStoreBatch — validate and
-            # mutate the SAME ledger (the old code validated ActiveStoreInventory
-            # but moved MedicationInventory, so the real ledger never changed and
-            # legacy rows went negative).
-            source_store = getattr(self.from_dispensary, "active_store", None)
-            dest_store = getattr(self.to_dispensary, "active_store", None)
-            if not source_store:
-                raise ValueError(f"No active store for {self.from_dispensary.name}")
-            if not dest_store:
-                raise ValueError(f"No active store for {self.to_dispensary.name}")
-
-            # Lock source row so concurrent transfers can't double-spend.
-            source_inv = (
-                ActiveStoreInventory.objects.select_for_update()
-                .filter(medication=self.medication, active_store=source_store)
-                .first()
-            )
-            if not source_inv or source_inv.stock_quantity < self.quantity:
-                have = source_inv.stock_quantity if source_inv else 0
-                raise ValueError(
-                    f"Insufficient stock. Available: {have}, Required: {self.quantity}"
-                )
+        from .transfer_services import _active_store, move_stock
 
-            dest_inv, _ = ActiveStoreInventory.objects.get_or_create(
-                medication=self.medication,
-                active_store=dest_store,
-                defaults={
-                    "stock_quantity": 0,
-                    "reorder_level": getattr(self.medication, "reorder_level", 10),
-                },
+        with transaction.atomic():
+            # One-line case of the set-based move: locks both stores' rows,
+            # FIFO across batches, and writes the StockMovement ledger.
+            move_stock(
+                _active_store(self.from_dispensary),
+                _active_store(self.to_dispensary),
+                {self.medication_id: self.quantity},
+                executing_user,
+                "inter_dispensary_transfer",
+                self.pk,
             )
 
-            # FIFO across source batches into dest batches, preserving expiry/cost.
-            remaining = self.quantity
-            for batch in source_inv.batches.filter(quantity__gt=0).order_by(
-                "expiry_date", "received_date"
-            ):
-                if remaining <= 0:
-                    break
-                take = min(batch.quantity, remaining)
-                batch.quantity -= take
-                remaining -= take
-
-                dest_batch, created = ActiveStoreBatch.objects.get_or_create(
-                    active_inventory=dest_inv,
-                    batch_number=batch.batch_number,
-                    defaults={
-                        "quantity": take,
-                        "expiry_date": batch.expiry_date,
-                        "unit_cost": batch.unit_cost,
-                    },
-                )
-                if not created:
-                    dest_batch.quantity += take
-                    dest_batch.save(update_fields=["quantity"])
-
-                if batch.quantity == 0:
-                    batch.delete()
-                else:
-                    batch.save(update_fields=["quantity"])
-
-            if remaining > 0:
-                raise ValueError(
-                    f"Could not fulfill transfer. Short by {remaining} units."
-                )
-
-            source_inv.update_summary_fields()
-            dest_inv.last_restock_date = timezone.now()
-            dest_inv.update_summary_fields()
-
-            # Update transfer status
             self.status = "completed"
             self.transferred_by = executing_user
             self.transferred_at = timezone.now()
@@ -2709,6 +2598,207 @@ class InterDispensaryTransfer(TenantModel):
         return True, "Transfer is feasible"
 
 
+class StockMovement(TenantModel):
+    """One line of the append-only stock ledger: a signed quantity of a
+    medication entering or leaving one store (an active store or a bulk
+    store), and the document that caused it.
+
+    Rows are only ever inserted; a correction is a new "adjustment" row. Stock
+    at any past moment is the nearest StockSnapshot plus the movements after
+    it (see pharmacy.stock_ledger)."""
+
+    MOVEMENT_TYPE_CHOICES = [
+        ("receipt", "Receipt"),
+        ("dispense", "Dispense"),
+        ("adjustment", "Adjustment"),
+        ("transfer_out", "Transfer Out"),
+        ("transfer_in", "Transfer In"),
+    ]
+
+    # PROTECT: deleting a medication or a store must not erase its history.
+    # The views deactivate them rather than delete.
+    medication = models.ForeignKey(
+        Medication, on_delete=models.PROTECT, related_name="stock_movements"
+    )
+    active_store = models.ForeignKey(
+        ActiveStore,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="stock_movements",
+    )
+    bulk_store = models.ForeignKey(
+        BulkStore,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="stock_movements",
+    )
+    batch_number = models.CharField(max_length=50, blank=True)
+    expiry_date = models.DateField(null=True, blank=True)
+    quantity = models.IntegerField(help_text="Positive into the store, negative out of it")
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPE_CHOICES)
+    # The source document, e.g. ("transfer_document", 12) or ("dispensing_log", 40).
+    document_type = models.CharField(max_length=40)
+    document_id = models.PositiveIntegerField()
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stock_movements",
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ["created_at", "id"]
+        indexes = [
+            models.Index(
+                fields=["active_store", "medication", "created_at"],
+                name="idx_movement_store_med",
+            ),
+            models.Index(
+                fields=["bulk_store", "medication", "created_at"],
+                name="idx_movement_bulk_med",
+            ),
+            models.Index(fields=["hospital", "created_at"], name="idx_movement_tenant_time"),
+            models.Index(fields=["document_type", "document_id"], name="idx_movement_document"),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                check=models.Q(active_store__isnull=False, bulk_store__isnull=True)
+                | models.Q(active_store__isnull=True, bulk_store__isnull=False),
+                name="stock_movement_one_store",
+            ),
+        ]
+
+    def __str__(self):
+        store = self.active_store_id or f"bulk {self.bulk_store_id}"
+        return f"{self.get_movement_type_display()} {self.quantity:+d} {self.medication_id} @ {store}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValidationError("Stock movements are append-only; record an adjustment instead.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Stock movements are append-only; record an adjustment instead.")
+
+
+class StockSnapshot(TenantModel):
+    """Stock of one medication in one store at `taken_at`, written for every
+    store in one run by `manage.py snapshot_stock`. The anchor that ledger
+    replays start from."""
+
+    taken_at = models.DateTimeField()
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="stock_snapshots"
+    )
+    active_store = models.ForeignKey(
+        ActiveStore,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="stock_snapshots",
+    )
+    bulk_store = models.ForeignKey(
+        BulkStore,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="stock_snapshots",
+    )
+    quantity = models.IntegerField()
+    value = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ["-taken_at"]
+        indexes = [
+            models.Index(fields=["hospital", "taken_at"], name="idx_snapshot_tenant_time"),
+        ]
+
+    def __str__(self):
+        return f"{self.medication_id} x{self.quantity} at {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class DailyConsumption(TenantModel):
+    """Units of a medication dispensed from a dispensary on one day: the daily
+    aggregate of DispensingLog that the reorder engine's rolling windows run
+    over. Maintained incrementally by `manage.py forecast_reorders`."""
+
+    dispensary = models.ForeignKey(
+        Dispensary, on_delete=models.CASCADE, related_name="daily_consumption"
+    )
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="daily_consumption"
+    )
+    day = models.DateField()
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["day"]
+        unique_together = ["dispensary", "medication", "day"]
+        indexes = [
+            models.Index(fields=["hospital", "day"], name="idx_consumption_tenant_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.medication_id} x{self.quantity} at {self.dispensary_id} on {self.day}"
+
+
+class ConsumptionCursor(TenantModel):
+    """The last DispensingLog id folded into DailyConsumption for a hospital,
+    so each nightly run reads only the rows logged since the previous one."""
+
+    last_log_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Consumption cursor {self.hospital_id}: {self.last_log_id}"
+
+
+class ReorderForecast(TenantModel):
+    """The reorder engine's verdict for one medication in one dispensary as of
+    `computed_at` (see pharmacy.reorder_engine). Rewritten for the whole
+    hospital on every run; the procurement dashboard and the alerts read it
+    instead of comparing stock_quantity with reorder_level."""
+
+    dispensary = models.ForeignKey(
+        Dispensary, on_delete=models.CASCADE, related_name="reorder_forecasts"
+    )
+    medication = models.ForeignKey(
+        Medication, on_delete=models.CASCADE, related_name="reorder_forecasts"
+    )
+    stock_quantity = models.IntegerField(default=0)
+    reorder_level = models.IntegerField(default=0)
+    avg_daily_7 = models.FloatField(default=0)
+    avg_daily_28 = models.FloatField(default=0)
+    avg_daily_90 = models.FloatField(default=0)
+    velocity = models.FloatField(default=0, help_text="Forecast units dispensed per day")
+    days_of_cover = models.FloatField(
+        null=True, blank=True, help_text="Days until stock runs out; empty with no recent usage"
+    )
+    reorder_point = models.IntegerField(default=0)
+    reorder_quantity = models.IntegerField(default=0)
+    needs_reorder = models.BooleanField(default=False)
+    units_at_risk = models.IntegerField(
+        default=0, help_text="Units expected to expire before they are dispensed"
+    )
+    expiry_risk = models.FloatField(default=0, help_text="units_at_risk / stock_quantity")
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        ordering = [models.F("days_of_cover").asc(nulls_last=True), "-reorder_quantity"]
+        unique_together = ["dispensary", "medication"]
+        indexes = [
+            models.Index(fields=["hospital", "needs_reorder"], name="idx_forecast_tenant_reorder"),
+        ]
+
+    def __str__(self):
+        return f"{self.medication_id} at {self.dispensary_id}: reorder {self.reorder_quantity}"
+
+
 class PharmacyExpense(TenantModel):
     """Model for tracking pharmacy expenses beyond purchases"""
 
@@ -0,0 +1,234 @@
+"""Denormalized pricing, payment and dispensing columns on Prescription.
+
+Prescription lists used to call get_total_prescribed_price,
+is_payment_verified, get_payment_status_display_info and
+get_dispensing_progress per row, each re-reading the items, the invoice and
+the carts. Those values now live on the prescription itself:
+
+    total_prescribed_price, patient_payable_amount    from the items
+    items_count, items_fully_dispensed,
+    items_partially_dispensed                          from the items
+    payment_verified, payment_state                    from payment_status,
+                                                       the invoice and carts
+
+refresh(ids) recomputes them for any number of prescriptions in one UPDATE
+with correlated subqueries. connect() calls it whenever a row those values
+depend on is saved or deleted: items, carts, dispensing logs, invoices, the
+prescription's own payment fields, and (for prescriptions not yet paid) a
+medication's price or a patient's type. After an item or the prescription
+itself is saved, the new values are also copied onto the Prescription
+instance in hand. `manage.py refresh_prescription_summaries`
+backfills existing rows and repairs anything written with queryset.update().
+"""
+from django.db.models import (
+    BooleanField, Case, CharField, Count, DecimalField, Exists, F, OuterRef, Q,
+    Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete, post_save, pre_delete
+
+from nhia.utils import NHIA_PATIENT_RATE
+
+SUMMARY_FIELDS = [
+    "total_prescribed_price", "patient_payable_amount", "items_count",
+    "items_fully_dispensed", "items_partially_dispensed", "payment_verified",
+    "payment_state",
+]
+
+# PrescriptionSearchForm's payment_status choices, as payment_state values.
+PAYMENT_STATE_FILTERS = {
+    "paid": ["paid", "paid_invoice", "paid_cart"],
+    "waived": ["waived"],
+    "unpaid": ["invoice_pending", "cart_pending", "unpaid"],
+}
+
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _models(apps=None):
+    """Prescription, PrescriptionItem, PrescriptionCart, Invoice and Patient,
+    from `apps` when a migration passes its historical registry."""
+    if apps is None:
+        from django.apps import apps
+    return [
+        apps.get_model(label)
+        for label in ("pharmacy.Prescription", "pharmacy.PrescriptionItem",
+                      "pharmacy.PrescriptionCart", "billing.Invoice", "patients.Patient")
+    ]
+
+
+def _item_aggregate(items, expression, **filters):
+    items = items.filter(prescription=OuterRef("pk"), **filters)
+    return Coalesce(
+        Subquery(
+            items.order_by().values("prescription").annotate(v=expression).values("v"),
+            output_field=expression.output_field,
+        ),
+        Value(0, output_field=expression.output_field),
+    )
+
+
+def _summary_expressions(apps=None):
+    # _base_manager: unscoped by tenant, and present on historical models too.
+    _, PrescriptionItem, PrescriptionCart, Invoice, Patient = _models(apps)
+    items = PrescriptionItem._base_manager.all()
+    total = _item_aggregate(items, Sum(F("medication__price") * F("quantity"), output_field=_MONEY))
+    nhia = Exists(Patient._base_manager.filter(pk=OuterRef("patient_id"), patient_type="nhia"))
+    invoice = Invoice._base_manager.filter(pk=OuterRef("invoice_id"))
+    invoice_paid = Exists(invoice.filter(status="paid"))
+    carts = PrescriptionCart._base_manager.filter(prescription=OuterRef("pk"))
+    paying_cart = carts.filter(status__in=["paid", "partially_dispensed"])
+    unpaid = Q(payment_status="unpaid")
+    return {
+        "total_prescribed_price": total,
+        "patient_payable_amount": Case(
+            When(nhia, then=total * Value(NHIA_PATIENT_RATE, output_field=_MONEY)),
+            default=total,
+            output_field=_MONEY,
+        ),
+        "items_count": _item_aggregate(items, Count("id")),
+        "items_fully_dispensed": _item_aggregate(items, Count("id"), is_dispensed=True),
+        "items_partially_dispensed": _item_aggregate(
+            items, Count("id"), is_dispensed=False, quantity_dispensed_so_far__gt=0
+        ),
+        # Prescription.is_payment_verified as it was: any paying cart that has
+        # an invoice counts, paid or not.
+        "payment_verified": Case(
+            When(payment_status__in=["paid", "waived"], then=Value(True)),
+            When(unpaid & Q(invoice_paid), then=Value(True)),
+            When(unpaid & Q(Exists(paying_cart.filter(invoice__isnull=False))), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ),
+        "payment_state": Case(
+            When(payment_status="paid", then=Value("paid")),
+            When(payment_status="waived", then=Value("waived")),
+            When(invoice_paid, then=Value("paid_invoice")),
+            When(Exists(invoice.filter(status="unpaid")), then=Value("invoice_pending")),
+            When(Exists(invoice.filter(status="waived")), then=Value("waived")),
+            When(Exists(paying_cart.filter(invoice__status="paid")), then=Value("paid_cart")),
+            When(Exists(carts.filter(status__in=["invoiced", "active"])), then=Value("cart_pending")),
+            default=Value("unpaid"),
+            output_field=CharField(),
+        ),
+    }
+
+
+def refresh(prescription_ids, apps=None):
+    """Recompute the summary columns of these prescriptions in one UPDATE.
+    Returns the number of rows updated."""
+    Prescription = _models(apps)[0]
+    ids = {pk for pk in prescription_ids if pk}
+    if not ids:
+        return 0
+    return Prescription._base_manager.filter(pk__in=ids).update(**_summary_expressions(apps))
+
+
+def refresh_queryset(queryset):
+    """refresh() over a Prescription queryset, without loading it."""
+    return queryset.model._base_manager.filter(
+        pk__in=queryset.values("pk")
+    ).update(**_summary_expressions())
+
+
+def _reload(prescription):
+    """Copy the refreshed columns onto a Prescription the caller still holds,
+    so it reads the new total and payment state without refresh_from_db."""
+    values = type(prescription)._base_manager.filter(pk=prescription.pk).values(*SUMMARY_FIELDS).first()
+    for field, value in (values or {}).items():
+        setattr(prescription, field, value)
+
+
+def _on_item(sender, instance, **kwargs):
+    refresh([instance.prescription_id])
+    if sender.prescription.is_cached(instance):
+        _reload(instance.prescription)
+
+
+def _on_cart(sender, instance, **kwargs):
+    refresh([instance.prescription_id])
+
+
+def _on_dispensing_log(sender, instance, **kwargs):
+    from .models import PrescriptionItem
+
+    refresh(
+        PrescriptionItem.all_objects.filter(pk=instance.prescription_item_id)
+        .values_list("prescription_id", flat=True)
+    )
+
+
+def _invoice_prescriptions(invoice):
+    from .models import Prescription
+
+    return Prescription.all_objects.filter(
+        Q(invoice_id=invoice.pk) | Q(carts__invoice_id=invoice.pk)
+        | Q(pk=invoice.prescription_id or 0)
+    )
+
+
+def _on_invoice(sender, instance, **kwargs):
+    refresh_queryset(_invoice_prescriptions(instance))
+
+
+def _before_invoice_delete(sender, instance, **kwargs):
+    # The links are SET_NULL by the time post_delete fires.
+    instance._summary_prescription_ids = list(
+        _invoice_prescriptions(instance).values_list("pk", flat=True)
+    )
+
+
+def _after_invoice_delete(sender, instance, **kwargs):
+    refresh(getattr(instance, "_summary_prescription_ids", []))
+
+
+def _on_prescription(sender, instance, created=False, update_fields=None, **kwargs):
+    watched = {"payment_status", "invoice", "invoice_id", "patient", "patient_id"}
+    if created or update_fields is None or watched & set(update_fields):
+        refresh([instance.pk])
+        _reload(instance)
+
+
+def _on_medication(sender, instance, update_fields=None, **kwargs):
+    from .models import Prescription
+
+    if update_fields is None or "price" in update_fields:
+        refresh_queryset(
+            Prescription.all_objects.filter(items__medication=instance, payment_verified=False)
+        )
+
+
+def _on_patient(sender, instance, created=False, update_fields=None, **kwargs):
+    from .models import Prescription
+
+    if created or (update_fields is not None and "patient_type" not in update_fields):
+        return
+    refresh_queryset(
+        Prescription.all_objects.filter(patient_id=instance.pk, payment_verified=False)
+    )
+
+
+def connect():
+    # billing's own Invoice receivers fix up invoice.status with a queryset
+    # update; importing them first makes them run before _on_invoice.
+    import billing.signals  # noqa: F401
+
+    hooks = (
+        ("pharmacy.PrescriptionItem", _on_item, _on_item),
+        ("pharmacy.PrescriptionCart", _on_cart, _on_cart),
+        ("pharmacy.DispensingLog", _on_dispensing_log, _on_dispensing_log),
+        ("billing.Invoice", _on_invoice, _after_invoice_delete),
+        ("pharmacy.Prescription", _on_prescription, None),
+        ("pharmacy.Medication", _on_medication, None),
+        ("patients.Patient", _on_patient, None),
+    )
+    for label, on_save, on_delete in hooks:
+        uid = f"prescription_summary_{label}"
+        post_save.connect(on_save, sender=label, dispatch_uid=uid, weak=False)
+        if on_delete:
+            post_delete.connect(on_delete, sender=label, dispatch_uid=uid, weak=False)
+    pre_delete.connect(
+        _before_invoice_delete, sender="billing.Invoice",
+        dispatch_uid="prescription_summary_billing.Invoice", weak=False,
+    )
+
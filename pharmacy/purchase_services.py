@@ -9,7 +9,7 @@ from decimal import Decimal, InvalidOperation
 from django.db import transaction
 from django.utils import timezone
 
-from .models import Purchase, PurchaseApproval, PurchasePayment
+from .models import BulkStore, Purchase, PurchaseApproval, PurchasePayment
 
 
 class PurchaseActionError(Exception):
@@ -107,10 +107,12 @@ def reject_purchase(purchase, user, reason):
     return purchase
 
 
-def receive_delivery(purchase, quantities):
+def receive_delivery(purchase, quantities, bulk_store=None):
     """Book received goods into the bulk store.
 
     `quantities` maps PurchaseItem id -> quantity received in this delivery.
+    `bulk_store` (a BulkStore or its id) picks the store; default is the
+    main bulk store.
     """
     if not purchase.can_receive_delivery():
         raise PurchaseActionError(
@@ -130,6 +132,12 @@ def receive_delivery(purchase, quantities):
     if not any(qty > 0 for qty in cleaned.values()):
         raise PurchaseActionError("Enter a received quantity for at least one item.")
 
+    if bulk_store not in (None, "") and not isinstance(bulk_store, BulkStore):
+        try:
+            bulk_store = BulkStore.objects.get(pk=int(bulk_store), is_active=True)
+        except (TypeError, ValueError, BulkStore.DoesNotExist):
+            raise PurchaseActionError("Choose an active bulk store.")
+
     with transaction.atomic():
         # Lock the row so concurrent receipts can't double-add stock.
         purchase = Purchase.objects.select_for_update().get(id=purchase.id)
@@ -138,7 +146,7 @@ def receive_delivery(purchase, quantities):
                 "This purchase can no longer receive deliveries."
             )
         try:
-            purchase.receive_items(cleaned)
+            purchase.receive_items(cleaned, bulk_store=bulk_store or None)
         except ValueError as e:
             raise PurchaseActionError(str(e))
     return purchase
@@ -0,0 +1,226 @@
+"""Predictive reordering from dispensing history.
+
+The alerts used to flag a row when stock_quantity <= reorder_level, a number
+somebody typed once per row. The engine instead asks how fast each dispensary
+actually uses each medication:
+
+- ingest(hospital) folds the DispensingLog rows logged since the last run
+  (ConsumptionCursor) into DailyConsumption, one GROUP BY over the new rows
+  only, so the nightly cost follows the day's dispensing, not the history;
+- forecast(hospital) reads the last 90 days of DailyConsumption, lays each
+  (dispensary, medication) out as a dense per-day series and takes 7/28/90 day
+  rolling means over prefix sums. The blended velocity gives days of cover, a
+  reorder point (lead-time demand plus safety stock from the 28-day spread)
+  and an order quantity that covers lead time plus REORDER_COVER_DAYS. Walking
+  the batches FIFO against that velocity gives the units expected to expire
+  before they are dispensed. The results replace the hospital's
+  ReorderForecast rows in one transaction.
+
+Rows with no usage in the window fall back to the static reorder_level, so a
+medication nobody has dispensed yet is still flagged when it runs low.
+
+Celery beat runs pharmacy.tasks.forecast_reorders nightly. Readers call
+ensure_forecast() first, so a hospital the schedule has not reached yet (a
+new tenant, a deploy without beat) is forecast on first read instead of
+showing nothing.
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    ActiveStoreBatch, ActiveStoreInventory, ConsumptionCursor, DailyConsumption,
+    DispensingLog, ReorderForecast,
+)
+
+WINDOWS = (7, 28, 90)
+# The 7/28/90 day means are blended so a recent surge counts without one busy
+# week doubling the order.
+WEIGHTS = (0.5, 0.3, 0.2)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def ingest(hospital_id):
+    """Add DispensingLog rows newer than the hospital's cursor to
+    DailyConsumption. Returns the number of log rows read."""
+    with transaction.atomic():
+        cursor = ConsumptionCursor.all_objects.select_for_update().filter(
+            hospital_id=hospital_id
+        ).first()
+        if cursor is None:
+            cursor = ConsumptionCursor.all_objects.create(hospital_id=hospital_id)
+        logs = DispensingLog.all_objects.filter(hospital_id=hospital_id, pk__gt=cursor.last_log_id)
+        # Bound the run, so rows logged while it works wait for the next one.
+        bounds = logs.aggregate(high=Max("pk"))
+        if bounds["high"] is None:
+            return 0
+        logs = logs.filter(pk__lte=bounds["high"])
+        read = logs.count()
+
+        totals = {
+            (row["dispensary_id"], row["med_id"], row["day"]): row["qty"]
+            for row in logs.filter(dispensary__isnull=False)
+            .values("dispensary_id", med_id=F("prescription_item__medication_id"),
+                    day=TruncDate("dispensed_date"))
+            .annotate(qty=Sum("dispensed_quantity"))
+            .order_by()
+        }
+        if totals:
+            existing = {
+                (row.dispensary_id, row.medication_id, row.day): row
+                for row in DailyConsumption.all_objects.filter(
+                    hospital_id=hospital_id,
+                    day__in={day for _, _, day in totals},
+                    dispensary_id__in={d for d, _, _ in totals},
+                    medication_id__in={m for _, m, _ in totals},
+                )
+            }
+            changed, created = [], []
+            for (dispensary_id, medication_id, day), qty in totals.items():
+                row = existing.get((dispensary_id, medication_id, day))
+                if row is None:
+                    created.append(DailyConsumption(
+                        hospital_id=hospital_id, dispensary_id=dispensary_id,
+                        medication_id=medication_id, day=day, quantity=qty,
+                    ))
+                else:
+                    row.quantity += qty
+                    changed.append(row)
+            DailyConsumption.all_objects.bulk_update(changed, ["quantity"], batch_size=500)
+            DailyConsumption.all_objects.bulk_create(created, batch_size=500)
+
+        cursor.last_log_id = bounds["high"]
+        cursor.save(update_fields=["last_log_id", "updated_at"])
+    return read
+
+
+def rebuild(hospital_id):
+    """Drop the hospital's daily aggregates and cursor and ingest the whole
+    DispensingLog again (after logs were edited or deleted)."""
+    with transaction.atomic():
+        DailyConsumption.all_objects.filter(hospital_id=hospital_id).delete()
+        ConsumptionCursor.all_objects.filter(hospital_id=hospital_id).delete()
+        return ingest(hospital_id)
+
+
+def _rolling_means(series):
+    """Means of the last 7/28/90 entries of a dense daily series, from one
+    prefix-sum pass."""
+    prefix = [0]
+    for qty in series:
+        prefix.append(prefix[-1] + qty)
+    return tuple((prefix[-1] - prefix[-1 - w]) / w for w in WINDOWS)
+
+
+def _std(values):
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+
+
+def units_at_risk(batches, velocity, today):
+    """Units in (quantity, expiry_date) batches, oldest expiry first, that
+    will still be on the shelf at expiry if stock goes at `velocity` a day."""
+    used = at_risk = 0
+    for quantity, expiry_date in batches:
+        # Everything dispensed until this batch expires, minus what the earlier
+        # batches absorbed, comes out of this batch (FIFO).
+        capacity = max(0, velocity * (expiry_date - today).days - used)
+        drawn = min(quantity, capacity)
+        used += drawn
+        at_risk += quantity - drawn
+    return int(math.ceil(at_risk))
+
+
+def ensure_forecast(hospital_id):
+    """Ingest and forecast a hospital that has no ReorderForecast rows yet.
+    Returns True if it had to."""
+    if ReorderForecast.all_objects.filter(hospital_id=hospital_id).exists():
+        return False
+    ingest(hospital_id)
+    forecast(hospital_id)
+    return True
+
+
+def forecast(hospital_id, today=None):
+    """Recompute every ReorderForecast row of a hospital. Returns the number
+    of rows written."""
+    now = timezone.now()
+    today = today or timezone.localdate()
+    span = WINDOWS[-1]
+    start = today - timedelta(days=span - 1)
+    lead_days = _setting("PHARMACY_REORDER_LEAD_DAYS", 7)
+    cover_days = _setting("PHARMACY_REORDER_COVER_DAYS", 30)
+    service_z = _setting("PHARMACY_REORDER_SERVICE_Z", 1.65)
+
+    series = defaultdict(lambda: [0] * span)
+    for dispensary_id, medication_id, day, qty in DailyConsumption.all_objects.filter(
+        hospital_id=hospital_id, day__gte=start, day__lte=today
+    ).values_list("dispensary_id", "medication_id", "day", "quantity"):
+        series[(dispensary_id, medication_id)][(day - start).days] += qty
+
+    stock = {}
+    for row in ActiveStoreInventory.all_objects.filter(hospital_id=hospital_id).values(
+        "pk", "medication_id", "stock_quantity", "reorder_level", "expiry_date",
+        dispensary_id=F("active_store__dispensary_id"),
+    ):
+        stock[(row["dispensary_id"], row["medication_id"])] = row
+    batches = defaultdict(list)
+    for inventory_id, quantity, expiry_date in ActiveStoreBatch.all_objects.filter(
+        hospital_id=hospital_id, quantity__gt=0
+    ).order_by("expiry_date", "received_date", "pk").values_list(
+        "active_inventory_id", "quantity", "expiry_date"
+    ):
+        batches[inventory_id].append((quantity, expiry_date))
+
+    forecasts = []
+    for key in set(series) | set(stock):
+        dispensary_id, medication_id = key
+        inventory = stock.get(key)
+        on_hand = max(inventory["stock_quantity"], 0) if inventory else 0
+        reorder_level = inventory["reorder_level"] if inventory else 0
+        daily = series.get(key) or [0] * span
+        means = _rolling_means(daily)
+        velocity = sum(w * m for w, m in zip(WEIGHTS, means))
+
+        if velocity > 0:
+            safety = service_z * _std(daily[-28:]) * math.sqrt(lead_days)
+            reorder_point = int(math.ceil(velocity * lead_days + safety))
+            days_of_cover = on_hand / velocity
+            needs_reorder = on_hand <= reorder_point
+            target = velocity * (lead_days + cover_days) + safety
+            reorder_quantity = int(math.ceil(target - on_hand)) if needs_reorder else 0
+        else:
+            reorder_point = reorder_level
+            days_of_cover = None
+            needs_reorder = inventory is not None and on_hand <= reorder_level
+            reorder_quantity = max(2 * reorder_level - on_hand, 0) if needs_reorder else 0
+
+        lots = batches.get(inventory["pk"], []) if inventory else []
+        if not lots and on_hand and inventory["expiry_date"]:
+            lots = [(on_hand, inventory["expiry_date"])]
+        at_risk = min(units_at_risk(lots, velocity, today), on_hand)
+
+        forecasts.append(ReorderForecast(
+            hospital_id=hospital_id, dispensary_id=dispensary_id,
+            medication_id=medication_id, stock_quantity=on_hand,
+            reorder_level=reorder_level, avg_daily_7=means[0],
+            avg_daily_28=means[1], avg_daily_90=means[2], velocity=velocity,
+            days_of_cover=days_of_cover, reorder_point=reorder_point,
+            reorder_quantity=max(reorder_quantity, 0), needs_reorder=needs_reorder,
+            units_at_risk=at_risk, expiry_risk=at_risk / on_hand if on_hand else 0,
+            computed_at=now,
+        ))
+
+    with transaction.atomic():
+        ReorderForecast.all_objects.filter(hospital_id=hospital_id).delete()
+        ReorderForecast.all_objects.bulk_create(forecasts, batch_size=500)
+    return len(forecasts)
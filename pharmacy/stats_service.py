@@ -0,0 +1,153 @@
+"""Headline pharmacy counters, one conditional-aggregate query per table.
+
+inventory_list, pharmacy_dashboard, bulk_store_dashboard and the manage-
+dispensaries API each used to fire their own handful of count() calls on
+every load. statistics() computes all of them with Count/Sum(filter=...)
+aggregates — one query for medications, one for active-store stock, one for
+bulk stock, one each for suppliers, dispensaries and the two transfer tables
+— and caches the result per (hospital, dispensary).
+
+The cache keys embed a per-hospital version (the dashboard/cache.py scheme).
+invalidate() bumps it; it is called by stock_ledger.record(), which every
+stock-writing path goes through, and by post_save/post_delete on the
+pharmacy models the counters read (connect(), from PharmacyConfig.ready).
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+from .models import (
+    ActiveStoreInventory, BulkStoreInventory, Dispensary, InterDispensaryTransfer,
+    Medication, MedicationTransfer, Supplier,
+)
+
+CACHE_TIMEOUT = 300
+EXPIRY_WINDOW_DAYS = 30
+
+WATCHED = (
+    "pharmacy.Medication",
+    "pharmacy.Supplier",
+    "pharmacy.Dispensary",
+    "pharmacy.ActiveStoreInventory",
+    "pharmacy.BulkStoreInventory",
+    "pharmacy.MedicationTransfer",
+    "pharmacy.InterDispensaryTransfer",
+)
+
+
+def _version_key(hospital_id):
+    return f"pharmacy_stats_version_{hospital_id or 0}"
+
+
+def invalidate(hospital_id):
+    """Retire every cached statistics entry of one hospital."""
+    key = _version_key(hospital_id)
+    try:
+        cache.incr(key)
+    except ValueError:  # key absent or expired
+        cache.set(key, 1, None)
+
+
+def _medications(dispensary_id):
+    low = ActiveStoreInventory.objects.filter(
+        medication=OuterRef("pk"), stock_quantity__lte=F("reorder_level")
+    )
+    if dispensary_id:
+        low = low.filter(active_store__dispensary_id=dispensary_id)
+    return Medication.objects.aggregate(
+        total=Count("id"),
+        active=Count("id", filter=Q(is_active=True)),
+        low_stock=Count("id", filter=Q(is_active=True) & Q(Exists(low))),
+    )
+
+
+def _active_stock(dispensary_id, today):
+    stock = ActiveStoreInventory.objects.all()
+    if dispensary_id:
+        stock = stock.filter(active_store__dispensary_id=dispensary_id)
+    in_stock = Q(stock_quantity__gt=0)
+    return stock.aggregate(
+        lines=Count("id"),
+        low_stock=Count("id", filter=Q(stock_quantity__lte=F("reorder_level"))),
+        out_of_stock=Count("id", filter=Q(stock_quantity__lte=0)),
+        expired=Count("id", filter=in_stock & Q(expiry_date__lt=today)),
+        expiring_soon=Count("id", filter=in_stock & Q(
+            expiry_date__gte=today,
+            expiry_date__lte=today + timedelta(days=EXPIRY_WINDOW_DAYS),
+        )),
+        quantity=Sum("stock_quantity"),
+        value=Sum(F("stock_quantity") * F("unit_cost")),
+    )
+
+
+def _bulk_stock(today):
+    in_stock = Q(stock_quantity__gt=0)
+    return BulkStoreInventory.objects.aggregate(
+        medications=Count("medication", distinct=True),
+        low_stock=Count("id", filter=in_stock & Q(stock_quantity__lte=F("medication__reorder_level"))),
+        out_of_stock=Count("id", filter=Q(stock_quantity=0)),
+        expired=Count("id", filter=in_stock & Q(expiry_date__lt=today)),
+        expiring_soon=Count("id", filter=in_stock & Q(
+            expiry_date__gte=today,
+            expiry_date__lte=today + timedelta(days=EXPIRY_WINDOW_DAYS),
+        )),
+        quantity=Sum("stock_quantity"),
+        value=Sum(F("stock_quantity") * F("unit_cost")),
+    )
+
+
+def _compute(dispensary_id):
+    today = timezone.localdate()
+    transfers = InterDispensaryTransfer.objects.all()
+    if dispensary_id:
+        transfers = transfers.filter(
+            Q(from_dispensary_id=dispensary_id) | Q(to_dispensary_id=dispensary_id)
+        )
+    stats = {
+        "medications": _medications(dispensary_id),
+        "active_stock": _active_stock(dispensary_id, today),
+        "bulk_stock": _bulk_stock(today),
+        "suppliers": Supplier.objects.aggregate(
+            total=Count("id"), active=Count("id", filter=Q(is_active=True)),
+        ),
+        "dispensaries": Dispensary.objects.aggregate(
+            total=Count("id"), active=Count("id", filter=Q(is_active=True)),
+        ),
+        "inter_transfers": transfers.aggregate(
+            total=Count("id"), pending=Count("id", filter=Q(status="pending")),
+        ),
+        "bulk_transfers": MedicationTransfer.objects.aggregate(
+            total=Count("id"), pending=Count("id", filter=Q(status="pending")),
+        ),
+    }
+    for section in ("active_stock", "bulk_stock"):
+        for field in ("quantity", "value"):
+            stats[section][field] = stats[section][field] or 0
+    return stats
+
+
+def statistics(hospital_id, dispensary_id=None):
+    """Every headline counter for a hospital, optionally narrowed to one
+    dispensary (active-store stock, low-stock medications and inter-dispensary
+    transfers). Reads the current tenant's rows, so pass its id."""
+    version = cache.get(_version_key(hospital_id)) or 0
+    key = f"pharmacy_stats_{hospital_id or 0}_{dispensary_id or 0}_{version}"
+    stats = cache.get(key)
+    if stats is None:
+        stats = _compute(dispensary_id)
+        cache.set(key, stats, CACHE_TIMEOUT)
+    return stats
+
+
+def _invalidate(sender, instance, **kwargs):
+    invalidate(getattr(instance, "hospital_id", None))
+
+
+def connect():
+    for label in WATCHED:
+        uid = f"pharmacy_stats_invalidate_{label}"
+        post_save.connect(_invalidate, sender=label, dispatch_uid=uid, weak=False)
+        post_delete.connect(_invalidate, sender=label, dispatch_uid=uid, weak=False)
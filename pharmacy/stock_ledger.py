@@ -0,0 +1,185 @@
+"""The stock ledger: append-only StockMovement rows plus periodic snapshots.
+
+Every place that changes stock (receiving a delivery, bulk-to-active and
+inter-dispensary transfers, dispensing, direct stock entry and manual edits)
+also appends movements saying what changed and which document caused it. The
+inventory tables stay the fast "stock now" read; the ledger answers
+everything that is about a past moment:
+
+- stock_at(when, store) = the latest StockSnapshot at or before `when`, plus
+  the movements between that snapshot and `when`. Both reads are range scans
+  on (store, created_at) indexes, so month-end valuation is two queries no
+  matter how old the month is;
+- reconcile(hospital) replays the ledger up to now and compares it with the live
+  inventory rows, which is how drift (the thing
+  merge_duplicate_active_store_inventory used to paper over) is found.
+
+Snapshots are written by `manage.py snapshot_stock` (nightly or monthly).
+Run it once when the ledger is switched on: stock that existed before the
+first snapshot has no movements behind it.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import DecimalField, F, Max, Sum
+from django.utils import timezone
+
+from . import stats_service
+from .models import (
+    ActiveStoreInventory, BulkStoreInventory, StockMovement, StockSnapshot,
+)
+
+_VALUE = DecimalField(max_digits=14, decimal_places=2)
+
+
+def movement(medication_id, quantity, movement_type, document_type, document_id,
+             active_store=None, bulk_store=None, batch_number="", expiry_date=None,
+             unit_cost=0, user=None, at=None):
+    """An unsaved StockMovement; pass a list of them to record()."""
+    store = active_store or bulk_store
+    return StockMovement(
+        hospital_id=store.hospital_id, medication_id=medication_id,
+        active_store=active_store, bulk_store=bulk_store,
+        batch_number=batch_number or "", expiry_date=expiry_date,
+        quantity=quantity, unit_cost=unit_cost or 0, movement_type=movement_type,
+        document_type=document_type, document_id=document_id,
+        created_by=user if user is not None and user.is_authenticated else None,
+        created_at=at or timezone.now(),
+    )
+
+
+def record(movements):
+    """Append movements in one INSERT, skipping zero quantities. Stock changed,
+    so the stores' cached pharmacy statistics are retired too."""
+    rows = StockMovement.objects.bulk_create([m for m in movements if m.quantity])
+    for hospital_id in {row.hospital_id for row in rows}:
+        stats_service.invalidate(hospital_id)
+    return rows
+
+
+def record_adjustment(inventory, quantity, user=None, movement_type="adjustment",
+                      document_type="inventory_edit"):
+    """Book a direct change of `quantity` units to an ActiveStoreInventory or
+    BulkStoreInventory row (stock entry, manual edit, deletion); the row
+    itself is the source document."""
+    if isinstance(inventory, ActiveStoreInventory):
+        store = {"active_store": inventory.active_store}
+    else:
+        store = {"bulk_store": inventory.bulk_store}
+    return record([
+        movement(
+            inventory.medication_id, quantity, movement_type, document_type,
+            inventory.pk, batch_number=inventory.batch_number,
+            expiry_date=inventory.expiry_date, unit_cost=inventory.unit_cost,
+            user=user, **store,
+        )
+    ])
+
+
+def _store_filter(active_store, bulk_store):
+    if (active_store is None) == (bulk_store is None):
+        raise ValueError("Pass exactly one of active_store or bulk_store")
+    store = active_store or bulk_store
+    field = "active_store" if active_store is not None else "bulk_store"
+    return store.hospital_id, {field: store}
+
+
+def _replay(when, hospital_id, keys, **filters):
+    """{key tuple: (quantity, value)} as of `when`, grouped by `keys`."""
+    snapshots = StockSnapshot.all_objects.filter(hospital_id=hospital_id, taken_at__lte=when)
+    # The latest run for the tenant, not per store: a store that was empty at
+    # that run simply has no rows in it.
+    anchor = snapshots.aggregate(latest=Max("taken_at"))["latest"]
+    totals = defaultdict(lambda: [0, Decimal("0")])
+    if anchor is not None:
+        for row in (
+            snapshots.filter(taken_at=anchor, **filters).values(*keys)
+            .annotate(qty=Sum("quantity"), val=Sum("value")).order_by()
+        ):
+            total = totals[tuple(row[k] for k in keys)]
+            total[0] += row["qty"] or 0
+            total[1] += row["val"] or 0
+
+    moves = StockMovement.all_objects.filter(
+        hospital_id=hospital_id, created_at__lte=when, **filters
+    )
+    if anchor is not None:
+        moves = moves.filter(created_at__gt=anchor)
+    for row in (
+        moves.values(*keys)
+        .annotate(qty=Sum("quantity"), val=Sum(F("quantity") * F("unit_cost"), output_field=_VALUE))
+        .order_by()
+    ):
+        total = totals[tuple(row[k] for k in keys)]
+        total[0] += row["qty"] or 0
+        total[1] += row["val"] or 0
+    return {key: (qty, val) for key, (qty, val) in totals.items()}
+
+
+def stock_at(when, active_store=None, bulk_store=None):
+    """{medication_id: (quantity, value)} in one store at `when`."""
+    hospital_id, filters = _store_filter(active_store, bulk_store)
+    return {
+        medication_id: total
+        for (medication_id,), total in _replay(when, hospital_id, ["medication_id"], **filters).items()
+    }
+
+
+def valuation_at(when, hospital_id):
+    """{(active_store_id, bulk_store_id): (quantity, value)} for every store of
+    a hospital at `when` — the month-end stock valuation."""
+    return _replay(when, hospital_id, ["active_store_id", "bulk_store_id"])
+
+
+def _live(hospital_id):
+    """Current stock per store and medication, read from the inventory tables."""
+    rows = []
+    active = ActiveStoreInventory.all_objects.filter(hospital_id=hospital_id)
+    bulk = BulkStoreInventory.all_objects.filter(hospital_id=hospital_id)
+    for row in (
+        active.values("active_store_id", "medication_id")
+        .annotate(qty=Sum("stock_quantity"),
+                  val=Sum(F("stock_quantity") * F("unit_cost"), output_field=_VALUE))
+        .order_by()
+    ):
+        rows.append((row["active_store_id"], None, row["medication_id"], row["qty"] or 0, row["val"] or 0))
+    for row in (
+        bulk.values("bulk_store_id", "medication_id")
+        .annotate(qty=Sum("stock_quantity"),
+                  val=Sum(F("stock_quantity") * F("unit_cost"), output_field=_VALUE))
+        .order_by()
+    ):
+        rows.append((None, row["bulk_store_id"], row["medication_id"], row["qty"] or 0, row["val"] or 0))
+    return rows
+
+
+def take_snapshot(hospital_id, at=None):
+    """Snapshot every store of a hospital from the live inventory. Returns the
+    number of rows written."""
+    at = at or timezone.now()
+    snapshots = [
+        StockSnapshot(
+            hospital_id=hospital_id, taken_at=at, active_store_id=active_id,
+            bulk_store_id=bulk_id, medication_id=medication_id, quantity=qty, value=val,
+        )
+        for active_id, bulk_id, medication_id, qty, val in _live(hospital_id)
+    ]
+    StockSnapshot.all_objects.bulk_create(snapshots, batch_size=1000)
+    return len(snapshots)
+
+
+def reconcile(hospital_id, at=None):
+    """[(active_store_id, bulk_store_id, medication_id, ledger_qty, live_qty)]
+    wherever the ledger replayed to now disagrees with the inventory tables."""
+    at = at or timezone.now()
+    expected = _replay(at, hospital_id, ["active_store_id", "bulk_store_id", "medication_id"])
+    drift = []
+    for active_id, bulk_id, medication_id, qty, _ in _live(hospital_id):
+        ledger_qty = expected.pop((active_id, bulk_id, medication_id), (0, 0))[0]
+        if ledger_qty != qty:
+            drift.append((active_id, bulk_id, medication_id, ledger_qty, qty))
+    drift.extend(
+        (active_id, bulk_id, medication_id, qty, 0)
+        for (active_id, bulk_id, medication_id), (qty, _) in expected.items() if qty
+    )
+    return drift
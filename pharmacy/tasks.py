@@ -0,0 +1,28 @@
+"""
+Celery tasks for pharmacy inventory.
+Scheduled from hms/celery.py; each wraps the management command of the same name.
+"""
+
+import logging
+from io import StringIO
+
+from celery import shared_task
+from django.core.management import call_command
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def forecast_reorders():
+    """
+    Fold the day's dispensing into the consumption aggregates and recompute
+    every hospital's ReorderForecast rows (pharmacy.reorder_engine).
+
+    Returns:
+        dict: The command's per-hospital summary lines
+    """
+    out = StringIO()
+    call_command('forecast_reorders', stdout=out)
+    lines = out.getvalue().splitlines()
+    logger.info(f"Reorder forecasts refreshed: {len(lines)} hospital(s)")
+    return {'hospitals': lines}
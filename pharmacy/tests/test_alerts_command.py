@@ -77,3 +77,9 @@ class PharmacyAlertsTenantTest(TestCase):
         call_command("send_pharmacy_alerts")
 
         self.assertEqual([m.to for m in mail.outbox], [["h1@example.com"]])
+
+    def test_rerun_on_the_same_day_sends_nothing_new(self):
+        call_command("send_pharmacy_alerts")
+        call_command("send_pharmacy_alerts")
+
+        self.assertEqual(len(mail.outbox), 2)
@@ -0,0 +1,182 @@
+"""Denormalized prescription pricing, payment and dispensing columns, kept in
+step with items, invoices, carts and dispensing logs."""
+import io
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, modify_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from billing.models import Invoice
+from patients.models import Patient
+from pharmacy.cart_models import PrescriptionCart
+from pharmacy.models import (
+    Dispensary, DispensingLog, Medication, MedicationCategory, Prescription,
+    PrescriptionItem,
+)
+
+User = get_user_model()
+
+
+class PrescriptionSummaryTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            phone_number="08012000401", username="summaryadmin", password="pw12345",
+        )
+        category = MedicationCategory.objects.create(name="Antimalarial")
+        self.artemether = Medication.objects.create(
+            name="Artemether", category=category, dosage_form="tablet",
+            strength="80mg", price=Decimal("150.00"),
+        )
+        self.quinine = Medication.objects.create(
+            name="Quinine", category=category, dosage_form="tablet",
+            strength="300mg", price=Decimal("20.00"),
+        )
+        self.patient = Patient.objects.create(
+            first_name="Bola", last_name="Ade", date_of_birth="1988-02-02",
+            gender="female", phone_number="08020000401",
+        )
+        self.prescription = Prescription.objects.create(patient=self.patient, doctor=self.user)
+
+    def add_items(self, prescription=None):
+        prescription = prescription or self.prescription
+        return [
+            PrescriptionItem.objects.create(
+                prescription=prescription, medication=self.artemether, quantity=2,
+            ),
+            PrescriptionItem.objects.create(
+                prescription=prescription, medication=self.quinine, quantity=5,
+            ),
+        ]
+
+    def invoice(self, **kwargs):
+        return Invoice.objects.create(
+            patient=self.patient, source_app="pharmacy", invoice_number="PHSUM1",
+            due_date=timezone.now().date(), subtotal=Decimal("400.00"),
+            tax_amount=Decimal("0.00"), total_amount=Decimal("400.00"), **kwargs
+        )
+
+    def test_items_and_patient_type_update_totals(self):
+        self.add_items()
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.total_prescribed_price, Decimal("400.00"))
+        self.assertEqual(self.prescription.patient_payable_amount, Decimal("400.00"))
+        self.assertEqual(self.prescription.items_count, 2)
+        self.assertEqual(self.prescription.get_dispensing_status(), "not_dispensed")
+
+        self.patient.patient_type = "nhia"
+        self.patient.save()
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.patient_payable_amount, Decimal("40.00"))
+
+        self.quinine.price = Decimal("30.00")
+        self.quinine.save()
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.total_prescribed_price, Decimal("450.00"))
+
+    def test_invoice_and_cart_payment_state(self):
+        self.add_items()
+        cart = PrescriptionCart.objects.create(prescription=self.prescription, status="active")
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.payment_state, "cart_pending")
+        self.assertFalse(self.prescription.is_payment_verified())
+
+        # Linked through the cart only; an invoice naming the prescription
+        # marks it paid outright (Invoice.save).
+        invoice = self.invoice()
+        cart.invoice = invoice
+        cart.status = "paid"
+        cart.save()
+        invoice.amount_paid = Decimal("400.00")
+        invoice.save()
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.payment_state, "paid_cart")
+        self.assertTrue(self.prescription.payment_verified)
+        self.assertEqual(
+            self.prescription.get_payment_status_display_info()["message"],
+            "Payment completed via cart invoice",
+        )
+
+        invoice.delete()
+        self.prescription.refresh_from_db()
+        self.assertEqual(self.prescription.payment_state, "unpaid")
+
+    def test_the_prescriptions_own_invoice_decides_before_carts(self):
+        self.add_items()
+        PrescriptionCart.objects.create(prescription=self.prescription, status="active")
+        invoice = self.invoice()
+        Invoice.objects.filter(pk=invoice.pk).update(status="unpaid")
+        self.prescription.invoice = invoice
+        self.prescription.save()
+        # Saving the prescription puts the new state on this instance too.
+        self.assertEqual(self.prescription.payment_state, "invoice_pending")
+        self.assertEqual(self.prescription.get_payment_status_display_info()["message"], "Payment pending")
+
+        Invoice.objects.filter(pk=invoice.pk).update(status="waived")
+        self.prescription.refresh_summary()
+        info = self.prescription.get_payment_status_display_info()
+        self.assertEqual((info["status"], info["message"]), ("waived", "Payment waived"))
+        self.assertFalse(self.prescription.is_payment_verified())
+
+    def test_dispensing_updates_progress(self):
+        artemether, quinine = self.add_items()
+        dispensary = Dispensary.objects.create(name="Main")
+        quinine.quantity_dispensed_so_far = 2
+        quinine.save()
+        artemether.quantity_dispensed_so_far = 2
+        artemether.is_dispensed = True
+        artemether.save()
+        DispensingLog.objects.create(
+            prescription_item=artemether, dispensed_by=self.user, dispensed_quantity=2,
+            unit_price_at_dispense=Decimal("150.00"),
+            total_price_for_this_log=Decimal("300.00"), dispensary=dispensary,
+        )
+        self.prescription.refresh_from_db()
+        self.assertEqual(
+            (self.prescription.items_fully_dispensed, self.prescription.items_partially_dispensed),
+            (1, 1),
+        )
+        self.assertEqual(self.prescription.get_dispensing_status(), "partially_dispensed")
+        self.assertEqual(self.prescription.get_dispensing_progress()["progress_percentage"], 50)
+
+    # The DEBUG query counter resets the query log mid-request.
+    @modify_settings(MIDDLEWARE={"remove": "core.query_count_middleware.QueryCountMiddleware"})
+    def test_list_renders_in_constant_queries_and_sorts_by_amount(self):
+        self.add_items()
+        self.client.force_login(self.user)
+        url = "/pharmacy/prescriptions/?payment_status=unpaid&sort=amount_desc"
+        self.client.get(url)  # warm session and permission caches
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        one_row = len(queries)
+        for _ in range(5):
+            self.add_items(Prescription.objects.create(patient=self.patient, doctor=self.user))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(queries), one_row)
+        self.assertEqual(response.context["dispensing_stats"]["not_dispensed"], 6)
+
+        cheap = Prescription.objects.create(patient=self.patient, doctor=self.user)
+        PrescriptionItem.objects.create(prescription=cheap, medication=self.quinine, quantity=1)
+        response = self.client.get("/pharmacy/prescriptions/?sort=amount_asc")
+        self.assertEqual(response.context["page_obj"][0].pk, cheap.pk)
+
+        cheap.payment_status = "waived"
+        cheap.save(update_fields=["payment_status"])
+        response = self.client.get("/pharmacy/prescriptions/?payment_status=unpaid")
+        self.assertEqual(response.context["total_prescriptions"], 6)
+
+    def test_refresh_command_repairs_bulk_writes(self):
+        self.add_items()
+        Prescription.objects.update(total_prescribed_price=0, items_count=0)
+        out = io.StringIO()
+        call_command("refresh_prescription_summaries", stdout=out)
+        self.assertIn("Refreshed", out.getvalue())
+        self.prescription.refresh_from_db()
+        self.assertEqual(
+            (self.prescription.total_prescribed_price, self.prescription.items_count),
+            (Decimal("400.00"), 2),
+        )
@@ -0,0 +1,77 @@
+"""Receiving a delivery is set-based: one store lookup, one locked read of the
+existing batches, and bulk writes — the query count does not grow with the
+number of lines."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from pharmacy.models import (
+    BulkStore, BulkStoreInventory, Medication, MedicationCategory, Purchase,
+    PurchaseItem, Supplier,
+)
+from pharmacy.purchase_services import PurchaseActionError, receive_delivery
+
+
+class PurchaseReceivingTest(TestCase):
+    def setUp(self):
+        self.category = MedicationCategory.objects.create(name="Analgesic")
+        self.supplier = Supplier.objects.create(name="Emzor")
+        BulkStore.main()
+
+    def approved_purchase(self, lines, invoice_number):
+        purchase = Purchase.objects.create(
+            supplier=self.supplier, purchase_date=timezone.now(),
+            invoice_number=invoice_number, total_amount=Decimal("0"),
+            approval_status="approved",
+        )
+        expiry = date.today() + timedelta(days=365)
+        for n in range(lines):
+            medication = Medication.objects.create(
+                name=f"{invoice_number} drug {n}", category=self.category,
+                dosage_form="tablet", strength="500mg", price=Decimal("10.00"),
+            )
+            PurchaseItem.objects.create(
+                purchase=purchase, medication=medication, quantity=10,
+                unit_price=Decimal("4.00"), batch_number=f"B{n}", expiry_date=expiry,
+            )
+        return purchase
+
+    def receive(self, purchase, **kwargs):
+        quantities = {item.pk: item.quantity for item in purchase.items.all()}
+        with CaptureQueriesContext(connection) as ctx:
+            purchase = receive_delivery(purchase, quantities, **kwargs)
+        return purchase, len(ctx.captured_queries)
+
+    def test_query_count_is_constant(self):
+        _, small = self.receive(self.approved_purchase(3, "PO-S"))
+        purchase, large = self.receive(self.approved_purchase(60, "PO-L"))
+        self.assertEqual(small, large)
+        self.assertEqual(purchase.delivery_status, "received")
+        self.assertEqual(BulkStoreInventory.objects.count(), 63)
+        row = BulkStoreInventory.objects.get(batch_number="B0", medication__name="PO-L drug 0")
+        self.assertEqual((row.stock_quantity, row.marked_up_cost), (10, Decimal("4.80")))
+        self.assertFalse(purchase.items.filter(quantity_received=0).exists())
+
+    def test_existing_batch_is_topped_up(self):
+        purchase = self.approved_purchase(1, "PO-T")
+        item = purchase.items.get()
+        BulkStoreInventory.objects.create(
+            medication=item.medication, bulk_store=BulkStore.main(), batch_number="B0",
+            stock_quantity=5, expiry_date=item.expiry_date, purchase_date=timezone.now(),
+        )
+        self.receive(purchase)
+        row = BulkStoreInventory.objects.get()
+        self.assertEqual(row.stock_quantity, 15)
+
+    def test_delivery_goes_to_the_chosen_store(self):
+        annex = BulkStore.objects.create(name="Annex", location="Block B", capacity=1000)
+        self.receive(self.approved_purchase(2, "PO-A"), bulk_store=annex.pk)
+        self.assertEqual(BulkStoreInventory.objects.filter(bulk_store=annex).count(), 2)
+
+        inactive = BulkStore.objects.create(name="Old", location="-", capacity=1, is_active=False)
+        with self.assertRaisesMessage(PurchaseActionError, "active bulk store"):
+            self.receive(self.approved_purchase(1, "PO-X"), bulk_store=inactive.pk)
@@ -0,0 +1,134 @@
+"""The reorder engine: dispensing history folded into daily aggregates
+incrementally, and forecasts of days of cover, order quantity and expiry risk."""
+import io
+import math
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from patients.models import Patient
+from pharmacy import reorder_engine
+from pharmacy.models import (
+    ActiveStoreBatch, ActiveStoreInventory, DailyConsumption, Dispensary,
+    DispensingLog, Medication, MedicationCategory, Prescription,
+    PrescriptionItem, ReorderForecast,
+)
+
+User = get_user_model()
+
+
+class ReorderEngineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            phone_number="08012000381", username="forecaster", password="pw12345",
+        )
+        category = MedicationCategory.objects.create(name="Analgesic")
+        self.medication = Medication.objects.create(
+            name="Paracetamol", category=category, dosage_form="tablet",
+            strength="500mg", price=Decimal("5.00"), reorder_level=10,
+        )
+        self.dispensary = Dispensary.objects.create(name="OPD Dispensary")
+        patient = Patient.objects.create(
+            first_name="Ada", last_name="Obi", date_of_birth="1990-01-01",
+            gender="female", phone_number="08020000381",
+        )
+        self.item = PrescriptionItem.objects.create(
+            prescription=Prescription.objects.create(patient=patient, doctor=self.user),
+            medication=self.medication, quantity=1000,
+        )
+        self.today = timezone.localdate()
+
+    def dispense(self, days_ago, quantity):
+        return DispensingLog.objects.create(
+            prescription_item=self.item, dispensed_by=self.user,
+            dispensed_quantity=quantity, unit_price_at_dispense=Decimal("5.00"),
+            total_price_for_this_log=Decimal("5.00") * quantity,
+            dispensary=self.dispensary,
+            dispensed_date=timezone.now() - timedelta(days=days_ago),
+        )
+
+    def stock(self, quantity, days_to_expiry):
+        inventory = ActiveStoreInventory.objects.create(
+            medication=self.medication, active_store=self.dispensary.active_store,
+            reorder_level=10,
+        )
+        ActiveStoreBatch.objects.create(
+            active_inventory=inventory, batch_number="P1", quantity=quantity,
+            expiry_date=date.today() + timedelta(days=days_to_expiry),
+        )
+        inventory.update_summary_fields()
+        return inventory
+
+    def test_ingest_reads_only_new_logs(self):
+        self.dispense(1, 4)
+        self.dispense(1, 6)
+        self.dispense(0, 3)
+        self.assertEqual(reorder_engine.ingest(self.dispensary.hospital_id), 3)
+        self.assertEqual(reorder_engine.ingest(self.dispensary.hospital_id), 0)
+
+        self.dispense(0, 2)
+        self.assertEqual(reorder_engine.ingest(self.dispensary.hospital_id), 1)
+        days = dict(DailyConsumption.objects.values_list("day", "quantity"))
+        self.assertEqual(days, {
+            self.today - timedelta(days=1): 10,
+            self.today: 5,
+        })
+
+        DailyConsumption.objects.update(quantity=0)
+        self.assertEqual(reorder_engine.rebuild(self.dispensary.hospital_id), 4)
+        self.assertEqual(sum(DailyConsumption.objects.values_list("quantity", flat=True)), 15)
+
+    def test_forecast_from_velocity_and_expiry(self):
+        for days_ago in range(28):
+            self.dispense(days_ago, 10)
+        inventory = self.stock(200, 10)
+
+        out = io.StringIO()
+        call_command("forecast_reorders", stdout=out)
+        self.assertIn("28 new dispensing log(s), 1 forecast(s)", out.getvalue())
+
+        forecast = ReorderForecast.objects.get()
+        # 7 and 28 day means are 10/day; the 90 day mean is 280/90.
+        velocity = 0.5 * 10 + 0.3 * 10 + 0.2 * 280 / 90
+        self.assertAlmostEqual(forecast.velocity, velocity)
+        self.assertAlmostEqual(forecast.days_of_cover, 200 / velocity)
+        self.assertEqual(forecast.reorder_point, math.ceil(velocity * 7))
+        self.assertFalse(forecast.needs_reorder)
+        # Ten days at ~8.6/day leaves most of the batch on the shelf at expiry.
+        self.assertEqual(forecast.units_at_risk, 200 - math.floor(velocity * 10))
+        self.assertAlmostEqual(forecast.expiry_risk, forecast.units_at_risk / 200)
+
+        ActiveStoreBatch.objects.update(quantity=40)
+        inventory.update_summary_fields()
+        reorder_engine.forecast(self.dispensary.hospital_id)
+        forecast = ReorderForecast.objects.get()
+        self.assertTrue(forecast.needs_reorder)
+        self.assertEqual(forecast.reorder_quantity, math.ceil(velocity * 37 - 40))
+        self.assertEqual(forecast.units_at_risk, 0)
+
+    def test_no_history_falls_back_to_reorder_level(self):
+        inventory = self.stock(5, 365)
+        reorder_engine.forecast(inventory.hospital_id)
+        forecast = ReorderForecast.objects.get()
+        self.assertEqual((forecast.needs_reorder, forecast.reorder_quantity), (True, 15))
+        self.assertIsNone(forecast.days_of_cover)
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("pharmacy:procurement_dashboard"))
+        self.assertEqual(response.context["low_stock_count"], 1)
+        self.assertContains(response, "Paracetamol")
+
+    def test_pages_forecast_a_hospital_the_schedule_has_not_reached(self):
+        self.stock(5, 365)
+        self.assertFalse(ReorderForecast.objects.exists())
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("pharmacy:alerts"))
+        self.assertEqual(len(response.context["low_stock_items"]), 1)
+        self.assertEqual(ReorderForecast.objects.count(), 1)
+        # Once rows exist the page only reads them.
+        self.assertFalse(reorder_engine.ensure_forecast(self.dispensary.hospital_id))
@@ -0,0 +1,110 @@
+"""Pharmacy headline counters: one aggregate per table, cached per
+(hospital, dispensary) and retired by stock writes."""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+from django.utils import timezone
+
+from pharmacy import stats_service, stock_ledger
+from pharmacy.models import (
+    ActiveStoreInventory, BulkStore, BulkStoreInventory, Dispensary, Medication,
+    MedicationCategory,
+)
+
+User = get_user_model()
+
+
+class PharmacyStatisticsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            phone_number="08012000391", username="statsadmin", password="pw12345",
+        )
+        category = MedicationCategory.objects.create(name="Antifungal")
+        self.fluconazole = Medication.objects.create(
+            name="Fluconazole", category=category, dosage_form="capsule",
+            strength="150mg", price=Decimal("40.00"), reorder_level=10,
+        )
+        self.nystatin = Medication.objects.create(
+            name="Nystatin", category=category, dosage_form="suspension",
+            strength="100000IU", price=Decimal("25.00"), reorder_level=10,
+        )
+        Medication.objects.create(
+            name="Griseofulvin", category=category, dosage_form="tablet",
+            strength="500mg", price=Decimal("15.00"), is_active=False,
+        )
+        self.opd = Dispensary.objects.create(name="OPD")
+        self.ward = Dispensary.objects.create(name="Ward")
+        self.low = ActiveStoreInventory.objects.create(
+            medication=self.fluconazole, active_store=self.opd.active_store,
+            stock_quantity=4, reorder_level=10, unit_cost=Decimal("2.00"),
+        )
+        ActiveStoreInventory.objects.create(
+            medication=self.nystatin, active_store=self.ward.active_store,
+            stock_quantity=50, reorder_level=10, unit_cost=Decimal("1.00"),
+            expiry_date=timezone.localdate() - timedelta(days=1),
+        )
+        BulkStoreInventory.objects.create(
+            medication=self.nystatin, bulk_store=BulkStore.main(), batch_number="N1",
+            stock_quantity=5, unit_cost=Decimal("3.00"), purchase_date=timezone.now(),
+            expiry_date=timezone.localdate() + timedelta(days=20),
+        )
+
+    def test_counters_in_one_query_per_table_then_cached(self):
+        with self.assertNumQueries(7):
+            stats = stats_service.statistics(None)
+        self.assertEqual(stats["medications"], {
+            "total": Medication.objects.count(),
+            "active": Medication.objects.filter(is_active=True).count(),
+            "low_stock": 1,
+        })
+        self.assertEqual(stats["active_stock"]["lines"], 2)
+        self.assertEqual(stats["active_stock"]["expired"], 1)
+        self.assertEqual(stats["active_stock"]["value"], Decimal("58.00"))
+        self.assertEqual(
+            (stats["bulk_stock"]["low_stock"], stats["bulk_stock"]["expiring_soon"]), (1, 1),
+        )
+        with self.assertNumQueries(0):
+            self.assertEqual(stats_service.statistics(None), stats)
+
+        ward = stats_service.statistics(None, self.ward.pk)
+        self.assertEqual(ward["medications"]["low_stock"], 0)
+        self.assertEqual(ward["active_stock"]["quantity"], 50)
+
+    def test_stock_writes_retire_the_cache(self):
+        self.assertEqual(stats_service.statistics(None)["active_stock"]["quantity"], 54)
+        # A set-based write that fires no signals still books a movement.
+        ActiveStoreInventory.objects.filter(pk=self.low.pk).update(stock_quantity=40)
+        stock_ledger.record_adjustment(self.low, 36)
+        stats = stats_service.statistics(None)
+        self.assertEqual(stats["active_stock"]["quantity"], 90)
+        self.assertEqual(stats["medications"]["low_stock"], 0)
+
+        self.low.delete()
+        self.assertEqual(stats_service.statistics(None)["active_stock"]["lines"], 1)
+
+    def test_api_and_dashboards_share_the_counters(self):
+        self.client.force_login(self.user)
+        response = self.client.get(
+            f"/pharmacy/api/manage-dispensaries/statistics/?dispensary={self.opd.pk}"
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["active_stock"]["low_stock"], 1)
+        self.assertEqual(
+            self.client.get("/pharmacy/api/manage-dispensaries/statistics/?dispensary=x").status_code,
+            400,
+        )
+
+        response = self.client.get("/pharmacy/inventory/")
+        self.assertEqual(
+            (response.context["total_medications"], response.context["low_stock_count"]),
+            (Medication.objects.count(), 1),
+        )
+        response = self.client.get("/pharmacy/dashboard/")
+        self.assertEqual(
+            response.context["total_medications"], Medication.objects.filter(is_active=True).count(),
+        )
+        response = self.client.get("/pharmacy/bulk-store/")
+        self.assertEqual(response.context["expiring_soon_count"], 1)
+        self.assertEqual(response.context["total_value"], Decimal("15.00"))
@@ -0,0 +1,190 @@
+"""The stock ledger: every stock change appends a StockMovement, and stock at a
+past moment is the nearest snapshot plus a ledger replay."""
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import ProtectedError
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from pharmacy import stock_ledger
+from pharmacy.management.commands.generate_pharmacy_report import Command
+from pharmacy.models import (
+    ActiveStoreInventory, BulkStore, BulkStoreInventory, Dispensary, Medication,
+    MedicationCategory, MedicationTransfer, Purchase, PurchaseItem,
+    StockMovement, StockSnapshot, Supplier,
+)
+from pharmacy.purchase_services import receive_delivery
+
+User = get_user_model()
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_superuser(
+            phone_number="08012000371", username="ledger", password="pw12345",
+        )
+        self.medication = Medication.objects.create(
+            name="Ciprofloxacin", category=MedicationCategory.objects.create(name="Antibiotic"),
+            dosage_form="tablet", strength="500mg", price=Decimal("30.00"),
+        )
+        self.bulk = BulkStore.main()
+        self.dispensary = Dispensary.objects.create(name="OPD Dispensary")
+        self.active = self.dispensary.active_store
+
+    def receive(self, quantity):
+        purchase = Purchase.objects.create(
+            supplier=Supplier.objects.get_or_create(name="Fidson")[0],
+            purchase_date=timezone.now(), invoice_number=f"INV-{quantity}",
+            total_amount=Decimal("0"), approval_status="approved",
+        )
+        item = PurchaseItem.objects.create(
+            purchase=purchase, medication=self.medication, quantity=quantity,
+            unit_price=Decimal("5.00"), batch_number="CIP1",
+            expiry_date=date.today() + timedelta(days=365),
+        )
+        receive_delivery(purchase, {item.pk: quantity})
+
+    def transfer(self, quantity):
+        transfer = MedicationTransfer.objects.create(
+            medication=self.medication, from_bulk_store=self.bulk,
+            to_active_store=self.active, quantity=quantity, requested_by=self.user,
+        )
+        transfer.approve_transfer(self.user)
+        transfer.execute_transfer(self.user)
+
+    def test_receipt_and_transfer_are_booked(self):
+        self.receive(10)
+        self.transfer(4)
+        ledger = list(
+            StockMovement.objects.values_list("movement_type", "quantity", "document_type")
+        )
+        self.assertEqual(ledger, [
+            ("receipt", 10, "purchase"),
+            ("transfer_out", -4, "medication_transfer"),
+            ("transfer_in", 4, "medication_transfer"),
+        ])
+        self.assertEqual(stock_ledger.reconcile(self.bulk.hospital_id), [])
+
+    def test_bulk_transfers_take_unexpired_batches_oldest_first(self):
+        self.receive(10)
+        for batch_number, quantity, days, cost in (("OLD", 50, -1, "5.00"), ("SOON", 3, 30, "10.00")):
+            BulkStoreInventory.objects.create(
+                medication=self.medication, bulk_store=self.bulk, batch_number=batch_number,
+                stock_quantity=quantity, expiry_date=date.today() + timedelta(days=days),
+                unit_cost=Decimal(cost), purchase_date=timezone.now(),
+            )
+        self.transfer(5)
+        self.assertEqual(
+            list(StockMovement.objects.filter(movement_type="transfer_in")
+                 .values_list("batch_number", "quantity", "unit_cost")),
+            [("SOON", 3, Decimal("12.00")), ("CIP1", 2, Decimal("6.00"))],
+        )
+        self.assertEqual(ActiveStoreInventory.objects.get(active_store=self.active).stock_quantity, 5)
+        self.assertEqual(BulkStoreInventory.objects.get(batch_number="OLD").stock_quantity, 50)
+
+        pinned = MedicationTransfer.objects.create(
+            medication=self.medication, from_bulk_store=self.bulk, to_active_store=self.active,
+            quantity=1, batch_number="OLD", requested_by=self.user,
+        )
+        pinned.approve_transfer(self.user)
+        with self.assertRaisesMessage(ValueError, "available 0, required 1"):
+            pinned.execute_transfer(self.user)
+
+    def test_stock_at_is_snapshot_plus_replay(self):
+        before = timezone.now()
+        self.receive(10)
+        stock_ledger.take_snapshot(self.bulk.hospital_id)
+        snapshot_at = StockSnapshot.objects.get().taken_at
+        self.transfer(4)
+        after = timezone.now()
+
+        self.assertEqual(stock_ledger.stock_at(before, bulk_store=self.bulk), {})
+        self.assertEqual(
+            stock_ledger.stock_at(snapshot_at, bulk_store=self.bulk),
+            {self.medication.pk: (10, Decimal("50.00"))},
+        )
+        self.assertEqual(stock_ledger.stock_at(after, bulk_store=self.bulk)[self.medication.pk][0], 6)
+        self.assertEqual(stock_ledger.stock_at(after, active_store=self.active)[self.medication.pk][0], 4)
+
+        valuation = stock_ledger.valuation_at(after, self.bulk.hospital_id)
+        self.assertEqual(valuation[(None, self.bulk.pk)], (6, Decimal("30.00")))
+
+        report = Command(stdout=io.StringIO())
+        report.output_stock_valuation(before.date(), after.date())
+        self.assertIn("Main Bulk Store", report.stdout.getvalue())
+
+    def test_manual_edits_are_adjustments_and_drift_is_reported(self):
+        self.receive(10)
+        self.transfer(4)
+        inventory = ActiveStoreInventory.objects.get(active_store=self.active)
+        self.client.force_login(self.user)
+        data = {
+            field: getattr(inventory, field)
+            for field in ("medication", "stock_quantity", "reorder_level", "batch_number",
+                          "expiry_date", "unit_cost")
+        }
+        data.update(medication=self.medication.pk, active_store=self.active.pk, stock_quantity=3)
+        self.client.post(
+            reverse("pharmacy:edit_dispensary_inventory_item", args=[self.dispensary.pk, inventory.pk]),
+            data,
+        )
+        adjustment = StockMovement.objects.get(movement_type="adjustment")
+        self.assertEqual((adjustment.quantity, adjustment.active_store_id), (-1, self.active.pk))
+
+        BulkStoreInventory.objects.update(stock_quantity=99)
+        drift = stock_ledger.reconcile(self.bulk.hospital_id)
+        self.assertEqual(drift, [(None, self.bulk.pk, self.medication.pk, 6, 99)])
+
+        out = io.StringIO()
+        call_command("snapshot_stock", "--check", stdout=out)
+        self.assertIn("ledger 6, on hand 99", out.getvalue())
+        # The snapshot re-anchors on the live figures.
+        self.assertEqual(stock_ledger.reconcile(self.bulk.hospital_id), [])
+
+    def test_bulk_store_edits_book_the_quantity_change(self):
+        self.receive(10)
+        inventory = BulkStoreInventory.objects.get()
+        self.client.force_login(self.user)
+        self.client.post(reverse("pharmacy:edit_bulk_store_inventory", args=[inventory.pk]), {
+            "batch_number": inventory.batch_number, "stock_quantity": 7,
+            "expiry_date": inventory.expiry_date, "unit_cost": inventory.unit_cost,
+            "markup_percentage": inventory.markup_percentage,
+        })
+        adjustment = StockMovement.objects.get(movement_type="adjustment")
+        self.assertEqual((adjustment.quantity, adjustment.bulk_store_id), (-3, self.bulk.pk))
+        self.assertEqual(stock_ledger.reconcile(self.bulk.hospital_id), [])
+
+    def test_delivered_transfers_are_costed_like_executed_ones(self):
+        self.receive(10)
+        self.transfer(2)
+        transfer = MedicationTransfer.objects.create(
+            medication=self.medication, from_bulk_store=self.bulk, to_active_store=self.active,
+            quantity=3, batch_number="CIP1", requested_by=self.user, status="in_transit",
+        )
+        call_command("deliver_in_transit_transfers", stdout=io.StringIO())
+        costs = dict(
+            StockMovement.objects.filter(movement_type="transfer_in")
+            .values_list("document_id", "unit_cost")
+        )
+        self.assertEqual(costs[transfer.pk], Decimal("6.00"))
+        self.assertEqual(len(set(costs.values())), 1)
+
+    def test_movements_are_append_only(self):
+        self.receive(5)
+        row = StockMovement.objects.get()
+        row.quantity = 50
+        with self.assertRaises(ValidationError):
+            row.save()
+        with self.assertRaises(ValidationError):
+            row.delete()
+        # Nor does the history go with the medication or the store.
+        with self.assertRaises(ProtectedError):
+            self.medication.delete()
+        with self.assertRaises(ProtectedError):
+            self.bulk.delete()
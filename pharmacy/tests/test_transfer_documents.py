@@ -0,0 +1,136 @@
+"""Multi-line transfer documents: one lock, FIFO in memory, bulk writes and a
+StockMovement ledger — the query count does not grow with the number of lines."""
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from core.models import AuditLog
+
+from pharmacy.models import (
+    ActiveStoreBatch, ActiveStoreInventory, Dispensary, InterDispensaryTransfer,
+    Medication, MedicationCategory, StockMovement,
+)
+from pharmacy.transfer_services import (
+    TransferError, approve_document, create_document, execute_document,
+)
+
+User = get_user_model()
+
+
+class TransferDocumentTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            phone_number="08012000361", username="mover", password="pw12345",
+        )
+        self.category = MedicationCategory.objects.create(name="Antibiotic")
+        # ActiveStore is auto-created for each dispensary.
+        self.source = Dispensary.objects.create(name="Main Dispensary")
+        self.dest = Dispensary.objects.create(name="Ward Dispensary")
+
+    def stocked(self, name, *batches):
+        """A medication with (batch_number, quantity, days_to_expiry, cost) batches in the source."""
+        medication = Medication.objects.create(
+            name=name, category=self.category, dosage_form="tablet",
+            strength="250mg", price=Decimal("20.00"),
+        )
+        inventory = ActiveStoreInventory.objects.create(
+            medication=medication, active_store=self.source.active_store,
+        )
+        for number, quantity, days, cost in batches:
+            ActiveStoreBatch.objects.create(
+                active_inventory=inventory, batch_number=number, quantity=quantity,
+                expiry_date=date.today() + timedelta(days=days), unit_cost=Decimal(cost),
+            )
+        inventory.update_summary_fields()
+        return medication
+
+    def execute(self, lines):
+        document = create_document(self.source, self.dest, lines, self.user)
+        approve_document(document, self.user)
+        with CaptureQueriesContext(connection) as ctx:
+            execute_document(document, self.user)
+        return document, len(ctx.captured_queries)
+
+    def test_fifo_across_batches_with_ledger(self):
+        amoxil = self.stocked("Amoxil", ("LATE", 50, 300, "6.00"), ("EARLY", 30, 30, "4.00"))
+        document, _ = self.execute([(amoxil, 40)])
+
+        source = ActiveStoreInventory.objects.get(medication=amoxil, active_store=self.source.active_store)
+        dest = ActiveStoreInventory.objects.get(medication=amoxil, active_store=self.dest.active_store)
+        self.assertEqual((source.stock_quantity, source.batch_number), (40, "LATE"))
+        self.assertEqual((dest.stock_quantity, dest.batch_number, dest.unit_cost), (40, "EARLY", Decimal("4.50")))
+        self.assertFalse(source.batches.filter(batch_number="EARLY").exists())
+        self.assertEqual(
+            dict(dest.batches.values_list("batch_number", "quantity")), {"EARLY": 30, "LATE": 10},
+        )
+
+        ledger = StockMovement.objects.filter(document_type="transfer_document", document_id=document.pk)
+        self.assertEqual(ledger.count(), 4)
+        self.assertEqual(sum(ledger.values_list("quantity", flat=True)), 0)
+        self.assertEqual(
+            sum(ledger.filter(active_store=self.dest.active_store).values_list("quantity", flat=True)), 40,
+        )
+        document.refresh_from_db()
+        self.assertEqual(document.status, "completed")
+        self.assertFalse(document.lines.exclude(status="completed").exists())
+
+    def test_query_count_is_constant(self):
+        def lines(prefix, count):
+            # Each line empties one batch and draws on the next.
+            return [
+                (self.stocked(f"{prefix} {n}", ("A", 10, 90, "1.00"), ("B", 10, 180, "1.00")), 15)
+                for n in range(count)
+            ]
+
+        _, few = self.execute(lines("Small", 2))
+        _, many = self.execute(lines("Large", 10))
+        self.assertEqual(few, many)
+        self.assertEqual(StockMovement.objects.count(), 2 * 4 + 10 * 4)
+
+    def test_documents_are_audited_once_each(self):
+        amoxil = self.stocked("Amoxil", ("A", 50, 90, "1.00"))
+        flagyl = self.stocked("Flagyl", ("A", 50, 90, "1.00"))
+        document, _ = self.execute([(amoxil, 10), (flagyl, 5)])
+        entries = dict(AuditLog.objects.values_list("action", "details"))
+        self.assertEqual(set(entries), {"TRANSFER_DOCUMENT_APPROVED", "TRANSFER_DOCUMENT_EXECUTED"})
+        self.assertIn(f"2 line(s) of transfer document #{document.pk}", entries["TRANSFER_DOCUMENT_APPROVED"])
+        self.assertIn(f"2 line(s) (15 units) of transfer document #{document.pk}", entries["TRANSFER_DOCUMENT_EXECUTED"])
+
+    def test_shortfall_on_any_line_moves_nothing(self):
+        plenty = self.stocked("Plenty", ("A", 100, 90, "1.00"))
+        scarce = self.stocked("Scarce", ("A", 5, 90, "1.00"))
+        with self.assertRaisesMessage(TransferError, "Scarce: available 5, required 6"):
+            create_document(self.source, self.dest, [(plenty, 10), (scarce, 6)], self.user)
+
+        document = create_document(self.source, self.dest, [(plenty, 10), (scarce, 5)], self.user)
+        approve_document(document, self.user)
+        ActiveStoreBatch.objects.filter(active_inventory__medication=scarce).update(quantity=1)
+        with self.assertRaisesMessage(TransferError, "Scarce: available 1, required 5"):
+            execute_document(document, self.user)
+        self.assertFalse(StockMovement.objects.exists())
+        self.assertEqual(
+            ActiveStoreBatch.objects.get(active_inventory__medication=plenty).quantity, 100,
+        )
+
+    def test_pending_lines_block_execution(self):
+        medication = self.stocked("Flagyl", ("A", 10, 90, "1.00"))
+        document = create_document(self.source, self.dest, [(medication, 4)], self.user)
+        with self.assertRaisesMessage(TransferError, "awaiting approval"):
+            execute_document(document, self.user)
+
+    def test_single_transfer_writes_the_same_ledger(self):
+        medication = self.stocked("Septrin", ("A", 10, 90, "2.00"))
+        transfer = InterDispensaryTransfer.create_transfer(
+            medication, self.source, self.dest, 4, requested_by=self.user,
+        )
+        transfer.approve_transfer(self.user)
+        transfer.execute_transfer(self.user)
+        self.assertEqual(transfer.status, "completed")
+        self.assertEqual(
+            list(StockMovement.objects.filter(document_id=transfer.pk).values_list("movement_type", "quantity")),
+            [("transfer_out", -4), ("transfer_in", 4)],
+        )
@@ -0,0 +1,314 @@
+"""Set-based stock transfers between dispensaries.
+
+A transfer document carries N medications from one dispensary's active store
+to another's. Moving it used to mean N round trips of lock, FIFO walk,
+get_or_create per batch and summary recompute. Here the whole document costs a
+fixed number of queries:
+
+- missing destination inventory rows are inserted up front (ignore_conflicts),
+  then both stores' rows are locked with one SELECT ... FOR UPDATE;
+- every batch of those rows is read once and FIFO is applied in memory;
+- batches, inventory summaries and the StockMovement ledger are written with
+  bulk_create / bulk_update, and emptied source batches with one DELETE.
+
+InterDispensaryTransfer.execute_transfer goes through the same path as a
+one-line move, so single and multi-line transfers write the same ledger, and
+so does MedicationTransfer.execute_transfer with a bulk store as the source.
+DispensaryTransfer does not: it moves no stock (see its execute_transfer).
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from core.audit_utils import log_audit_action
+
+from . import stock_ledger
+from .models import (
+    ActiveStoreBatch, ActiveStoreInventory, BulkStore, BulkStoreInventory,
+    InterDispensaryTransfer, Medication, StockMovement, TransferDocument,
+)
+
+
+class TransferError(ValueError):
+    """A transfer that cannot go ahead (no store, not enough stock, wrong status).
+
+    A ValueError, so the transfer views' existing handlers report it."""
+
+
+def _active_store(dispensary):
+    store = getattr(dispensary, "active_store", None)
+    if store is None:
+        raise TransferError(f"No active store for {dispensary.name}")
+    return store
+
+
+def _summarise(inventory, batches):
+    """ActiveStoreInventory.update_summary_fields over batches already in memory."""
+    stocked = [b for b in batches if b.quantity > 0]
+    inventory.stock_quantity = sum(b.quantity for b in stocked)
+    if stocked:
+        earliest = min(stocked, key=lambda b: b.expiry_date)
+        inventory.expiry_date = earliest.expiry_date
+        inventory.batch_number = earliest.batch_number
+    if inventory.stock_quantity > 0:
+        total_value = sum(b.quantity * b.unit_cost for b in stocked)
+        inventory.unit_cost = (Decimal(total_value) / inventory.stock_quantity).quantize(Decimal("0.01"))
+
+
+def move_stock(source_store, dest_store, quantities, user, document_type, document_id,
+               batch_number=None):
+    """Move {medication_id: quantity} into an active store, FIFO by expiry. All
+    or nothing: a shortfall on any line raises TransferError before anything
+    is written. Returns the StockMovement rows.
+
+    The source is another active store (its ActiveStoreBatch rows) or a bulk
+    store (its BulkStoreInventory rows, one per batch). From a bulk store,
+    expired batches are never moved, stock arrives at the batch's marked-up
+    cost, and `batch_number` pins the move to that one batch."""
+    from_bulk = isinstance(source_store, BulkStore)
+    if not from_bulk and source_store.pk == dest_store.pk:
+        raise TransferError("Cannot transfer to same dispensary")
+    quantities = {med: qty for med, qty in quantities.items() if qty}
+    if any(qty < 0 for qty in quantities.values()):
+        raise TransferError("Transfer quantities must be positive")
+    if not quantities:
+        return []
+
+    medications = {
+        pk: (name, reorder_level)
+        for pk, name, reorder_level in Medication.objects.filter(
+            pk__in=quantities
+        ).values_list("pk", "name", "reorder_level")
+    }
+    if len(medications) != len(quantities):
+        raise TransferError("Unknown medication in transfer")
+    with transaction.atomic():
+        # Destination rows that don't exist yet, so the one lock below covers them.
+        ActiveStoreInventory.objects.bulk_create(
+            [
+                ActiveStoreInventory(
+                    medication_id=medication_id, active_store=dest_store,
+                    hospital_id=dest_store.hospital_id, stock_quantity=0,
+                    reorder_level=medications[medication_id][1],
+                )
+                for medication_id in quantities
+            ],
+            ignore_conflicts=True,
+        )
+        stores = [dest_store] if from_bulk else [source_store, dest_store]
+        inventories = {
+            (inv.active_store_id, inv.medication_id): inv
+            for inv in ActiveStoreInventory.objects.select_for_update()
+            .filter(active_store__in=stores, medication_id__in=quantities)
+            .order_by("pk")
+        }
+        batches = defaultdict(list)
+        for batch in ActiveStoreBatch.objects.filter(
+            active_inventory__in=list(inventories.values())
+        ).order_by("expiry_date", "received_date", "pk"):
+            batches[batch.active_inventory_id].append(batch)
+
+        # What each medication is taken from, oldest expiry first.
+        lots = defaultdict(list)
+        if from_bulk:
+            rows = BulkStoreInventory.objects.select_for_update().filter(
+                bulk_store=source_store, medication_id__in=quantities,
+                expiry_date__gte=timezone.now().date(),
+            )
+            if batch_number:
+                rows = rows.filter(batch_number=batch_number)
+            for row in rows.order_by("expiry_date", "pk"):
+                # ActiveStoreBatch's name for it, so the walk below reads both alike.
+                row.quantity = row.stock_quantity
+                lots[row.medication_id].append(row)
+        else:
+            for medication_id in quantities:
+                source = inventories.get((source_store.pk, medication_id))
+                lots[medication_id] = batches[source.pk] if source else []
+
+        short = []
+        for medication_id, quantity in quantities.items():
+            have = sum(lot.quantity for lot in lots[medication_id] if lot.quantity > 0)
+            if have < quantity:
+                short.append(f"{medications[medication_id][0]}: available {have}, required {quantity}")
+        if short:
+            raise TransferError("Insufficient stock (" + "; ".join(short) + ")")
+
+        now = timezone.now()
+        changed, created, emptied, taken, movements = [], [], [], [], []
+        source_side = {"bulk_store" if from_bulk else "active_store": source_store}
+        for medication_id, quantity in quantities.items():
+            dest = inventories[(dest_store.pk, medication_id)]
+            dest_batches = {b.batch_number: b for b in batches[dest.pk]}
+            remaining = quantity
+            for lot in lots[medication_id]:
+                if remaining <= 0:
+                    break
+                if lot.quantity <= 0:
+                    continue
+                take = min(lot.quantity, remaining)
+                remaining -= take
+                lot.quantity -= take
+                if from_bulk:
+                    # Bulk rows stay at zero; they are the store's batch register.
+                    lot.stock_quantity = lot.quantity
+                    taken.append(lot)
+                    cost_in = lot.marked_up_cost or lot.unit_cost
+                else:
+                    (emptied if lot.quantity == 0 else changed).append(lot)
+                    cost_in = lot.unit_cost
+
+                target = dest_batches.get(lot.batch_number)
+                if target is None:
+                    target = dest_batches[lot.batch_number] = ActiveStoreBatch(
+                        active_inventory=dest, hospital_id=dest.hospital_id,
+                        batch_number=lot.batch_number, quantity=0,
+                        expiry_date=lot.expiry_date, unit_cost=cost_in,
+                    )
+                    batches[dest.pk].append(target)
+                    created.append(target)
+                elif target.pk:
+                    changed.append(target)
+                target.quantity += take
+
+                common = dict(
+                    medication_id=medication_id, batch_number=lot.batch_number,
+                    expiry_date=lot.expiry_date, document_type=document_type,
+                    document_id=document_id, created_by=user, created_at=now,
+                )
+                movements.append(StockMovement(
+                    hospital_id=source_store.hospital_id, quantity=-take,
+                    unit_cost=lot.unit_cost, movement_type="transfer_out",
+                    **source_side, **common,
+                ))
+                movements.append(StockMovement(
+                    active_store=dest_store, hospital_id=dest_store.hospital_id,
+                    quantity=take, unit_cost=cost_in, movement_type="transfer_in",
+                    **common,
+                ))
+            if not from_bulk:
+                source = inventories[(source_store.pk, medication_id)]
+                _summarise(source, batches[source.pk])
+                source.updated_at = now
+            _summarise(dest, batches[dest.pk])
+            dest.updated_at = dest.last_restock_date = now
+
+        for row in changed + taken:
+            row.updated_at = now
+        ActiveStoreBatch.objects.filter(pk__in=[b.pk for b in emptied]).delete()
+        ActiveStoreBatch.objects.bulk_update(changed, ["quantity", "updated_at"])
+        ActiveStoreBatch.objects.bulk_create(created)
+        BulkStoreInventory.objects.bulk_update(taken, ["stock_quantity", "updated_at"])
+        ActiveStoreInventory.objects.bulk_update(
+            list(inventories.values()),
+            ["stock_quantity", "expiry_date", "batch_number", "unit_cost",
+             "last_restock_date", "updated_at"],
+        )
+        return stock_ledger.record(movements)
+
+
+def create_document(from_dispensary, to_dispensary, lines, requested_by, notes=""):
+    """A pending TransferDocument with one InterDispensaryTransfer per
+    (medication, quantity). Stock is checked for all lines in one query."""
+    if from_dispensary == to_dispensary:
+        raise TransferError("Cannot transfer to same dispensary")
+    totals = defaultdict(int)
+    names = {}
+    for medication, quantity in lines:
+        if quantity <= 0:
+            raise TransferError(f"Quantity for {medication.name} must be positive")
+        totals[medication.pk] += quantity
+        names[medication.pk] = medication.name
+    if not totals:
+        raise TransferError("A transfer document needs at least one line")
+
+    store = _active_store(from_dispensary)
+    available = dict(
+        ActiveStoreInventory.objects.filter(
+            active_store=store, medication_id__in=totals
+        ).values_list("medication_id", "stock_quantity")
+    )
+    short = [
+        f"{names[med]}: available {available.get(med, 0)}, required {qty}"
+        for med, qty in totals.items() if available.get(med, 0) < qty
+    ]
+    if short:
+        raise TransferError("Insufficient stock (" + "; ".join(short) + ")")
+
+    with transaction.atomic():
+        document = TransferDocument.objects.create(
+            from_dispensary=from_dispensary, to_dispensary=to_dispensary,
+            requested_by=requested_by, notes=notes,
+        )
+        InterDispensaryTransfer.objects.bulk_create([
+            InterDispensaryTransfer(
+                document=document, hospital_id=document.hospital_id,
+                medication_id=med, from_dispensary=from_dispensary,
+                to_dispensary=to_dispensary, quantity=qty,
+                requested_by=requested_by, notes=notes,
+            )
+            for med, qty in totals.items()
+        ])
+    return document
+
+
+def approve_document(document, user):
+    """Approve every pending line. Returns how many were approved."""
+    now = timezone.now()
+    approved = document.lines.filter(status="pending").update(
+        status="in_transit", approved_by=user, approved_at=now, updated_at=now,
+    )
+    if approved:
+        # One entry for the document: update() skips the per-line saves.
+        log_audit_action(
+            user, "TRANSFER_DOCUMENT_APPROVED", document,
+            f"Approved {approved} line(s) of transfer document #{document.pk} "
+            f"from {document.from_dispensary.name} to {document.to_dispensary.name}",
+        )
+    return approved
+
+
+def execute_document(document, user):
+    """Move every approved line of a pending document in one transaction.
+    Rejected and cancelled lines are skipped; pending ones block execution."""
+    with transaction.atomic():
+        document = TransferDocument.objects.select_for_update().get(pk=document.pk)
+        if document.status != "pending":
+            raise TransferError(f"Transfer document #{document.pk} is already {document.status}")
+        lines = list(document.lines.select_for_update().order_by("pk"))
+        waiting = sum(1 for line in lines if line.status == "pending")
+        if waiting:
+            raise TransferError(f"{waiting} line(s) still awaiting approval")
+        # InterDispensaryTransfer.can_execute, without fetching approved_by per line.
+        approved = [
+            line for line in lines
+            if line.status == "in_transit" and line.approved_by_id is not None
+        ]
+        if not approved:
+            raise TransferError("No approved lines to transfer")
+
+        quantities = defaultdict(int)
+        for line in approved:
+            quantities[line.medication_id] += line.quantity
+        move_stock(
+            _active_store(document.from_dispensary), _active_store(document.to_dispensary),
+            quantities, user, "transfer_document", document.pk,
+        )
+
+        now = timezone.now()
+        for line in approved:
+            line.status, line.transferred_by, line.transferred_at = "completed", user, now
+        InterDispensaryTransfer.objects.bulk_update(
+            approved, ["status", "transferred_by", "transferred_at"]
+        )
+        document.status, document.transferred_by, document.transferred_at = "completed", user, now
+        document.save(update_fields=["status", "transferred_by", "transferred_at"])
+        log_audit_action(
+            user, "TRANSFER_DOCUMENT_EXECUTED", document,
+            f"Transferred {len(approved)} line(s) ({sum(quantities.values())} units) of "
+            f"transfer document #{document.pk} from {document.from_dispensary.name} "
+            f"to {document.to_dispensary.name}",
+        )
+    return document
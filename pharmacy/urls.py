@@ -616,6 +616,16 @@ urlpatterns = [
         enhanced_transfer_views.execute_transfer,
         name="execute_transfer",
     ),
+    path(
+        "transfers/documents/<int:document_id>/approve/",
+        enhanced_transfer_views.approve_transfer_document,
+        name="approve_transfer_document",
+    ),
+    path(
+        "transfers/documents/<int:document_id>/execute/",
+        enhanced_transfer_views.execute_transfer_document,
+        name="execute_transfer_document",
+    ),
     path(
         "transfers/bulk/approve/",
         enhanced_transfer_views.approve_bulk_transfers,
@@ -47,6 +47,7 @@ from .models import (
     PackItem,
     MedicalPackItem,
     PackOrder,
+    ReorderForecast,
 )
 from accounts.models import CustomUser
 from patients.models import Patient
@@ -61,6 +62,8 @@ from .purchase_services import (
     reject_purchase as reject_purchase_service,
     submit_for_approval,
 )
+from . import reorder_engine, stats_service, stock_ledger
+from .prescription_summary import PAYMENT_STATE_FILTERS
 from .forms import (
     MedicationForm,
     MedicationCategoryForm,
@@ -83,6 +86,12 @@ from billing.models import Invoice, InvoiceItem, Service, ServiceCategory
 from core.json_safe import json_for_template
 
 
+def _hospital_id(request):
+    """The request's tenant id, for cache keys."""
+    hospital = getattr(request, "hospital", None)
+    return hospital.pk if hospital else None
+
+
 def no_doctor_prescribing(view_func):
     """Block doctors from creating prescriptions inside the pharmacy module.
 
@@ -233,32 +242,23 @@ def pharmacy_dashboard(request):
             except Dispensary.DoesNotExist:
                 selected_dispensary = None
 
-    # Get pharmacy statistics
-    total_medications = Medication.objects.filter(is_active=True).count()
-    total_suppliers = Supplier.objects.filter(is_active=True).count()
-    total_dispensaries = Dispensary.objects.filter(is_active=True).count()
-
-    # Apply dispensary filter for pharmacist statistics
-    pharmacy_filter = Q()
-    if pharmacist_dispensary:
-        pharmacy_filter = Q(active_store__dispensary=pharmacist_dispensary)
+    # Get pharmacy statistics (cached per hospital and dispensary)
+    stats = stats_service.statistics(
+        _hospital_id(request),
+        pharmacist_dispensary.pk if pharmacist_dispensary else None,
+    )
 
     # Get low stock items (filtered for pharmacist if assigned)
     low_stock_items = ActiveStoreInventory.objects.filter(
-        models.Q(
-            **{key: value for key, value in pharmacy_filter.children if pharmacy_filter}
-        )
-        | models.Q(active_store__dispensary=pharmacist_dispensary)
-        if pharmacist_dispensary
-        else models.Q(stock_quantity__lte=models.F("reorder_level"))
-    ).select_related("medication", "active_store__dispensary")[:5]
-
-    # If pharmacist has selected dispensary, filter low stock items to their dispensary only
+        stock_quantity__lte=models.F("reorder_level")
+    )
     if pharmacist_dispensary:
-        low_stock_items = ActiveStoreInventory.objects.filter(
-            stock_quantity__lte=models.F("reorder_level"),
-            active_store__dispensary=pharmacist_dispensary,
-        ).select_related("medication", "active_store__dispensary")[:5]
+        low_stock_items = low_stock_items.filter(
+            active_store__dispensary=pharmacist_dispensary
+        )
+    low_stock_items = low_stock_items.select_related(
+        "medication", "active_store__dispensary"
+    )[:5]
 
     # Get recent purchases (filtered for pharmacist)
     recent_purchases = Purchase.objects.select_related("supplier")
@@ -279,21 +279,12 @@ def pharmacy_dashboard(request):
         recent_prescriptions = recent_prescriptions.filter(id__in=carts_for_dispensary)
     recent_prescriptions = recent_prescriptions.order_by("-prescription_date")[:5]
 
-    # Get inter-dispensary transfer statistics
-    try:
-        from .models import InterDispensaryTransfer
-
-        total_inter_transfers = InterDispensaryTransfer.objects.count()
-        pending_transfers = InterDispensaryTransfer.objects.filter(
-            status="pending"
-        ).count()
-        recent_transfers = InterDispensaryTransfer.objects.select_related(
-            "medication", "from_dispensary", "to_dispensary"
-        ).order_by("-created_at")[:5]
-    except:
-        total_inter_transfers = 0
-        pending_transfers = 0
-        recent_transfers = []
+    # Get recent inter-dispensary transfers
+    from .models import InterDispensaryTransfer
+
+    recent_transfers = InterDispensaryTransfer.objects.select_related(
+        "medication", "from_dispensary", "to_dispensary"
+    ).order_by("-created_at")[:5]
 
     # Add referral integration
     from core.department_dashboard_utils import (
@@ -323,9 +314,9 @@ def pharmacy_dashboard(request):
     ]
 
     context = {
-        "total_medications": total_medications,
-        "total_suppliers": total_suppliers,
-        "total_dispensaries": total_dispensaries,
+        "total_medications": stats["medications"]["active"],
+        "total_suppliers": stats["suppliers"]["active"],
+        "total_dispensaries": stats["dispensaries"]["active"],
         "stock_entry_dispensaries": stock_entry_dispensaries,
         # No dispensary yet (a tenant that predates dispensary seeding): offer
         # to create one instead of showing an empty picker.
@@ -333,8 +324,8 @@ def pharmacy_dashboard(request):
         "low_stock_items": low_stock_items,
         "recent_purchases": recent_purchases,
         "recent_prescriptions": recent_prescriptions,
-        "total_inter_transfers": total_inter_transfers,
-        "pending_transfers": pending_transfers,
+        "total_inter_transfers": stats["inter_transfers"]["total"],
+        "pending_transfers": stats["inter_transfers"]["pending"],
         "recent_transfers": recent_transfers,
         "categorized_referrals": categorized_referrals,
         "pending_referrals_count": pending_referrals_count,
@@ -397,19 +388,8 @@ def inventory_list(request):
     # Get categories for filter dropdown
     categories = MedicationCategory.objects.all()
 
-    # Calculate statistics
-    total_medications = Medication.objects.count()
-    active_count = Medication.objects.filter(is_active=True).count()
-
-    # Count active medications with at least one low-stock inventory (single query)
-    low_stock_count = (
-        Medication.objects.filter(
-            is_active=True,
-            active_inventories__stock_quantity__lte=F("reorder_level"),
-        )
-        .distinct()
-        .count()
-    )
+    # Headline counters: one cached aggregate, see stats_service
+    medication_stats = stats_service.statistics(_hospital_id(request))["medications"]
 
     context = {
         "page_obj": page_obj,
@@ -419,9 +399,9 @@ def inventory_list(request):
         "category_id": category_id,
         "page_title": "Pharmacy Inventory",
         "active_nav": "pharmacy",
-        "total_medications": total_medications,
-        "active_count": active_count,
-        "low_stock_count": low_stock_count,
+        "total_medications": medication_stats["total"],
+        "active_count": medication_stats["active"],
+        "low_stock_count": medication_stats["low_stock"],
     }
 
     response = render(request, "pharmacy/inventory_list.html", context)
@@ -805,12 +785,18 @@ def procurement_dashboard(request):
         "-purchase_date"
     )[:10]
 
-    # Get low stock items from ActiveStoreInventory
-    low_stock_qs = ActiveStoreInventory.objects.filter(
-        stock_quantity__lte=F("reorder_level")
-    ).select_related("medication", "active_store__dispensary")
+    # Reorder suggestions precomputed nightly by `manage.py forecast_reorders`
+    reorder_engine.ensure_forecast(_hospital_id(request))
+    low_stock_qs = ReorderForecast.objects.filter(needs_reorder=True).select_related(
+        "medication", "dispensary"
+    )
     low_stock_count = low_stock_qs.count()
     low_stock_medications = low_stock_qs[:20]
+    expiry_risk_items = (
+        ReorderForecast.objects.filter(units_at_risk__gt=0)
+        .select_related("medication", "dispensary")
+        .order_by("-units_at_risk")[:10]
+    )
 
     # Get top suppliers in last 90 days
     ninety_days_ago = timezone.now() - timedelta(days=90)
@@ -831,6 +817,7 @@ def procurement_dashboard(request):
         "total_pending_value": total_pending_value,
         "low_stock_medications": low_stock_medications,
         "low_stock_count": low_stock_count,
+        "expiry_risk_items": expiry_risk_items,
         "recent_orders": recent_orders,
         "top_suppliers": top_suppliers,
         "page_title": "Procurement Dashboard",
@@ -2224,66 +2211,61 @@ def api_suppliers(request):
 @permission_required("pharmacy.view")
 def bulk_store_dashboard(request):
     """View for the bulk store dashboard with comprehensive statistics"""
-    from django.db.models import Sum, Count, Q, F
+    from django.db.models import F
     from datetime import date, timedelta
 
     bulk_stores = BulkStore.objects.filter(is_active=True)
 
-    total_medications = (
-        BulkStoreInventory.objects.values("medication").distinct().count()
-    )
-    total_stock_quantity = (
-        BulkStoreInventory.objects.aggregate(total=Sum("stock_quantity"))["total"] or 0
-    )
+    # Counters come from one cached aggregate (stats_service); the queries
+    # below only fetch the first rows of each list.
+    stats = stats_service.statistics(_hospital_id(request))
+    bulk_stats = stats["bulk_stock"]
+    total_medications = bulk_stats["medications"]
+    total_stock_quantity = bulk_stats["quantity"]
+    low_stock_count = bulk_stats["low_stock"]
+    out_of_stock_count = bulk_stats["out_of_stock"]
+    expiring_soon_count = bulk_stats["expiring_soon"]
+    expired_count = bulk_stats["expired"]
+    pending_transfers_count = stats["bulk_transfers"]["pending"]
+    total_value = bulk_stats["value"]
 
     low_stock_items = (
-        BulkStoreInventory.objects.filter(stock_quantity__gt=0)
+        BulkStoreInventory.objects.filter(
+            stock_quantity__gt=0, stock_quantity__lte=F("medication__reorder_level")
+        )
         .select_related("medication", "bulk_store")
-        .order_by("medication__name")
+        .order_by("medication__name")[:10]
     )
 
-    low_stock_list = []
-    for item in low_stock_items:
-        if item.stock_quantity <= item.medication.reorder_level:
-            low_stock_list.append(item)
-
-    low_stock_count = len(low_stock_list)
-    low_stock_items = low_stock_list[:10]
-
-    out_of_stock_count = BulkStoreInventory.objects.filter(stock_quantity=0).count()
-
-    thirty_days_from_now = date.today() + timedelta(days=30)
-    expiring_soon_queryset = (
+    # The same local "today" stats_service counts with, so the lists agree
+    # with the counters around midnight.
+    today = timezone.localdate()
+    thirty_days_from_now = today + timedelta(days=stats_service.EXPIRY_WINDOW_DAYS)
+    expiring_soon = (
         BulkStoreInventory.objects.filter(
             expiry_date__lte=thirty_days_from_now,
-            expiry_date__gte=date.today(),
+            expiry_date__gte=today,
             stock_quantity__gt=0,
         )
         .select_related("medication", "bulk_store")
-        .order_by("expiry_date")
+        .order_by("expiry_date")[:10]
     )
-    expiring_soon_count = expiring_soon_queryset.count()
-    expiring_soon = expiring_soon_queryset[:10]
 
-    expired_items_queryset = (
+    expired_items = (
         BulkStoreInventory.objects.filter(
-            expiry_date__lt=date.today(), stock_quantity__gt=0
+            expiry_date__lt=today, stock_quantity__gt=0
         )
         .select_related("medication", "bulk_store")
-        .order_by("expiry_date")
+        .order_by("expiry_date")[:10]
     )
-    expired_count = expired_items_queryset.count()
-    expired_items = expired_items_queryset[:10]
 
-    pending_transfers_queryset = (
+    pending_transfers = (
         MedicationTransfer.objects.filter(status="pending")
         .select_related(
             "medication", "from_bulk_store", "to_active_store", "requested_by"
         )
-        .order_by("-requested_at")
+        .order_by("-requested_at")[:10]
     )
-    pending_transfers_count = pending_transfers_queryset.count()
-    pending_transfers = pending_transfers_queryset[:10]
 
     recent_transfers = (
         MedicationTransfer.objects.filter(
@@ -2293,13 +2275,6 @@ def bulk_store_dashboard(request):
         .order_by("-requested_at")[:10]
     )
 
-    total_value = (
-        BulkStoreInventory.objects.aggregate(
-            total=Sum(F("stock_quantity") * F("unit_cost"))
-        )["total"]
-        or 0
-    )
-
     dispensaries = Dispensary.objects.filter(is_active=True).select_related(
         "active_store", "manager"
     )
@@ -2500,6 +2475,10 @@ def add_bulk_store_inventory(request):
                     if form.cleaned_data.get("supplier"):
                         inventory.supplier = form.cleaned_data["supplier"]
                 inventory.save()
+                stock_ledger.record_adjustment(
+                    inventory, quantity, request.user,
+                    movement_type="receipt", document_type="direct_entry",
+                )
 
             messages.success(
                 request,
@@ -2542,11 +2521,14 @@ def edit_bulk_store_inventory(request, item_id):
         return redirect("pharmacy:bulk_store_dashboard")
 
     if request.method == "POST":
+        # Read before binding: is_valid() writes the posted values onto `item`.
+        old_qty = item.stock_quantity
+        old_markup = item.markup_percentage
         form = BulkStoreInventoryEditForm(request.POST, instance=item)
         if form.is_valid():
-            old_qty = item.stock_quantity
-            old_markup = item.markup_percentage
-            obj = form.save()  # save() auto-recalculates marked_up_cost
+            with transaction.atomic():
+                obj = form.save()  # save() auto-recalculates marked_up_cost
+                stock_ledger.record_adjustment(obj, obj.stock_quantity - old_qty, request.user)
 
             try:
                 from core.models import AuditLog
@@ -2606,7 +2588,11 @@ def delete_bulk_store_inventory(request, item_id):
     store_name = item.bulk_store.name
     qty = item.stock_quantity
 
-    item.delete()
+    with transaction.atomic():
+        stock_ledger.record_adjustment(
+            item, -qty, request.user, document_type="inventory_delete"
+        )
+        item.delete()
 
     try:
         from core.models import AuditLog
@@ -4765,7 +4751,9 @@ def receive_purchase_delivery(request, purchase_id):
             for item in purchase.items.all()
         }
         try:
-            purchase = receive_delivery(purchase, quantities)
+            purchase = receive_delivery(
+                purchase, quantities, request.POST.get("bulk_store")
+            )
         except PurchaseActionError as e:
             messages.error(request, str(e))
             return redirect(
@@ -4792,6 +4780,7 @@ def receive_purchase_delivery(request, purchase_id):
     context = {
         "purchase": purchase,
         "items": items,
+        "bulk_stores": BulkStore.objects.filter(is_active=True),
         "title": f"Receive Delivery - Purchase #{purchase.invoice_number}",
         "active_nav": "pharmacy",
     }
@@ -4881,12 +4870,10 @@ def edit_purchase_delivery_date(request, purchase_id):
 @permission_required("prescriptions.view")
 def prescription_list(request):
     """View for listing prescriptions with enhanced search and filtering"""
-    # Get all prescriptions with prefetch for efficient dispensing status calculation
-    prescriptions = (
-        Prescription.objects.select_related("patient", "doctor")
-        .prefetch_related("items")
-        .order_by("-created_at")
-    )
+    # Pricing, payment and dispensing progress are denormalized columns
+    # (pharmacy.prescription_summary), so a page renders from one query.
+    prescriptions = Prescription.objects.select_related("patient", "doctor")
+    order_by = ["-created_at"]
 
     # Initialize the search form
     search_form = PrescriptionSearchForm(request.GET)
@@ -4902,6 +4889,7 @@ def prescription_list(request):
         doctor = search_form.cleaned_data.get("doctor")
         date_from = search_form.cleaned_data.get("date_from")
         date_to = search_form.cleaned_data.get("date_to")
+        sort = search_form.cleaned_data.get("sort")
 
         # Apply search filter
         if search_query:
@@ -4927,16 +4915,21 @@ def prescription_list(request):
         # Apply medication name filter
         if medication_name:
             prescriptions = prescriptions.filter(
-                items__medication__name__icontains=medication_name
+                pk__in=PrescriptionItem.objects.filter(
+                    medication__name__icontains=medication_name
+                ).values("prescription_id")
             )
 
         # Apply status filter
         if status:
             prescriptions = prescriptions.filter(status=status)
 
-        # Apply payment status filter
+        # Apply payment status filter on the effective payment state, so
+        # prescriptions settled through an invoice or cart count as paid
         if payment_status:
-            prescriptions = prescriptions.filter(payment_status=payment_status)
+            prescriptions = prescriptions.filter(
+                payment_state__in=PAYMENT_STATE_FILTERS[payment_status]
+            )
 
         # Apply doctor filter
         if doctor:
@@ -4948,33 +4941,36 @@ def prescription_list(request):
         if date_to:
             prescriptions = prescriptions.filter(prescription_date__lte=date_to)
 
-    # Get statistics for the dashboard cards
-    total_prescriptions = prescriptions.count()
-    pending_count = prescriptions.filter(status="pending").count()
-    processing_count = prescriptions.filter(
-        status__in=["approved", "partially_dispensed"]
-    ).count()
-    completed_count = prescriptions.filter(status="dispensed").count()
-
-    # Add dispensing statistics
-    prescriptions_list = list(prescriptions.distinct())
+        if sort == "amount_desc":
+            order_by = ["-total_prescribed_price", "-created_at"]
+        elif sort == "amount_asc":
+            order_by = ["total_prescribed_price", "-created_at"]
+
+    # Get statistics for the dashboard cards in one aggregate
+    fully = Q(items_count__gt=0, items_fully_dispensed=F("items_count"))
+    started = Q(items_fully_dispensed__gt=0) | Q(items_partially_dispensed__gt=0)
+    stats = prescriptions.aggregate(
+        total=Count("id"),
+        pending=Count("id", filter=Q(status="pending")),
+        processing=Count("id", filter=Q(status__in=["approved", "partially_dispensed"])),
+        completed=Count("id", filter=Q(status="dispensed")),
+        fully_dispensed=Count("id", filter=fully),
+        partially_dispensed=Count("id", filter=~fully & started),
+    )
     dispensing_stats = {
-        "fully_dispensed": 0,
-        "partially_dispensed": 0,
-        "not_dispensed": 0,
+        "fully_dispensed": stats["fully_dispensed"],
+        "partially_dispensed": stats["partially_dispensed"],
+        "not_dispensed": stats["total"]
+        - stats["fully_dispensed"]
+        - stats["partially_dispensed"],
     }
-
-    for prescription in prescriptions_list:
-        dispensing_status = prescription.get_dispensing_status()
-        if dispensing_status == "fully_dispensed":
-            dispensing_stats["fully_dispensed"] += 1
-        elif dispensing_status == "partially_dispensed":
-            dispensing_stats["partially_dispensed"] += 1
-        else:
-            dispensing_stats["not_dispensed"] += 1
+    total_prescriptions = stats["total"]
+    pending_count = stats["pending"]
+    processing_count = stats["processing"]
+    completed_count = stats["completed"]
 
     # Pagination
-    paginator = Paginator(prescriptions_list, 10)
+    paginator = Paginator(prescriptions.order_by(*order_by), 10)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
 
@@ -7143,6 +7139,10 @@ def add_dispensary_inventory_item(request, dispensary_id):
                     inventory.last_restock_date = timezone.now()
                     inventory.save()
                     inventory.refresh_from_db()
+                stock_ledger.record_adjustment(
+                    inventory, quantity, request.user,
+                    movement_type="receipt", document_type="direct_entry",
+                )
 
                 # Stock with no purchase order behind it still needs a trail.
                 log_audit_action(
@@ -7201,9 +7201,12 @@ def edit_dispensary_inventory_item(request, dispensary_id, inventory_item_id):
     instance = inventory_item
 
     if request.method == "POST":
+        old_qty = instance.stock_quantity
         form = form_class(request.POST, instance=instance)
         if form.is_valid():
-            obj = form.save()
+            with transaction.atomic():
+                obj = form.save()
+                stock_ledger.record_adjustment(obj, obj.stock_quantity - old_qty, request.user)
             messages.success(request, "Inventory item updated successfully.")
             return redirect(
                 "pharmacy:dispensary_inventory", dispensary_id=dispensary.id
@@ -7245,7 +7248,12 @@ def delete_dispensary_inventory_item(request, dispensary_id, inventory_item_id):
     source = "active_store"
 
     if request.method == "POST":
-        inventory_item.delete()
+        with transaction.atomic():
+            stock_ledger.record_adjustment(
+                inventory_item, -inventory_item.stock_quantity, request.user,
+                document_type="inventory_delete",
+            )
+            inventory_item.delete()
         messages.success(request, "Inventory item deleted successfully.")
         return redirect("pharmacy:dispensary_inventory", dispensary_id=dispensary.id)
 
@@ -7302,6 +7310,10 @@ def add_medication_stock(request):
                 inventory.batch_number = data["batch_number"]
             inventory.last_restock_date = timezone.now()
             inventory.save()
+            stock_ledger.record_adjustment(
+                inventory, data["stock_quantity"], request.user,
+                movement_type="receipt", document_type="direct_entry",
+            )
             messages.success(
                 request,
                 f"Added {data['stock_quantity']} units of {data['medication'].name} to {dispensary.name}.",
@@ -7363,6 +7375,10 @@ def quick_add_stock(request):
         inventory.stock_quantity += quantity_to_add
         inventory.last_restock_date = timezone.now()
         inventory.save()
+        stock_ledger.record_adjustment(
+            inventory, quantity_to_add, request.user,
+            movement_type="receipt", document_type="direct_entry",
+        )
 
         return JsonResponse(
             {
@@ -7457,10 +7473,11 @@ def get_stock_quantities(request, prescription_id):
 @login_required
 def low_stock_alerts(request):
     """View to display low stock medications and send alerts"""
-    # Get all active store inventories that are low on stock
-    low_stock_items = ActiveStoreInventory.objects.filter(
-        stock_quantity__lte=models.F("reorder_level")
-    ).select_related("medication", "active_store__dispensary")
+    # Medications the reorder engine says to reorder (forecast_reorders)
+    reorder_engine.ensure_forecast(_hospital_id(request))
+    low_stock_items = ReorderForecast.objects.filter(needs_reorder=True).select_related(
+        "medication", "dispensary"
+    )
 
     # Get expired medications
     from django.utils import timezone
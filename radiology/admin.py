@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import RadiologyCategory, RadiologyTest, RadiologyOrder, RadiologyResult
+from .models import RadiologyCategory, RadiologyTest, RadiologyOrder, RadiologyResult, DicomInstance
 
 @admin.register(RadiologyCategory)
 class RadiologyCategoryAdmin(admin.ModelAdmin):
@@ -24,3 +24,11 @@ class RadiologyResultAdmin(admin.ModelAdmin):
     list_display = ('order', 'performed_by', 'result_date', 'is_abnormal')
     list_filter = ('is_abnormal',)
     search_fields = ('order__patient__first_name', 'order__patient__last_name', 'findings')
+
+@admin.register(DicomInstance)
+class DicomInstanceAdmin(admin.ModelAdmin):
+    list_display = ('order', 'modality', 'study_date', 'series_number', 'instance_number', 'error')
+    list_filter = ('modality',)
+    search_fields = ('study_instance_uid', 'series_instance_uid', 'sop_instance_uid', 'study_description')
+    date_hierarchy = 'study_date'
+    readonly_fields = [f.name for f in DicomInstance._meta.fields]
@@ -1,7 +1,10 @@
 from rest_framework import serializers
 
+from core.thumbnails import thumbnail_url
+
 from ..models import (
-    RadiologyCategory, RadiologyOrder, RadiologyResult, RadiologyTest,
+    DicomInstance, RadiologyCategory, RadiologyOrder, RadiologyResult,
+    RadiologyTest,
 )
 
 
@@ -42,6 +45,8 @@ class RadiologyResultSerializer(serializers.ModelSerializer):
     is_verified = serializers.SerializerMethodField()
     # Where the app can fetch the study and the report, when they exist.
     image_url = serializers.SerializerMethodField()
+    # A screen-sized JPEG of the same image, for the result list and viewer.
+    image_preview_url = serializers.SerializerMethodField()
     report_url = serializers.SerializerMethodField()
 
     class Meta:
@@ -53,7 +58,7 @@ class RadiologyResultSerializer(serializers.ModelSerializer):
             'study_status', 'is_abnormal', 'notes', 'result_status',
             'result_status_display', 'performed_by_name', 'verified_by_name',
             'verified_date', 'verification_notes', 'is_verified', 'image_url',
-            'report_url',
+            'image_preview_url', 'report_url',
         ]
         read_only_fields = [
             'order', 'result_status', 'verified_date', 'verification_notes',
@@ -71,6 +76,14 @@ class RadiologyResultSerializer(serializers.ModelSerializer):
     def get_image_url(self, result):
         return self._url(result.images or result.image_file)
 
+    def get_image_preview_url(self, result):
+        field = result.images or result.image_file
+        if not field:
+            return ''
+        url = thumbnail_url(field, 'preview')
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
     def get_report_url(self, result):
         return self._url(result.report_file)
 
@@ -141,3 +154,36 @@ class RadiologyOrderSerializer(serializers.ModelSerializer):
         if not order.is_payment_verified():
             return 'Payment is pending for this radiology order.'
         return ''
+
+
+class DicomInstanceSerializer(serializers.ModelSerializer):
+    """One indexed DICOM file: its header and a preview, never the pixels."""
+
+    patient = serializers.IntegerField(source='order.patient_id', read_only=True)
+    patient_name = serializers.CharField(
+        source='order.patient.get_full_name', read_only=True
+    )
+    test_name = serializers.CharField(source='order.test.name', read_only=True)
+    preview_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = DicomInstance
+        fields = [
+            'id', 'result', 'order', 'patient', 'patient_name', 'test_name',
+            'modality', 'study_date', 'study_description', 'series_description',
+            'body_part', 'study_instance_uid', 'series_instance_uid',
+            'sop_instance_uid', 'series_number', 'instance_number', 'rows',
+            'columns', 'frames', 'bits_stored', 'photometric', 'window_center',
+            'window_width', 'file_size', 'preview_url', 'thumbnail_url', 'error',
+        ]
+
+    def _absolute(self, url):
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request and url else url
+
+    def get_preview_url(self, instance):
+        return self._absolute(instance.preview.url) if instance.preview else ''
+
+    def get_thumbnail_url(self, instance):
+        return self._absolute(thumbnail_url(instance.preview, 'thumb'))
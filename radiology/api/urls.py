@@ -9,5 +9,6 @@ router.register(r'tests', views.RadiologyTestViewSet)
 router.register(r'categories', views.RadiologyCategoryViewSet)
 router.register(r'orders', views.RadiologyOrderViewSet)
 router.register(r'results', views.RadiologyResultViewSet)
+router.register(r'dicom', views.DicomInstanceViewSet)
 
 urlpatterns = router.urls
@@ -14,14 +14,15 @@ from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.response import Response
 
 from ..models import (
-    RadiologyCategory, RadiologyOrder, RadiologyResult, RadiologyTest,
+    DicomInstance, RadiologyCategory, RadiologyOrder, RadiologyResult,
+    RadiologyTest,
 )
 from ..services import (
     RadiologyActionError, finalize_result, save_result, update_status,
     verify_result,
 )
 from .serializers import (
-    RadiologyCategorySerializer, RadiologyOrderSerializer,
+    DicomInstanceSerializer, RadiologyCategorySerializer, RadiologyOrderSerializer,
     RadiologyResultSerializer, RadiologyTestSerializer,
 )
 
@@ -205,3 +206,45 @@ class RadiologyResultViewSet(viewsets.ReadOnlyModelViewSet):
         except RadiologyActionError as e:
             return _error(e)
         return Response(self.get_serializer(result).data)
+
+
+class DicomInstanceViewSet(viewsets.ReadOnlyModelViewSet):
+    """Search indexed studies by header, without downloading them.
+
+    The study itself is still on the result (`image_url`); this returns the
+    metadata and a preview per file.
+    """
+
+    queryset = DicomInstance.objects.all()
+    serializer_class = DicomInstanceSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = RadiologyPagination
+
+    def get_queryset(self):
+        queryset = (
+            DicomInstance.objects
+            .select_related('order', 'order__patient', 'order__test')
+            .order_by('-study_date', 'series_number', 'instance_number')
+        )
+        params = self.request.query_params
+        if params.get('modality'):
+            queryset = queryset.filter(modality__iexact=params['modality'])
+        if params.get('date_from'):
+            queryset = queryset.filter(study_date__gte=params['date_from'])
+        if params.get('date_to'):
+            queryset = queryset.filter(study_date__lte=params['date_to'])
+        if params.get('study_uid'):
+            queryset = queryset.filter(study_instance_uid=params['study_uid'])
+        if params.get('series_uid'):
+            queryset = queryset.filter(series_instance_uid=params['series_uid'])
+        if params.get('order'):
+            queryset = queryset.filter(order_id=params['order'])
+        if params.get('patient'):
+            queryset = queryset.filter(order__patient_id=params['patient'])
+        if params.get('search'):
+            queryset = queryset.filter(
+                Q(study_description__icontains=params['search']) |
+                Q(series_description__icontains=params['search']) |
+                Q(body_part__icontains=params['search'])
+            )
+        return queryset
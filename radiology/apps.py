@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RadiologyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'radiology'
+
+    def ready(self):
+        import radiology.signals  # noqa
@@ -0,0 +1,261 @@
+"""DICOM ingest: index the headers, render one 8-bit preview per instance.
+
+`validate_radiology_upload` accepts .dcm/.dicom, but until now a study was an
+opaque file: finding "all CTs from last week" meant opening every order, and
+looking at one meant downloading the whole thing. Each DICOM file attached to
+a RadiologyResult is now read once, when the result is saved:
+
+- the header goes into DicomInstance (modality, study date, study/series/
+  instance UIDs, dimensions, the stored window), which the list pages and
+  `/radiology/api/dicom/` search without touching the file;
+- the pixel data is windowed down to an 8-bit JPEG preview (see SIZES in
+  core.thumbnails), which the order page and the app show instead of
+  streaming the study.
+
+pydicom is optional (requirements.txt). Without it, or for a compressed
+transfer syntax Pillow cannot unpack, the instance is still recorded with
+whatever could be read, and the original stays downloadable as before.
+Re-run `manage.py index_dicom` after installing pydicom to backfill.
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from core.thumbnails import SIZES, render_derivative
+from core.upload_validators import SCAN_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+# RadiologyResult fields that can carry a study.
+DICOM_FIELDS = ("image_file", "images")
+
+
+class DicomError(Exception):
+    """A file that could not be read as DICOM."""
+
+
+def is_dicom_name(name):
+    return os.path.splitext(name or "")[1].lstrip(".").lower() in SCAN_EXTENSIONS
+
+
+def _first(value):
+    """WindowCenter & co. may be multi-valued; the first is the default."""
+    if value is None or value == "":
+        return None
+    try:
+        return float(value[0] if hasattr(value, "__len__") and not isinstance(value, str) else value)
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+def _int(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _date(value):
+    """DA is YYYYMMDD; plenty of modalities leave it blank or malformed."""
+    from datetime import datetime
+
+    try:
+        return datetime.strptime(str(value)[:8], "%Y%m%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def read_dataset(fileobj, pixels=True):
+    try:
+        import pydicom
+    except ImportError as e:
+        raise DicomError("pydicom is not installed") from e
+    try:
+        return pydicom.dcmread(fileobj, stop_before_pixels=not pixels, force=True)
+    except Exception as e:
+        raise DicomError(f"Not a readable DICOM file: {e}") from e
+
+
+def header_fields(ds):
+    """The DicomInstance columns for a parsed dataset."""
+    get = ds.get
+    meta = getattr(ds, "file_meta", None)
+    return {
+        "sop_instance_uid": str(get("SOPInstanceUID", "") or ""),
+        "study_instance_uid": str(get("StudyInstanceUID", "") or ""),
+        "series_instance_uid": str(get("SeriesInstanceUID", "") or ""),
+        "modality": str(get("Modality", "") or "")[:16],
+        "study_date": _date(get("StudyDate")),
+        "study_description": str(get("StudyDescription", "") or "")[:255],
+        "series_description": str(get("SeriesDescription", "") or "")[:255],
+        "body_part": str(get("BodyPartExamined", "") or "")[:64],
+        "series_number": _int(get("SeriesNumber")),
+        "instance_number": _int(get("InstanceNumber")),
+        "rows": _int(get("Rows")),
+        "columns": _int(get("Columns")),
+        "frames": _int(get("NumberOfFrames")) or 1,
+        "bits_stored": _int(get("BitsStored")),
+        "photometric": str(get("PhotometricInterpretation", "") or "")[:32],
+        "window_center": _first(get("WindowCenter")),
+        "window_width": _first(get("WindowWidth")),
+        "transfer_syntax": str(getattr(meta, "TransferSyntaxUID", "") or "")[:64],
+    }
+
+
+def windowed_image(ds):
+    """The middle frame of `ds` as an 8-bit Pillow image.
+
+    Native (uncompressed) pixel data only: that is what modalities in these
+    clinics send, and it needs neither numpy nor a codec plugin. The stored
+    window is applied through the rescale slope/intercept; with none stored,
+    the frame's own min..max is used.
+    """
+    from PIL import Image, ImageOps
+
+    meta = getattr(ds, "file_meta", None)
+    syntax = getattr(meta, "TransferSyntaxUID", None)
+    if syntax is not None and getattr(syntax, "is_compressed", False):
+        raise DicomError(f"Compressed transfer syntax {syntax} is not previewed")
+    if "PixelData" not in ds:
+        raise DicomError("No pixel data")
+
+    rows, cols = int(ds.Rows), int(ds.Columns)
+    samples = int(ds.get("SamplesPerPixel", 1) or 1)
+    bits = int(ds.get("BitsAllocated", 16) or 16)
+    frames = int(ds.get("NumberOfFrames", 1) or 1)
+    photometric = str(ds.get("PhotometricInterpretation", "MONOCHROME2"))
+
+    frame_bytes = rows * cols * samples * (bits // 8)
+    data = bytes(ds.PixelData)
+    start = (frames // 2) * frame_bytes
+    frame = data[start:start + frame_bytes]
+    if bits not in (8, 16) or len(frame) != frame_bytes:
+        raise DicomError("Unsupported pixel layout")
+
+    if samples == 3:
+        if int(ds.get("PlanarConfiguration", 0) or 0):
+            planes = [
+                Image.frombytes("L", (cols, rows), frame[i * rows * cols:(i + 1) * rows * cols])
+                for i in range(3)
+            ]
+            return Image.merge("RGB", planes)
+        return Image.frombytes("RGB", (cols, rows), frame)
+
+    if bits == 8:
+        img = Image.frombytes("L", (cols, rows), frame).convert("I")
+    else:
+        signed = int(ds.get("PixelRepresentation", 0) or 0) == 1
+        little = getattr(syntax, "is_little_endian", True) if syntax else True
+        raw = ("I;16S" if signed else "I;16") + ("" if little else "B")
+        img = Image.frombytes("I", (cols, rows), frame, "raw", raw)
+
+    slope = _first(ds.get("RescaleSlope")) or 1.0
+    intercept = _first(ds.get("RescaleIntercept")) or 0.0
+    center = _first(ds.get("WindowCenter"))
+    width = _first(ds.get("WindowWidth"))
+    if center is None or not width or width <= 1:
+        low, high = img.getextrema()
+        low, high = low * slope + intercept, high * slope + intercept
+        center, width = (low + high) / 2, max(high - low, 2)
+
+    # DICOM PS3.3 C.11.2.1.2 linear window, folded into one point() so Pillow
+    # does it in C: y = ((x*slope + intercept - (c - .5)) / (w - 1) + .5) * 255.
+    # Converting to "L" afterwards clips to 0..255.
+    gain = 255.0 / (width - 1)
+    img = img.point(lambda x: x * slope * gain + ((intercept - center + 0.5) * gain + 127.5))
+    img = img.convert("L")
+    if photometric == "MONOCHROME1":
+        img = ImageOps.invert(img)
+    return img
+
+
+def preview_jpeg(ds):
+    """JPEG bytes of the windowed preview, downscaled to the preview bucket."""
+    img = render_derivative(windowed_image(ds), SIZES["preview"])
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=85, optimize=True)
+    return buf.getvalue()
+
+
+def index_file(result, field_name):
+    """Parse one attached file into its DicomInstance row (created or refreshed)."""
+    from .models import DicomInstance
+
+    fieldfile = getattr(result, field_name)
+    instance = (
+        DicomInstance.all_objects.filter(result=result, source_field=field_name).first()
+        or DicomInstance(result=result, source_field=field_name)
+    )
+    instance.hospital_id = result.hospital_id
+    instance.order_id = result.order_id
+    instance.file_name = fieldfile.name
+    instance.file_size = fieldfile.size if fieldfile.storage.exists(fieldfile.name) else None
+    instance.indexed_at = timezone.now()
+    instance.error = ""
+
+    preview = None
+    try:
+        with fieldfile.open("rb") as fh:
+            ds = read_dataset(fh)
+        for name, value in header_fields(ds).items():
+            setattr(instance, name, value)
+        try:
+            preview = preview_jpeg(ds)
+        except DicomError as e:
+            instance.error = str(e)[:255]
+    except (DicomError, OSError) as e:
+        instance.error = str(e)[:255]
+
+    if instance.preview:
+        instance.preview.delete(save=False)
+    if preview is not None:
+        stem = instance.sop_instance_uid or f"result{result.pk}-{field_name}"
+        instance.preview.save(f"{stem}.jpg", ContentFile(preview), save=False)
+    instance.save()
+    return instance
+
+
+def index_result(result, force=False):
+    """Bring a result's DicomInstance rows in line with its attached files.
+
+    Cheap when nothing changed: a file already indexed under the same name is
+    skipped unless `force`, and rows for files that were replaced or removed
+    are dropped.
+    """
+    from .models import DicomInstance
+
+    existing = {
+        i.source_field: i
+        for i in DicomInstance.all_objects.filter(result=result)
+    }
+    indexed = []
+    for field_name in DICOM_FIELDS:
+        fieldfile = getattr(result, field_name)
+        current = existing.pop(field_name, None)
+        if not fieldfile or not is_dicom_name(fieldfile.name):
+            if current is not None:
+                existing[field_name] = current
+            continue
+        if current is not None and current.file_name == fieldfile.name and not force:
+            indexed.append(current)
+            continue
+        try:
+            indexed.append(index_file(result, field_name))
+        except Exception:  # noqa: BLE001 - a bad study must not fail the report
+            logger.exception("DICOM indexing failed for radiology result %s", result.pk)
+
+    for stale in existing.values():
+        if stale.preview:
+            stale.preview.delete(save=False)
+        stale.delete()
+    return indexed
+
+
+def index_result_on_commit(result):
+    """Index after the surrounding transaction commits, so a rolled-back save
+    never leaves a preview for a file that was not kept."""
+    transaction.on_commit(lambda: index_result(result))
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from radiology.dicom import index_result
+from radiology.models import RadiologyResult
+
+
+class Command(BaseCommand):
+    help = (
+        "Index DICOM attachments on radiology results and render their previews. "
+        "Idempotent: files already indexed are skipped unless --force."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--force", action="store_true",
+            help="Re-read every file, e.g. after installing pydicom.",
+        )
+        parser.add_argument(
+            "--failed", action="store_true",
+            help="Only retry instances that recorded an error.",
+        )
+
+    def handle(self, *args, **options):
+        dicom = Q()
+        for field in ("image_file", "images"):
+            for ext in ("dcm", "dicom"):
+                dicom |= Q(**{f"{field}__iendswith": f".{ext}"})
+        results = RadiologyResult.all_objects.filter(dicom)
+        if options["failed"]:
+            results = results.filter(dicom_instances__error__gt="").distinct()
+
+        indexed = errors = 0
+        for result in results.order_by("pk").iterator(chunk_size=200):
+            for instance in index_result(result, force=options["force"] or options["failed"]):
+                indexed += 1
+                if instance.error:
+                    errors += 1
+                    self.stdout.write(
+                        self.style.WARNING(f"Result {result.pk} ({instance.file_name}): {instance.error}")
+                    )
+        self.stdout.write(
+            self.style.SUCCESS(f"{indexed} DICOM file(s) indexed, {errors} without preview.")
+        )
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.4 on 2026-10-19 08:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('radiology', '0009_alter_radiologyresult_image_file_and_more'),
+        ('saas', '0009_hospital_logo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DicomInstance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_field', models.CharField(max_length=20)),
+                ('file_name', models.CharField(max_length=255)),
+                ('file_size', models.BigIntegerField(blank=True, null=True)),
+                ('sop_instance_uid', models.CharField(blank=True, max_length=64)),
+                ('study_instance_uid', models.CharField(blank=True, max_length=64)),
+                ('series_instance_uid', models.CharField(blank=True, max_length=64)),
+                ('modality', models.CharField(blank=True, max_length=16)),
+                ('study_date', models.DateField(blank=True, null=True)),
+                ('study_description', models.CharField(blank=True, max_length=255)),
+                ('series_description', models.CharField(blank=True, max_length=255)),
+                ('body_part', models.CharField(blank=True, max_length=64)),
+                ('series_number', models.IntegerField(blank=True, null=True)),
+                ('instance_number', models.IntegerField(blank=True, null=True)),
+                ('rows', models.PositiveIntegerField(blank=True, null=True)),
+                ('columns', models.PositiveIntegerField(blank=True, null=True)),
+                ('frames', models.PositiveIntegerField(default=1)),
+                ('bits_stored', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('photometric', models.CharField(blank=True, max_length=32)),
+                ('window_center', models.FloatField(blank=True, null=True)),
+                ('window_width', models.FloatField(blank=True, null=True)),
+                ('transfer_syntax', models.CharField(blank=True, max_length=64)),
+                ('preview', models.ImageField(blank=True, null=True, upload_to='radiology_previews/')),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('indexed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('hospital', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='saas.hospital')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dicom_instances', to='radiology.radiologyorder')),
+                ('result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dicom_instances', to='radiology.radiologyresult')),
+            ],
+            options={
+                'ordering': ['-study_date', 'series_number', 'instance_number'],
+                'indexes': [models.Index(fields=['hospital', 'modality', 'study_date'], name='idx_dicom_modality_date'), models.Index(fields=['hospital', 'study_date'], name='idx_dicom_study_date'), models.Index(fields=['study_instance_uid'], name='idx_dicom_study_uid'), models.Index(fields=['series_instance_uid'], name='idx_dicom_series_uid'), models.Index(fields=['sop_instance_uid'], name='idx_dicom_sop_uid')],
+                'constraints': [models.UniqueConstraint(fields=('result', 'source_field'), name='uniq_dicom_result_field')],
+            },
+        ),
+    ]
@@ -395,3 +395,70 @@ class RadiologyResult(TenantModel):
 
     class Meta:
         ordering = ["-result_date"]
+
+
+class DicomInstance(TenantModel):
+    """Header index and windowed preview of one DICOM file on a result.
+
+    Filled by radiology.dicom when a result with a .dcm/.dicom attachment is
+    saved, so studies can be listed, searched and glanced at without reading
+    the file. The file on the result stays the source of truth.
+    """
+
+    result = models.ForeignKey(
+        RadiologyResult, on_delete=models.CASCADE, related_name="dicom_instances"
+    )
+    order = models.ForeignKey(
+        RadiologyOrder, on_delete=models.CASCADE, related_name="dicom_instances"
+    )
+    # Which RadiologyResult field the file came from ("image_file"/"images").
+    source_field = models.CharField(max_length=20)
+    file_name = models.CharField(max_length=255)
+    file_size = models.BigIntegerField(null=True, blank=True)
+
+    sop_instance_uid = models.CharField(max_length=64, blank=True)
+    study_instance_uid = models.CharField(max_length=64, blank=True)
+    series_instance_uid = models.CharField(max_length=64, blank=True)
+    modality = models.CharField(max_length=16, blank=True)
+    study_date = models.DateField(null=True, blank=True)
+    study_description = models.CharField(max_length=255, blank=True)
+    series_description = models.CharField(max_length=255, blank=True)
+    body_part = models.CharField(max_length=64, blank=True)
+    series_number = models.IntegerField(null=True, blank=True)
+    instance_number = models.IntegerField(null=True, blank=True)
+    rows = models.PositiveIntegerField(null=True, blank=True)
+    columns = models.PositiveIntegerField(null=True, blank=True)
+    frames = models.PositiveIntegerField(default=1)
+    bits_stored = models.PositiveSmallIntegerField(null=True, blank=True)
+    photometric = models.CharField(max_length=32, blank=True)
+    window_center = models.FloatField(null=True, blank=True)
+    window_width = models.FloatField(null=True, blank=True)
+    transfer_syntax = models.CharField(max_length=64, blank=True)
+
+    preview = models.ImageField(upload_to="radiology_previews/", blank=True, null=True)
+    # Why there is no header or no preview; blank when indexing went through.
+    error = models.CharField(max_length=255, blank=True)
+    indexed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.modality or 'DICOM'} {self.sop_instance_uid or self.file_name}"
+
+    class Meta:
+        ordering = ["-study_date", "series_number", "instance_number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["result", "source_field"], name="uniq_dicom_result_field"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["hospital", "modality", "study_date"],
+                name="idx_dicom_modality_date",
+            ),
+            models.Index(
+                fields=["hospital", "study_date"], name="idx_dicom_study_date"
+            ),
+            models.Index(fields=["study_instance_uid"], name="idx_dicom_study_uid"),
+            models.Index(fields=["series_instance_uid"], name="idx_dicom_series_uid"),
+            models.Index(fields=["sop_instance_uid"], name="idx_dicom_sop_uid"),
+        ]
@@ -0,0 +1,54 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from .dicom import DICOM_FIELDS, index_result_on_commit, is_dicom_name
+from .models import RadiologyResult
+
+
+def _attached(instance):
+    """The names of the result's DICOM-capable attachments as loaded, or None
+    if one of them was deferred (reading it here would cost a query)."""
+    names = []
+    for name in DICOM_FIELDS:
+        if name not in instance.__dict__:
+            return None
+        value = instance.__dict__[name]
+        names.append(getattr(value, "name", value) or "")
+    return tuple(names)
+
+
+@receiver(post_init, sender=RadiologyResult)
+def remember_dicom_attachments(sender, instance, **kwargs):
+    instance._dicom_attached = _attached(instance)
+
+
+@receiver(post_save, sender=RadiologyResult)
+def index_dicom_attachments(sender, instance, created=False, update_fields=None, **kwargs):
+    """Index .dcm attachments (and drop stale rows) when a result's files change.
+
+    Every save path - the HTML forms, save_result, the admin - ends here, so
+    none of them has to remember to. A save that leaves the attachments as
+    they were loaded (a findings edit, a status change) costs nothing.
+    """
+    if kwargs.get('raw'):
+        return
+    if update_fields is not None and not set(update_fields) & set(DICOM_FIELDS):
+        return
+    before = getattr(instance, "_dicom_attached", None)
+    now = _attached(instance)
+    instance._dicom_attached = now
+
+    if created:
+        if any(is_dicom_name(name) for name in now or ()):
+            index_result_on_commit(instance)
+    elif before is None or now is None:
+        # The files were deferred on load: compare against what was indexed.
+        has_dicom = any(
+            is_dicom_name(getattr(instance, name).name)
+            for name in DICOM_FIELDS
+            if getattr(instance, name)
+        )
+        if has_dicom or instance.dicom_instances.exists():
+            index_result_on_commit(instance)
+    elif before != now:
+        index_result_on_commit(instance)
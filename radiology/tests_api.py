@@ -4,6 +4,8 @@ The guards are shared with the HTML views via radiology.services: a report
 cannot be written before payment, editing a signed-off report is refused, and
 verifying records who signed it — which the verification page never did.
 """
+import shutil
+import tempfile
 from decimal import Decimal
 
 from django.contrib.auth.models import Permission
@@ -22,6 +24,13 @@ from radiology.models import (
 @override_settings(STRICT_ACCESS_CONTROL=True)
 class RadiologyApiTest(TestCase):
     def setUp(self):
+        # Uploaded studies land here, not in the checkout's media/.
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        override = override_settings(MEDIA_ROOT=media, THUMBNAIL_ROOT=media + "/derived")
+        override.enable()
+        self.addCleanup(override.disable)
+
         self.user = CustomUser.objects.create_superuser(
             phone_number="08015000001", username="radadmin", password="pw12345",
         )
@@ -0,0 +1,156 @@
+"""DICOM ingest: headers land in DicomInstance, pixels become a small preview."""
+import io
+import shutil
+import struct
+import tempfile
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from accounts.models import CustomUser
+from patients.models import Patient
+from radiology import dicom
+from radiology.models import (
+    DicomInstance, RadiologyCategory, RadiologyOrder, RadiologyResult, RadiologyTest,
+)
+
+try:
+    import pydicom
+    from pydicom.dataset import FileDataset, FileMetaDataset
+    from pydicom.uid import ExplicitVRLittleEndian, generate_uid
+except ImportError:  # pragma: no cover - optional dependency
+    pydicom = None
+
+
+def _ct_bytes(pixels, rows, cols, **tags):
+    """A minimal single-frame 16-bit signed CT file."""
+    meta = FileMetaDataset()
+    meta.MediaStorageSOPClassUID = "1.2.840.10008.5.1.4.1.1.2"
+    meta.MediaStorageSOPInstanceUID = generate_uid()
+    meta.TransferSyntaxUID = ExplicitVRLittleEndian
+    ds = FileDataset(None, {}, file_meta=meta, preamble=b"\0" * 128)
+    ds.SOPClassUID = meta.MediaStorageSOPClassUID
+    ds.SOPInstanceUID = meta.MediaStorageSOPInstanceUID
+    ds.StudyInstanceUID = generate_uid()
+    ds.SeriesInstanceUID = generate_uid()
+    ds.Modality = "CT"
+    ds.StudyDate = "20260301"
+    ds.SeriesNumber = 2
+    ds.InstanceNumber = 7
+    ds.Rows, ds.Columns = rows, cols
+    ds.SamplesPerPixel = 1
+    ds.PhotometricInterpretation = "MONOCHROME2"
+    ds.BitsAllocated = ds.BitsStored = 16
+    ds.HighBit = 15
+    ds.PixelRepresentation = 1
+    ds.RescaleSlope, ds.RescaleIntercept = 1, -1024
+    for name, value in tags.items():
+        setattr(ds, name, value)
+    ds.PixelData = struct.pack(f"<{len(pixels)}h", *pixels)
+    buf = io.BytesIO()
+    ds.save_as(buf, enforce_file_format=True)
+    return buf.getvalue()
+
+
+@unittest.skipIf(pydicom is None, "pydicom not installed")
+class WindowingTests(SimpleTestCase):
+    def _image(self, pixels, **tags):
+        ds = pydicom.dcmread(io.BytesIO(_ct_bytes(pixels, 1, len(pixels), **tags)))
+        return list(dicom.windowed_image(ds).tobytes())
+
+    def test_stored_window_is_applied_through_the_rescale(self):
+        # Raw 1024 is 0 HU; a 0/400 window puts air black, bone white, water mid-grey.
+        out = self._image([0, 1024, 1524, 3000], WindowCenter=0, WindowWidth=400)
+        self.assertEqual(out[0], 0)
+        self.assertIn(out[1], (127, 128))
+        self.assertEqual(out[2:], [255, 255])
+
+    def test_missing_window_falls_back_to_min_max(self):
+        out = self._image([100, 200, 300])
+        self.assertEqual((out[0], out[-1]), (0, 255))
+
+    def test_monochrome1_is_inverted(self):
+        out = self._image([0, 3000], PhotometricInterpretation="MONOCHROME1")
+        self.assertEqual(out, [255, 0])
+
+
+@unittest.skipIf(pydicom is None, "pydicom not installed")
+class IndexingTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, True)
+        override = override_settings(MEDIA_ROOT=media, THUMBNAIL_ROOT=media + "/derived")
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = CustomUser.objects.create_user(
+            phone_number="08015000009", username="radtech", password="pw12345",
+        )
+        patient = Patient.objects.create(
+            first_name="Ifeoma", last_name="Eze", date_of_birth="1992-02-02",
+            gender="F", address="3 Imaging Road", city="Aba", state="Abia",
+        )
+        test = RadiologyTest.objects.create(
+            name="CT Head", category=RadiologyCategory.objects.create(name="CT"), price=1,
+        )
+        self.order = RadiologyOrder.objects.create(
+            patient=patient, test=test, referring_doctor=self.user,
+        )
+
+    def _result(self, data, name="study.dcm"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return RadiologyResult.objects.create(
+                order=self.order, performed_by=self.user, findings="f", impression="i",
+                image_file=SimpleUploadedFile(name, data),
+            )
+
+    def test_saving_a_result_indexes_its_study(self):
+        pixels = [1024 + (i % 64) * 10 for i in range(64 * 48)]
+        result = self._result(_ct_bytes(pixels, 48, 64, WindowCenter=40, WindowWidth=400))
+
+        instance = DicomInstance.objects.get(result=result)
+        self.assertEqual(instance.modality, "CT")
+        self.assertEqual(str(instance.study_date), "2026-03-01")
+        self.assertEqual((instance.columns, instance.rows), (64, 48))
+        self.assertEqual(instance.order, self.order)
+        self.assertEqual(instance.error, "")
+        with instance.preview.open("rb") as fh, Image.open(fh) as img:
+            self.assertEqual((img.mode, img.size), ("L", (64, 48)))
+
+    def test_resave_without_change_does_not_reindex(self):
+        result = self._result(_ct_bytes([0, 1, 2, 3], 2, 2))
+        stamp = DicomInstance.objects.get(result=result).indexed_at
+        with self.captureOnCommitCallbacks(execute=True):
+            result.findings = "edited"
+            result.save()
+        self.assertEqual(DicomInstance.objects.get(result=result).indexed_at, stamp)
+
+    def test_resave_without_change_does_not_look_for_instances(self):
+        result = self._result(b"%PDF-1.4", name="report.pdf")
+        result = RadiologyResult.objects.get(pk=result.pk)
+        result.findings = "edited"
+        with CaptureQueriesContext(connection) as queries:
+            result.save()
+        self.assertFalse(any("dicominstance" in q["sql"].lower() for q in queries.captured_queries))
+
+    def test_removing_the_study_drops_its_index(self):
+        result = self._result(_ct_bytes([0, 1, 2, 3], 2, 2))
+        result = RadiologyResult.objects.get(pk=result.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            result.image_file = None
+            result.save()
+        self.assertFalse(DicomInstance.objects.filter(result=result).exists())
+
+    def test_unreadable_file_is_recorded_not_raised(self):
+        result = self._result(b"definitely not dicom" * 10)
+        instance = DicomInstance.objects.get(result=result)
+        self.assertTrue(instance.error)
+        self.assertFalse(instance.preview)
+
+    def test_non_dicom_attachments_are_ignored(self):
+        result = self._result(b"%PDF-1.4", name="report.pdf")
+        self.assertFalse(DicomInstance.objects.filter(result=result).exists())
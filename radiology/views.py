@@ -10,6 +10,7 @@ from django.contrib.auth.models import User
 from django.views.decorators.http import require_POST
 from .forms import RadiologyOrderForm, RadiologyResultForm
 from .services import RadiologyActionError, assert_can_add_result, update_status
+from core import turnaround
 from core.decorators import department_access_required
 from core.department_dashboard_utils import (
     get_user_department,
@@ -30,7 +31,7 @@ from core.json_safe import json_for_template
 @permission_required("radiology.view")
 def index(request):
     """Enhanced Radiology dashboard with charts, metrics, and referral integration"""
-    from django.db.models import Sum, Count, Avg, F, ExpressionWrapper, DurationField
+    from django.db.models import Sum, Count
     from datetime import datetime, timedelta
 
     today = timezone.now().date()
@@ -128,27 +129,12 @@ def index(request):
         status__in=["pending", "scheduled"], priority="emergency"
     ).count()
 
-    # Calculate average reporting time (for completed orders in last 30 days)
-    avg_reporting_time = (
-        RadiologyOrder.objects.filter(
-            status="completed",
-            created_at__gte=timezone.now() - timedelta(days=30),
-            completed_date__isnull=False,
-        )
-        .annotate(
-            reporting_time=ExpressionWrapper(
-                F("completed_date") - F("created_at"), output_field=DurationField()
-            )
-        )
-        .aggregate(avg=Avg("reporting_time"))["avg"]
-    )
-
-    # Format reporting time
-    if avg_reporting_time:
-        hours = avg_reporting_time.total_seconds() / 3600
-        avg_reporting_hours = round(hours, 1)
-    else:
-        avg_reporting_hours = 0
+    # Average reporting time (last 30 days) from the hourly rollups
+    # rather than the raw orders
+    avg_reporting_time = turnaround.summary(
+        timezone.now() - timedelta(days=30), metrics=("radiology_turnaround",)
+    )["radiology_turnaround"]["mean"]
+    avg_reporting_hours = round(avg_reporting_time / 3600, 1) if avg_reporting_time else 0
 
     # Get modality distribution (by test type)
     modality_data = (
@@ -235,6 +221,7 @@ def index(request):
             "urgent_orders": urgent_orders,
             "emergency_orders": emergency_orders,
             "avg_reporting_hours": avg_reporting_hours,
+            "turnaround": turnaround.dashboard(metrics=("radiology_turnaround",)),
             "results_needing_verification": results_needing_verification,
             "orders_needing_results": orders_needing_results,
             "modality_labels": json_for_template(modality_labels),
@@ -436,6 +423,8 @@ def order_detail(request, order_id):
         "order": order,
         "order_id": order_id,
         "result": result,
+        # Indexed headers + previews, so the page never streams the study.
+        "dicom_instances": list(result.dicom_instances.all()) if result else [],
     }
     return render(request, "radiology/order_detail.html", context)
 
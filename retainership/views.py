@@ -7,6 +7,7 @@ from django.db import transaction
 from decimal import Decimal
 
 from accounts.permissions import permission_required, role_required
+from patients import wallet_analytics
 from patients.models import (
     Patient,
     SharedWallet,
@@ -25,6 +26,7 @@ from .forms import (
     AddMemberToWalletForm,
 )
 from django.http import HttpResponse
+from django.utils.dateparse import parse_date
 from datetime import datetime
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
@@ -1002,15 +1004,24 @@ def remove_wallet_member(request, wallet_id, member_id):
     return redirect("retainership:view_wallet_details", wallet_id=wallet.id)
 
 
+def _statement_range(request):
+    """from_date/to_date query parameters as dates; unparseable ones are ignored."""
+    dates = []
+    for name in ("from_date", "to_date"):
+        try:
+            dates.append(parse_date(request.GET.get(name) or ""))
+        except ValueError:
+            dates.append(None)
+    return dates
+
+
 @login_required
 @permission_required("retainership.view")
 def print_wallet_transactions(request, wallet_id):
     """Generate a printable PDF of wallet transactions with optional date range filter"""
     wallet = get_object_or_404(SharedWallet, id=wallet_id, wallet_type="retainership")
 
-    # Get date range parameters
-    from_date = request.GET.get("from_date")
-    to_date = request.GET.get("to_date")
+    from_date, to_date = _statement_range(request)
 
     # Get all transactions for this wallet
     transactions = (
@@ -1025,25 +1036,8 @@ def print_wallet_transactions(request, wallet_id):
     if to_date:
         transactions = transactions.filter(created_at__date__lte=to_date)
 
-    # Calculate totals (also filtered by date range)
-    total_credits_qs = WalletTransaction.objects.filter(
-        shared_wallet=wallet,
-        transaction_type__in=["credit", "deposit", "transfer_in"],
-    )
-    total_debits_qs = WalletTransaction.objects.filter(
-        shared_wallet=wallet,
-        transaction_type__in=["debit", "withdrawal", "transfer_out"],
-    )
-
-    if from_date:
-        total_credits_qs = total_credits_qs.filter(created_at__date__gte=from_date)
-        total_debits_qs = total_debits_qs.filter(created_at__date__gte=from_date)
-    if to_date:
-        total_credits_qs = total_credits_qs.filter(created_at__date__lte=to_date)
-        total_debits_qs = total_debits_qs.filter(created_at__date__lte=to_date)
-
-    total_credits = total_credits_qs.aggregate(total=Sum("amount"))["total"] or 0
-    total_debits = total_debits_qs.aggregate(total=Sum("amount"))["total"] or 0
+    # Totals and balances for the range, from monthly snapshots
+    summary = wallet_analytics.statement(wallet, from_date, to_date)
 
     # Create the PDF response
     response = HttpResponse(content_type="application/pdf")
@@ -1104,10 +1098,12 @@ def print_wallet_transactions(request, wallet_id):
     # Summary Table
     summary_data = [
         ["Summary", "Amount (₦)"],
-        ["Total Credits", f"{total_credits:,.2f}"],
-        ["Total Debits", f"{total_debits:,.2f}"],
+        ["Opening Balance", f"{summary['opening_balance']:,.2f}"],
+        ["Total Credits", f"{summary['credits']:,.2f}"],
+        ["Total Debits", f"{summary['debits']:,.2f}"],
+        ["Closing Balance", f"{summary['closing_balance']:,.2f}"],
         ["Current Balance", f"{wallet.balance:,.2f}"],
-        ["Total Transactions", str(transactions.count())],
+        ["Total Transactions", str(summary["transaction_count"])],
     ]
 
     summary_table = Table(summary_data, colWidths=[3 * inch, 2 * inch])
@@ -1165,12 +1161,13 @@ def print_wallet_transactions(request, wallet_id):
     elements.append(Spacer(1, 12))
 
     # Transactions Table
-    if transactions:
+    rows = list(transactions[:100])  # Limit to 100 transactions for PDF size
+    if rows:
         trans_data = [
             ["Date", "Type", "Patient", "Description", "Amount (₦)", "Balance (₦)"]
         ]
 
-        for trans in transactions[:100]:  # Limit to 100 transactions for PDF size
+        for trans in rows:
             patient_name = trans.patient.get_full_name() if trans.patient else "N/A"
             trans_data.append(
                 [
@@ -1233,9 +1230,7 @@ def print_wallet_transactions_html(request, wallet_id):
     """Generate a printable HTML view of wallet transactions with optional date range filter"""
     wallet = get_object_or_404(SharedWallet, id=wallet_id, wallet_type="retainership")
 
-    # Get date range parameters
-    from_date = request.GET.get("from_date")
-    to_date = request.GET.get("to_date")
+    from_date, to_date = _statement_range(request)
 
     # Get all transactions for this wallet
     transactions = (
@@ -1250,25 +1245,8 @@ def print_wallet_transactions_html(request, wallet_id):
     if to_date:
         transactions = transactions.filter(created_at__date__lte=to_date)
 
-    # Calculate totals (also filtered by date range)
-    total_credits_qs = WalletTransaction.objects.filter(
-        shared_wallet=wallet,
-        transaction_type__in=["credit", "deposit", "transfer_in"],
-    )
-    total_debits_qs = WalletTransaction.objects.filter(
-        shared_wallet=wallet,
-        transaction_type__in=["debit", "withdrawal", "transfer_out"],
-    )
-
-    if from_date:
-        total_credits_qs = total_credits_qs.filter(created_at__date__gte=from_date)
-        total_debits_qs = total_debits_qs.filter(created_at__date__gte=from_date)
-    if to_date:
-        total_credits_qs = total_credits_qs.filter(created_at__date__lte=to_date)
-        total_debits_qs = total_debits_qs.filter(created_at__date__lte=to_date)
-
-    total_credits = total_credits_qs.aggregate(total=Sum("amount"))["total"] or 0
-    total_debits = total_debits_qs.aggregate(total=Sum("amount"))["total"] or 0
+    # Totals and balances for the range, from monthly snapshots
+    summary = wallet_analytics.statement(wallet, from_date, to_date)
 
     # Get members
     members = wallet.members.select_related("patient").all()
@@ -1277,13 +1255,15 @@ def print_wallet_transactions_html(request, wallet_id):
         "wallet": wallet,
         "transactions": transactions,
         "members": members,
-        "total_credits": total_credits,
-        "total_debits": total_debits,
-        "transaction_count": transactions.count(),
+        "total_credits": summary["credits"],
+        "total_debits": summary["debits"],
+        "opening_balance": summary["opening_balance"],
+        "closing_balance": summary["closing_balance"],
+        "transaction_count": summary["transaction_count"],
         "report_date": datetime.now(),
         "generated_by": request.user.get_full_name() or request.user.username,
-        "from_date": from_date,
-        "to_date": to_date,
+        "from_date": from_date.isoformat() if from_date else "",
+        "to_date": to_date.isoformat() if to_date else "",
     }
 
     return render(request, "retainership/wallet_transactions_print.html", context)
@@ -0,0 +1,168 @@
+// Live screens: deltas pushed over the server-sent event stream (core.events).
+//
+//   HMSLive.connect("{% live_events_url 'queue' %}", {
+//       queue: function (type, data) { ... },   // one handler per channel
+//       reset: function () { ... }              // optional; default reloads the page
+//   }, {
+//       poll: function () { ... }               // optional; re-reads the page's data
+//   });
+//
+// The browser reconnects on its own (sending Last-Event-ID), so a dropped
+// connection or a server restart needs nothing from the page. `poll` runs
+// every POLL_MS as well: without a shared bus (EVENT_REDIS_URL) an event
+// written on another worker never reaches this stream, and it is all a
+// browser without EventSource gets.
+(function (window) {
+    'use strict';
+
+    // A screen that keeps falling behind must not reload in a loop.
+    var RELOAD_GUARD_MS = 60000;
+    var POLL_MS = 300000;
+
+    function reloadPage() {
+        var key = 'hmsLiveReload:' + window.location.pathname;
+        var last = parseInt(window.sessionStorage.getItem(key), 10) || 0;
+        if (Date.now() - last < RELOAD_GUARD_MS) {
+            return;
+        }
+        window.sessionStorage.setItem(key, String(Date.now()));
+        window.location.reload();
+    }
+
+    function connect(url, handlers, options) {
+        if (options && options.poll) {
+            window.setInterval(options.poll, options.every || POLL_MS);
+        }
+        if (!window.EventSource) {
+            return null;
+        }
+        var source = new window.EventSource(url);
+        Object.keys(handlers).forEach(function (channel) {
+            if (channel === 'reset') {
+                return;
+            }
+            source.addEventListener(channel, function (message) {
+                var event = JSON.parse(message.data);
+                handlers[channel](event.type, event.data);
+            });
+        });
+        source.addEventListener('reset', function () {
+            (handlers.reset || reloadPage)();
+        });
+        window.addEventListener('beforeunload', function () {
+            source.close();
+        });
+        return source;
+    }
+
+    // Fetch this page again and hand `fn` the parsed document; failures are
+    // left to the next poll.
+    function readPage(fn) {
+        window.fetch(window.location.href, {credentials: 'same-origin'}).then(function (response) {
+            return response.ok ? response.text() : null;
+        }).then(function (html) {
+            if (html) {
+                fn(new window.DOMParser().parseFromString(html, 'text/html'));
+            }
+        }).catch(function () {});
+    }
+
+    // Run `fn` once things have been quiet for `wait` ms.
+    function debounce(fn, wait) {
+        var timer = null;
+        return function () {
+            window.clearTimeout(timer);
+            timer = window.setTimeout(fn, wait);
+        };
+    }
+
+    // Write queue positions ({entry id: {position, wait_minutes}}) into the
+    // rows' .queue-position and .queue-eta cells.
+    function showPositions(positions) {
+        Object.keys(positions).forEach(function (id) {
+            var row = document.querySelector('tr[data-entry-id="' + id + '"]');
+            if (!row) {
+                return;
+            }
+            var position = row.querySelector('.queue-position');
+            var eta = row.querySelector('.queue-eta');
+            if (position) {
+                position.textContent = positions[id].position;
+            }
+            if (eta) {
+                eta.textContent = '~' + positions[id].wait_minutes + ' min';
+            }
+        });
+    }
+
+    // Keep a queue table in step with waiting_entry deltas. Rows carry
+    // data-entry-id/-status/-priority: rows that leave the queue are removed,
+    // rows whose status or priority changed re-read the page (their actions
+    // change too), and arrivals are counted on options.notice (an element
+    // with a .count inside) rather than reshuffling the list under the user.
+    // options.belongs(entry) limits arrivals to the ones this page lists.
+    // `positions` events renumber the rows in place. The slow poll re-reads
+    // the page and applies its rows the same way.
+    function followQueue(url, options) {
+        var arrivals = {};
+        var reload = debounce(function () {
+            window.location.reload();
+        }, 2000);
+
+        // `listed`: the entry comes from the page itself, so it belongs.
+        function apply(entry, listed) {
+            var row = document.querySelector('tr[data-entry-id="' + entry.id + '"]');
+            var queued = !entry.deleted && (entry.status === 'waiting' || entry.status === 'in_progress');
+            if (row && !queued) {
+                row.remove();
+            } else if (row) {
+                if (row.getAttribute('data-status') !== entry.status ||
+                        row.getAttribute('data-priority') !== entry.priority) {
+                    reload();
+                }
+            } else if (queued && (listed || !options.belongs || options.belongs(entry))) {
+                var notice = document.getElementById(options.notice);
+                if (notice) {
+                    arrivals[entry.id] = true;
+                    notice.querySelector('.count').textContent = Object.keys(arrivals).length;
+                    notice.classList.remove('d-none');
+                }
+            }
+        }
+
+        function poll() {
+            readPage(function (page) {
+                var listed = {};
+                page.querySelectorAll('tr[data-entry-id]').forEach(function (row) {
+                    var id = row.getAttribute('data-entry-id');
+                    listed[id] = true;
+                    apply({
+                        id: id,
+                        status: row.getAttribute('data-status'),
+                        priority: row.getAttribute('data-priority')
+                    }, true);
+                });
+                document.querySelectorAll('tr[data-entry-id]').forEach(function (row) {
+                    var id = row.getAttribute('data-entry-id');
+                    if (!listed[id]) {
+                        apply({id: id, deleted: true}, true);
+                    }
+                });
+            });
+        }
+
+        return connect(url, {
+            queue: function (type, entry) {
+                if (type === 'positions') {
+                    showPositions(entry.positions);
+                } else if (type === 'waiting_entry') {
+                    apply(entry, false);
+                }
+            }
+        }, {poll: poll});
+    }
+
+    window.HMSLive = {
+        connect: connect, reloadPage: reloadPage, readPage: readPage, debounce: debounce, followQueue: followQueue
+    };
+})(window);